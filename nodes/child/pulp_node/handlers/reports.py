@@ -9,6 +9,8 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+from threading import RLock
+
 from pulp_node.reports import RepositoryReport, RepositoryProgress
 from pulp_node.error import ErrorList
 
@@ -85,6 +87,8 @@ class HandlerProgress(object):
     :type state: str
     :ivar progress: A list of RepositoryProgress reports.
     :type progress: list
+    :ivar lock: Serializes updates made by repositories synchronized concurrently.
+    :type lock: RLock
     """
 
     PENDING = 'pending'
@@ -99,6 +103,7 @@ class HandlerProgress(object):
         self.conduit = conduit
         self.state = self.PENDING
         self.progress = []
+        self.lock = RLock()
 
     def started(self, bindings):
         """
@@ -142,18 +147,20 @@ class HandlerProgress(object):
         :param report: The update repository progress report.
         :type report: RepositoryProgress
         """
-        for i, p in enumerate(self.progress):
-            if p.repo_id == report.repo_id:
-                self.progress[i] = report
-            self._updated()
-            break
+        with self.lock:
+            for i, p in enumerate(self.progress):
+                if p.repo_id == report.repo_id:
+                    self.progress[i] = report
+                self._updated()
+                break
 
     def _updated(self):
         """
         Notification that the report has been updated.
         Reported using the conduit.
         """
-        self.conduit.update_progress(self.dict())
+        with self.lock:
+            self.conduit.update_progress(self.dict())
 
     def dict(self):
         return dict(
@@ -13,6 +13,8 @@
 from gettext import gettext as _
 from logging import getLogger
 from operator import itemgetter
+from Queue import Queue, Empty
+from threading import Thread
 
 from pulp_node import constants
 from pulp_node.handlers.model import *
@@ -24,6 +26,10 @@ from pulp_node.handlers.reports import SummaryReport, HandlerProgress, Repositor
 log = getLogger(__name__)
 
 
+# The number of repositories merged and synchronized concurrently by default.
+DEFAULT_MAX_CONCURRENCY = 1
+
+
 # --- i18n ------------------------------------------------------------------------------
 
 STRATEGY_UNSUPPORTED = _('Handler strategy "%(s)s" not supported')
@@ -69,6 +75,18 @@ class SyncRequest(object):
         self.options = options
         summary.setup(self.bindings)
 
+    def max_concurrency(self):
+        """
+        Get the maximum number of repositories to be merged and
+        synchronized concurrently.
+        :return: The max concurrency specified in the options (at least 1).
+        :rtype: int
+        """
+        max_concurrency = self.options.get(constants.MAX_CONCURRENCY_KEYWORD)
+        if max_concurrency is None:
+            return DEFAULT_MAX_CONCURRENCY
+        return max(1, int(max_concurrency))
+
     def cancelled(self):
         """
         Get whether the request has been cancelled.
@@ -142,34 +160,51 @@ class HandlerStrategy(object):
         Add or update repositories based on bindings.
           - Merge repositories found in BOTH parent and child.
           - Add repositories found in the parent but NOT in the child.
+        Up to request.max_concurrency() repositories are merged and
+        synchronized concurrently.
         :param request: A synchronization request.
         :type request: SyncRequest
         """
-        for bind in request.bindings:
-            try:
-                repo_id = bind['repo_id']
-                details = bind['details']
-                if request.cancelled():
-                    request.summary[repo_id].action = RepositoryReport.CANCELLED
-                    continue
-                parent = Repository(repo_id, details)
-                child = RepositoryOnChild.fetch(repo_id)
-                progress = request.progress.find_report(repo_id)
-                progress.begin_merging()
-                if child:
-                    request.summary[repo_id].action = RepositoryReport.MERGED
-                    child.merge(parent)
-                else:
-                    child = RepositoryOnChild(repo_id, parent.details)
-                    request.summary[repo_id].action = RepositoryReport.ADDED
-                    child.add()
-                self._synchronize_repository(request, repo_id)
-            except NodeError, ne:
-                request.summary.errors.append(ne)
-            except Exception, e:
-                log.exception(repo_id)
-                error = CaughtException(e, repo_id)
-                request.summary.errors.append(error)
+        max_concurrency = request.max_concurrency()
+        if max_concurrency > 1 and len(request.bindings) > 1:
+            pool = WorkerPool(max_concurrency)
+            pool.run(self._merge_repository, [(request, bind) for bind in request.bindings])
+        else:
+            for bind in request.bindings:
+                self._merge_repository(request, bind)
+
+    def _merge_repository(self, request, bind):
+        """
+        Add or update the repository of a binding and synchronize it.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param bind: A consumer binding payload.
+        :type bind: dict
+        """
+        repo_id = bind['repo_id']
+        try:
+            details = bind['details']
+            if request.cancelled():
+                request.summary[repo_id].action = RepositoryReport.CANCELLED
+                return
+            parent = Repository(repo_id, details)
+            child = RepositoryOnChild.fetch(repo_id)
+            progress = request.progress.find_report(repo_id)
+            progress.begin_merging()
+            if child:
+                request.summary[repo_id].action = RepositoryReport.MERGED
+                child.merge(parent)
+            else:
+                child = RepositoryOnChild(repo_id, parent.details)
+                request.summary[repo_id].action = RepositoryReport.ADDED
+                child.add()
+            self._synchronize_repository(request, repo_id)
+        except NodeError, ne:
+            request.summary.errors.append(ne)
+        except Exception, e:
+            log.exception(repo_id)
+            error = CaughtException(e, repo_id)
+            request.summary.errors.append(error)
 
     def _synchronize_repository(self, request, repo_id):
         """
@@ -221,6 +256,66 @@ class HandlerStrategy(object):
                 request.summary.errors.append(error)
 
 
+# --- concurrency -----------------------------------------------------------------------
+
+
+class WorkerPool(object):
+    """
+    A bounded pool of threads used to run a function on a list of inputs.
+    :ivar max_concurrency: The maximum number of threads.
+    :type max_concurrency: int
+    """
+
+    def __init__(self, max_concurrency):
+        """
+        :param max_concurrency: The maximum number of threads.
+        :type max_concurrency: int
+        """
+        self.max_concurrency = max_concurrency
+
+    def run(self, fn, inputs):
+        """
+        Call the function once for each input using at most max_concurrency
+        threads.  Blocks until all calls have completed.  Inputs are dispatched
+        in order.  The function is expected to handle its own exceptions.
+        :param fn: A function.
+        :type fn: callable
+        :param inputs: A list of argument tuples.
+        :type inputs: list
+        """
+        queue = Queue()
+        for args in inputs:
+            queue.put(args)
+        threads = []
+        for i in range(min(self.max_concurrency, len(inputs))):
+            thread = Thread(target=self._work, args=(queue, fn))
+            thread.setDaemon(True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+    @staticmethod
+    def _work(queue, fn):
+        """
+        Thread main.  Call the function with arguments taken from the queue
+        until the queue is empty.
+        :param queue: A queue of argument tuples.
+        :type queue: Queue
+        :param fn: A function.
+        :type fn: callable
+        """
+        while True:
+            try:
+                args = queue.get_nowait()
+            except Empty:
+                break
+            try:
+                fn(*args)
+            except Exception:
+                log.exception('worker failed')
+
+
 # --- strategies ------------------------------------------------------------------------
 
 
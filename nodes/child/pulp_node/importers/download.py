@@ -10,23 +10,179 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import os
+import shutil
 import tarfile
+import inspect
 
-from tempfile import mktemp
+from Queue import Queue
+from threading import Thread, RLock
+from tempfile import mkdtemp
 from logging import getLogger
 
 from nectar.listener import AggregatingEventListener
 from nectar.request import DownloadRequest
 
+from pulp.plugins.util import verification
+from pulp.server.config import config as pulp_conf
+
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.error import UnitDownloadError
+from pulp_node.pool import Pool, content_checksum
+from pulp_node.error import NodeError, UnitDownloadError, UnitVerificationError, CaughtException
 
 
 log = getLogger(__name__)
 
 
 UNIT_REF = 'unit_ref'
+STORAGE_PATH = 'storage_path'
+
+# The number of threads adding downloaded units.
+DEFAULT_WORKERS = 4
+
+# The number of downloaded units waiting to be added before
+# the downloader is blocked.
+DEFAULT_BACKLOG = 100
+
+# The pool (relative to the storage_dir) of symlinks to downloaded files keyed by checksum.
+CONTENT_POOL_DIR = 'nodes/pool'
+
+# The journal (in the repository working_dir) of verified downloads.
+JOURNAL_FILE_NAME = 'downloads.journal'
+
+# Whether the downloader sends the headers of download requests, such as the
+# Range header used to resume partial downloads.  Older versions of nectar
+# ignore them and always download the whole file.
+RANGE_SUPPORTED = 'headers' in inspect.getargspec(DownloadRequest.__init__)[0]
+
+# Checksum types found in unit keys that are named differently by verification.
+CHECKSUM_TYPES = {
+    'sha': verification.TYPE_SHA1,
+}
+
+
+def content_pool():
+    """
+    Get the pool of files downloaded by the child.
+    :return: The pool.
+    :rtype: Pool
+    """
+    storage_dir = pulp_conf.get('server', 'storage_dir')
+    return Pool(pathlib.join(storage_dir, CONTENT_POOL_DIR))
+
+
+def published_checksum(unit):
+    """
+    Get the checksum published with the unit (in the unit key) that can
+    be used to verify the downloaded file.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: A tuple of: (checksum_type, checksum) or None when the unit key
+        does not contain a checksum of a supported type.
+    :rtype: tuple
+    """
+    key = content_checksum(unit)
+    if not key:
+        return None
+    algorithm, checksum = key.split(':')
+    algorithm = algorithm.lower()
+    algorithm = CHECKSUM_TYPES.get(algorithm, algorithm)
+    if algorithm in verification.CHECKSUM_FUNCTIONS:
+        return algorithm, checksum.lower()
+
+
+def verify(unit, path):
+    """
+    Verify the file downloaded for the unit using the size and checksum
+    published with the unit.  Only the size of tarballs can be verified.
+    :param unit: A content unit.
+    :type unit: dict
+    :param path: The absolute path to the downloaded file.
+    :type path: str
+    :raise VerificationException: when the file fails verification.
+    """
+    size = unit.get(constants.FILE_SIZE)
+    checksum = None
+    if not unit.get(constants.PUBLISHED_AS_TARBALL):
+        checksum = published_checksum(unit)
+    if size is None and checksum is None:
+        # nothing published to verify against
+        return
+    fp = open(path, 'rb')
+    try:
+        if size is not None:
+            verification.verify_size(fp, size)
+        if checksum is not None:
+            verification.verify_checksum(fp, *checksum)
+    finally:
+        fp.close()
+
+
+class DownloadJournal(object):
+    """
+    The journal of files downloaded (or found) and verified while synchronizing
+    a repository.  Each verified path is appended to a file in the repository
+    working directory so that a synchronization that is restarted after being
+    cancelled or interrupted does not download or verify the file again.
+    The journal is deleted once the repository has been synchronized.
+    :ivar path: The absolute path to the journal file.
+    :type path: str
+    :ivar verified: The set of verified paths.
+    :type verified: set
+    """
+
+    def __init__(self, dir_path):
+        """
+        :param dir_path: The absolute path to the repository working directory.
+        :type dir_path: str
+        """
+        self.path = pathlib.join(dir_path, JOURNAL_FILE_NAME)
+        self.verified = set()
+        self._lock = RLock()
+        self._loaded = False
+
+    def load(self):
+        """
+        Load the journal file.
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return
+            with open(self.path) as fp:
+                for line in fp:
+                    if line.endswith('\n'):
+                        self.verified.add(line[:-1])
+
+    def add(self, path):
+        """
+        Record that the file at the specified path has been verified.
+        :param path: The absolute path to a verified file.
+        :type path: str
+        """
+        with self._lock:
+            self.load()
+            if path in self.verified:
+                return
+            pathlib.mkdir(os.path.dirname(self.path))
+            with open(self.path, 'a') as fp:
+                fp.write(path + '\n')
+            self.verified.add(path)
+
+    def delete(self):
+        """
+        Delete the journal.
+        """
+        with self._lock:
+            self.verified = set()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def __contains__(self, path):
+        self.load()
+        return path in self.verified
 
 
 class UnitDownloadManager(AggregatingEventListener):
@@ -34,15 +190,25 @@ class UnitDownloadManager(AggregatingEventListener):
     The content unit download manager.
     Listens for status changes to unit download requests and calls into the importer
     strategy object based on whether the download succeeded or failed.  If the download
-    succeeded, the importer strategy is called to add the associated content unit (in the DB).
+    succeeded, the downloaded unit is queued and a pool of worker threads extracts
+    tarballs and calls the importer strategy to add the associated content unit (in the DB).
+    The queue is bounded so the downloader is blocked while the workers catch up.
+    Each downloaded file is verified before the unit is added and recorded in the
+    download journal once the unit has been added.
     In all cases, it checks the cancellation status of the sync request and when
     cancellation is detected, the downloader is cancelled.
+    The workers are started by start() and must be stopped by shutdown() after
+    the downloader has finished.
     """
 
     @staticmethod
-    def create_request(url, storage_path, unit_ref):
+    def create_request(url, storage_path, unit_ref, offset=0):
         """
         Create a nectar download request compatible with the listener.
+        When an offset is specified, the download resumes a partially downloaded
+        file using an HTTP range request and the rest of the file is appended.
+        When the downloader does not support range requests, the partially
+        downloaded file is deleted and downloaded from the start instead.
         :param url: The download URL.
         :type url: str
 
@@ -50,21 +216,63 @@ class UnitDownloadManager(AggregatingEventListener):
         :type storage_path: str
         :param unit_ref: A reference to the unit association.
         :type unit_ref: pulp_node.manifest.UnitRef.
+        :param offset: The number of bytes already downloaded.
+        :type offset: int
         :return: A nectar download request.
         :rtype: DownloadRequest
         """
-        return DownloadRequest(url, storage_path, data={UNIT_REF: unit_ref})
+        data = {UNIT_REF: unit_ref, STORAGE_PATH: storage_path}
+        if offset and not RANGE_SUPPORTED:
+            # the whole file would be appended to the partial file
+            os.unlink(storage_path)
+            offset = 0
+        if not offset:
+            return DownloadRequest(url, storage_path, data=data)
+        fp = open(storage_path, 'ab')
+        request = DownloadRequest(url, fp, data=data)
+        request.headers = {'Range': 'bytes=%d-' % offset}
+        return request
 
-    def __init__(self, strategy, request):
+    def __init__(self, strategy, request, workers=DEFAULT_WORKERS, backlog=DEFAULT_BACKLOG):
         """
         :param strategy: An importer strategy
         :type strategy: pulp_node.importer.strategy.ImporterStrategy.
         :param request: The nodes sync request.
         :type request: pulp_node.importers.strategies.SyncRequest.
+        :param workers: The number of threads adding downloaded units.
+        :type workers: int
+        :param backlog: The number of downloaded units waiting to be added
+            before the downloader is blocked.
+        :type backlog: int
         """
         super(self.__class__, self).__init__()
         self._strategy = strategy
         self.request = request
+        self.workers = workers
+        self.queue = Queue(maxsize=backlog)
+        self.threads = []
+        self.errors = []
+        self.journal = DownloadJournal(request.working_dir)
+
+    def start(self):
+        """
+        Start the worker threads.
+        """
+        for n in range(self.workers):
+            thread = Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def shutdown(self):
+        """
+        Wait for the queued units to be added and stop the worker threads.
+        """
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
 
     def download_started(self, report):
         """
@@ -77,7 +285,7 @@ class UnitDownloadManager(AggregatingEventListener):
         """
         super(self.__class__, self).download_started(report)
         if not self.request.cancelled():
-            dir_path = os.path.dirname(report.destination)
+            dir_path = os.path.dirname(self._storage_path(report))
             pathlib.mkdir(dir_path)
         else:
             self.request.downloader.cancel()
@@ -94,12 +302,13 @@ class UnitDownloadManager(AggregatingEventListener):
         :type report: nectar.report.DownloadReport.
         """
         super(self.__class__, self).download_succeeded(report)
-        unit_ref = report.data[UNIT_REF]
-        unit = unit_ref.fetch()
-        unit['storage_path'] = report.destination
-        self._strategy.add_unit(self.request, unit)
-        if unit.get(constants.PUBLISHED_AS_TARBALL):
-            self.untar_dir(report.destination)
+        self._close(report)
+        item = (report.data[UNIT_REF], self._storage_path(report))
+        if self.threads:
+            # blocks while the backlog is full
+            self.queue.put(item)
+        else:
+            self._add(item)
         if self.request.cancelled():
             self.request.downloader.cancel()
 
@@ -112,29 +321,128 @@ class UnitDownloadManager(AggregatingEventListener):
         :type report: nectar.report.DownloadReport.:
         """
         super(self.__class__, self).download_failed(report)
+        self._close(report)
         if self.request.cancelled():
             self.request.downloader.cancel()
 
+    def add_unit(self, unit_ref, path):
+        """
+        Add the downloaded unit.
+          1. Fetch the content unit using the reference.
+          2. Verify the downloaded file.
+          3. Update the storage_path on the unit.
+          4. Add the unit.
+          5. Extract the tarball or add the file to the content pool.
+          6. Record the verified file in the journal.
+        :param unit_ref: A reference to the downloaded unit.
+        :type unit_ref: pulp_node.manifest.UnitRef
+        :param path: The absolute path to the downloaded file.
+        :type path: str
+        :raise UnitVerificationError: when the file fails verification.
+        """
+        unit = unit_ref.fetch()
+        try:
+            verify(unit, path)
+        except verification.VerificationException:
+            log.error('%s failed verification', path)
+            os.unlink(path)
+            raise UnitVerificationError(path, self.request.repo_id)
+        unit['storage_path'] = path
+        self._strategy.add_unit(self.request, unit)
+        if unit.get(constants.PUBLISHED_AS_TARBALL):
+            self.untar_dir(path)
+        else:
+            self.pool_file(unit, path)
+        self.journal.add(path)
+
+    def _run(self):
+        """
+        The worker thread main loop.
+        Add queued units until the (None) stop marker is read.
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self._add(item)
+
+    def _add(self, item):
+        """
+        Add the downloaded unit and collect errors.
+        :param item: A tuple of: (unit_ref, path).
+        :type item: tuple
+        """
+        try:
+            self.add_unit(*item)
+        except NodeError, ne:
+            self.errors.append(ne)
+        except Exception, e:
+            log.exception(item[1])
+            self.errors.append(CaughtException(e, self.request.repo_id))
+
+    @staticmethod
+    def _storage_path(report):
+        """
+        Get the absolute path to the file being downloaded.
+        The report destination is a file object when the download is resumed.
+        :param report: A nectar download report.
+        :type report: nectar.report.DownloadReport.
+        :return: The absolute path.
+        :rtype: str
+        """
+        return report.data.get(STORAGE_PATH, report.destination)
+
+    @staticmethod
+    def _close(report):
+        """
+        Close the destination of a resumed download.
+        :param report: A nectar download report.
+        :type report: nectar.report.DownloadReport.
+        """
+        if isinstance(report.destination, file):
+            report.destination.close()
+
     def untar_dir(self, path):
         """
         Replaces the tarball at the specified path with the extracted directory tree.
+        The tree is extracted within a private temporary directory and renamed once
+        complete so a partially extracted tree is never found at the specified path.
         :param path: The absolute path to a tarball.
         :type path: str
         :raise IOError: on i/o errors.
         """
-        parent_dir = os.path.dirname(path)
-        tar_path = mktemp(dir=parent_dir)
-        os.link(path, tar_path)
-        os.unlink(path)
+        tmp_dir = mkdtemp(dir=os.path.dirname(path))
         try:
+            tar_path = os.path.join(tmp_dir, 'tarball')
+            tree_path = os.path.join(tmp_dir, 'tree')
+            os.rename(path, tar_path)
+            # created with the default mode (mkdtemp directories are private)
+            os.mkdir(tree_path)
             fp = tarfile.open(tar_path)
             try:
-                fp.extractall(path=path)
+                fp.extractall(path=tree_path)
             finally:
                 fp.close()
+            os.rename(tree_path, path)
         finally:
-            if os.path.exists(tar_path):
-                os.unlink(tar_path)
+            shutil.rmtree(tmp_dir)
+
+    def pool_file(self, unit, path):
+        """
+        Add the downloaded file to the content pool so it can be linked
+        instead of downloaded when the same content is needed at another path.
+        :param unit: The downloaded unit.
+        :type unit: dict
+        :param path: The absolute path to the downloaded file.
+        :type path: str
+        """
+        key = content_checksum(unit)
+        if not key:
+            return
+        try:
+            content_pool().add(key, path, symbolic=True)
+        except Exception:
+            log.exception(path)
 
     def error_list(self):
         """
@@ -146,4 +454,5 @@ class UnitDownloadManager(AggregatingEventListener):
         for report in self.failed_reports:
             error = UnitDownloadError(report.url, self.request.repo_id, report.error_report)
             error_list.append(error)
+        error_list.extend(self.errors)
         return error_list
@@ -17,6 +17,7 @@ from gettext import gettext as _
 from nectar.config import DownloaderConfig
 from nectar.downloaders.curl import HTTPSCurlDownloader
 
+from pulp.plugins.conduits.repo_sync import SAVE_UNIT_BATCH_SIZE
 from pulp.plugins.importer import Importer
 
 from pulp_node import constants
@@ -125,6 +126,8 @@ class NodesHttpImporter(Importer):
         summary_report = SummaryReport()
 
         try:
+            # units are not used once saved so they can be written in batches
+            conduit.set_unit_batch_size(SAVE_UNIT_BATCH_SIZE)
             downloader = self._downloader(config)
             strategy_name = config.get(constants.STRATEGY_KEYWORD)
             progress_report = RepositoryProgress(repo.id, ProgressListener(conduit))
@@ -10,77 +10,220 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
-class UniqueKey(object):
+"""
+Provides the unit inventories used by the importer strategies to determine
+which content units need to be added to and removed from a child repository.
+To keep a small memory footprint for large repositories, units are tracked
+by digest and the units themselves are read from the manifest again only
+when they need to be added.
+"""
+
+import struct
+
+from array import array
+from bisect import bisect_left
+
+from pulp_node.manifest import DIGEST_FORMAT, unit_digest, units_digest
+
+
+# --- constants -------------------------------------------------------------------------
+
+
+# The array typecode holding a unit digest.  Python 2 arrays have no 64-bit
+# typecode so a native long is used when it is 64 bits wide; otherwise (32-bit
+# platforms) the digests are kept in lists.
+DIGEST_TYPECODE = 'l' if array('l').itemsize == struct.calcsize(DIGEST_FORMAT) else None
+
+
+# --- utils -----------------------------------------------------------------------------
+
+
+def digest_array(digests=()):
+    """
+    Get a compact array of the specified digests.
+    :param digests: Unit digests.
+    :type digests: iterable
+    :return: The array of digests, a list when no array typecode is 64 bits wide.
+    :rtype: array.array
+    """
+    if DIGEST_TYPECODE is None:
+        return list(digests)
+    return array(DIGEST_TYPECODE, digests)
+
+
+def sorted_digests(digests):
     """
-    A unique unit key consisting of a unit's type_id & unit_key.
-    The unit key is sorted to ensure consistency.
-    :ivar uid: The unique ID.
-    :type uid: A tuple of: (type_id, unit_key)
+    Get a sorted copy of the specified digests.
+    :param digests: An array of digests.
+    :type digests: array.array
+    :return: The sorted array of digests.
+    :rtype: array.array
     """
+    return digest_array(sorted(digests))
+
+
+def contains(digests, digest):
+    """
+    Get whether the sorted array of digests contains the specified digest.
+    :param digests: A sorted array of digests.
+    :type digests: array.array
+    :param digest: A unit digest.
+    :type digest: int
+    :return: True if contained.
+    :rtype: bool
+    """
+    i = bisect_left(digests, digest)
+    return i < len(digests) and digests[i] == digest
+
 
-    def __init__(self, unit):
+def difference(digests, other):
+    """
+    Merge two sorted arrays of digests to get the digests contained in
+    the first array but not contained in the other.
+    :param digests: A sorted array of digests.
+    :type digests: array.array
+    :param other: A sorted array of digests.
+    :type other: array.array
+    :return: The sorted array of digests.
+    :rtype: array.array
+    """
+    result = digest_array()
+    i = 0
+    length = len(other)
+    for digest in digests:
+        while i < length and other[i] < digest:
+            i += 1
+        if i < length and other[i] == digest:
+            continue
+        result.append(digest)
+    return result
+
+
+# --- inventory -------------------------------------------------------------------------
+
+
+class ChildUnits(object):
+    """
+    The content units associated with a repository in the child inventory.
+    Only the fields needed to remove a unit are kept.
+    :ivar digests: The digest of each unit (in order).
+    :type digests: array.array
+    :ivar records: The (unit_id, type_id, owner_type, owner_id) of each unit (in order).
+    :type records: list
+    :ivar sorted: The sorted digests.
+    :type sorted: array.array
+    """
+
+    def __init__(self, units):
         """
-        :param unit: A content unit.
-        :type unit: dict
+        :param units: The content units in the child node.
+        :type units: iterable
         """
-        type_id = unit['type_id']
-        unit_key = tuple(sorted(unit['unit_key'].items()))
-        self.uid = (type_id, unit_key)
+        self.digests = digest_array()
+        self.records = []
+        for unit in units:
+            self.digests.append(unit_digest(unit))
+            self.records.append((
+                unit['unit_id'],
+                unit['type_id'],
+                unit.get('owner_type'),
+                unit.get('owner_id')))
+        self.sorted = sorted_digests(self.digests)
+
+    def units(self, digests):
+        """
+        Get the units with the specified digests.
+        :param digests: A sorted array of digests.
+        :type digests: array.array
+        :return: List of: {unit_id, type_id, owner_type, owner_id}
+        :rtype: list
+        """
+        units = []
+        if not digests:
+            return units
+        for i, digest in enumerate(self.digests):
+            if not contains(digests, digest):
+                continue
+            unit_id, type_id, owner_type, owner_id = self.records[i]
+            units.append(dict(
+                unit_id=unit_id,
+                type_id=type_id,
+                owner_type=owner_type,
+                owner_id=owner_id))
+        return units
+
+    def __contains__(self, digest):
+        return contains(self.sorted, digest)
+
+    def __len__(self):
+        return len(self.digests)
+
+
+class ParentUnits(object):
+    """
+    The content units in the manifest with the specified digests.
+    The units are read from the manifest when iterated.
+    """
 
-    def __hash__(self):
-        return hash(self.uid)
+    def __init__(self, manifest, digests):
+        """
+        :param manifest: The manifest.
+        :type manifest: pulp_node.manifest.Manifest
+        :param digests: A sorted array of digests.
+        :type digests: array.array
+        """
+        self.manifest = manifest
+        self.digests = digests
 
-    def __eq__(self, other):
-        return self.uid == other.uid
+    def __iter__(self):
+        if not self.digests:
+            return
+        for unit, ref in self.manifest.get_units():
+            if contains(self.digests, unit_digest(unit)):
+                unit.pop('metadata', None)
+                yield (unit, ref)
 
-    def __ne__(self, other):
-        return self.uid != other.uid
+    def __len__(self):
+        return len(self.digests)
 
 
 class UnitInventory(object):
     """
     The unit inventory contains both the parent and child inventory
-    of content units associated with a specific repository.  Each is contained
-    within a dictionary keyed by {UnitKey} to ensure uniqueness.
+    of content units associated with a specific repository.  The parent
+    inventory is the sorted digests of the units in the manifest.
     """
 
     @staticmethod
     def _import_parent_units(units):
-        _units = {}
+        digests = digest_array()
         for unit, ref in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = (unit, ref)
-        return _units
-
-    @staticmethod
-    def _import_child_units(units):
-        _units = {}
-        for unit in units:
-            unit.pop('metadata', None)
-            key = UniqueKey(unit)
-            _units[key] = unit
-        return _units
+            digests.append(unit_digest(unit))
+        return sorted_digests(digests)
 
     def __init__(self, manifest, child_units):
         """
         :param manifest: The manifest.
         :type manifest: pulp_node.manifest.Manifest
         :param child_units: The content units in the child node.
-        :type child_units: iterable
+        :type child_units: iterable|ChildUnits
         """
         self.manifest = manifest
         self.parent_units = self._import_parent_units(manifest.get_units())
-        self.child_units = self._import_child_units(child_units)
+        if isinstance(child_units, ChildUnits):
+            self.child_units = child_units
+        else:
+            self.child_units = ChildUnits(child_units)
 
     def units_on_parent_only(self):
         """
         Listing of units contained in the parent inventory
         but not contained in the child inventory.
-        :return: List of (unit address).
-        :rtype: list
+        :return: An iterable of: (unit, UnitRef).
+        :rtype: ParentUnits
         """
-        return [r for k, r in self.parent_units.items() if k not in self.child_units]
+        digests = difference(self.parent_units, self.child_units.sorted)
+        return ParentUnits(self.manifest, digests)
 
     def units_on_child_only(self):
         """
@@ -89,4 +232,85 @@ class UnitInventory(object):
         :return: List of units that need to be purged.
         :rtype: list
         """
-        return [u for k, u in self.child_units.items() if k not in self.parent_units]
\ No newline at end of file
+        digests = difference(self.child_units.sorted, self.parent_units)
+        return self.child_units.units(digests)
+
+
+class DeltaInventory(UnitInventory):
+    """
+    A unit inventory built from the chain of deltas leading from the manifest
+    last applied to the child to the current manifest.  Only the units added and
+    removed on the parent since the last synchronization are contained in the
+    parent inventory.
+    :ivar removed: The digests of units removed on the parent.
+    :type removed: set
+    """
+
+    def __init__(self, manifest, deltas, child_units):
+        """
+        :param manifest: The (current) manifest.
+        :type manifest: pulp_node.manifest.Manifest
+        :param deltas: The list of deltas to be applied in order.
+        :type deltas: list
+        :param child_units: The content units in the child node.
+        :type child_units: iterable|ChildUnits
+        """
+        self.manifest = manifest
+        self.parent_units = {}
+        self.removed = set()
+        for delta in deltas:
+            for unit in delta.removed:
+                digest = unit_digest(unit)
+                self.parent_units.pop(digest, None)
+                self.removed.add(digest)
+            for unit, ref in delta.get_units():
+                digest = unit_digest(unit)
+                unit.pop('metadata', None)
+                self.removed.discard(digest)
+                self.parent_units[digest] = (unit, ref)
+        if isinstance(child_units, ChildUnits):
+            self.child_units = child_units
+        else:
+            self.child_units = ChildUnits(child_units)
+
+    def units_on_parent_only(self):
+        """
+        Listing of units added to the parent inventory
+        but not contained in the child inventory.
+        :return: List of: (unit, UnitRef).
+        :rtype: list
+        """
+        return [r for d, r in self.parent_units.items() if d not in self.child_units]
+
+    def units_on_child_only(self):
+        """
+        Listing of units contained in the child inventory
+        but removed from the parent inventory.
+        :return: List of units that need to be purged.
+        :rtype: list
+        """
+        digests = sorted_digests([d for d in self.removed if d in self.child_units])
+        return self.child_units.units(digests)
+
+    def child_units_after(self):
+        """
+        Get the number of units contained in the child inventory
+        after the deltas have been applied.
+        :return: The number of units.
+        :rtype: int
+        """
+        added = len([d for d in self.parent_units if d not in self.child_units])
+        removed = len([d for d in self.removed if d in self.child_units])
+        return len(self.child_units) + added - removed
+
+    def child_digest_after(self):
+        """
+        Get the digest of the units contained in the child inventory
+        after the deltas have been applied.
+        See: pulp_node.manifest.units_digest().
+        :return: The digest.
+        :rtype: int
+        """
+        added = sum(d for d in self.parent_units if d not in self.child_units)
+        removed = sum(d for d in self.removed if d in self.child_units)
+        return units_digest((sum(self.child_units.digests), added, -removed))
@@ -20,15 +20,18 @@ import os
 from gettext import gettext as _
 from logging import getLogger
 
-from pulp.plugins.model import Unit, AssociatedUnit
+from pulp.plugins.model import Unit
+from pulp.plugins.util.verification import VerificationException
 from pulp.server.config import config as pulp_conf
 
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.conduit import NodesConduit
 from pulp_node.manifest import Manifest
-from pulp_node.importers.inventory import UnitInventory
-from pulp_node.importers.download import UnitDownloadManager
+from pulp_node.importers.inventory import ChildUnits, UnitInventory, DeltaInventory
+from pulp_node.importers.download import (UnitDownloadManager, DownloadJournal, content_pool,
+    verify)
+from pulp_node.pool import content_checksum
 from pulp_node.error import (NodeError, GetChildUnitsError, GetParentUnitsError, AddUnitError,
     DeleteUnitError, CaughtException)
 
@@ -41,6 +44,12 @@ log = getLogger(__name__)
 STRATEGY_UNSUPPORTED = _('Importer strategy "%(s)s" not supported')
 
 
+# --- constants -------------------------------------------------------------------------
+
+# The importer scratchpad key for the ID of the last manifest applied to the repository.
+MANIFEST_ID = 'manifest_id'
+
+
 # --- request ---------------------------------------------------------------------------
 
 
@@ -63,6 +72,8 @@ class SyncRequest(object):
     :type repo_id: str
     :ivar working_dir: The absolute path to a directory to be used as temporary storage.
     :type working_dir: str
+    :ivar manifest_id: The ID of the manifest being applied.
+    :type manifest_id: str
     """
 
     def __init__(self, importer, conduit, config, downloader, progress, summary, repo):
@@ -88,6 +99,7 @@ class SyncRequest(object):
         self.summary = summary
         self.repo_id = repo.id
         self.working_dir = repo.working_dir
+        self.manifest_id = None
 
     def started(self):
         """
@@ -129,6 +141,12 @@ class ImporterStrategy(object):
             log.exception(request.repo_id)
             request.summary.errors.append(CaughtException(e, request.repo_id))
 
+        if request.summary.errors or request.cancelled():
+            return
+
+        self._save_manifest_id(request)
+        DownloadJournal(request.working_dir).delete()
+
     def _synchronize(self, request):
         """
         Specific strategies defined by subclasses.
@@ -169,10 +187,10 @@ class ImporterStrategy(object):
         :return: The built inventory.
         :rtype: UnitInventory
         """
-        # fetch child units
+        # fetch child unit keys
         try:
             conduit = NodesConduit()
-            child_units = conduit.get_units(request.repo_id)
+            child_units = ChildUnits(conduit.get_unit_keys(request.repo_id))
         except NodeError:
             raise
         except Exception:
@@ -185,14 +203,99 @@ class ImporterStrategy(object):
             url = request.config.get(constants.MANIFEST_URL_KEYWORD)
             manifest = Manifest()
             manifest.fetch(url, request.working_dir, request.downloader)
-            manifest.fetch_units(url, request.downloader)
+            inventory = self._delta_inventory(request, url, manifest, child_units)
+            if inventory is not None and not self._consistent(manifest, inventory):
+                log.info('deltas for: %s not consistent, using: %s', request.repo_id, url)
+                inventory = None
+            if inventory is None:
+                manifest.fetch_units(url, request.downloader)
+                inventory = UnitInventory(manifest, child_units)
         except NodeError:
             raise
         except Exception:
             log.exception(request.repo_id)
             raise GetParentUnitsError(request.repo_id)
 
-        return UnitInventory(manifest, child_units)
+        request.manifest_id = manifest.id
+        return inventory
+
+    def _delta_inventory(self, request, url, manifest, child_units):
+        """
+        Build the unit inventory using the deltas published since the manifest
+        last applied to the repository.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param url: The URL to the manifest.
+        :type url: str
+        :param manifest: The fetched manifest.
+        :type manifest: Manifest
+        :param child_units: The content units in the child node.
+        :type child_units: ChildUnits
+        :return: The built inventory or None when the deltas cannot be fetched
+            and the inventory must be built using all of the units in the manifest.
+        :rtype: DeltaInventory
+        """
+        manifest_id = self._last_manifest_id(request)
+        if not manifest_id:
+            return None
+        try:
+            deltas = manifest.fetch_deltas(url, manifest_id, request.working_dir, request.downloader)
+        except Exception:
+            log.info('deltas from manifest: %s not found, using: %s', manifest_id, url)
+            return None
+        return DeltaInventory(manifest, deltas, child_units)
+
+    def _consistent(self, manifest, inventory):
+        """
+        Get whether applying the deltas in the inventory results in the child
+        repository containing the units in the manifest.
+        :param manifest: The fetched manifest.
+        :type manifest: Manifest
+        :param inventory: An inventory built using deltas.
+        :type inventory: DeltaInventory
+        :return: True if consistent.
+        :rtype: bool
+        """
+        if inventory.child_units_after() != manifest.total_units:
+            return False
+        if manifest.units_digest is None:
+            # published by a parent that does not record the digest
+            return True
+        return inventory.child_digest_after() == manifest.units_digest
+
+    def _last_manifest_id(self, request):
+        """
+        Get the ID of the manifest last applied to the repository.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :return: The manifest ID or None when not found.
+        :rtype: str
+        """
+        try:
+            scratchpad = request.conduit.get_scratchpad()
+        except Exception:
+            log.exception(request.repo_id)
+            return None
+        if isinstance(scratchpad, dict):
+            return scratchpad.get(MANIFEST_ID)
+
+    def _save_manifest_id(self, request):
+        """
+        Save the ID of the manifest applied to the repository so the next
+        synchronization can use the deltas published since.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        """
+        if not request.manifest_id:
+            return
+        try:
+            scratchpad = request.conduit.get_scratchpad()
+            if not isinstance(scratchpad, dict):
+                scratchpad = {}
+            scratchpad[MANIFEST_ID] = request.manifest_id
+            request.conduit.set_scratchpad(scratchpad)
+        except Exception:
+            log.exception(request.repo_id)
 
     def _update_storage_path(self, unit):
         """
@@ -221,7 +324,8 @@ class ImporterStrategy(object):
           1. If no file is associated with unit.
           2. The file associated with the unit is successfully downloaded.
         For units with files, the unit is added to the inventory as part of the
-        unit download manager callback.
+        unit download manager callback.  Partially downloaded files are resumed
+        when the downloader supports range requests.
         :param request: A synchronization request.
         :type request: SyncRequest
         :param unit_inventory: The inventory of both parent and child content units.
@@ -236,62 +340,113 @@ class ImporterStrategy(object):
             if request.cancelled():
                 return
             self._update_storage_path(unit)
-            if not self._needs_download(unit):
-                # unit has no file associated
-                self.add_unit(request, unit_ref.fetch())
+            if not self._needs_download(unit, manager.journal):
+                # unit has no file associated or the file is already stored
+                _unit = unit_ref.fetch()
+                self._update_storage_path(_unit)
+                self.add_unit(request, _unit)
                 continue
             url = pathlib.url_join(
                 publishing_details[constants.BASE_URL],
                 pathlib.quote(unit[constants.RELATIVE_PATH]))
             storage_path = unit[constants.STORAGE_PATH]
-            _request = manager.create_request(url, storage_path, unit_ref)
+            offset = 0
+            if os.path.isfile(storage_path):
+                offset = os.path.getsize(storage_path)
+            _request = manager.create_request(url, storage_path, unit_ref, offset)
             download_list.append(_request)
         if request.cancelled():
             return
         request.downloader.event_listener = manager
-        request.downloader.download(download_list)
+        manager.start()
+        try:
+            request.downloader.download(download_list)
+        finally:
+            manager.shutdown()
         request.summary.errors.extend(manager.error_list())
 
-    def _needs_download(self, unit):
+    def _needs_download(self, unit, journal=None):
         """
         Get whether the unit has an associated file that needs to be downloaded.
+        A file already stored is verified unless recorded in the download journal.
+        A file that is shorter than the published size is left in place so
+        the download can be resumed.  Otherwise, a file that fails verification
+        is removed and downloaded again.
+        When the same content (by checksum) has already been downloaded to
+        another path, it is hard linked to the unit's storage_path instead.
         :param unit: A content unit.
         :type unit: dict
+        :param journal: The journal of verified downloads.
+        :type journal: pulp_node.importers.download.DownloadJournal
         :return: True if has associated file that needs to be downloaded.
         :rtype: bool
         """
         storage_path = unit.get(constants.STORAGE_PATH)
-        if storage_path:
-            if not os.path.exists(storage_path):
+        if not storage_path:
+            return False
+        if os.path.isdir(storage_path):
+            # an extracted tarball
+            return False
+        if os.path.exists(storage_path):
+            if journal is not None and storage_path in journal:
+                return False
+            return not self._stored(unit, storage_path, journal)
+        if unit.get(constants.PUBLISHED_AS_TARBALL):
+            return True
+        key = content_checksum(unit)
+        if key and content_pool().link(key, storage_path):
+            return False
+        return True
+
+    def _stored(self, unit, storage_path, journal):
+        """
+        Get whether the file found at the unit's storage_path is complete.
+        Incomplete files that cannot be resumed are removed.
+        :param unit: A content unit.
+        :type unit: dict
+        :param storage_path: The absolute path to the stored file.
+        :type storage_path: str
+        :param journal: The journal of verified downloads.
+        :type journal: pulp_node.importers.download.DownloadJournal
+        :return: True if the stored file is complete.
+        :rtype: bool
+        """
+        size = unit.get(constants.FILE_SIZE)
+        if size and os.path.getsize(storage_path) < size:
+            # resumed
+            return False
+        if not unit.get(constants.PUBLISHED_AS_TARBALL):
+            try:
+                verify(unit, storage_path)
+                if journal is not None:
+                    journal.add(storage_path)
                 return True
+            except VerificationException:
+                log.info('%s failed verification', storage_path)
+        # a tarball that has not been extracted or a file that failed verification
+        os.unlink(storage_path)
         return False
 
     def _delete_units(self, request, unit_inventory):
         """
         Determine the list of units contained in the child inventory
         but are not contained in the parent inventory and un-associate them.
+        The units are removed by ID in bulk using one conduit call per type.
         :param request: A synchronization request.
         :type request: SyncRequest
         :param unit_inventory: The inventory of both parent and child content units.
         :type unit_inventory: UnitInventory
         """
+        unit_ids = {}
         for unit in unit_inventory.units_on_child_only():
+            unit_ids.setdefault(unit['type_id'], []).append(unit['unit_id'])
+        for type_id, id_list in sorted(unit_ids.items()):
             if request.cancelled():
                 return
             try:
-                _unit = AssociatedUnit(
-                    type_id=unit['type_id'],
-                    unit_key=unit['unit_key'],
-                    metadata={},
-                    storage_path=None,
-                    created=None,
-                    updated=None,
-                    owner_type=unit['owner_type'],
-                    owner_id=unit['owner_id'])
-                _unit.id = unit['unit_id']
-                request.conduit.remove_unit(_unit)
+                request.conduit.remove_units(type_id, id_list)
             except Exception:
-                log.exception(unit['unit_id'])
+                log.exception(type_id)
                 request.summary.errors.append(DeleteUnitError(request.repo_id))
 
 
@@ -340,6 +495,16 @@ class Additive(ImporterStrategy):
         unit_inventory = self._unit_inventory(request)
         self._add_units(request, unit_inventory)
 
+    def _consistent(self, manifest, inventory):
+        """
+        Units that are not contained in the parent inventory are permitted
+        to remain in the child inventory.  The digest can only be compared
+        when there are none.
+        """
+        if inventory.child_units_after() > manifest.total_units:
+            return True
+        return ImporterStrategy._consistent(self, manifest, inventory)
+
 
 # --- factory ---------------------------------------------------------------------------
 
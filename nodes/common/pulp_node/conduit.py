@@ -14,6 +14,10 @@ from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.config import config as pulp_conf
 
 
+# The number of units fetched from the type collections per query.
+UNITS_BATCH_SIZE = 1000
+
+
 # --- nodes conduit  ----------------------------------------------------------
 
 
@@ -38,6 +42,40 @@ class NodesConduit(object):
             unit_list.append(unit['unit_id'])
         return UnitsIterator(units, types)
 
+    def get_unit_keys(self, repo_id, batch_size=UNITS_BATCH_SIZE):
+        """
+        Get the keys of all units associated with a repository.
+        Intended for building the unit inventory, the associations are streamed
+        and only the unit key fields are fetched from the type collections in
+        batches.  A unit associated more than once is only included once.
+        :param repo_id: The repository ID used to query the units.
+        :type repo_id: str
+        :param batch_size: The number of units fetched per query.
+        :type batch_size: int
+        :return: unit iterator of: {unit_id, type_id, unit_key, owner_type, owner_id}
+        :rtype: generator
+        """
+        typedefs = Typedef()
+        collection = RepoContentUnit.get_collection()
+        fields = ('unit_id', 'unit_type_id', 'owner_type', 'owner_id')
+        # sorted using the unique index so multiple associations of a unit are adjacent
+        sort = [('unit_type_id', 1), ('unit_id', 1)]
+        cursor = collection.find({'repo_id': repo_id}, fields=fields, sort=sort)
+        batch = []
+        last = None
+        for unit in cursor:
+            key = (unit['unit_type_id'], unit['unit_id'])
+            if key == last:
+                continue
+            last = key
+            if batch and (len(batch) >= batch_size or batch[0]['unit_type_id'] != key[0]):
+                for unit_key in UnitKeysIterator.get_units(typedefs, batch):
+                    yield unit_key
+                batch = []
+            batch.append(unit)
+        for unit_key in UnitKeysIterator.get_units(typedefs, batch):
+            yield unit_key
+
 
 # --- typedef -----------------------------------------------------------------
 
@@ -113,4 +151,37 @@ class UnitsIterator:
         return self
 
     def __len__(self):
-        return self.length
\ No newline at end of file
+        return self.length
+
+
+class UnitKeysIterator:
+
+    @staticmethod
+    def get_units(typedefs, units):
+        """
+        Fetch the unit keys for a batch of associations.
+        :param typedefs: The type definitions.
+        :type typedefs: Typedef
+        :param units: A list of associations of the same type.
+        :type units: list
+        :return: unit iterator of: {unit_id, type_id, unit_key, owner_type, owner_id}
+        :rtype: generator
+        """
+        if not units:
+            return
+        type_id = units[0]['unit_type_id']
+        key_fields = typedefs.get(type_id)['unit_key']
+        associations = dict((u['unit_id'], u) for u in units)
+        query = {'_id': {'$in': associations.keys()}}
+        collection = types_db.type_units_collection(type_id)
+        for metadata in collection.find(query, fields=list(key_fields)):
+            unit = associations[metadata['_id']]
+            unit_key = {}
+            for key in key_fields:
+                unit_key[key] = metadata.get(key)
+            yield dict(
+                unit_id=unit['unit_id'],
+                type_id=type_id,
+                unit_key=unit_key,
+                owner_type=unit.get('owner_type'),
+                owner_id=unit.get('owner_id'))
@@ -34,6 +34,7 @@ STRATEGY_KEYWORD = 'strategy'
 PROTOCOL_KEYWORD = 'protocol'
 MANIFEST_URL_KEYWORD = 'manifest_url'
 PURGE_ORPHANS_KEYWORD = 'purge_orphans'
+MAX_CONCURRENCY_KEYWORD = 'max_concurrency'
 
 SSL_KEYWORD = 'ssl'
 CA_CERT_KEYWORD = 'ca_cert'
@@ -45,6 +46,7 @@ CLIENT_CERT_KEYWORD = 'client_cert'
 BASE_URL = 'base_url'
 STORAGE_PATH = 'storage_path'
 RELATIVE_PATH = 'relative_path'
+FILE_SIZE = 'file_size'
 
 PUBLISHED_AS_FILE = 'published_as_file'
 PUBLISHED_AS_TARBALL = 'published_as_tarball'
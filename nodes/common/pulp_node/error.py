@@ -159,6 +159,19 @@ class UnitDownloadError(NodeError):
             self.ERROR_ID, url=url, repo_id=repo_id, error_report=error_report)
 
 
+class UnitVerificationError(NodeError):
+
+    ERROR_ID = 'download.unit.verification'
+    DESCRIPTION = _('The unit file [%(path)s] downloaded for repository [%(repo_id)s] '
+                    'failed verification and has been removed.')
+
+    def __init__(self, path, repo_id):
+        super(UnitVerificationError, self).__init__(self.ERROR_ID, path=path, repo_id=repo_id)
+
+    def __str__(self):
+        return self.DESCRIPTION % self.details
+
+
 class AddUnitError(NodeError):
 
     ERROR_ID = 'child.unit.add'
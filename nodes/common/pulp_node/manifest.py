@@ -14,17 +14,36 @@ Provides classes for managing the content unit manifest.
 The manifest is a json encoded file that defines content units
 associated with repository.  The units themselves are stored in a separate
 json encoded file.  For performance reasons, the unit files are compressed.
+The units file is written as a series of GZIP members (blocks) of BLOCK_SIZE
+units each.  It can be decompressed as a whole using any GZIP reader but the
+offset and length of each block are also recorded in the manifest so units can
+be read directly from the compressed file.
+When published, the units are written to a set of chunk files of CHUNK_SIZE
+units each by a pool of worker threads.  Each chunk is a units file as described
+above and is listed in the manifest with its unit count, blocks and checksum so
+the chunks can be downloaded in parallel and verified.  The chunks are also
+concatenated into the (unchunked) units file, a valid GZIP file as well, for
+children that predate chunking and only download units_path.
+Each time a repository is published, a delta is also written that lists the
+units added and removed since the previously published manifest.  Deltas
+are stored in the DELTAS_DIR_NAME directory and named by the ID of the manifest
+they apply to, so the deltas form a chain from older manifests to the latest.
 """
 
 import os
 import json
+import zlib
+import struct
 
+from Queue import Queue
+from threading import Thread
+from hashlib import sha256, md5
 from logging import getLogger
 
 from nectar.request import DownloadRequest
 
 from pulp_node import pathlib
-from pulp_node.compression import compress, decompress, compressed
+from pulp_node.compression import decompress, compressed, FILE_SUFFIX
 
 
 log = getLogger(__name__)
@@ -36,6 +55,119 @@ log = getLogger(__name__)
 MANIFEST_FILE_NAME = 'manifest.json'
 UNITS_FILE_NAME = 'units.json.gz'
 
+DELTAS_DIR_NAME = 'deltas'
+DELTA_FILE_SUFFIX = '.json'
+DELTA_UNITS_FILE_SUFFIX = '-units.json.gz'
+
+# The number of deltas kept when a repository is published.
+DELTA_HISTORY = 20
+
+# The number of units in each compressed block of the units file.
+BLOCK_SIZE = 100
+
+# The zlib window bits used to read and write GZIP members.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# The number of units in each chunk file.
+CHUNK_SIZE = 10000
+
+# The number of threads writing chunk files.
+CHUNK_WORKERS = 4
+
+# The struct format of a unit digest (fixed-width, little-endian 64-bit integer).
+DIGEST_FORMAT = '<q'
+
+# The modulus of the (order independent) sum of the unit digests in a units file.
+UNITS_DIGEST_MODULUS = 1 << 64
+
+
+# --- utils -----------------------------------------------------------------------------
+
+
+def unique_key(unit):
+    """
+    Get a string that uniquely identifies a content unit by type_id and unit_key.
+    Unlike the unit_key, the string is hashable and is the same after the
+    unit has been json encoded and decoded.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The unique key.
+    :rtype: str
+    """
+    return json.dumps([unit['type_id'], unit['unit_key']], sort_keys=True)
+
+
+def unit_digest(unit):
+    """
+    Get a fixed size digest of the unit's type_id & unit_key.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The digest.
+    :rtype: int
+    """
+    size = struct.calcsize(DIGEST_FORMAT)
+    digest = md5(unique_key(unit)).digest()
+    return struct.unpack(DIGEST_FORMAT, digest[:size])[0]
+
+
+def units_digest(digests):
+    """
+    Get the digest of a set of units.  The digest is the sum of the unit
+    digests so it does not depend on the order of the units and can be
+    updated as units are added and removed.
+    :param digests: The unit digests.
+    :type digests: iterable
+    :return: The digest.
+    :rtype: int
+    """
+    return sum(digests) % UNITS_DIGEST_MODULUS
+
+
+def delta_file_name(manifest_id):
+    """
+    Get the name of the file containing the delta that applies to a manifest.
+    :param manifest_id: The ID of the manifest the delta applies to.
+    :type manifest_id: str
+    :return: The file name.
+    :rtype: str
+    """
+    return manifest_id + DELTA_FILE_SUFFIX
+
+
+def chunk_path(path, n):
+    """
+    Get the path to a chunk file.
+    Example: units.json.gz => units-0003.json.gz
+    :param path: The absolute path to the (unchunked) units file.
+    :type path: str
+    :param n: The chunk number.
+    :type n: int
+    :return: The absolute path to the chunk file.
+    :rtype: str
+    """
+    if path.endswith(FILE_SUFFIX):
+        path = path[:-len(FILE_SUFFIX)]
+    root, ext = os.path.splitext(path)
+    return '%s-%.4d%s%s' % (root, n, ext, FILE_SUFFIX)
+
+
+def file_checksum(path):
+    """
+    Calculate the checksum of a file.
+    :param path: The absolute path to a file.
+    :type path: str
+    :return: The checksum: sha256:<digest>.
+    :rtype: str
+    """
+    digest = sha256()
+    with open(path, 'rb') as fp:
+        while True:
+            buf = fp.read(65536)
+            if not buf:
+                break
+            digest.update(buf)
+    return 'sha256:%s' % digest.hexdigest()
+
 
 # --- manifest --------------------------------------------------------------------------
 
@@ -47,18 +179,34 @@ class Manifest(object):
     and iterator to ensure a small memory footprint.
     :ivar id: The unique manifest ID.
     :type id: str
+    :ivar sequence: The sequence number of the manifest within the repository.
+        Incremented each time the repository is published.
+    :type sequence: int
     :ivar total_units: The number of units in the units file.
     :type total_units: int
+    :ivar units_digest: The digest of the units in the units file.  See: units_digest().
+        None when published by a parent that does not record it.
+    :type units_digest: int
     :ivar unit_path: The path to the downloaded content units file.
     :type unit_path: str
+    :ivar blocks: The (offset, length) of each compressed block in the units file.
+        Empty when the units file was not written in blocks.
+    :type blocks: list
+    :ivar chunks: The chunk files when the units were written in chunks.
+        List of: {path: <file name>, total_units: <int>, blocks: <list>, checksum: <str>}.
+    :type chunks: list
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
     """
 
-    def __init__(self, manifest_id=None):
+    def __init__(self, manifest_id=None, sequence=0):
         self.id = manifest_id
+        self.sequence = sequence
         self.total_units = 0
+        self.units_digest = None
         self.units_path = None
+        self.blocks = []
+        self.chunks = []
         self.publishing_details = {}
 
     def fetch(self, url, dir_path, downloader):
@@ -73,7 +221,7 @@ class Manifest(object):
         :raise HTTPError: on URL errors.
 -       :raise ValueError: on json decoding errors
         """
-        destination = pathlib.join(dir_path, MANIFEST_FILE_NAME)
+        destination = pathlib.join(dir_path, os.path.basename(url))
         request = DownloadRequest(str(url), destination)
         request_list = [request]
         downloader.download(request_list)
@@ -87,22 +235,81 @@ class Manifest(object):
     def fetch_units(self, url, downloader):
         """
         Fetch the units file referenced in the manifest.
-        The file is decompressed and written to the path specified by units_path.
+        The file is written to the path specified by units_path.  Unless the
+        units can be read by block, the file is decompressed.
+        When the units were written in chunks, the chunk files are downloaded
+        together (concurrently as permitted by the downloader) into the directory
+        containing units_path and verified.
         :param url: The URL to the manifest.  Used as the base URL.
         :type url: str
         :param downloader: The nectar downloader to be used.
         :type downloader: nectar.downloaders.base.Downloader
         :raise HTTPError: on URL errors.
--       :raise ValueError: on json decoding errors
+-       :raise ValueError: on json decoding errors and chunk verification errors.
         """
         base_url = url.rsplit('/', 1)[0]
+        if self.chunks:
+            self.fetch_chunks(base_url, downloader)
+            return
         url = '/'.join((base_url, os.path.basename(self.units_path)))
         request = DownloadRequest(str(url), self.units_path)
         request_list = [request]
         downloader.download(request_list)
+        if self.blocks:
+            return
         if compressed(self.units_path):
             self.units_path = decompress(self.units_path)
 
+    def fetch_chunks(self, base_url, downloader):
+        """
+        Fetch and verify the chunk files referenced in the manifest.
+        :param base_url: The base URL of the chunk files.
+        :type base_url: str
+        :param downloader: The nectar downloader to be used.
+        :type downloader: nectar.downloaders.base.Downloader
+        :raise ValueError: when a chunk is not downloaded or fails verification.
+        """
+        request_list = []
+        for chunk in self.chunks:
+            url = '/'.join((base_url, chunk['path']))
+            request_list.append(DownloadRequest(str(url), self.chunk_path(chunk)))
+        downloader.download(request_list)
+        for chunk in self.chunks:
+            path = self.chunk_path(chunk)
+            if not os.path.exists(path):
+                raise ValueError('chunk: %s not downloaded' % chunk['path'])
+            if file_checksum(path) != chunk['checksum']:
+                raise ValueError('chunk: %s failed verification' % chunk['path'])
+
+    def chunk_path(self, chunk):
+        """
+        Get the absolute path to a chunk file.
+        Chunk files are stored in the directory containing units_path.
+        The chunk path is read from the (downloaded) manifest so it must be a
+        plain file name that cannot refer to a file outside of that directory.
+        :param chunk: A chunk listed in the manifest.
+        :type chunk: dict
+        :return: The absolute path.
+        :rtype: str
+        :raise ValueError: when the chunk path is not a plain file name.
+        """
+        path = chunk['path']
+        if not path or os.path.basename(path) != path or path.startswith('.'):
+            raise ValueError('chunk: %s not a valid file name' % path)
+        return pathlib.join(os.path.dirname(self.units_path), path)
+
+    def unit_files(self):
+        """
+        Get the names of the files containing the units.
+        :return: List of file names: the units file or the chunk files.
+        :rtype: list
+        """
+        if self.chunks:
+            return [chunk['path'] for chunk in self.chunks]
+        if self.total_units:
+            return [os.path.basename(self.units_path)]
+        return []
+
     def read(self, path):
         """
         Read the manifest file at the specified path.
@@ -116,6 +323,40 @@ class Manifest(object):
             manifest = json.load(fp)
             self.__dict__.update(manifest)
 
+    def fetch_deltas(self, url, manifest_id, dir_path, downloader):
+        """
+        Fetch the chain of deltas leading from the specified manifest to this manifest.
+        The units file of each delta is fetched as well.
+        :param url: The URL to this manifest.  Used as the base URL.
+        :type url: str
+        :param manifest_id: The ID of a previously published manifest.
+        :type manifest_id: str
+        :param dir_path: The absolute path to a directory for the downloaded deltas.
+        :type dir_path: str
+        :param downloader: The nectar downloader to be used.
+        :type downloader: nectar.downloaders.base.Downloader
+        :return: The list of deltas to be applied in order.  Empty when the
+            specified manifest is this manifest.
+        :rtype: list
+        :raise IOError: when a delta in the chain is not published.
+        :raise ValueError: on json decoding errors and broken chains.
+        """
+        deltas = []
+        base_url = url.rsplit('/', 1)[0]
+        while manifest_id != self.id:
+            if len(deltas) >= DELTA_HISTORY:
+                raise ValueError('delta chain from: %s exceeds %d' % (manifest_id, DELTA_HISTORY))
+            delta_url = '/'.join((base_url, DELTAS_DIR_NAME, delta_file_name(manifest_id)))
+            delta = Delta()
+            delta.fetch(delta_url, dir_path, downloader)
+            if delta.base_id != manifest_id:
+                raise ValueError('delta: %s not based on: %s' % (delta_url, manifest_id))
+            if delta.total_units:
+                delta.fetch_units(delta_url, downloader)
+            deltas.append(delta)
+            manifest_id = delta.id
+        return deltas
+
     def write(self, path):
         """
         Write the manifest to a json encoded file at the specified path.
@@ -134,12 +375,16 @@ class Manifest(object):
     def set_units(self, writer):
         """
         Set the associated units file using the specified writer.
-        Updates the units_path and total_units based on what was written by the writer.
+        Updates the units_path, total_units and units_digest based on what was
+        written by the writer.
         :param writer: The writer used to create the units file.
         :type writer: UnitWriter
         """
         self.units_path = writer.path
         self.total_units = writer.total_units
+        self.units_digest = getattr(writer, 'units_digest', None)
+        self.blocks = writer.blocks
+        self.chunks = getattr(writer, 'chunks', [])
 
     def get_units(self):
         """
@@ -149,33 +394,72 @@ class Manifest(object):
         :raise IOError: on I/O errors.
 -       :raise ValueError: json decoding errors
         """
+        if self.chunks:
+            return ChunkIterator(self)
         if self.total_units:
-            return UnitIterator(self.units_path, self.total_units)
+            return UnitIterator(self.units_path, self.total_units, self.blocks)
         else:
             return []
 
 
+class Delta(Manifest):
+    """
+    The difference between two manifests published for a repository.
+    Provides access to the units added since the base manifest the same
+    way the manifest provides access to its units.
+    :ivar base_id: The ID of the manifest the delta applies to.
+    :type base_id: str
+    :ivar removed: The type_id and unit_key of each unit removed since the
+        base manifest.  List of: {type_id: <str>, unit_key: <dict>}
+    :type removed: list
+    """
+
+    def __init__(self, base_id=None, manifest_id=None, sequence=0):
+        """
+        :param base_id: The ID of the manifest the delta applies to.
+        :type base_id: str
+        :param manifest_id: The ID of the manifest resulting from applying the delta.
+        :type manifest_id: str
+        :param sequence: The sequence number of the resulting manifest.
+        :type sequence: int
+        """
+        Manifest.__init__(self, manifest_id, sequence)
+        self.base_id = base_id
+        self.removed = []
+
+
 class UnitWriter(object):
     """
-    Writes json encoded content units to a file.
-    This approach is 30x faster than opening, appending, and closing for each unit.
+    Writes json encoded content units to a compressed file.
+    Units are buffered and each BLOCK_SIZE units are compressed and written
+    as a GZIP member so the file is written in a single pass.
     :ivar path: The absolute path to the file to be written.
     :type path: str
     :ivar fp: The file pointer used to write units to the file.
     :type fp: A python file object.
     :ivar total_units: Tracks the total number of units written.
     :type total_units: int
+    :ivar blocks: The (offset, length) of each block written.
+    :type blocks: list
+    :ivar digest: The digest of the data written.
+    :type digest: hashlib.sha256
     """
 
     def __init__(self, path):
         """
         :param path: The absolute path to the file to be written.
+            The GZIP suffix is appended as needed.
         :type path: str
         :raise IOError: on I/O errors
         """
+        if not path.endswith(FILE_SUFFIX):
+            path += FILE_SUFFIX
         self.path = path
-        self.fp = open(path, 'w+')
+        self.fp = open(path, 'wb')
         self.total_units = 0
+        self.blocks = []
+        self.buffer = []
+        self.digest = sha256()
 
     def add(self, unit):
         """
@@ -184,21 +468,56 @@ class UnitWriter(object):
         :type unit: dict
         :raise IOError: on I/O errors.
 -       :raise ValueError: json encoding errors
+        """
+        self.write(json.dumps(unit))
+
+    def write(self, json_unit):
+        """
+        Write the specified json encoded unit to the file.
+        :param json_unit: A json encoded content unit.
+        :type json_unit: str
+        :raise IOError: on I/O errors.
         """
         self.total_units += 1
-        json_unit = json.dumps(unit)
-        self.fp.write(json_unit)
-        self.fp.write('\n')
+        self.buffer.append(json_unit + '\n')
+        if len(self.buffer) >= BLOCK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Compress and write the buffered units as a block.
+        :raise IOError: on I/O errors.
+        """
+        if not self.buffer:
+            return
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, GZIP_WBITS)
+        block = compressor.compress(''.join(self.buffer))
+        block += compressor.flush()
+        self.blocks.append((self.fp.tell(), len(block)))
+        self.fp.write(block)
+        self.digest.update(block)
+        self.buffer = []
+
+    @property
+    def checksum(self):
+        """
+        The checksum of the data written.
+        :return: The checksum: sha256:<digest>.
+        :rtype: str
+        """
+        return 'sha256:%s' % self.digest.hexdigest()
 
     def close(self):
         """
-        Close and compress the associated file.  This method is idempotent.
+        Write the buffered units and close the associated file.  This method is idempotent.
         :return: The number of units written.
         :rtype: int
         """
         if not self.fp.closed:
-            self.fp.close()
-            self.path = compress(self.path)
+            try:
+                self.flush()
+            finally:
+                self.fp.close()
         return self.total_units
 
     def __enter__(self):
@@ -213,11 +532,184 @@ class UnitWriter(object):
         self.close()
 
 
+class ChunkWriter(object):
+    """
+    Writes json encoded content units to a set of compressed chunk files.
+    Units are encoded as they are added and each CHUNK_SIZE units are queued to a
+    pool of worker threads that write (compress) the chunk file using a UnitWriter.
+    The queue is bounded so the caller is blocked while the workers catch up.
+    :ivar path: The absolute path to the (unchunked) units file.  Chunks are
+        written to the same directory.  See: chunk_path().
+    :type path: str
+    :ivar total_units: Tracks the total number of units written.
+    :type total_units: int
+    :ivar units_digest: Tracks the digest of the units written.  See: units_digest().
+    :type units_digest: int
+    :ivar blocks: Always empty.  Blocks are listed by chunk.
+    :type blocks: list
+    :ivar chunks: The chunks written (in order).
+        List of: {path: <file name>, total_units: <int>, blocks: <list>, checksum: <str>}.
+    :type chunks: list
+    :ivar unchunked: Write the (unchunked) units file as well, by concatenating
+        the chunks once they are written.
+    :type unchunked: bool
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, workers=CHUNK_WORKERS, unchunked=True):
+        """
+        :param path: The absolute path to the (unchunked) units file.
+            The GZIP suffix is appended as needed.
+        :type path: str
+        :param chunk_size: The number of units in each chunk.
+        :type chunk_size: int
+        :param workers: The number of threads writing chunks.
+        :type workers: int
+        :param unchunked: Write the (unchunked) units file as well.
+        :type unchunked: bool
+        """
+        if not path.endswith(FILE_SUFFIX):
+            path += FILE_SUFFIX
+        self.path = path
+        self.chunk_size = chunk_size
+        self.unchunked = unchunked
+        self.total_units = 0
+        self.units_digest = 0
+        self.blocks = []
+        self.chunks = []
+        self.buffer = []
+        self.errors = []
+        self.closed = False
+        self.queue = Queue(maxsize=workers)
+        self.threads = []
+        for n in range(workers):
+            thread = Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def add(self, unit):
+        """
+        Add (write) the specified unit as a json encoded string.
+        :param unit: A content unit.
+        :type unit: dict
+        :raise ValueError: json encoding errors
+        """
+        self.total_units += 1
+        self.units_digest = units_digest((self.units_digest, unit_digest(unit)))
+        self.buffer.append(json.dumps(unit))
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Queue the buffered units to be written as a chunk.
+        """
+        if not self.buffer:
+            return
+        chunk = dict(path=os.path.basename(chunk_path(self.path, len(self.chunks))))
+        self.chunks.append(chunk)
+        # blocks while the workers are busy
+        self.queue.put((chunk, self.buffer))
+        self.buffer = []
+
+    def close(self):
+        """
+        Write the buffered units and wait for the chunks to be written.
+        Then, write the (unchunked) units file as needed.
+        This method is idempotent.
+        :return: The number of units written.
+        :rtype: int
+        :raise IOError: when a chunk could not be written.
+        """
+        if self.closed:
+            return self.total_units
+        self.closed = True
+        try:
+            self.flush()
+        finally:
+            for thread in self.threads:
+                self.queue.put(None)
+            for thread in self.threads:
+                thread.join()
+        if self.errors:
+            raise IOError('writing chunks for: %s failed: %s' % (self.path, self.errors[0]))
+        if self.unchunked:
+            self._concatenate()
+        return self.total_units
+
+    def _concatenate(self):
+        """
+        Write the (unchunked) units file by concatenating the chunk files.
+        The chunks are series of GZIP members so no recompression is needed.
+        :raise IOError: on I/O errors.
+        """
+        with open(self.path, 'wb') as fp_out:
+            for chunk in self.chunks:
+                path = pathlib.join(os.path.dirname(self.path), chunk['path'])
+                with open(path, 'rb') as fp_in:
+                    while True:
+                        buf = fp_in.read(65536)
+                        if not buf:
+                            break
+                        fp_out.write(buf)
+
+    def _run(self):
+        """
+        The worker thread main loop.
+        Write queued chunks until the (None) stop marker is read.
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            chunk, json_units = item
+            try:
+                path = pathlib.join(os.path.dirname(self.path), chunk['path'])
+                writer = UnitWriter(path)
+                try:
+                    for json_unit in json_units:
+                        writer.write(json_unit)
+                finally:
+                    writer.close()
+                chunk.update(
+                    total_units=writer.total_units,
+                    blocks=writer.blocks,
+                    checksum=writer.checksum)
+            except Exception, e:
+                log.exception(chunk['path'])
+                self.errors.append(e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *unused):
+        self.close()
+        return False
+
+
+def read_block(fp, block):
+    """
+    Read and decompress a block of units.
+    :param fp: An open units file.
+    :type fp: A python file object.
+    :param block: The (offset, length) of the block within the file.
+    :type block: tuple
+    :return: The decompressed block.
+    :rtype: str
+    :raise IOError: on I/O errors.
+    :raise zlib.error: on decompression errors.
+    """
+    offset, length = block
+    fp.seek(offset)
+    return zlib.decompress(fp.read(length), GZIP_WBITS)
+
+
 class UnitIterator:
     """
     Used to iterate content units inventory file associated with a manifest.
     The file contains (1) json encoded unit per line.  The total number
-    of units in the file is reported by __len__().
+    of units in the file is reported by __len__().  When blocks are specified,
+    the file is compressed and units are read one block at a time.
     """
 
     @staticmethod
@@ -235,14 +727,31 @@ class UnitIterator:
                 else:
                     break
 
-    def __init__(self, path, total_units):
+    @staticmethod
+    def get_block_units(path, blocks):
+        with open(path, 'rb') as fp:
+            for block in blocks:
+                begin = 0
+                for json_unit in read_block(fp, block).splitlines(True):
+                    unit = json.loads(json_unit)
+                    length = len(json_unit)
+                    ref = UnitRef(path, begin, length, block)
+                    begin += length
+                    yield (unit, ref)
+
+    def __init__(self, path, total_units, blocks=None):
         """
         :param path: The absolute path to the units file to be iterated.
         :type path: str
         :param total_units: The number of units contained in the units file.
         :type total_units: int
+        :param blocks: The (offset, length) of each compressed block in the units file.
+        :type blocks: list
         """
-        self.unit_generator = UnitIterator.get_units(path)
+        if blocks:
+            self.unit_generator = UnitIterator.get_block_units(path, blocks)
+        else:
+            self.unit_generator = UnitIterator.get_units(path)
         self.total_units = total_units
 
     def next(self):
@@ -255,29 +764,66 @@ class UnitIterator:
         return self.total_units
 
 
+class ChunkIterator:
+    """
+    Used to iterate the content units in the chunk files associated with a manifest.
+    The chunks are read in order.  The total number of units is reported by __len__().
+    """
+
+    @staticmethod
+    def get_units(manifest):
+        for chunk in manifest.chunks:
+            path = manifest.chunk_path(chunk)
+            for unit in UnitIterator(path, chunk['total_units'], chunk['blocks']):
+                yield unit
+
+    def __init__(self, manifest):
+        """
+        :param manifest: A manifest with chunks.
+        :type manifest: Manifest
+        """
+        self.unit_generator = ChunkIterator.get_units(manifest)
+        self.total_units = manifest.total_units
+
+    def next(self):
+        return self.unit_generator.next()
+
+    def __iter__(self):
+        return self
+
+    def __len__(self):
+        return self.total_units
+
+
 class UnitRef(object):
     """
     Reference to a unit within the downloaded units file.
     :ivar path: The absolute path to the units file.
     :type path: str
-    :ivar offset: The offset for a specific unit with the file.
+    :ivar offset: The offset for a specific unit with the file (or block).
     :type offset: int
-    :ivar length: The length of a specific unit within the file.
+    :ivar length: The length of a specific unit within the file (or block).
     :type length: int
+    :ivar block: The (offset, length) of the compressed block containing the unit.
+    :type block: tuple
     """
 
-    def __init__(self, path, offset, length):
+    def __init__(self, path, offset, length, block=None):
         """
         :param path: The absolute path to the units file.
         :type path: str
-        :param offset: The offset for a specific unit with the file.
+        :param offset: The offset for a specific unit with the file (or block).
         :type offset: int
-        :param length: The length of a specific unit within the file.
+        :param length: The length of a specific unit within the file (or block).
         :type length: int
+        :param block: The (offset, length) of the compressed block containing the unit.
+            None when the file is not compressed.
+        :type block: tuple
         """
         self.path = path
         self.offset = offset
         self.length = length
+        self.block = block
 
     def fetch(self):
         """
@@ -287,7 +833,11 @@ class UnitRef(object):
         :raise IOError: on I/O errors.
 -       :raise ValueError: json decoding errors
         """
-        with open(self.path) as fp:
-            fp.seek(self.offset)
-            json_unit = fp.read(self.length)
+        with open(self.path, 'rb') as fp:
+            if self.block:
+                data = read_block(fp, self.block)
+                json_unit = data[self.offset:self.offset + self.length]
+            else:
+                fp.seek(self.offset)
+                json_unit = fp.read(self.length)
             return json.loads(json_unit)
@@ -11,7 +11,7 @@
 
 import httplib
 
-from time import sleep
+from time import sleep, time
 from gettext import gettext as _
 
 from pulp.server.dispatch.constants import CALL_COMPLETE_STATES, CALL_ERROR_STATE
@@ -39,6 +39,9 @@ class PollingFailed(Exception):
 class TaskPoller(object):
     """
     The task poller is used to poll a running task by ID.
+    Each poll asks the server to hold the request until the state of the task
+    changes or the delay has elapsed (long-poll) so that state changes, such
+    as completion, are seen as soon as they happen.
     :ivar binding: A pulp API binding.
     :type binding: pulp_node.handlers.model.PulpBinding
     :ivar delay: The delay in seconds between each poll.
@@ -74,15 +77,15 @@ class TaskPoller(object):
         poll = True
         task_result = None
         last_hash = 0
+        last_state = None
 
         while poll:
             if cancelled():
                 poll = False
                 continue
 
-            sleep(self.delay)
-
-            http = self.binding.tasks.get_task(task_id)
+            started = time()
+            http = self.binding.tasks.get_task(task_id, wait=self.delay, state=last_state)
             if http.response_code != httplib.OK:
                 msg = FETCH_TASK_FAILED % {'t': task_id, 'c': http.response_code}
                 raise PollingFailed(msg)
@@ -98,9 +101,27 @@ class TaskPoller(object):
             if task.state in CALL_COMPLETE_STATES:
                 task_result = task.result
                 poll = False
+                continue
+
+            if task.state == last_state:
+                self._pause(started)
+
+            last_state = task.state
 
         return task_result
 
+    def _pause(self, started):
+        """
+        Sleep for what remains of the delay after a poll that started at the
+        specified time.  The server holds each poll until the state of the task
+        changes, so this only happens when the server does not support waiting.
+        :param started: The time the poll was started.
+        :type started: float
+        """
+        remaining = self.delay - (time() - started)
+        if remaining > 0:
+            sleep(remaining)
+
     def _report_progress(self, progress, task, last_hash):
         """
         Update the progress report only if the progress in the task has changed.
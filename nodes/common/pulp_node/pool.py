@@ -0,0 +1,183 @@
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Provides a content-addressed pool of files.
+Each entry is keyed by <algorithm>:<digest> and stored at:
+<pool>/<algorithm>/<digest[0:2]>/<digest>.  An entry is either a file owned by
+the pool or a symlink to a file stored elsewhere.
+"""
+
+import os
+import re
+import errno
+import shutil
+
+from tempfile import mkdtemp
+from logging import getLogger
+
+from pulp_node import pathlib
+
+
+log = getLogger(__name__)
+
+
+# Keys are used to build paths and may come from the parent so only
+# letters and numbers are permitted in the algorithm and digest.
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9]+:[A-Za-z0-9]+$')
+
+
+# --- utils -----------------------------------------------------------------------------
+
+
+def content_checksum(unit):
+    """
+    Get the pool key for the file associated with the unit using the checksum
+    contained in the unit key.  When the checksum type is not specified, sha256
+    is assumed.
+    :param unit: A content unit.
+    :type unit: dict
+    :return: The key or None when the unit key does not contain a checksum.
+    :rtype: str
+    """
+    unit_key = unit.get('unit_key') or {}
+    checksum = unit_key.get('checksum')
+    if not checksum:
+        return None
+    algorithm = unit_key.get('checksumtype') or 'sha256'
+    key = '%s:%s' % (algorithm, checksum)
+    if KEY_PATTERN.match(key):
+        return key
+
+
+# --- pool ------------------------------------------------------------------------------
+
+
+class Pool(object):
+    """
+    A content-addressed pool of files.
+    :ivar dir_path: The absolute path to the pool root directory.
+    :type dir_path: str
+    """
+
+    def __init__(self, dir_path):
+        """
+        :param dir_path: The absolute path to the pool root directory.
+        :type dir_path: str
+        """
+        self.dir_path = dir_path
+
+    def path(self, key):
+        """
+        Get the path to the entry for the specified key.
+        :param key: An entry key: <algorithm>:<digest>.
+        :type key: str
+        :return: The absolute path to the entry.
+        :rtype: str
+        :raise ValueError: when the key is not valid.
+        """
+        if not KEY_PATTERN.match(key):
+            raise ValueError('pool key: %s not valid' % key)
+        algorithm, digest = key.split(':')
+        return pathlib.join(self.dir_path, algorithm, digest[0:2], digest)
+
+    def find(self, key):
+        """
+        Find the file for the specified key.
+        :param key: An entry key: <algorithm>:<digest>.
+        :type key: str
+        :return: The absolute path to the file (symlinks resolved) or
+            None when not found.
+        :rtype: str
+        """
+        path = self.path(key)
+        if os.path.isfile(path):
+            return os.path.realpath(path)
+
+    def add(self, key, path, symbolic=False):
+        """
+        Add (or replace) the entry for the specified key.
+        :param key: An entry key: <algorithm>:<digest>.
+        :type key: str
+        :param path: The absolute path to a file.  Unless symbolic, the
+            file is moved into the pool.
+        :type path: str
+        :param symbolic: Add the entry as a symlink to the file.
+        :type symbolic: bool
+        :return: The absolute path to the entry.
+        :rtype: str
+        """
+        entry_path = self.path(key)
+        dir_path = os.path.dirname(entry_path)
+        pathlib.mkdir(dir_path)
+        if not symbolic:
+            os.rename(path, entry_path)
+            return entry_path
+        # the symlink is created in a private directory and renamed into place
+        tmp_dir = mkdtemp(dir=dir_path)
+        try:
+            tmp_path = os.path.join(tmp_dir, os.path.basename(entry_path))
+            os.symlink(path, tmp_path)
+            os.rename(tmp_path, entry_path)
+        finally:
+            shutil.rmtree(tmp_dir)
+        return entry_path
+
+    def link(self, key, path):
+        """
+        Hard link the file for the specified key to the specified path.
+        :param key: An entry key: <algorithm>:<digest>.
+        :type key: str
+        :param path: The absolute path to the link to be created.
+        :type path: str
+        :return: True if linked.
+        :rtype: bool
+        """
+        found = self.find(key)
+        if not found:
+            return False
+        try:
+            pathlib.mkdir(os.path.dirname(path))
+            os.link(found, path)
+            return True
+        except OSError, e:
+            if e.errno == errno.EEXIST:
+                return True
+            log.debug('link %s => %s failed: %s', found, path, e)
+            return False
+
+    def purge(self, algorithm):
+        """
+        Remove the entries for the specified algorithm that are no longer
+        referenced.  That is, files owned by the pool that are not linked
+        elsewhere and symlinks to files that no longer exist.
+        :param algorithm: A key algorithm.
+        :type algorithm: str
+        :return: The number of entries removed.
+        :rtype: int
+        """
+        removed = 0
+        root = pathlib.join(self.dir_path, algorithm)
+        for dir_path, dir_names, file_names in os.walk(root):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    if os.path.islink(path):
+                        if os.path.exists(path):
+                            continue
+                    elif os.stat(path).st_nlink > 1:
+                        continue
+                    os.unlink(path)
+                    removed += 1
+                except OSError, e:
+                    if e.errno != errno.ENOENT:
+                        raise
+        return removed
@@ -9,6 +9,9 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+from threading import RLock
+
+
 # --- summary reporting  -----------------------------------------------------
 
 
@@ -81,6 +84,8 @@ class UnitReport(object):
 class RepositoryProgress(object):
     """
     Tracks the progress of a repository in the pulp nodes synchronization process.
+    :ivar lock: Serializes updates made by units added concurrently.
+    :type lock: RLock
     """
 
     PENDING = 'pending'
@@ -103,6 +108,7 @@ class RepositoryProgress(object):
         self.listener = listener
         self.state = self.PENDING
         self.unit_add = dict(total=0, completed=0, details=None)
+        self.lock = RLock()
 
     def begin_merging(self):
         """
@@ -147,9 +153,10 @@ class RepositoryProgress(object):
         :param details: Details (optional) about the unit added.
         :type details: object
         """
-        self.unit_add['completed'] += added
-        self.unit_add['details'] = details
-        self.updated()
+        with self.lock:
+            self.unit_add['completed'] += added
+            self.unit_add['details'] = details
+            self.updated()
 
     def finished(self):
         """
@@ -10,21 +10,35 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import os
+import gzip
+import errno
+import json
 import tarfile
 
 from uuid import uuid4
-from shutil import rmtree
+from hashlib import sha256
+from shutil import rmtree, copy
 from tempfile import mkdtemp
 from logging import getLogger
 
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter, MANIFEST_FILE_NAME, UNITS_FILE_NAME
+from pulp_node.pool import Pool
+from pulp_node.manifest import (Manifest, Delta, ChunkWriter, unique_key, delta_file_name,
+    MANIFEST_FILE_NAME, UNITS_FILE_NAME, DELTAS_DIR_NAME, DELTA_FILE_SUFFIX,
+    DELTA_UNITS_FILE_SUFFIX, DELTA_HISTORY)
 
 
 log = getLogger(__name__)
 
 
+# The name of the directory (next to the publish_dir) containing the pool.
+POOL_DIR_NAME = 'pool'
+
+# The pool key algorithm for tarballs of directories.
+TARBALL = 'tarball'
+
+
 class Publisher(object):
     """
     The publisher does the heavy lifting for nodes distributor.
@@ -61,6 +75,8 @@ class FilePublisher(Publisher):
     :type tmp_dir: str
     :ivar staged: A flag indicating that publishing has been staged and needs commit.
     :type staged: bool
+    :ivar pool: The pool of tarballs shared by all repositories.
+    :type pool: Pool
     """
 
     def __init__(self, publish_dir, repo_id):
@@ -74,13 +90,18 @@ class FilePublisher(Publisher):
         self.repo_id = repo_id
         self.tmp_dir = None
         self.staged = False
+        parent_dir = os.path.dirname(publish_dir.rstrip('/'))
+        self.pool = Pool(pathlib.join(parent_dir, POOL_DIR_NAME))
 
     def publish(self, units):
         """
         Publish the specified units.
-        Writes the units.json file and symlinks each of the files associated
-        to the unit.storage_path.  Publishing is staged in a temporary directory and
-        must use commit() to make the publishing permanent.
+        Writes the units (json) chunk files, concatenated into the units file for older
+        children, and symlinks each of the files associated to the unit.storage_path.
+        Publishing is staged in a temporary directory and must use commit() to make the
+        publishing permanent.
+        When the repository has been published before, a delta from the previous
+        manifest is written and the most recent deltas are carried forward.
         :param units: A list of units to publish.
         :type units: iterable
         :return: The absolute path to the manifest.
@@ -90,36 +111,205 @@ class FilePublisher(Publisher):
         self.tmp_dir = mkdtemp(dir=self.publish_dir)
         units_path = pathlib.join(self.tmp_dir, UNITS_FILE_NAME)
         manifest_path = pathlib.join(self.tmp_dir, MANIFEST_FILE_NAME)
-        with UnitWriter(units_path) as writer:
-            for unit in units:
-                self.publish_unit(unit)
-                writer.add(unit)
         manifest_id = str(uuid4())
-        manifest = Manifest(manifest_id)
+        previous = self.previous_manifest()
+        if previous is None:
+            manifest = Manifest(manifest_id, 1)
+            with ChunkWriter(units_path) as writer:
+                for unit in units:
+                    self.publish_unit(unit)
+                    writer.add(unit)
+        else:
+            manifest = Manifest(manifest_id, previous.sequence + 1)
+            delta = Delta(previous.id, manifest_id, manifest.sequence)
+            deltas_dir = pathlib.join(self.tmp_dir, DELTAS_DIR_NAME)
+            pathlib.mkdir(deltas_dir)
+            delta_units_path = pathlib.join(deltas_dir, previous.id + DELTA_UNITS_FILE_SUFFIX)
+            previous_keys = self.unit_keys(previous)
+            with ChunkWriter(units_path) as writer:
+                # only children that read chunks fetch deltas
+                with ChunkWriter(delta_units_path, unchunked=False) as delta_writer:
+                    for unit in units:
+                        self.publish_unit(unit)
+                        writer.add(unit)
+                        key = unique_key(unit)
+                        if key in previous_keys:
+                            previous_keys.remove(key)
+                        else:
+                            delta_writer.add(unit)
+            # the keys remaining are for units that have been removed
+            for key in previous_keys:
+                type_id, unit_key = json.loads(key)
+                delta.removed.append(dict(type_id=type_id, unit_key=unit_key))
+            delta.set_units(delta_writer)
+            delta.write(pathlib.join(deltas_dir, delta_file_name(previous.id)))
+            self.carry_deltas(deltas_dir, manifest.sequence)
         manifest.set_units(writer)
         manifest_path = manifest.write(manifest_path)
         self.staged = True
         return manifest_path
 
+    def published_dir(self):
+        """
+        Get the directory containing the committed publishing for the repository.
+        :return: The absolute path to the directory.
+        :rtype: str
+        """
+        return pathlib.join(self.publish_dir, self.repo_id)
+
+    def previous_manifest(self):
+        """
+        Get the manifest committed by the previous publishing.
+        :return: The manifest or None when the repository has not been published
+            or the manifest cannot be read.
+        :rtype: Manifest
+        """
+        path = pathlib.join(self.published_dir(), MANIFEST_FILE_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            manifest = Manifest()
+            manifest.read(path)
+            return manifest
+        except Exception:
+            log.exception(path)
+            return None
+
+    def unit_keys(self, manifest):
+        """
+        Get the unique keys of the units in a manifest committed by the previous
+        publishing.  The units (or chunk) files are read in place.
+        :param manifest: A previously published manifest.
+        :type manifest: Manifest
+        :return: The set of unique keys.
+        :rtype: set
+        """
+        keys = set()
+        for name in manifest.unit_files():
+            path = pathlib.join(self.published_dir(), name)
+            fp = gzip.open(path)
+            try:
+                for json_unit in fp:
+                    keys.add(unique_key(json.loads(json_unit)))
+            finally:
+                fp.close()
+        return keys
+
+    def carry_deltas(self, deltas_dir, sequence):
+        """
+        Copy the deltas committed by the previous publishing into the deltas
+        directory.  Only the deltas resulting in one of the (DELTA_HISTORY - 1)
+        manifests published before the current one are kept.
+        :param deltas_dir: The absolute path to the (staged) deltas directory.
+        :type deltas_dir: str
+        :param sequence: The sequence number of the manifest being published.
+        :type sequence: int
+        """
+        previous_dir = pathlib.join(self.published_dir(), DELTAS_DIR_NAME)
+        if not os.path.isdir(previous_dir):
+            return
+        for name in os.listdir(previous_dir):
+            if not name.endswith(DELTA_FILE_SUFFIX):
+                continue
+            path = pathlib.join(previous_dir, name)
+            delta = Delta()
+            try:
+                delta.read(path)
+            except Exception:
+                log.exception(path)
+                continue
+            if delta.sequence <= sequence - DELTA_HISTORY:
+                continue
+            paths = [pathlib.join(previous_dir, file_name) for file_name in delta.unit_files()]
+            if not all(os.path.exists(p) for p in paths):
+                continue
+            copy(path, deltas_dir)
+            for units_path in paths:
+                copy(units_path, deltas_dir)
+
     def publish_unit(self, unit):
         """
         Publish the file associated with the unit into the publish directory.
+        The size of the published file is added to the unit.
         :param unit: A content unit.
         :type unit: dict
         """
         storage_path = unit.get('storage_path')
         if not storage_path:
             # not all units have associated files.
-            return unit, None
+            return
         relative_path = unit['relative_path']
         published_path = pathlib.join(self.tmp_dir, relative_path)
         pathlib.mkdir(os.path.dirname(published_path))
         if os.path.isdir(storage_path):
-            self.tar_dir(storage_path, published_path)
+            self.publish_tarball(storage_path, published_path)
             unit[constants.PUBLISHED_AS_TARBALL] = True
         else:
             os.symlink(storage_path, published_path)
             unit[constants.PUBLISHED_AS_FILE] = True
+        # used by the child to resume and verify the download
+        unit[constants.FILE_SIZE] = os.path.getsize(published_path)
+
+    def publish_tarball(self, path, published_path):
+        """
+        Publish a tarball of the directory at the specified path.
+        Tarballs are stored in the pool keyed by the directory path and the
+        status (inode, size, modification and change times) of its contents.
+        The published tarball is a hard link to the pool entry so an unchanged
+        directory is tarred once regardless of the number of repositories and
+        times it is published.
+        :param path: The absolute path to a directory.
+        :type path: str
+        :param published_path: The absolute path to the published tarball.
+        :type published_path: str
+        """
+        key = self.tarball_key(path)
+        for retry in (True, False):
+            entry_path = self.pool.find(key)
+            if entry_path is None:
+                pathlib.mkdir(self.pool.dir_path)
+                # written in a private directory and renamed into the pool
+                tmp_dir = mkdtemp(dir=self.pool.dir_path)
+                try:
+                    tar_path = os.path.join(tmp_dir, os.path.basename(path) + '.tar')
+                    self.tar_dir(path, tar_path)
+                    entry_path = self.pool.add(key, tar_path)
+                finally:
+                    rmtree(tmp_dir)
+            try:
+                os.link(entry_path, published_path)
+                return
+            except OSError, e:
+                if e.errno == errno.ENOENT and retry:
+                    # purged by a concurrent commit
+                    continue
+                if e.errno != errno.EXDEV:
+                    raise
+                # the pool is on another file system
+                self.tar_dir(path, published_path)
+                return
+
+    @staticmethod
+    def tarball_key(path):
+        """
+        Get the pool key for a tarball of the directory at the specified path.
+        The key changes when a file is modified (mtime, at full precision),
+        replaced (inode) or has its metadata changed (ctime) so a change within
+        the same second as the previous publishing is not missed.
+        :param path: The absolute path to a directory.
+        :type path: str
+        :return: The pool key.
+        :rtype: str
+        """
+        digest = sha256(path)
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for name in [dir_path] + sorted(file_names):
+                file_path = os.path.join(dir_path, name)
+                st = os.lstat(file_path)
+                digest.update('\0%s\0%d\0%d\0%r\0%r' % (
+                    file_path, st.st_ino, st.st_size, st.st_mtime, st.st_ctime))
+        return '%s:%s' % (TARBALL, digest.hexdigest())
 
     def tar_dir(self, path, tar_path, bufsize=65535):
         """
@@ -151,6 +341,7 @@ class FilePublisher(Publisher):
         rmtree(dir_path, ignore_errors=True)
         os.rename(self.tmp_dir, dir_path)
         self.staged = False
+        self.pool.purge(TARBALL)
 
     def unstage(self):
         """
@@ -118,4 +118,25 @@ class QueryTests(ServerTests):
             unit_key = u['unit_key']
             self.assertEqual(unit_key['N'], n)
             self.assertEqual(u['storage_path'], create_storage_path(unit_id))
-            n += 1
\ No newline at end of file
+            n += 1
+
+    def test_query_unit_keys(self):
+        num_units = 5
+        units_created = populate(num_units)
+        # associated twice
+        manager = managers.repo_unit_association_manager()
+        manager.associate_unit_by_id(
+            REPO_ID, TYPE_A, create_unit_id(TYPE_A, 0), RepoContentUnit.OWNER_TYPE_USER, 'admin')
+        conduit = NodesConduit()
+        unit_list = list(conduit.get_unit_keys(REPO_ID, batch_size=3))
+        self.assertEqual(len(unit_list), len(units_created))
+        n = 0
+        for u in sorted(unit_list, key=itemgetter('unit_id')):
+            unit_id = u['unit_id']
+            type_id = u['type_id']
+            self.assertTrue(type_id in ALL_TYPES)
+            self.assertEqual(create_unit_id(type_id, n), unit_id)
+            self.assertEqual(u['unit_key']['N'], n)
+            self.assertFalse('metadata' in u)
+            self.assertFalse('storage_path' in u)
+            n += 1
@@ -152,6 +152,15 @@ class TestErrors(TestCase):
         self.assertEqual(ne.details['error_report'], 'abc')
         self.assertTrue(isinstance(str(ne), str))
 
+    def test_unit_verification(self):
+        # Test
+        ne = UnitVerificationError('/tmp/unit_1', repo_id='repo_1')
+        # Verify
+        self.assertEqual(ne.error_id, UnitVerificationError.ERROR_ID)
+        self.assertEqual(ne.details['path'], '/tmp/unit_1')
+        self.assertEqual(ne.details['repo_id'], 'repo_1')
+        self.assertTrue(isinstance(str(ne), str))
+
     def test_add_unit(self):
         # Test
         ne = AddUnitError(repo_id='repo_1')
@@ -10,9 +10,13 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
+import threading
+import time
+
 from unittest import TestCase
 from mock import Mock, patch
 
+from pulp_node import constants
 from pulp_node.handlers.strategies import *
 from pulp_node.error import *
 from pulp_node.handlers.model import RepositoryOnChild
@@ -51,6 +55,51 @@ class TestRepo:
         self.repo_id = repo_id
 
 
+class StubTask:
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.state = 'finished'
+        self.progress = {}
+        self.result = dict(
+            added_count=1,
+            updated_count=0,
+            removed_count=0,
+            details=dict(errors=[]))
+
+
+class StubBindings:
+    """
+    Stub of the child pulp REST API used to synchronize repositories.
+    Each repository synchronization task runs for the specified duration.
+    Tracks the peak number of synchronizations running concurrently.
+    """
+
+    def __init__(self, duration=0.1):
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.synchronized = []
+        self.repo_actions = Mock()
+        self.repo_actions.sync.side_effect = self.sync
+        self.tasks = Mock()
+        self.tasks.get_task.side_effect = self.get_task
+
+    def sync(self, repo_id, options):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.synchronized.append(repo_id)
+        return TestResponse(202, [TestTask(repo_id)])
+
+    def get_task(self, task_id, **unused):
+        time.sleep(self.duration)
+        with self.lock:
+            self.running -= 1
+        return TestResponse(200, StubTask(task_id))
+
+
 
 REPO_ID = 'foo'
 TYPE_ID = 'random_importer'
@@ -59,7 +108,7 @@ TASK_ID = 'test_task'
 
 class TestBase(TestCase):
 
-    def request(self, cancel_on=0):
+    def request(self, cancel_on=0, repo_ids=(REPO_ID,), options=None):
         conduit = TestConduit(cancel_on)
         progress = HandlerProgress(conduit)
         summary = SummaryReport()
@@ -67,8 +116,8 @@ class TestBase(TestCase):
             conduit=conduit,
             progress=progress,
             summary=summary,
-            bindings=[dict(repo_id=REPO_ID, details={})],
-            options={}
+            bindings=[dict(repo_id=repo_id, details={}) for repo_id in repo_ids],
+            options=options or {}
         )
         return request
 
@@ -207,6 +256,85 @@ class TestBase(TestCase):
         # Verify
         mock_cancel.assert_called_with(TASK_ID)
 
+    def test_max_concurrency(self):
+        self.assertEqual(self.request().max_concurrency(), DEFAULT_MAX_CONCURRENCY)
+        options = {constants.MAX_CONCURRENCY_KEYWORD: '4'}
+        self.assertEqual(self.request(options=options).max_concurrency(), 4)
+        options = {constants.MAX_CONCURRENCY_KEYWORD: 0}
+        self.assertEqual(self.request(options=options).max_concurrency(), 1)
+
+    def test_worker_pool(self):
+        # Setup
+        called = []
+        lock = threading.Lock()
+        def fn(n):
+            with lock:
+                called.append(n)
+            if n == 3:
+                raise ValueError()
+        # Test
+        pool = WorkerPool(3)
+        pool.run(fn, [(n,) for n in range(10)])
+        # Verify
+        self.assertEqual(sorted(called), range(10))
+
+    def _merge_repositories_concurrently(self, bindings, repo_ids, max_concurrency, cancel_on=0):
+        options = {constants.MAX_CONCURRENCY_KEYWORD: max_concurrency}
+        request = self.request(cancel_on, repo_ids, options)
+        request.started()
+        with patch('pulp_node.handlers.model.RepositoryOnChild.binding', bindings):
+            strategy = HandlerStrategy()
+            strategy._merge_repositories(request)
+        return request
+
+    @patch('pulp_node.poller.sleep')
+    @patch('pulp_node.handlers.model.RepositoryOnChild.add')
+    @patch('pulp_node.handlers.model.RepositoryOnChild.fetch', return_value=None)
+    def test_merge_repositories_concurrently(self, *unused):
+        # Setup
+        bindings = StubBindings()
+        repo_ids = ['repo-%d' % n for n in range(8)]
+        # Test
+        request = self._merge_repositories_concurrently(bindings, repo_ids, 4)
+        # Verify
+        self.assertEqual(len(request.summary.errors), 0)
+        self.assertEqual(sorted(bindings.synchronized), repo_ids)
+        self.assertTrue(1 < bindings.peak <= 4)
+        for repo_id in repo_ids:
+            repository = request.summary[repo_id]
+            self.assertEqual(repository.action, RepositoryReport.ADDED)
+            self.assertEqual(repository.units.added, 1)
+            progress = request.progress.find_report(repo_id)
+            self.assertEqual(progress.state, progress.FINISHED)
+
+    @patch('pulp_node.poller.sleep')
+    @patch('pulp_node.handlers.model.RepositoryOnChild.add')
+    @patch('pulp_node.handlers.model.RepositoryOnChild.fetch', return_value=None)
+    def test_merge_repositories_sequentially(self, *unused):
+        # Setup
+        bindings = StubBindings(0)
+        repo_ids = ['repo-%d' % n for n in range(4)]
+        # Test
+        request = self._merge_repositories_concurrently(bindings, repo_ids, 1)
+        # Verify
+        self.assertEqual(bindings.synchronized, repo_ids)
+        self.assertEqual(bindings.peak, 1)
+
+    @patch('pulp_node.poller.sleep')
+    @patch('pulp_node.handlers.model.RepositoryOnChild.add')
+    @patch('pulp_node.handlers.model.RepositoryOnChild.fetch', return_value=None)
+    def test_merge_repositories_concurrently_cancelled(self, *unused):
+        # Setup
+        bindings = StubBindings(0)
+        repo_ids = ['repo-%d' % n for n in range(8)]
+        # Test
+        request = self._merge_repositories_concurrently(bindings, repo_ids, 4, cancel_on=1)
+        # Verify
+        self.assertEqual(len(request.summary.errors), 0)
+        self.assertEqual(len(bindings.synchronized), 0)
+        for repo_id in repo_ids:
+            self.assertEqual(request.summary[repo_id].action, RepositoryReport.CANCELLED)
+
     def test_strategy_factory(self):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
@@ -16,6 +16,7 @@ from unittest import TestCase
 from mock import Mock, patch
 from tempfile import mkdtemp
 from uuid import uuid4
+from hashlib import sha256
 
 from nectar.config import DownloaderConfig
 from nectar.downloaders.curl import HTTPCurlDownloader
@@ -24,10 +25,13 @@ from pulp.plugins.model import Unit
 from pulp.server.config import config as pulp_conf
 
 from pulp_node.importers.strategies import *
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.inventory import UnitInventory, DeltaInventory
+from pulp_node.manifest import unit_digest, units_digest
+from pulp_node.importers.download import UnitDownloadManager, DownloadJournal, UNIT_REF
 from pulp_node.importers.reports import SummaryReport, ProgressListener
 from pulp_node.reports import RepositoryProgress
 from pulp_node.error import *
+from pulp_node.pool import Pool
 
 
 class TestConduit:
@@ -40,7 +44,7 @@ class TestConduit:
         ]
 
     save_unit = Mock()
-    remove_unit = Mock()
+    remove_units = Mock()
     set_progress = Mock()
 
 
@@ -73,6 +77,7 @@ class TestManifest:
 
     def __init__(self, units):
         self.units = [(u, TestUnitRef(u)) for u in units]
+        self.units_digest = None
         self.publishing_details = {constants.BASE_URL: ''}
 
     def get_units(self):
@@ -180,7 +185,7 @@ class TestBase(TestCase):
         self.assertEqual(request.summary.errors[0].error_id, AddUnitError.ERROR_ID)
 
     @patch('pulp_node.importers.strategies.ImporterStrategy._unit_inventory')
-    @patch('test_importer_strategies.TestConduit.remove_unit', ValueError())
+    @patch('test_importer_strategies.TestConduit.remove_units', ValueError())
     def test_delete_units_exception(self, *unused):
         # Setup
         request = self.request()
@@ -192,7 +197,7 @@ class TestBase(TestCase):
         self.assertEqual(len(request.summary.errors), 1)
         self.assertEqual(request.summary.errors[0].error_id, DeleteUnitError.ERROR_ID)
 
-    @patch('pulp_node.conduit.NodesConduit.get_units', side_effect=ValueError())
+    @patch('pulp_node.conduit.NodesConduit.get_unit_keys', side_effect=ValueError())
     def test_get_child_units_exception(self, *unused):
         # Setup
         request = self.request()
@@ -200,7 +205,7 @@ class TestBase(TestCase):
         strategy = ImporterStrategy()
         self.assertRaises(GetChildUnitsError, strategy._unit_inventory, request)
 
-    @patch('pulp_node.conduit.NodesConduit.get_units', return_value=[])
+    @patch('pulp_node.conduit.NodesConduit.get_unit_keys', return_value=[])
     @patch('pulp_node.manifest.Manifest.fetch', side_effect=ValueError())
     def test_get_parent_units_exception(self, *unused):
         # Setup
@@ -209,7 +214,7 @@ class TestBase(TestCase):
         strategy = ImporterStrategy()
         self.assertRaises(GetParentUnitsError, strategy._unit_inventory, request)
 
-    @patch('pulp_node.conduit.NodesConduit.get_units', return_value=[])
+    @patch('pulp_node.conduit.NodesConduit.get_unit_keys', return_value=[])
     @patch('pulp_node.manifest.Manifest.fetch', side_effect=MANIFEST_ERROR)
     def test_get_parent_units_manifest_error(self, *unused):
         # Setup
@@ -236,12 +241,33 @@ class TestBase(TestCase):
         request = self.request(1)
         unit = dict(unit_id='abc', type_id='T', unit_key={}, metadata={})
         inventory = UnitInventory(TestManifest([]), [unit])
-        request.conduit.remove_unit = Mock()
+        request.conduit.remove_units = Mock()
         # Test
         strategy = ImporterStrategy()
         strategy._delete_units(request, inventory)
         self.assertEqual(request.cancelled_call_count, 1)
-        request.conduit.remove_unit.assert_not_called()
+        self.assertFalse(request.conduit.remove_units.called)
+
+    def test_delete_units(self):
+        # Setup
+        request = self.request()
+        child_units = [
+            dict(unit_id='1', type_id='T1', unit_key={'n': 1}, owner_type='A', owner_id='B'),
+            dict(unit_id='2', type_id='T2', unit_key={'n': 2}, owner_type='A', owner_id='B'),
+            dict(unit_id='3', type_id='T1', unit_key={'n': 3}, owner_type='A', owner_id='B'),
+        ]
+        inventory = UnitInventory(TestManifest([]), child_units)
+        request.conduit.remove_units = Mock()
+        # Test
+        strategy = Mirror()
+        strategy._delete_units(request, inventory)
+        # Verify
+        calls = request.conduit.remove_units.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][0][0], 'T1')
+        self.assertEqual(sorted(calls[0][0][1]), ['1', '3'])
+        self.assertEqual(calls[1][0], ('T2', ['2']))
+        self.assertEqual(len(request.summary.errors), 0)
 
     def test_cancel_just_before_downloading(self):
         # Setup
@@ -336,6 +362,276 @@ class TestBase(TestCase):
         self.assertTrue(request.downloader.download.called)
         self.assertTrue(request.downloader.cancel.called)
 
+    def test_unit_inventory(self):
+        # Setup
+        parent_units = [
+            dict(unit_id='1', type_id='T', unit_key={'n': 1}, metadata={}),
+            dict(unit_id='2', type_id='T', unit_key={'n': 2}, metadata={}),
+            dict(unit_id='3', type_id='T', unit_key={'n': 3}, metadata={}),
+        ]
+        child_units = [
+            dict(unit_id='2', type_id='T', unit_key={'n': 2}, owner_type='A', owner_id='B'),
+            dict(unit_id='4', type_id='T', unit_key={'n': 4}, owner_type='A', owner_id='B'),
+        ]
+        # Test
+        inventory = UnitInventory(TestManifest(parent_units), child_units)
+        # Verify
+        added = inventory.units_on_parent_only()
+        self.assertEqual(len(added), 2)
+        self.assertEqual(sorted(u['unit_id'] for u, r in added), ['1', '3'])
+        for unit, ref in added:
+            self.assertEqual(ref.fetch(), unit)
+            self.assertFalse('metadata' in unit)
+        removed = inventory.units_on_child_only()
+        self.assertEqual(removed, [dict(unit_id='4', type_id='T', owner_type='A', owner_id='B')])
+
+    @patch('pulp_node.importers.inventory.DIGEST_TYPECODE', None)
+    def test_unit_inventory_digest_lists(self):
+        # no 64-bit array typecode (32-bit platforms)
+        self.test_unit_inventory()
+
+    def test_delta_inventory(self):
+        # Setup
+        child_units = [
+            dict(unit_id='1', type_id='T', unit_key={'n': 1}),
+            dict(unit_id='2', type_id='T', unit_key={'n': 2}),
+        ]
+        manifest = TestManifest([])
+        delta = TestManifest([dict(unit_id='3', type_id='T', unit_key={'n': 3})])
+        delta.removed = [dict(type_id='T', unit_key={'n': 2})]
+        # Test
+        inventory = DeltaInventory(manifest, [delta], child_units)
+        # Verify
+        added = inventory.units_on_parent_only()
+        self.assertEqual(len(added), 1)
+        self.assertEqual(added[0][0]['unit_id'], '3')
+        removed = inventory.units_on_child_only()
+        self.assertEqual(len(removed), 1)
+        self.assertEqual(removed[0]['unit_id'], '2')
+        self.assertEqual(inventory.child_units_after(), 2)
+        manifest.total_units = 2
+        self.assertTrue(Mirror()._consistent(manifest, inventory))
+        self.assertTrue(Additive()._consistent(manifest, inventory))
+        manifest.total_units = 3
+        self.assertFalse(Mirror()._consistent(manifest, inventory))
+        self.assertFalse(Additive()._consistent(manifest, inventory))
+        manifest.total_units = 1
+        self.assertFalse(Mirror()._consistent(manifest, inventory))
+        self.assertTrue(Additive()._consistent(manifest, inventory))
+        # digest of the units
+        manifest.total_units = 2
+        manifest.units_digest = units_digest(
+            [unit_digest(dict(type_id='T', unit_key={'n': n})) for n in (1, 3)])
+        self.assertEqual(inventory.child_digest_after(), manifest.units_digest)
+        self.assertTrue(Mirror()._consistent(manifest, inventory))
+        self.assertTrue(Additive()._consistent(manifest, inventory))
+        manifest.units_digest = units_digest(
+            [unit_digest(dict(type_id='T', unit_key={'n': n})) for n in (1, 4)])
+        self.assertFalse(Mirror()._consistent(manifest, inventory))
+        self.assertFalse(Additive()._consistent(manifest, inventory))
+
+    def test_synchronize_saves_manifest_id(self):
+        # Setup
+        request = self.request()
+        request.conduit.get_scratchpad = Mock(return_value=None)
+        request.conduit.set_scratchpad = Mock()
+        strategy = Additive()
+        strategy._synchronize = Mock()
+        request.manifest_id = '123'
+        # Test
+        strategy.synchronize(request)
+        # Verify
+        request.conduit.set_scratchpad.assert_called_with({MANIFEST_ID: '123'})
+
+    def test_needs_download_linked(self):
+        # Setup
+        pool = Pool(os.path.join(self.tmp_dir, 'pool'))
+        path = os.path.join(self.tmp_dir, 'stored')
+        with open(path, 'w+') as fp:
+            fp.write('content')
+        pool.add('sha256:abc', path, symbolic=True)
+        storage_path = os.path.join(self.tmp_dir, 'content', 'unit')
+        unit = dict(type_id='T', unit_key={'checksum': 'abc'}, storage_path=storage_path)
+        other = dict(type_id='T', unit_key={'checksum': 'def'}, storage_path=storage_path + '2')
+        # Test
+        strategy = ImporterStrategy()
+        with patch('pulp_node.importers.strategies.content_pool', return_value=pool):
+            needed = strategy._needs_download(unit)
+            other_needed = strategy._needs_download(other)
+        # Verify
+        self.assertFalse(needed)
+        self.assertTrue(other_needed)
+        self.assertEqual(os.stat(storage_path).st_ino, os.stat(path).st_ino)
+
+    def test_needs_download_resumed(self):
+        # Setup
+        storage_path = os.path.join(self.tmp_dir, 'unit')
+        with open(storage_path, 'w+') as fp:
+            fp.write('cont')
+        unit = dict(type_id='T', unit_key={}, storage_path=storage_path, file_size=7)
+        journal = DownloadJournal(self.tmp_dir)
+        # Test
+        strategy = ImporterStrategy()
+        needed = strategy._needs_download(unit, journal)
+        # Verify
+        self.assertTrue(needed)
+        self.assertTrue(os.path.exists(storage_path))
+        self.assertFalse(storage_path in journal)
+
+    def test_needs_download_verified(self):
+        # Setup
+        storage_path = os.path.join(self.tmp_dir, 'unit')
+        with open(storage_path, 'w+') as fp:
+            fp.write('content')
+        unit_key = {'checksumtype': 'sha256', 'checksum': sha256('content').hexdigest()}
+        unit = dict(type_id='T', unit_key=unit_key, storage_path=storage_path, file_size=7)
+        journal = DownloadJournal(self.tmp_dir)
+        # Test
+        strategy = ImporterStrategy()
+        needed = strategy._needs_download(unit, journal)
+        # Verify
+        self.assertFalse(needed)
+        self.assertTrue(storage_path in journal)
+        self.assertTrue(storage_path in DownloadJournal(self.tmp_dir))
+
+    def test_needs_download_corrupted(self):
+        # Setup
+        storage_path = os.path.join(self.tmp_dir, 'unit')
+        with open(storage_path, 'w+') as fp:
+            fp.write('garbage')
+        unit_key = {'checksumtype': 'sha256', 'checksum': sha256('content').hexdigest()}
+        unit = dict(type_id='T', unit_key=unit_key, storage_path=storage_path, file_size=7)
+        journal = DownloadJournal(self.tmp_dir)
+        # Test
+        strategy = ImporterStrategy()
+        needed = strategy._needs_download(unit, journal)
+        # Verify
+        self.assertTrue(needed)
+        self.assertFalse(os.path.exists(storage_path))
+        self.assertFalse(storage_path in journal)
+
+    def test_needs_download_journal(self):
+        # Setup
+        storage_path = os.path.join(self.tmp_dir, 'unit')
+        with open(storage_path, 'w+') as fp:
+            fp.write('garbage')
+        unit_key = {'checksumtype': 'sha256', 'checksum': sha256('content').hexdigest()}
+        unit = dict(type_id='T', unit_key=unit_key, storage_path=storage_path, file_size=7)
+        journal = DownloadJournal(self.tmp_dir)
+        journal.add(storage_path)
+        # Test
+        strategy = ImporterStrategy()
+        needed = strategy._needs_download(unit, journal)
+        # Verify
+        self.assertFalse(needed)
+        self.assertTrue(os.path.exists(storage_path))
+
+    @patch('pulp_node.importers.download.RANGE_SUPPORTED', True)
+    def test_resumed_request(self):
+        # Setup
+        storage_path = os.path.join(self.tmp_dir, 'unit')
+        with open(storage_path, 'w+') as fp:
+            fp.write('cont')
+        # Test
+        request = UnitDownloadManager.create_request('http://redhat.com/unit', storage_path, None, 4)
+        request.destination.write('ent')
+        request.destination.close()
+        # Verify
+        self.assertEqual(request.headers, {'Range': 'bytes=4-'})
+        self.assertEqual(request.data[UNIT_REF], None)
+        with open(storage_path) as fp:
+            self.assertEqual(fp.read(), 'content')
+
+    @patch('pulp_node.importers.download.RANGE_SUPPORTED', False)
+    def test_resumed_request_not_supported(self):
+        # Setup
+        storage_path = os.path.join(self.tmp_dir, 'unit')
+        with open(storage_path, 'w+') as fp:
+            fp.write('cont')
+        # Test
+        request = UnitDownloadManager.create_request('http://redhat.com/unit', storage_path, None, 4)
+        # Verify
+        self.assertEqual(request.destination, storage_path)
+        self.assertFalse(os.path.exists(storage_path))
+
+    def test_synchronize_deletes_journal(self):
+        # Setup
+        request = self.request()
+        request.conduit.get_scratchpad = Mock(return_value=None)
+        request.conduit.set_scratchpad = Mock()
+        journal = DownloadJournal(self.tmp_dir)
+        journal.add('/tmp/unit')
+        strategy = Additive()
+        strategy._synchronize = Mock()
+        # Test
+        strategy.synchronize(request)
+        # Verify
+        self.assertFalse(os.path.exists(journal.path))
+        self.assertFalse('/tmp/unit' in DownloadJournal(self.tmp_dir))
+
+    def test_download_manager_workers(self):
+        # Setup
+        request = self.request()
+        strategy = Mock()
+        units = [dict(unit_id=str(n), type_id='T', unit_key={}) for n in range(20)]
+        reports = []
+        for unit in units:
+            report = Mock(destination='/tmp/%s' % unit['unit_id'], data={UNIT_REF: TestUnitRef(unit)})
+            reports.append(report)
+        # Test
+        manager = UnitDownloadManager(strategy, request, workers=3, backlog=2)
+        manager.start()
+        for report in reports:
+            manager.download_succeeded(report)
+        manager.shutdown()
+        # Verify
+        self.assertEqual(manager.threads, [])
+        self.assertEqual(strategy.add_unit.call_count, len(units))
+        added = sorted([c[0][1]['storage_path'] for c in strategy.add_unit.call_args_list])
+        self.assertEqual(added, sorted([r.destination for r in reports]))
+        self.assertEqual(manager.error_list(), [])
+
+    def test_download_manager_add_failed(self):
+        # Setup
+        request = self.request()
+        strategy = Mock()
+        unit_ref = Mock()
+        unit_ref.fetch.side_effect = ValueError()
+        report = Mock(destination='/tmp/1', data={UNIT_REF: unit_ref})
+        # Test
+        manager = UnitDownloadManager(strategy, request)
+        manager.start()
+        manager.download_succeeded(report)
+        manager.shutdown()
+        # Verify
+        self.assertFalse(strategy.add_unit.called)
+        errors = manager.error_list()
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], CaughtException))
+
+    def test_download_manager_verification_failed(self):
+        # Setup
+        request = self.request()
+        strategy = Mock()
+        path = os.path.join(self.tmp_dir, 'unit')
+        with open(path, 'w+') as fp:
+            fp.write('garbage')
+        unit_key = {'checksumtype': 'sha256', 'checksum': sha256('content').hexdigest()}
+        unit = dict(unit_id='1', type_id='T', unit_key=unit_key, file_size=7)
+        report = Mock(destination=path, data={UNIT_REF: TestUnitRef(unit)})
+        # Test
+        manager = UnitDownloadManager(strategy, request)
+        manager.start()
+        manager.download_succeeded(report)
+        manager.shutdown()
+        # Verify
+        self.assertFalse(strategy.add_unit.called)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(path in manager.journal)
+        errors = manager.error_list()
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], UnitVerificationError))
+
     def test_strategy_factory(self):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
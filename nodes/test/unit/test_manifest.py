@@ -114,3 +114,120 @@ class TestManifest(TestCase):
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
         self.verify(units, units_in)
+
+    def test_round_trip_blocks(self):
+        # Setup
+        units = []
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        num_units = BLOCK_SIZE * 2 + 1
+        for i in range(0, num_units):
+            unit = dict(unit_id=i, type_id='T', unit_key={}, metadata={'n': i})
+            units.append(unit)
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        writer = UnitWriter(units_path)
+        for u in units:
+            writer.add(u)
+        writer.close()
+        manifest = Manifest(self.MANIFEST_ID)
+        manifest.set_units(writer)
+        manifest.write(manifest_path)
+        # Test
+        cfg = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(cfg)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        url = 'file://%s' % manifest_path
+        manifest = Manifest()
+        manifest.fetch(url, working_dir, downloader)
+        manifest.fetch_units(url, downloader)
+        # Verify
+        self.assertEqual(len(manifest.blocks), 3)
+        self.assertEqual(manifest.units_path, os.path.join(working_dir, UNITS_FILE_NAME))
+        self.assertEqual(sorted(os.listdir(working_dir)), sorted([MANIFEST_FILE_NAME, UNITS_FILE_NAME]))
+        units_in = []
+        for unit, ref in manifest.get_units():
+            units_in.append(unit)
+            self.assertEqual(unit, ref.fetch())
+        self.assertEqual(units_in, units)
+        fp = gzip.open(manifest.units_path)
+        try:
+            self.assertEqual(len(fp.readlines()), num_units)
+        finally:
+            fp.close()
+
+    def test_round_trip_chunks(self):
+        # Setup
+        units = []
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        num_units = 25
+        for i in range(0, num_units):
+            unit = dict(unit_id=i, type_id='T', unit_key={}, metadata={'n': i})
+            units.append(unit)
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        with ChunkWriter(units_path, chunk_size=10, workers=2) as writer:
+            for u in units:
+                writer.add(u)
+        manifest = Manifest(self.MANIFEST_ID)
+        manifest.set_units(writer)
+        manifest.write(manifest_path)
+        # Test
+        cfg = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(cfg)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        url = 'file://%s' % manifest_path
+        manifest = Manifest()
+        manifest.fetch(url, working_dir, downloader)
+        manifest.fetch_units(url, downloader)
+        # Verify
+        fp = gzip.open(units_path)
+        try:
+            # the unchunked units file is still written for older children
+            self.assertEqual([json.loads(l) for l in fp], units)
+        finally:
+            fp.close()
+        chunk_names = ['units-0000.json.gz', 'units-0001.json.gz', 'units-0002.json.gz']
+        self.assertEqual(manifest.unit_files(), chunk_names)
+        self.assertEqual([c['total_units'] for c in manifest.chunks], [10, 10, 5])
+        self.assertEqual(manifest.units_digest, units_digest([unit_digest(u) for u in units]))
+        self.assertEqual(sorted(os.listdir(working_dir)), sorted([MANIFEST_FILE_NAME] + chunk_names))
+        for chunk in manifest.chunks:
+            self.assertEqual(file_checksum(manifest.chunk_path(chunk)), chunk['checksum'])
+        units_in = []
+        for unit, ref in manifest.get_units():
+            units_in.append(unit)
+            self.assertEqual(unit, ref.fetch())
+        self.assertEqual(units_in, units)
+        self.assertEqual(len(manifest.get_units()), num_units)
+
+    def test_chunk_path(self):
+        manifest = Manifest(self.MANIFEST_ID)
+        manifest.units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        # Test
+        path = manifest.chunk_path(dict(path='units-0000.json.gz'))
+        # Verify
+        self.assertEqual(path, os.path.join(self.tmp_dir, 'units-0000.json.gz'))
+        for name in ('', '.', '..', '.units.json.gz', '../units.json.gz', '/etc/passwd'):
+            self.assertRaises(ValueError, manifest.chunk_path, dict(path=name))
+
+    def test_chunk_verification_failed(self):
+        # Setup
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        with ChunkWriter(units_path, chunk_size=10, workers=2) as writer:
+            for i in range(0, 15):
+                writer.add(dict(unit_id=i, type_id='T', unit_key={}))
+        manifest = Manifest(self.MANIFEST_ID)
+        manifest.set_units(writer)
+        manifest.chunks[1]['checksum'] = 'sha256:0'
+        manifest.write(manifest_path)
+        # Test
+        cfg = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(cfg)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        url = 'file://%s' % manifest_path
+        manifest = Manifest()
+        manifest.fetch(url, working_dir, downloader)
+        # Verify
+        self.assertRaises(ValueError, manifest.fetch_units, url, downloader)
@@ -0,0 +1,90 @@
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+
+import httplib
+
+from unittest import TestCase
+from mock import Mock, patch
+
+from pulp_node.poller import TaskPoller, TaskFailed, PollingFailed
+
+
+class Task:
+
+    def __init__(self, state, result=None):
+        self.state = state
+        self.progress = {}
+        self.result = result
+        self.exception = None
+        self.traceback = None
+
+
+class Response:
+
+    def __init__(self, task, http_code=httplib.OK):
+        self.response_code = http_code
+        self.response_body = task
+
+
+TASK_ID = 'test_task'
+
+
+class TestPoller(TestCase):
+
+    def binding(self, *tasks):
+        binding = Mock()
+        binding.tasks.get_task.side_effect = [Response(t) for t in tasks]
+        return binding
+
+    @patch('pulp_node.poller.sleep')
+    def test_join(self, mock_sleep):
+        # Setup
+        binding = self.binding(Task('waiting'), Task('running'), Task('finished', 123))
+        progress = Mock()
+        # Test
+        poller = TaskPoller(binding)
+        result = poller.join(TASK_ID, progress, Mock(return_value=False))
+        # Verify
+        self.assertEqual(result, 123)
+        calls = binding.tasks.get_task.call_args_list
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[0][1], dict(wait=poller.delay, state=None))
+        self.assertEqual(calls[1][1], dict(wait=poller.delay, state='waiting'))
+        self.assertEqual(calls[2][1], dict(wait=poller.delay, state='running'))
+        self.assertFalse(mock_sleep.called)
+
+    @patch('pulp_node.poller.sleep')
+    def test_join_not_waited(self, mock_sleep):
+        # Setup
+        binding = self.binding(Task('running'), Task('running'), Task('finished'))
+        # Test
+        poller = TaskPoller(binding)
+        poller.join(TASK_ID, Mock(), Mock(return_value=False))
+        # Verify
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertTrue(0 < mock_sleep.call_args[0][0] <= poller.delay)
+
+    @patch('pulp_node.poller.sleep')
+    def test_join_task_failed(self, *unused):
+        # Setup
+        binding = self.binding(Task('running'), Task('error'))
+        # Test
+        poller = TaskPoller(binding)
+        self.assertRaises(TaskFailed, poller.join, TASK_ID, Mock(), Mock(return_value=False))
+
+    def test_join_polling_failed(self):
+        # Setup
+        binding = Mock()
+        binding.tasks.get_task.return_value = Response(None, httplib.NOT_FOUND)
+        # Test
+        poller = TaskPoller(binding)
+        self.assertRaises(PollingFailed, poller.join, TASK_ID, Mock(), Mock(return_value=False))
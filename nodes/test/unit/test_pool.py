@@ -0,0 +1,93 @@
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import os
+import shutil
+
+from unittest import TestCase
+from tempfile import mkdtemp
+
+from pulp_node.pool import *
+
+
+KEY = 'sha256:0123456789abcdef'
+
+
+class TestPool(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.pool = Pool(os.path.join(self.tmp_dir, 'pool'))
+        self.path = os.path.join(self.tmp_dir, 'content', 'file')
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w+') as fp:
+            fp.write('content')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_content_checksum(self):
+        unit = dict(unit_key=dict(checksumtype='sha', checksum='abc'))
+        self.assertEqual(content_checksum(unit), 'sha:abc')
+        unit = dict(unit_key=dict(checksum='abc'))
+        self.assertEqual(content_checksum(unit), 'sha256:abc')
+        unit = dict(unit_key=dict(checksum='../../abc'))
+        self.assertEqual(content_checksum(unit), None)
+        unit = dict(unit_key=dict(name='abc'))
+        self.assertEqual(content_checksum(unit), None)
+
+    def test_path(self):
+        path = self.pool.path(KEY)
+        self.assertEqual(path, os.path.join(self.pool.dir_path, 'sha256', '01', KEY[7:]))
+        self.assertRaises(ValueError, self.pool.path, 'sha256:../abc')
+
+    def test_add_symbolic(self):
+        # Test
+        self.pool.add(KEY, self.path, symbolic=True)
+        # Verify
+        self.assertTrue(os.path.islink(self.pool.path(KEY)))
+        self.assertEqual(self.pool.find(KEY), self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_add(self):
+        # Test
+        entry_path = self.pool.add(KEY, self.path)
+        # Verify
+        self.assertEqual(self.pool.find(KEY), entry_path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_link(self):
+        # Setup
+        self.pool.add(KEY, self.path, symbolic=True)
+        path = os.path.join(self.tmp_dir, 'other', 'file')
+        # Test
+        linked = self.pool.link(KEY, path)
+        # Verify
+        self.assertTrue(linked)
+        self.assertEqual(os.stat(path).st_ino, os.stat(self.path).st_ino)
+        self.assertFalse(self.pool.link('sha256:abc', path + '2'))
+
+    def test_purge(self):
+        # Setup
+        symlink_key = 'sha256:abc'
+        self.pool.add(symlink_key, self.path, symbolic=True)
+        entry_path = self.pool.add(KEY, self.path)
+        linked_path = os.path.join(self.tmp_dir, 'linked')
+        os.link(entry_path, linked_path)
+        # Test
+        removed = self.pool.purge('sha256')
+        # Verify
+        self.assertEqual(removed, 1)
+        self.assertEqual(self.pool.find(symlink_key), None)
+        self.assertEqual(self.pool.find(KEY), entry_path)
+        os.unlink(linked_path)
+        self.assertEqual(self.pool.purge('sha256'), 1)
+        self.assertEqual(self.pool.find(KEY), None)
@@ -21,7 +21,9 @@ from nectar.config import DownloaderConfig
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import Manifest
+from pulp_node.distributors.publisher import FilePublisher, POOL_DIR_NAME
+from pulp_node.manifest import Manifest, MANIFEST_FILE_NAME
+from pulp_node.pool import Pool
 
 
 class TestHttp(TestCase):
@@ -122,6 +124,7 @@ class TestHttp(TestCase):
                 with open(path, 'rb') as fp:
                     unit_content = fp.read()
                     self.assertEqual(unit_content, unit_content)
+            self.assertEqual(unit[constants.FILE_SIZE], os.path.getsize(path))
             self.assertEqual(unit['unit_key']['n'], n)
             n += 1
 
@@ -153,3 +156,97 @@ class TestHttp(TestCase):
             p.publish(units)
         # verify
         self.assertFalse(os.path.exists(p.tmp_dir))
+
+    def test_publisher_deltas(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units)
+            p.commit()
+        first = Manifest()
+        first.read(os.path.join(publish_dir, repo_id, MANIFEST_FILE_NAME))
+        # test
+        # remove the 1st unit and add a unit without a file
+        added = {'type_id': 'unit', 'unit_key': {'n': 3}}
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units[1:] + [added])
+            p.commit()
+        # verify
+        conf = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(conf)
+        working_dir = os.path.join(self.tmpdir, 'working_dir')
+        os.makedirs(working_dir)
+        manifest = Manifest()
+        url = pathlib.url_join(base_url, p.manifest_path())
+        manifest.fetch(url, working_dir, downloader)
+        self.assertEqual(first.sequence, 1)
+        self.assertEqual(manifest.sequence, 2)
+        self.assertEqual(manifest.total_units, 3)
+        deltas = manifest.fetch_deltas(url, first.id, working_dir, downloader)
+        self.assertEqual(len(deltas), 1)
+        self.assertEqual(deltas[0].base_id, first.id)
+        self.assertEqual(deltas[0].id, manifest.id)
+        self.assertEqual(deltas[0].removed, [{'type_id': 'unit', 'unit_key': {'n': 0}}])
+        self.assertEqual([u for u, r in deltas[0].get_units()], [added])
+        self.assertEqual(manifest.fetch_deltas(url, manifest.id, working_dir, downloader), [])
+        self.assertRaises(Exception, manifest.fetch_deltas, url, 'unknown', working_dir, downloader)
+
+    def test_tarball_key(self):
+        # setup
+        dir_path = os.path.join(self.tmpdir, 'tarball')
+        os.makedirs(dir_path)
+        path = os.path.join(dir_path, 'file')
+        with open(path, 'w') as fp:
+            fp.write('1')
+        os.utime(path, (1000.25, 1000.25))
+        key = FilePublisher.tarball_key(dir_path)
+        # test
+        # rewritten with the same size within the same second
+        with open(path, 'w') as fp:
+            fp.write('2')
+        os.utime(path, (1000.75, 1000.75))
+        # verify
+        self.assertNotEqual(FilePublisher.tarball_key(dir_path), key)
+
+    def test_publisher_tarball_pool(self):
+        # setup
+        units = self.populate()
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        relative_path = units[0]['relative_path']
+        # test
+        # publish the same directory in (2) repositories
+        for repo_id in ('repo_1', 'repo_2'):
+            with HttpPublisher(base_url, virtual_host, repo_id) as p:
+                p.publish(units)
+                p.commit()
+        # verify
+        path_1 = os.path.join(publish_dir, 'repo_1', relative_path)
+        path_2 = os.path.join(publish_dir, 'repo_2', relative_path)
+        inode = os.stat(path_1).st_ino
+        self.assertEqual(os.stat(path_2).st_ino, inode)
+        self.assertEqual(os.stat(path_1).st_nlink, 3)
+        pool_dir = os.path.join(self.tmpdir, 'nodes', POOL_DIR_NAME)
+        key = FilePublisher.tarball_key(units[0]['storage_path'])
+        self.assertEqual(Pool(pool_dir).find(key), Pool(pool_dir).path(key))
+        # change the directory and publish again
+        path = os.path.join(units[0]['storage_path'], self.TARED_FILE % 0)
+        with open(path, 'a') as fp:
+            fp.write('changed')
+        with HttpPublisher(base_url, virtual_host, 'repo_1') as p:
+            p.publish(units)
+            p.commit()
+        self.assertNotEqual(os.stat(path_1).st_ino, inode)
+        self.assertEqual(os.stat(path_2).st_ino, inode)
+        self.assertEqual(os.stat(path_2).st_nlink, 2)
+        tb = tarfile.open(path_1)
+        try:
+            fp = tb.extractfile(os.path.join(os.path.basename(units[0]['storage_path']), self.TARED_FILE % 0))
+            self.assertEqual(fp.read(), '0changed')
+        finally:
+            tb.close()
@@ -12,7 +12,8 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 from pulp.bindings.base import PulpAPI
-from pulp.bindings.search import SearchAPI
+from pulp.bindings.responses import Response
+from pulp.bindings.search import SearchAPI, iterate_pages
 from pulp.common import constants
 
 # Default for update APIs to differentiate between None and not updating the value
@@ -396,11 +397,14 @@ class RepositoryUnitAPI(PulpAPI):
 
         :param repo_id: id of repo to search within
         :type  repo_id: basestring
-        :param kwargs:  search options input by the user and passed in by okaara
+        :param kwargs:  search options input by the user and passed in by okaara;
+                        if 'page-size' is passed, the units are retrieved that
+                        many at a time and returned in a single response
         :type  kwargs:  dict
 
         :return:    server response
         """
+        page_size = kwargs.pop('page-size', None)
         criteria = self._generate_search_criteria(**kwargs)
 
         sort = kwargs.pop('sort', None)
@@ -420,6 +424,13 @@ class RepositoryUnitAPI(PulpAPI):
             criteria['skip'] = skip
 
         path = self.SEARCH_PATH % repo_id
+
+        if page_size:
+            units = []
+            for response in iterate_pages(self.server, path, criteria, page_size):
+                units.extend(response.response_body['items'])
+            return Response(response.response_code, units)
+
         data = {'criteria': criteria}
         return self.server.POST(path, data)
 
@@ -63,6 +63,43 @@ class CSVOperator(Operator):
     value_parser = _csv_parse
 
 
+def iterate_pages(server, path, criteria, page_size):
+    """
+    Generator of the responses to a paginated search, following the
+    continuation returned with each page until the last page or, if the
+    criteria has a limit, until that many results have been returned.
+
+    :param server:      connection to the server
+    :type  server:      pulp.bindings.server.PulpConnection
+    :param path:        path of the search
+    :type  path:        str
+    :param criteria:    criteria of the search, as sent to the server
+    :type  criteria:    dict
+    :param page_size:   maximum number of results in each page
+    :type  page_size:   int
+
+    :return:    generator of the responses, whose body is a dict of the
+                results under 'items' and the continuation under 'continuation'
+    :rtype:     generator
+    """
+    remaining = criteria.get('limit')
+    continuation = ''
+    while continuation is not None:
+        if remaining is None:
+            limit = page_size
+        else:
+            limit = min(page_size, remaining)
+        page_criteria = dict(criteria, limit=limit, continuation=continuation)
+        response = server.POST(path, {'criteria' : page_criteria})
+        yield response
+
+        continuation = response.response_body['continuation']
+        if remaining is not None:
+            remaining -= len(response.response_body['items'])
+            if remaining <= 0:
+                return
+
+
 class SearchAPI(PulpAPI):
     # PATH should normally be defined by a subclass
     PATH = None
@@ -81,7 +118,7 @@ class SearchAPI(PulpAPI):
     }
     _CRITERIA_ARGS = set(('filters', 'sort', 'limit', 'skip', 'fields'))
     _FILTER_ARGS = set(_OPERATORS.keys())
-    _ALL_ARGS = _CRITERIA_ARGS | _FILTER_ARGS
+    _ALL_ARGS = _CRITERIA_ARGS | _FILTER_ARGS | set(('page-size',))
 
     def search(self, **kwargs):
         """
@@ -92,6 +129,9 @@ class SearchAPI(PulpAPI):
         Pass in name-based parameters only that match the values accepted by
         pulp.server.db.model.criteria.Criteria.__init__
 
+        If 'page-size' is passed, the results are retrieved that many at a
+        time; see search_pages.
+
         @return:    response body from the server
         """
         if not set(kwargs.keys()) <= self._ALL_ARGS:
@@ -99,13 +139,36 @@ class SearchAPI(PulpAPI):
             # undefined behavior in case the search command had defined options
             # this class doesn't know about.
             raise ValueError()
+        page_size = kwargs.pop('page-size', None)
         filters = self.compose_filters(**kwargs)
         if filters:
             kwargs['filters'] = filters
         self._strip_criteria_kwargs(kwargs)
+        if page_size:
+            return list(self.search_pages(kwargs, page_size))
         response = self.server.POST(self.PATH, {'criteria':kwargs})
         return response.response_body
 
+    def search_pages(self, criteria, page_size):
+        """
+        Generator of the results of a search, retrieved from the server one
+        page at a time. Each page is requested with the continuation returned
+        with the previous one, so the server finds it without skipping over
+        the results already returned.
+
+        :param criteria:    criteria of the search, as sent to the server; a
+                            limit applies to the total number of results
+        :type  criteria:    dict
+        :param page_size:   maximum number of results in each page
+        :type  page_size:   int
+
+        :return:    generator of the results
+        :rtype:     generator
+        """
+        for page in iterate_pages(self.server, self.PATH, criteria, page_size):
+            for item in page.response_body['items']:
+                yield item
+
     def _strip_criteria_kwargs(self, kwargs):
         for field_name in kwargs.keys():
             if field_name not in self._CRITERIA_ARGS:
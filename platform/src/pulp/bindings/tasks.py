@@ -34,9 +34,18 @@ class TasksAPI(PulpAPI):
         response = self.server.DELETE(path)
         return response
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, wait=None, state=None):
         """
-        Retrieves the status of the given task if it exists.
+        Retrieves the status of the given task if it exists. If both wait and
+        state are specified, the server holds the request until the task is no
+        longer in the given state or the wait has elapsed, whichever is first.
+        Servers that do not support waiting return immediately.
+
+        @param wait: maximum number of seconds the server should wait for the
+                     task's state to change
+        @type  wait: float
+        @param state: state the task was last seen in
+        @type  state: str
 
         @return: response with a Task object in the response_body
         @rtype:  Response
@@ -44,7 +53,10 @@ class TasksAPI(PulpAPI):
         @raise NotFoundException: if there is no task with the given ID
         """
         path = '/v2/tasks/%s/' % task_id
-        response = self.server.GET(path)
+        queries = ()
+        if wait is not None and state is not None:
+            queries = [('state', state), ('wait', wait)]
+        response = self.server.GET(path, queries=queries)
 
         # Since it was a 200, the connection parsed the response body into a
         # Document. We know this will be task data, so convert the object here.
@@ -26,6 +26,7 @@ from pulp.client.extensions.extensions import PulpCliCommand, PulpCliOption, Pul
 
 _LIMIT_DESCRIPTION = _('max number of items to return')
 _SKIP_DESCRIPTION = _('number of items to skip')
+_PAGE_SIZE_DESCRIPTION = _('if specified, the items are retrieved from the server this many at a time')
 _FILTERS_DESCRIPTION = _("""filters provided as JSON in mongo syntax. This will
 override any options specified from the 'Filters' section
 below.""").replace('\n', ' ')
@@ -148,6 +149,15 @@ class CriteriaCommand(PulpCliCommand):
             required=False, validate_func=str,
             parse_func=lambda x: x.split(',')))
 
+    def add_page_size_option(self):
+        """
+        Add the option to retrieve the search results a page at a time, for
+        commands whose search supports it.
+        """
+        self.add_option(PulpCliOption('--page-size', _PAGE_SIZE_DESCRIPTION,
+            required=False, parse_func=int,
+            validate_func=validators.positive_int_validator))
+
     @staticmethod
     def ensure_criteria(kwargs):
         """
@@ -303,4 +313,5 @@ class DisplayUnitAssociationsCommand(UnitAssociationCriteriaCommand):
         # options will be added here
 
         self.add_flag(self.ASSOCIATION_FLAG)
+        self.add_page_size_option()
 
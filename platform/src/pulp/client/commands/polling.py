@@ -189,11 +189,19 @@ class PollingCommand(PulpCliCommand):
                     first_run = False
                 self.progress(task, running_spinner)
 
-            time.sleep(self.poll_frequency_in_seconds)
-
-            response = self.context.server.tasks.get_task(task.task_id)
+            # The server holds the request until the task's state changes or the
+            # poll frequency has elapsed; sleep out the remainder in case it does
+            # not support waiting.
+            started = time.time()
+            response = self.context.server.tasks.get_task(
+                task.task_id, wait=self.poll_frequency_in_seconds, state=task.state)
+            last_state = task.state
             task = response.response_body
 
+            remaining = self.poll_frequency_in_seconds - (time.time() - started)
+            if task.state == last_state and remaining > 0:
+                time.sleep(remaining)
+
         # One final call to update the progress with the end state. It's possible the run state
         # was never hit in the loop above, so we check for first_run again for the missing blank space.
         if first_run:
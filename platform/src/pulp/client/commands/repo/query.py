@@ -35,6 +35,7 @@ class RepoSearchCommand(CriteriaCommand):
         super(RepoSearchCommand, self).__init__(self.run, name=name,
                                                 description=DESC_SEARCH,
                                                 include_search=True)
+        self.add_page_size_option()
 
         self.context = context
         self.prompt = context.prompt
@@ -14,6 +14,7 @@
 from gettext import gettext as _
 import logging
 import sys
+import threading
 
 import pulp.plugins.conduits._common as common_utils
 from   pulp.plugins.model import Unit, PublishReport
@@ -30,6 +31,9 @@ from   pulp.server.db.model.criteria import UnitAssociationCriteria, Criteria
 
 _LOG = logging.getLogger(__name__)
 
+# Default number of units loaded at a time by get_units_iter
+DEFAULT_UNITS_BATCH_SIZE = 1000
+
 # -- exceptions ---------------------------------------------------------------
 
 class ImporterConduitException(Exception):
@@ -159,6 +163,25 @@ class SingleRepoUnitsMixin(object):
         """
         return do_get_repo_units(self.repo_id, criteria, self.exception_class)
 
+    def get_units_iter(self, criteria=None, batch_size=DEFAULT_UNITS_BATCH_SIZE):
+        """
+        Generator counterpart of get_units. The units are loaded from the
+        server one batch at a time as the generator is consumed, so only a
+        batch of units is held in memory at once. The units are returned in
+        the same order as get_units.
+
+        @param criteria: used to scope the returned results or the data within;
+               the Criteria class can be imported from this module
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: number of units loaded from the server at a time
+        @type  batch_size: int
+
+        @return: generator of unit instances
+        @rtype:  generator of L{AssociatedUnit}
+        """
+        return do_get_repo_units_iter(self.repo_id, criteria, self.exception_class, batch_size)
+
 
 class MultipleRepoUnitsMixin(object):
 
@@ -182,6 +205,25 @@ class MultipleRepoUnitsMixin(object):
         """
         return do_get_repo_units(repo_id, criteria, self.exception_class)
 
+    def get_units_iter(self, repo_id, criteria=None, batch_size=DEFAULT_UNITS_BATCH_SIZE):
+        """
+        Generator counterpart of get_units. The units are loaded from the
+        server one batch at a time as the generator is consumed, so only a
+        batch of units is held in memory at once. The units are returned in
+        the same order as get_units.
+
+        @param criteria: used to scope the returned results or the data within;
+               the Criteria class can be imported from this module
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: number of units loaded from the server at a time
+        @type  batch_size: int
+
+        @return: generator of unit instances
+        @rtype:  generator of L{AssociatedUnit}
+        """
+        return do_get_repo_units_iter(repo_id, criteria, self.exception_class, batch_size)
+
 
 class SearchUnitsMixin(object):
 
@@ -373,7 +415,8 @@ class AddUnitMixin(object):
     the instance will take care of it itself.
     """
 
-    def __init__(self, repo_id, importer_id, association_owner_type, association_owner_id):
+    def __init__(self, repo_id, importer_id, association_owner_type, association_owner_id,
+                 unit_batch_size=1):
         """
         @param repo_id: identifies the repo being synchronized
         @type  repo_id: str
@@ -388,17 +431,29 @@ class AddUnitMixin(object):
 
         @param association_owner_id: ID of the association owner
         @type  association_owner_id: str
+
+        @param unit_batch_size: number of units buffered by save_unit before
+               they are written to the database; 1 writes each unit as it
+               is saved
+        @type  unit_batch_size: int
         """
         self.repo_id = repo_id
         self.importer_id = importer_id
         self.association_owner_type = association_owner_type
         self.association_owner_id = association_owner_id
+        self.unit_batch_size = unit_batch_size
 
         self._added_count = 0
         self._updated_count = 0
 
         self._association_owner_id = association_owner_id
 
+        # units passed to save_unit that have not been written yet, in order
+        self._unsaved_units = []
+        # unit keys of the buffered units, by type
+        self._unsaved_unit_keys = {}
+        self._unsaved_units_lock = threading.RLock()
+
     def init_unit(self, type_id, unit_key, metadata, relative_path):
         """
         Initializes the Pulp representation of a content unit. The conduit will
@@ -463,35 +518,140 @@ class AddUnitMixin(object):
         A reference to the provided unit is returned from this call. This call
         will populate the unit's id field with the UUID for the unit.
 
+        If a unit batch size greater than one was set (see set_unit_batch_size),
+        the unit is buffered and both steps take place when the batch is
+        written, at which point the unit's id field is populated; until then,
+        it is None. The batch is written when it is full, when flush_units is
+        called and before any call in this conduit that requires unit ids.
+
         @param unit: unit object returned from the init_unit call
         @type  unit: L{Unit}
 
         @return: object reference to the provided unit, its state updated from the call
         @rtype:  L{Unit}
         """
+        self._unsaved_units_lock.acquire()
         try:
-            content_query_manager = manager_factory.content_query_manager()
-            content_manager = manager_factory.content_manager()
-            association_manager = manager_factory.repo_unit_association_manager()
+            # A unit saved twice in the same batch must be written in two steps
+            # so that the second save is an update of the first
+            unit_key = _unit_key_tuple(unit.unit_key)
+            if unit_key in self._unsaved_unit_keys.get(unit.type_id, ()):
+                self.flush_units()
 
-            # Save or update the unit
-            pulp_unit = common_utils.to_pulp_unit(unit)
-            try:
-                existing_unit = content_query_manager.get_content_unit_by_keys_dict(unit.type_id, unit.unit_key)
-                unit.id = existing_unit['_id']
-                content_manager.update_content_unit(unit.type_id, unit.id, pulp_unit)
-                self._updated_count += 1
-            except MissingResource:
-                unit.id = content_manager.add_content_unit(unit.type_id, None, pulp_unit)
-                self._added_count += 1
+            self._unsaved_units.append(unit)
+            self._unsaved_unit_keys.setdefault(unit.type_id, set()).add(unit_key)
 
-            # Associate it with the repo
-            association_manager.associate_unit_by_id(self.repo_id, unit.type_id, unit.id, self.association_owner_type, self.association_owner_id)
+            if len(self._unsaved_units) >= self.unit_batch_size:
+                self.flush_units()
 
             return unit
+        except ImporterConduitException:
+            raise
         except Exception, e:
             _LOG.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
+        finally:
+            self._unsaved_units_lock.release()
+
+    def set_unit_batch_size(self, unit_batch_size):
+        """
+        Sets the number of units buffered by save_unit before they are written
+        to the database. Importers that do not need the unit's id as soon as
+        save_unit returns may set a larger batch size to save units faster.
+        Any units already buffered are written first.
+
+        @param unit_batch_size: number of units buffered by save_unit; 1
+               writes each unit as it is saved
+        @type  unit_batch_size: int
+        """
+        self._unsaved_units_lock.acquire()
+        try:
+            self.flush_units()
+            self.unit_batch_size = unit_batch_size
+        finally:
+            self._unsaved_units_lock.release()
+
+    def flush_units(self):
+        """
+        Writes all of the units buffered by save_unit to the database. For each
+        type of unit, the existing units are looked up with a single query,
+        new units are inserted in bulk, existing units are only updated if
+        their metadata changed and all of the units are associated to the
+        repository in bulk.
+
+        The units of each type are removed from the buffer once written. If
+        writing a type fails, the units not written are kept in the buffer and
+        listed in the raised exception.
+
+        This call has no effect if there are no buffered units.
+        """
+        self._unsaved_units_lock.acquire()
+        try:
+            type_ids = []
+            units_by_type = {}
+            for unit in self._unsaved_units:
+                if unit.type_id not in units_by_type:
+                    type_ids.append(unit.type_id)
+                units_by_type.setdefault(unit.type_id, []).append(unit)
+
+            for type_id in type_ids:
+                try:
+                    self._save_units(type_id, units_by_type[type_id])
+                except Exception, e:
+                    unsaved = [u.unit_key for u in self._unsaved_units]
+                    msg = _('Content unit association failed for [%(n)s] units: %(e)s; units not saved: %(u)s')
+                    msg = msg % {'n': len(unsaved), 'e': str(e), 'u': unsaved}
+                    _LOG.exception(msg)
+                    raise ImporterConduitException(msg), None, sys.exc_info()[2]
+                self._unsaved_units = [u for u in self._unsaved_units if u.type_id != type_id]
+                self._unsaved_unit_keys.pop(type_id, None)
+        finally:
+            self._unsaved_units_lock.release()
+
+    def _save_units(self, type_id, units):
+        """
+        Creates or updates Pulp's knowledge of the given units and associates
+        them to the repository.
+
+        @param type_id: type of all of the units
+        @type  type_id: str
+
+        @param units: units to save; no two may have the same unit key
+        @type  units: list of L{Unit}
+        """
+        content_query_manager = manager_factory.content_query_manager()
+        content_manager = manager_factory.content_manager()
+        association_manager = manager_factory.repo_unit_association_manager()
+
+        key_fields = units[0].unit_key.keys()
+        existing_units = {}
+        for existing_unit in content_query_manager.get_multiple_units_by_keys_dicts(
+                type_id, [u.unit_key for u in units]):
+            existing_key = dict((k, existing_unit.get(k)) for k in key_fields)
+            existing_units[_unit_key_tuple(existing_key)] = existing_unit
+
+        new_units = []
+        for unit in units:
+            pulp_unit = common_utils.to_pulp_unit(unit)
+            existing_unit = existing_units.get(_unit_key_tuple(unit.unit_key))
+            if existing_unit is None:
+                new_units.append((unit, pulp_unit))
+                continue
+
+            unit.id = existing_unit['_id']
+            changed = [k for k, v in pulp_unit.items() if k not in existing_unit or existing_unit[k] != v]
+            if changed:
+                content_manager.update_content_unit(type_id, unit.id, pulp_unit)
+            self._updated_count += 1
+
+        unit_ids = content_manager.add_content_units(type_id, [p for u, p in new_units])
+        for (unit, pulp_unit), unit_id in zip(new_units, unit_ids):
+            unit.id = unit_id
+        self._added_count += len(new_units)
+
+        association_manager.associate_all_by_ids(self.repo_id, type_id, [u.id for u in units],
+                                                 self.association_owner_type,
+                                                 self.association_owner_id)
 
     def link_unit(self, from_unit, to_unit, bidirectional=False):
         """
@@ -515,6 +675,10 @@ class AddUnitMixin(object):
         content_manager = manager_factory.content_manager()
 
         try:
+            # Units still waiting in the save_unit buffer do not have their ids yet
+            if from_unit.id is None or to_unit.id is None:
+                self.flush_units()
+
             content_manager.link_referenced_content_units(from_unit.type_id, from_unit.id, to_unit.type_id, [to_unit.id])
 
             if bidirectional:
@@ -606,6 +770,18 @@ class PublishReportMixin(object):
 
 # -- utilities ----------------------------------------------------------------
 
+def _unit_key_tuple(unit_key):
+    """
+    Returns a hashable representation of a unit key.
+
+    @param unit_key: unit key dictionary
+    @type  unit_key: dict
+
+    @rtype: tuple
+    """
+    return tuple(sorted(unit_key.items()))
+
+
 def do_get_repo_units(repo_id, criteria, exception_class):
     """
     Performs a repo unit association query. This is split apart so we can have
@@ -636,3 +812,26 @@ def do_get_repo_units(repo_id, criteria, exception_class):
         _LOG.exception('Exception from server requesting all content units for repository [%s]' % repo_id)
         raise exception_class(e), None, sys.exc_info()[2]
 
+
+def do_get_repo_units_iter(repo_id, criteria, exception_class, batch_size):
+    """
+    Generator counterpart of do_get_repo_units.
+    """
+    try:
+        association_query_manager = manager_factory.repo_unit_association_query_manager()
+        units = association_query_manager.get_units_iter(repo_id, criteria=criteria, batch_size=batch_size)
+
+        # Type definitions are loaded as the types are encountered
+        type_defs = {}
+
+        # Convert to transfer object
+        for unit in units:
+            type_id = unit['unit_type_id']
+            type_def = type_defs.get(type_id)
+            if type_def is None:
+                type_def = type_defs[type_id] = types_db.type_definition(type_id)
+            yield common_utils.to_plugin_associated_unit(unit, type_def)
+
+    except Exception, e:
+        _LOG.exception('Exception from server requesting all content units for repository [%s]' % repo_id)
+        raise exception_class(e), None, sys.exc_info()[2]
@@ -34,6 +34,9 @@ its calls into this conduit:
 3. For units previously associated with the repository (known from get_units)
    that should no longer be, calls remove_unit to remove that association.
 
+Importers that do not need a unit's id as soon as save_unit returns may call
+set_unit_batch_size to have the saved units written to the database in batches.
+
 Throughout the sync process, the set_progress call can be used to update the
 Pulp server on the status of the sync. Pulp will make this information available
 to users.
@@ -46,7 +49,7 @@ import sys
 from   pulp.plugins.conduits.mixins import (\
     ImporterConduitException, AddUnitMixin, RepoScratchPadMixin,
     ImporterScratchPadMixin, SingleRepoUnitsMixin, StatusMixin,
-    SearchUnitsMixin)
+    SearchUnitsMixin, DEFAULT_UNITS_BATCH_SIZE)
 from   pulp.plugins.model import SyncReport
 import pulp.server.managers.factory as manager_factory
 from   pulp.server.managers.repo.unit_association import OWNER_TYPE_IMPORTER
@@ -55,6 +58,10 @@ from   pulp.server.managers.repo.unit_association import OWNER_TYPE_IMPORTER
 
 _LOG = logging.getLogger(__name__)
 
+# Number of units buffered by save_unit before they are written to the database,
+# for importers that enable buffering with set_unit_batch_size
+SAVE_UNIT_BATCH_SIZE = 500
+
 # -- classes -----------------------------------------------------------------
 
 class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin,
@@ -86,6 +93,36 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
     def __str__(self):
         return _('RepoSyncConduit for repository [%(r)s]') % {'r' : self.repo_id}
 
+    def get_units(self, criteria=None):
+        """
+        Returns the collection of content units associated with the repository
+        being synchronized, including the units saved so far in this sync.
+
+        See SingleRepoUnitsMixin.get_units for details.
+        """
+        self.flush_units()
+        return SingleRepoUnitsMixin.get_units(self, criteria=criteria)
+
+    def get_units_iter(self, criteria=None, batch_size=DEFAULT_UNITS_BATCH_SIZE):
+        """
+        Generator counterpart of get_units, including the units saved so far
+        in this sync.
+
+        See SingleRepoUnitsMixin.get_units_iter for details.
+        """
+        self.flush_units()
+        return SingleRepoUnitsMixin.get_units_iter(self, criteria=criteria, batch_size=batch_size)
+
+    def search_all_units(self, type_id, criteria):
+        """
+        Searches for units of a given type in the server, including the units
+        saved so far in this sync.
+
+        See SearchUnitsMixin.search_all_units for details.
+        """
+        self.flush_units()
+        return SearchUnitsMixin.search_all_units(self, type_id, criteria)
+
     def remove_unit(self, unit):
         """
         Removes the association between the given content unit and the repository
@@ -109,6 +146,9 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @type  unit: L{Unit}
         """
 
+        # Units saved earlier in the sync must be associated before the removal
+        self.flush_units()
+
         try:
             self._association_manager.unassociate_unit_by_id(self.repo_id, unit.type_id, unit.id, OWNER_TYPE_IMPORTER, self.association_owner_id)
             self._removed_count += 1
@@ -116,6 +156,38 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
             _LOG.exception(_('Content unit unassociation failed'))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def remove_units(self, type_id, unit_ids):
+        """
+        Removes the associations between the given content units of a single
+        type and the repository being synchronized.
+
+        This is the bulk counterpart of remove_unit for importers removing a
+        large number of units. The units are identified by ID only and the
+        importer is not notified of the removal. As with remove_unit, only the
+        associations owned by this importer are removed.
+
+        @param type_id: identifies the type of the units
+        @type  type_id: str
+
+        @param unit_ids: list of unit IDs
+        @type  unit_ids: list of str
+
+        @return: number of units no longer associated with the repository
+        @rtype:  int
+        """
+
+        # Units saved earlier in the sync must be associated before the removal
+        self.flush_units()
+
+        try:
+            removed = self._association_manager.remove_all_by_ids(
+                self.repo_id, type_id, unit_ids, OWNER_TYPE_IMPORTER, self.association_owner_id)
+            self._removed_count += removed
+            return removed
+        except Exception, e:
+            _LOG.exception(_('Content unit unassociation failed'))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
     def build_success_report(self, summary, details):
         """
         Creates the SyncReport instance that needs to be returned to the Pulp
@@ -132,6 +204,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush_units()
         r = SyncReport(True, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         return r
@@ -157,6 +230,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush_units()
         r = SyncReport(False, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         return r
@@ -181,6 +255,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush_units()
         r = SyncReport(False, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         r.canceled_flag = True
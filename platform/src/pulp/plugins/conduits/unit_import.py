@@ -110,6 +110,37 @@ class ImportUnitConduit(ImporterScratchPadMixin, RepoScratchPadMixin,
             _LOG.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def associate_units(self, units):
+        """
+        Associates all of the given units with the destination repository for
+        the import. This is equivalent to calling associate_unit for each unit,
+        but the associations are made in bulk and should be preferred when
+        importing a large number of units.
+
+        This call is idempotent. Units that are already associated will be
+        skipped.
+
+        :param units: unit objects returned from the init_unit call
+        :type  units: list of pulp.plugins.model.Unit
+
+        :return: object references to the provided units
+        :rtype:  list of pulp.plugins.model.Unit
+        """
+
+        unit_ids_by_type = {}
+        for unit in units:
+            unit_ids_by_type.setdefault(unit.type_id, []).append(unit.id)
+
+        try:
+            for type_id, unit_ids in unit_ids_by_type.items():
+                self.__association_manager.associate_all_by_ids(self.dest_repo_id, type_id, unit_ids,
+                                                                self.association_owner_type,
+                                                                self.association_owner_id)
+            return units
+        except Exception, e:
+            _LOG.exception(_('Content unit association failed'))
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
     def get_source_units(self, criteria=None):
         """
         Returns the collection of content units associated with the source
@@ -17,17 +17,24 @@ This module covers both the ContentType collection itself as well as any
 type-specific collections that exist to suit the type needs.
 """
 
+import copy
 import logging
+import threading
+import time
 
 from pymongo import ASCENDING
 
 import pulp.server.db.connection as pulp_db
-from pulp.server.db.model.content import ContentType
+from pulp.server.db.model.content import ContentType, ContentTypesVersion
 
 # -- constants ----------------------------------------------------------------
 
 TYPE_COLLECTION_PREFIX = 'units_'
 
+# Seconds between checks of the version stamp of the cached type definitions;
+# updates made in this process invalidate the cache immediately
+VERSION_CHECK_INTERVAL = 5
+
 LOG = logging.getLogger('db')
 
 # -- database exceptions ------------------------------------------------------
@@ -127,6 +134,9 @@ def update_database(definitions, error_on_missing_definitions=False):
             error_defs.append(type_def)
             continue
 
+    # Even a partially failed update may have changed some definitions
+    _bump_version()
+
     if len(error_defs) > 0:
         raise UpdateFailed(error_defs)
 
@@ -152,6 +162,8 @@ def clean():
     type_collection = ContentType.get_collection()
     type_collection.remove(safe=True)
 
+    _bump_version()
+
 
 def type_units_collection(type_id):
     """
@@ -163,9 +175,7 @@ def type_units_collection(type_id):
     @return: database collection holding units of the given type
     @rtype:  L{pymongo.collection.Collection}
     """
-    collection_name = unit_collection_name(type_id)
-    collection = pulp_db.get_collection(collection_name, create=False)
-    return collection
+    return _CACHE.collection(type_id)
 
 
 def all_type_ids():
@@ -174,12 +184,7 @@ def all_type_ids():
              if there are no IDs in the database
     @rtype:  list of str
     """
-
-    collection = ContentType.get_collection()
-    type_id_son = list(collection.find(fields={'id' : 1}))
-    type_ids = [t['id'] for t in type_id_son]
-
-    return type_ids
+    return [t['id'] for t in _CACHE.definitions()]
 
 
 def all_type_collection_names():
@@ -187,15 +192,7 @@ def all_type_collection_names():
     @return: list of collection names for all types currently in the database
     @rtype:  list of str
     """
-
-    collection = ContentType.get_collection()
-    type_ids = list(collection.find(fields={'id' : 1}))
-
-    type_collection_names = []
-    for id in type_ids:
-        type_collection_names.append(unit_collection_name(id['id']))
-
-    return type_collection_names
+    return [unit_collection_name(t['id']) for t in _CACHE.definitions()]
 
 
 def all_type_definitions():
@@ -203,10 +200,7 @@ def all_type_definitions():
     @return: list of all type definitions in the database (mongo SON objects)
     @rtype:  list of dict
     """
-
-    coll = ContentType.get_collection()
-    types = list(coll.find())
-    return types
+    return copy.deepcopy(_CACHE.definitions())
 
 
 def type_definition(type_id):
@@ -217,9 +211,8 @@ def type_definition(type_id):
     @return: corresponding type definition, None if not found
     @rtype: SON or None
     """
-    collection = ContentType.get_collection()
-    type_ = collection.find_one({'id': type_id})
-    return type_
+    type_ = _CACHE.definition(type_id)
+    return copy.deepcopy(type_)
 
 
 def unit_collection_name(type_id):
@@ -246,14 +239,166 @@ def type_units_unit_key(type_id):
              content type collection
     @rtype: list of str or None
     """
-    collection = ContentType.get_collection()
-    type_def = collection.find_one({'id': type_id})
+    type_def = _CACHE.definition(type_id)
     if type_def is None:
         return None
-    return type_def['unit_key']
+    return copy.copy(type_def['unit_key'])
+
+
+def cache_statistics():
+    """
+    Returns the hit and miss counts of the type definition cache since the
+    process started. A miss is a lookup that had to load the definitions from
+    the database.
+
+    @return: dict of hits, misses, hit_rate (between 0 and 1) and the number
+             of times the cached definitions were reloaded
+    @rtype:  dict
+    """
+    return _CACHE.statistics()
+
+
+def invalidate_cache():
+    """
+    Drops the type definitions cached in this process; they are reloaded from
+    the database on the next lookup. Other processes pick up changes through
+    the version stamp bumped by update_database and clean.
+    """
+    _CACHE.invalidate()
+
+# -- cache --------------------------------------------------------------------
+
+class TypeDefinitionCache(object):
+    """
+    Process-wide cache of the content type definitions and of the handles to
+    the type unit collections.
+
+    The definitions are reloaded when the version stamp in the database
+    differs from the one they were loaded with. The stamp is read at most
+    once every check_interval seconds.
+    """
+
+    def __init__(self, check_interval=VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._version = None
+        self._checked = None
+        self._definitions = None
+        self._definitions_by_id = {}
+        self._collections = {}
+        self._database = None
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def definitions(self):
+        """
+        @return: all type definitions, in database order; not to be modified
+        @rtype:  list of dict
+        """
+        with self._lock:
+            self._validate()
+            return self._definitions
+
+    def definition(self, type_id):
+        """
+        @return: type definition or None if there is none; not to be modified
+        @rtype:  dict or None
+        """
+        with self._lock:
+            self._validate()
+            return self._definitions_by_id.get(type_id)
+
+    def collection(self, type_id):
+        """
+        @return: database collection holding units of the given type
+        @rtype:  L{pymongo.collection.Collection}
+        """
+        with self._lock:
+            self._check_database()
+
+            collection = self._collections.get(type_id)
+            if collection is None:
+                collection_name = unit_collection_name(type_id)
+                collection = pulp_db.get_collection(collection_name, create=False)
+                self._collections[type_id] = collection
+
+            return collection
+
+    def invalidate(self):
+        with self._lock:
+            self._definitions = None
+            self._definitions_by_id = {}
+            self._collections = {}
+
+    def statistics(self):
+        with self._lock:
+            total = self.hits + self.misses
+            hit_rate = 0.0
+            if total > 0:
+                hit_rate = float(self.hits) / total
+            return {'hits' : self.hits,
+                    'misses' : self.misses,
+                    'hit_rate' : hit_rate,
+                    'reloads' : self.reloads}
+
+    def _check_database(self):
+        # Nothing cached is valid once the database connection is reinitialized
+        database = pulp_db.get_database()
+        if database is not self._database:
+            self.invalidate()
+            self._database = database
+
+    def _validate(self):
+        self._check_database()
+        now = time.time()
+
+        if self._definitions is not None and now - self._checked < self.check_interval:
+            self.hits += 1
+            return
+
+        version = _current_version()
+        self._checked = now
+
+        if self._definitions is not None and version == self._version:
+            self.hits += 1
+            return
+
+        self.misses += 1
+        if self._definitions is not None:
+            self.reloads += 1
+
+        definitions = list(ContentType.get_collection().find())
+        self._definitions = definitions
+        self._definitions_by_id = dict((t['id'], t) for t in definitions)
+        self._collections = {}
+        self._version = version
+
+
+_CACHE = TypeDefinitionCache()
 
 # -- private -----------------------------------------------------------------
 
+def _current_version():
+    stamp = ContentTypesVersion.get_collection().find_one({'_id' : ContentTypesVersion.STAMP_ID})
+    if stamp is None:
+        return None
+    return stamp['version']
+
+
+def _bump_version():
+    """
+    Marks the type definitions as changed, both for this process and for any
+    other process caching them.
+    """
+    collection = ContentTypesVersion.get_collection()
+    collection.update({'_id' : ContentTypesVersion.STAMP_ID}, {'$inc' : {'version' : 1}},
+                      upsert=True, safe=True)
+    _CACHE.invalidate()
+
+
 def _create_or_update_type(type_def):
 
     # Make sure a collection exists for the type
@@ -274,6 +419,9 @@ def _create_or_update_type(type_def):
     # XXX this still causes a potential race condition when 2 users are updating the same type
     content_type_collection.save(content_type, safe=True)
 
+    # Other processes are notified by the version bump at the end of the update
+    _CACHE.invalidate()
+
 def _update_indexes(type_def, unique):
 
     collection_name = unit_collection_name(type_def.id)
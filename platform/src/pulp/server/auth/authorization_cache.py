@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Process-wide cache of the data authorization decisions are made from: whether
+a user is a super user and the operations a user is granted on each permission
+resource. Entries expire after the configured time to live and are dropped by
+the user, role and permission managers whenever they change that data. The
+cache holds at most the configured number of entries, evicting the least
+recently used ones in batches when it is full.
+
+The time spent authenticating and authorizing each request is totalled with
+the cache statistics.
+"""
+
+import heapq
+import threading
+import time
+
+from pulp.server.config import config
+
+# -- constants ----------------------------------------------------------------
+
+# Cache key resource for the super user flag of a user
+SUPER_USER_KEY = None
+
+# Fraction of the maximum number of entries evicted when the cache is full
+_EVICTION_FRACTION = 0.1
+
+# -- cache --------------------------------------------------------------------
+
+class AuthorizationCache(object):
+    """
+    Cache of authorization data keyed by (login, resource prefix).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (expiration time, value, access stamp)
+        self._entries = {}
+        # Incremented on each access to stamp the entries in order of use
+        self._clock = 0
+        # Incremented on each invalidation so values loaded concurrently with
+        # an invalidation are not cached
+        self._generation = 0
+        # Time of the next sweep of the expired entries
+        self._next_purge = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.authorizations = 0
+        self.authorization_time = 0
+
+    def get(self, login, resource, load):
+        """
+        Returns the cached value for the user and resource, calling load to
+        retrieve it if it is not cached or has expired.
+
+        @param login: login of the user the value applies to
+        @type  login: str
+
+        @param resource: permission resource the value applies to or
+                         SUPER_USER_KEY for the super user flag
+        @type  resource: str or None
+
+        @param load: called without arguments to retrieve the value
+        @type  load: callable
+
+        @return: cached or loaded value
+        """
+        key = (login, resource)
+        now = time.time()
+
+        self._lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._clock += 1
+                self._entries[key] = (entry[0], entry[1], self._clock)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        finally:
+            self._lock.release()
+
+        # Loaded outside of the lock so concurrent requests are not serialized
+        # behind the database; the worst case is the value is loaded twice
+        value = load()
+
+        ttl = config.getint('security', 'authorization_cache_ttl')
+        if ttl > 0:
+            self._lock.acquire()
+            try:
+                if generation == self._generation:
+                    self._add(key, now + ttl, value, now, ttl)
+            finally:
+                self._lock.release()
+
+        return value
+
+    def _add(self, key, expiration, value, now, ttl):
+        # must be called with the lock held
+        if now >= self._next_purge:
+            for k in [k for k, e in self._entries.items() if e[0] <= now]:
+                del self._entries[k]
+            self._next_purge = now + ttl
+
+        self._entries.pop(key, None)
+        size = config.getint('security', 'authorization_cache_size')
+        if self._entries and len(self._entries) >= size:
+            # evicting a batch keeps the scan for the least recently used
+            # entries from running on every addition to a full cache
+            count = max(len(self._entries) - size + 1, int(size * _EVICTION_FRACTION))
+            stamped = [(e[2], k) for k, e in self._entries.items()]
+            for stamp, k in heapq.nsmallest(count, stamped):
+                del self._entries[k]
+                self.evictions += 1
+
+        self._clock += 1
+        self._entries[key] = (expiration, value, self._clock)
+
+    def add_authorization(self, elapsed):
+        """
+        Adds the time spent authenticating and authorizing a request to the
+        statistics.
+
+        @param elapsed: seconds
+        @type  elapsed: float
+        """
+        self._lock.acquire()
+        try:
+            self.authorizations += 1
+            self.authorization_time += elapsed
+        finally:
+            self._lock.release()
+
+    def invalidate(self, login=None):
+        """
+        Drops the cached entries of the given user, or of all users if login
+        is None.
+
+        @type login: str or None
+        """
+        self._lock.acquire()
+        try:
+            self._generation += 1
+            if login is None:
+                self._entries.clear()
+                return
+
+            for key in [k for k in self._entries if k[0] == login]:
+                del self._entries[key]
+        finally:
+            self._lock.release()
+
+    def statistics(self):
+        """
+        @return: dict of hits, misses, evictions and number of cached entries,
+                 and of the number of requests authorized and the seconds
+                 spent authorizing them
+        @rtype:  dict
+        """
+        self._lock.acquire()
+        try:
+            return {'hits' : self.hits,
+                    'misses' : self.misses,
+                    'evictions' : self.evictions,
+                    'entries' : len(self._entries),
+                    'authorizations' : self.authorizations,
+                    'authorization_time' : self.authorization_time}
+        finally:
+            self._lock.release()
+
+
+_CACHE = AuthorizationCache()
+
+# -- public -------------------------------------------------------------------
+
+def get(login, resource, load):
+    """
+    @see: L{AuthorizationCache.get}
+    """
+    return _CACHE.get(login, resource, load)
+
+
+def invalidate(login=None):
+    """
+    @see: L{AuthorizationCache.invalidate}
+    """
+    _CACHE.invalidate(login)
+
+
+def record_authorization(elapsed):
+    """
+    @see: L{AuthorizationCache.add_authorization}
+    """
+    _CACHE.add_authorization(elapsed)
+
+
+def statistics():
+    """
+    @see: L{AuthorizationCache.statistics}
+    """
+    return _CACHE.statistics()
@@ -25,7 +25,7 @@ _default_values = {
         'lifetime': '180', # in days
     },
     'coordinator': {
-        'task_state_poll_interval': '0.1',
+        'resource_lock_table': 'memory',
     },
     'data_reaping': {
         'reaper_interval': '0.25',
@@ -69,6 +69,12 @@ _default_values = {
         'bind_timeout': '2592000:600',
         'unbind_timeout': '2592000:600',
     },
+    'profiling': {
+        'enabled': 'false',
+        'slow_request_threshold': '5',
+        'slow_query_threshold': '1',
+        'database_metrics': 'false',
+    },
     'scheduler': {
         'dispatch_interval': '30',
     },
@@ -79,6 +85,8 @@ _default_values = {
         'user_cert_expiration': '7',
         'consumer_cert_expiration': '3650',
         'serial_number_path': '/var/lib/pulp/sn.dat',
+        'authorization_cache_ttl': '60',
+        'authorization_cache_size': '10000',
     },
     'server': {
         'server_name': socket.gethostname(),
@@ -95,6 +103,7 @@ _default_values = {
         'create_weight': '0',
         'publish_weight': '1',
         'sync_weight': '2',
+        'max_wait': '2',
     },
 }
 
@@ -11,17 +11,20 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import inspect
 import logging
 import time
 from gettext import gettext as _
 
 import pymongo
 from pymongo.collection import Collection
+from pymongo.cursor import Cursor
 from pymongo.errors import AutoReconnect
 from pymongo.son_manipulator import AutoReference, NamespaceInjector
 
-from pulp.server import config
+from pulp.server import config, debugging
 from pulp.server.compat import wraps
+from pulp.server.db import metrics
 from pulp.server.exceptions import PulpException
 
 # globals ----------------------------------------------------------------------
@@ -53,7 +56,13 @@ def initialize(name=None, seeds=None, max_pool_size=None):
 
         _LOG.info("Attempting Database connection with seeds = %s" % (seeds))
 
-        _CONNECTION = pymongo.Connection(seeds, max_pool_size=max_pool_size)
+        kwargs = {'max_pool_size': max_pool_size}
+        if config.config.getboolean('profiling', 'database_metrics'):
+            metrics.enable()
+            # pymongo's hook to customize its connection pool
+            kwargs['_pool_class'] = metrics.MetricsPool
+
+        _CONNECTION = pymongo.Connection(seeds, **kwargs)
 
         _DATABASE = getattr(_CONNECTION, name)
         _DATABASE.add_son_manipulator(NamespaceInjector())
@@ -102,6 +111,7 @@ def _retry_decorator(method):
                           (method.__name__, self.full_name, self.retries - tries + 1))
 
                 if tries <= self.retries:
+                    metrics.record_retry(self.name, method.__name__)
                     time.sleep(0.3)
 
         raise PulpCollectionFailure(
@@ -127,6 +137,136 @@ def _end_request_decorator(method):
     return _with_end_request
 
 
+# The argument holding the selector of the profiled methods that have one. The
+# arguments of the others, such as the documents passed to insert and save, may
+# hold sensitive values and are not logged.
+_SELECTOR_ARGUMENTS = {'update': 'spec', 'remove': 'spec_or_id'}
+
+
+def _profiling():
+    return debugging.PROFILER is not None or metrics.METRICS is not None
+
+
+def _profile_decorator(method, collection_name):
+    """
+    Collection instance method decorator recording the database call in the
+    profile of the current request and in the database metrics, when enabled
+    """
+
+    @wraps(method)
+    def _with_profile(*args, **kwargs):
+        if not _profiling():
+            return method(*args, **kwargs)
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = time.time() - start
+            selector = None
+            if method.__name__ in _SELECTOR_ARGUMENTS:
+                selector = args[0] if args else kwargs.get(_SELECTOR_ARGUMENTS[method.__name__])
+            debugging.record_query(collection_name, method.__name__, elapsed, selector)
+            metrics.record_call(collection_name, method.__name__, elapsed)
+
+    return _with_profile
+
+
+class PulpCursor(object):
+    """
+    pymongo.cursor.Cursor wrapper, returned by PulpCollection.find when profiling
+    or the database metrics are enabled, that records the query in the profile
+    of the current request and in the database metrics. The results are
+    retrieved as the cursor is iterated, so the query is recorded as a find
+    with the time spent iterating and the number of documents read once the
+    cursor is exhausted, closed or discarded. The cursor's count, distinct and
+    explain commands are recorded as they are run. Cursors returned by the
+    wrapped cursor, such as by clone, are wrapped as well.
+    """
+
+    _profiled_methods = ('count', 'distinct', 'explain')
+
+    def __init__(self, cursor, spec):
+        """
+        :param cursor: cursor returned by Collection.find
+        :type  cursor: pymongo.cursor.Cursor
+        :param spec: selector of the query, included in the slow query log
+        :type  spec: dict or None
+        """
+        self._cursor = cursor
+        self._spec = spec
+        self._elapsed = 0.0
+        self._documents = 0
+        self._iterated = False
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cursor, name)
+        # properties such as collection may be callable, only methods are wrapped
+        if not inspect.ismethod(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def _method(*args, **kwargs):
+            if name not in self._profiled_methods or not _profiling():
+                return self._wrap(attribute(*args, **kwargs))
+            start = time.time()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                elapsed = time.time() - start
+                debugging.record_query(self._cursor.collection.name, name, elapsed, self._spec)
+                metrics.record_call(self._cursor.collection.name, name, elapsed)
+
+        return _method
+
+    def _wrap(self, value):
+        # the query modifiers return the cursor itself, clone returns a new one
+        if value is self._cursor:
+            return self
+        if isinstance(value, Cursor):
+            return PulpCursor(value, self._spec)
+        return value
+
+    def __getitem__(self, index):
+        return self._wrap(self._cursor[index])
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if not _profiling():
+            return self._cursor.next()
+        self._iterated = True
+        start = time.time()
+        try:
+            document = self._cursor.next()
+        except StopIteration:
+            self._elapsed += time.time() - start
+            self._record()
+            raise
+        self._elapsed += time.time() - start
+        self._documents += 1
+        return document
+
+    def close(self):
+        self._record()
+        self._cursor.close()
+
+    def __del__(self):
+        # cursors that are not read to the end, such as by find_one
+        if self.__dict__.get('_iterated'):
+            self._record()
+
+    def _record(self):
+        if not self._iterated:
+            return
+        self._iterated = False
+        collection_name = self._cursor.collection.name
+        debugging.record_query(collection_name, 'find', self._elapsed, self._spec)
+        metrics.record_call(collection_name, 'find', self._elapsed, self._documents)
+        self._elapsed = 0.0
+        self._documents = 0
+
+
 class PulpCollection(Collection):
     """
     pymongo.collection.Collection wrapper that provides support for retries when
@@ -139,6 +279,9 @@ class PulpCollection(Collection):
                           'find_one', 'count', 'create_index', 'ensure_index',
                           'drop_index', 'drop_indexes', 'group', 'rename', 'map_reduce')
 
+    # find and find_one are profiled as their cursors are iterated
+    _profiled_methods = tuple(m for m in _decorated_methods if m not in ('find', 'find_one'))
+
     def __init__(self, database, name, create=False, retries=0, **kwargs):
         super(PulpCollection, self).__init__(database, name, create=create, **kwargs)
 
@@ -148,9 +291,19 @@ class PulpCollection(Collection):
             setattr(self, m, _retry_decorator(getattr(self, m)))
             setattr(self, m, _end_request_decorator(getattr(self, m)))
 
+        for m in self._profiled_methods:
+            setattr(self, m, _profile_decorator(getattr(self, m), self.name))
+
     def __getstate__(self):
         return {'name': self.name}
 
+    def find(self, *args, **kwargs):
+        cursor = super(PulpCollection, self).find(*args, **kwargs)
+        # the wrapper is only paid for when profiling
+        if not _profiling():
+            return cursor
+        return PulpCursor(cursor, args[0] if args else kwargs.get('spec'))
+
     def __setstate__(self, state):
         return get_collection(state['name'])
 
@@ -162,6 +315,13 @@ class PulpCollection(Collection):
         :return: pymongo cursor for the given query
         :rtype:  pymongo.cursor.Cursor
         """
+        if criteria.paginated:
+            # The page is sorted on the fields its continuation is built from
+            cursor = self.find(criteria.spec, fields=criteria.page_fields)
+            cursor.sort(criteria.page_sort)
+            cursor.limit(criteria.page_limit)
+            return cursor
+
         cursor = self.find(criteria.spec, fields=criteria.fields)
 
         if criteria.sort is not None:
@@ -16,7 +16,7 @@ import os
 import sys
 
 from pulp.plugins.loader.api import load_content_types
-from pulp.server.db import connection
+from pulp.server.db import connection, metrics
 from pulp.server.db.migrate import models
 from pulp.server import config
 
@@ -40,6 +40,10 @@ def parse_args():
     parser.add_option('--test', action='store_true', dest='test',
                       default=False,
                       help=_('Run migration, but do not update version'))
+    parser.add_option('--dump-metrics', action='store_true', dest='dump_metrics',
+                      default=False,
+                      help=_('Print the metrics of the database calls made by the migrations '
+                             'and content type loading when done'))
     options, args = parser.parse_args()
     if args:
         parser.error(_('Unknown arguments: %s') % ', '.join(args))
@@ -99,7 +103,11 @@ def main():
     try:
         options = parse_args()
         _start_logging()
+        if options.dump_metrics:
+            metrics.enable()
         _auto_manage_db(options)
+        if options.dump_metrics:
+            _dump_metrics()
     except DataError, e:
         print >> sys.stderr, str(e)
         logger.critical(str(e))
@@ -138,6 +146,15 @@ def _auto_manage_db(options):
     return os.EX_OK
 
 
+def _dump_metrics():
+    """
+    Print the metrics of the database calls made by this process and log them.
+    """
+    for line in metrics.format_report(metrics.report()):
+        print line
+        logger.info(line)
+
+
 def _start_logging():
     """
     Call into Pulp to get the logging started, and set up the logger to be used in this module.
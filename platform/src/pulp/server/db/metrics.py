@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Database metrics aggregated over all of the calls made through PulpCollection
+instances in this process: per collection and operation histograms of the
+latency and of the number of documents returned, the number of retries after
+AutoReconnect errors, and a histogram of the time spent waiting for a socket
+from the connection pool.
+"""
+
+import bisect
+import threading
+import time
+
+from pymongo.pool import Pool
+
+# Upper bounds of the histogram buckets; a last bucket counts the larger values
+LATENCY_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0) # seconds
+DOCUMENTS_BUCKETS = (0, 1, 10, 100, 1000, 10000)
+
+# Metrics, None unless enabled with enable
+METRICS = None
+
+
+class Histogram(object):
+    """
+    Counts of values in buckets bounded by increasing upper bounds.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """
+        :return: the count and sum of the values, and the count of values in
+                 each bucket; the upper bound of the last bucket is None
+        :rtype:  dict
+        """
+        bounds = list(self.bounds) + [None]
+        buckets = [{'upper_bound': b, 'count': c} for b, c in zip(bounds, self.counts)]
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class OperationMetrics(object):
+    """
+    Metrics of one operation on one collection.
+    """
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.documents = Histogram(DOCUMENTS_BUCKETS)
+        self.retries = 0
+
+    def to_dict(self):
+        return {'latency': self.latency.to_dict(), 'documents': self.documents.to_dict(),
+                'retries': self.retries}
+
+
+class DatabaseMetrics(object):
+    """
+    Metrics of the database calls made by all of the threads in this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.pool_wait = Histogram(LATENCY_BUCKETS)
+
+    def _operation(self, collection_name, operation):
+        # must be called with the lock held
+        key = (collection_name, operation)
+        metrics = self.operations.get(key)
+        if metrics is None:
+            metrics = self.operations[key] = OperationMetrics()
+        return metrics
+
+    def add_call(self, collection_name, operation, elapsed, documents=None):
+        """
+        Adds a database call.
+
+        :param collection_name: name of the collection called
+        :type  collection_name: str
+        :param operation: name of the operation, usually the collection method
+        :type  operation: str
+        :param elapsed: seconds taken by the call
+        :type  elapsed: float
+        :param documents: number of documents returned, if the call returns documents
+        :type  documents: int or None
+        """
+        self.lock.acquire()
+        try:
+            metrics = self._operation(collection_name, operation)
+            metrics.latency.add(elapsed)
+            if documents is not None:
+                metrics.documents.add(documents)
+        finally:
+            self.lock.release()
+
+    def add_retry(self, collection_name, operation):
+        """
+        Adds a retry of a database call that failed with an AutoReconnect error.
+
+        :param collection_name: name of the collection called
+        :type  collection_name: str
+        :param operation: name of the collection method
+        :type  operation: str
+        """
+        self.lock.acquire()
+        try:
+            self._operation(collection_name, operation).retries += 1
+        finally:
+            self.lock.release()
+
+    def add_pool_wait(self, elapsed):
+        """
+        Adds the time spent getting a socket from the connection pool.
+
+        :param elapsed: seconds
+        :type  elapsed: float
+        """
+        self.lock.acquire()
+        try:
+            self.pool_wait.add(elapsed)
+        finally:
+            self.lock.release()
+
+    def to_dict(self):
+        """
+        :return: the metrics, with the operations keyed by collection name then
+                 operation name
+        :rtype:  dict
+        """
+        self.lock.acquire()
+        try:
+            collections = {}
+            for (collection_name, operation), metrics in self.operations.items():
+                collections.setdefault(collection_name, {})[operation] = metrics.to_dict()
+            return {'collections': collections, 'pool_wait': self.pool_wait.to_dict()}
+        finally:
+            self.lock.release()
+
+
+class MetricsPool(Pool):
+    """
+    pymongo connection pool recording the time spent getting each socket,
+    including waiting for one to be returned to the pool when all are in use.
+    """
+
+    # Pool is an old style class in some versions of pymongo, so super can't be used
+    def get_socket(self, *args, **kwargs):
+        if METRICS is None:
+            return Pool.get_socket(self, *args, **kwargs)
+        start = time.time()
+        try:
+            return Pool.get_socket(self, *args, **kwargs)
+        finally:
+            METRICS.add_pool_wait(time.time() - start)
+
+
+def enable():
+    """
+    Enables the metrics, if not already enabled.
+
+    :return: the metrics
+    :rtype:  DatabaseMetrics
+    """
+    global METRICS
+    if METRICS is None:
+        METRICS = DatabaseMetrics()
+    return METRICS
+
+
+def record_call(collection_name, operation, elapsed, documents=None):
+    """
+    Adds a database call to the metrics, if enabled.
+    """
+    if METRICS is not None:
+        METRICS.add_call(collection_name, operation, elapsed, documents)
+
+
+def record_retry(collection_name, operation):
+    """
+    Adds a retry of a database call to the metrics, if enabled.
+    """
+    if METRICS is not None:
+        METRICS.add_retry(collection_name, operation)
+
+
+def report():
+    """
+    :return: the metrics, or None if they are not enabled
+    :rtype:  dict or None
+    """
+    if METRICS is None:
+        return None
+    return METRICS.to_dict()
+
+
+def format_report(metrics_report):
+    """
+    Formats a metrics report as a table with one row per collection and
+    operation, sorted by the total time spent on them.
+
+    :param metrics_report: report returned by report
+    :type  metrics_report: dict
+    :return: lines of the table
+    :rtype:  list of str
+    """
+    rows = []
+    for collection_name, operations in metrics_report['collections'].items():
+        for operation, metrics in operations.items():
+            rows.append((metrics['latency']['sum'], collection_name, operation, metrics))
+    rows.sort(reverse=True)
+
+    row_format = '%-32s %-14s %8s %10s %10s %12s %8s'
+    lines = [row_format % ('collection', 'operation', 'calls', 'time (s)', 'avg (ms)',
+                           'documents', 'retries')]
+    for total, collection_name, operation, metrics in rows:
+        calls = metrics['latency']['count']
+        average = calls and total * 1000 / calls
+        lines.append(row_format % (collection_name, operation, calls, '%.3f' % total,
+                                   '%.2f' % average, metrics['documents']['sum'],
+                                   metrics['retries']))
+    pool_wait = metrics_report['pool_wait']
+    lines.append('pool wait: %d sockets, %.3f s' % (pool_wait['count'], pool_wait['sum']))
+    return lines
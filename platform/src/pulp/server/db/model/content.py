@@ -55,3 +55,27 @@ class ContentType(Model):
         self.search_indexes = search_indexes
 
         self.referenced_types = referenced_types
+
+
+class ContentTypesVersion(Model):
+    """
+    Version stamp of the content type definitions. The stamp is bumped each
+    time the type definitions are updated so that processes caching the
+    definitions know to reload them.
+
+    There is a single instance of this document, identified by STAMP_ID.
+
+    @ivar version: incremented on each update of the type definitions
+    @type version: int
+    """
+
+    collection_name = 'content_types_version'
+    unique_indices = ()
+
+    STAMP_ID = 'content_types'
+
+    def __init__(self, version=0):
+        super(ContentTypesVersion, self).__init__()
+
+        self._id = self.id = self.STAMP_ID
+        self.version = version
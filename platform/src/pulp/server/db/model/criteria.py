@@ -11,6 +11,7 @@
 # You should have received a copy of GPLv2 along with this software; if not,
 # see http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
 
+import base64
 import copy
 import re
 import sys
@@ -19,8 +20,12 @@ from types import NoneType
 import pymongo
 
 from pulp.server import exceptions as pulp_exceptions
+from pulp.server.compat import json, json_util
 from pulp.server.db.model.base import Model
 
+# Number of results in a page when paging without a limit
+DEFAULT_PAGE_SIZE = 1000
+
 # criteria model ---------------------------------------------------------------
 
 class Criteria(Model):
@@ -29,7 +34,8 @@ class Criteria(Model):
     # storing them in the db - jconnor (2012-07-23)
     #collection_name = 'criteria'
 
-    def __init__(self, filters=None, sort=None, limit=None, skip=None, fields=None):
+    def __init__(self, filters=None, sort=None, limit=None, skip=None, fields=None,
+                 continuation=None):
         super(Criteria, self).__init__()
 
         assert isinstance(filters, (dict, NoneType))
@@ -37,12 +43,14 @@ class Criteria(Model):
         assert isinstance(limit, (int, NoneType))
         assert isinstance(skip, (int, NoneType))
         assert isinstance(fields, (list, tuple, NoneType))
+        assert isinstance(continuation, (basestring, NoneType))
 
         self.filters = filters
         self.sort = sort
         self.limit = limit
         self.skip = skip
         self.fields = fields
+        self.continuation = continuation
 
     def as_dict(self):
         """
@@ -56,11 +64,12 @@ class Criteria(Model):
             'sort' : self.sort,
             'limit' : self.limit,
             'skip' : self.skip,
-            'fields' : self.fields
+            'fields' : self.fields,
+            'continuation' : self.continuation
         }
 
     @classmethod
-    def from_client_input(cls, doc):
+    def from_client_input(cls, doc, paginate=False):
         """
         Accept input provided by a client (such as through a GET or POST
         request), validate that the provided data is part of a Criteria
@@ -70,6 +79,12 @@ class Criteria(Model):
                     of a Criteria object
         @type  doc: dict
 
+        @param paginate:    True if the caller returns a page of the results
+                            along with the next continuation when the criteria
+                            has a continuation; otherwise a continuation is
+                            rejected
+        @type  paginate:    bool
+
         @return:    new Criteria instance based on provided data
         @rtype:     pulp.server.db.model.criteria.Criteria
         """
@@ -82,18 +97,70 @@ class Criteria(Model):
         limit = _validate_limit(doc.pop('limit', None))
         skip = _validate_skip(doc.pop('skip', None))
         fields = _validate_fields(doc.pop('fields', None))
+        continuation = _validate_continuation(doc.pop('continuation', None), skip, paginate)
         if doc:
             raise pulp_exceptions.InvalidValue(doc.keys())
-        return cls(filters, sort, limit, skip, fields)
+        return cls(filters, sort, limit, skip, fields, continuation)
 
     @property
     def spec(self):
         if self.filters is None:
-            return None
-        spec = copy.copy(self.filters)
-        _compile_regexs_for_not(spec)
+            spec = None
+        else:
+            spec = copy.copy(self.filters)
+            _compile_regexs_for_not(spec)
+        if self.paginated:
+            spec = after_continuation(spec, self.page_sort, self.continuation)
         return spec
 
+    @property
+    def paginated(self):
+        """
+        @return:    True if the results are returned a page at a time, the
+                    continuation being an empty string for the first page
+        @rtype:     bool
+        """
+        return self.continuation is not None
+
+    @property
+    def page_sort(self):
+        """
+        @return:    the sort of a paginated query, which always ends in _id so
+                    the position of every document is unique
+        @rtype:     list
+        """
+        return continuation_sort(self.sort)
+
+    @property
+    def page_fields(self):
+        """
+        @return:    fields returned by a paginated query, including the ones the
+                    continuation is built from
+        @rtype:     list or None
+        """
+        return continuation_fields(self.fields, self.page_sort)
+
+    @property
+    def page_limit(self):
+        """
+        @return:    maximum number of results in a page; the limit if specified
+        @rtype:     int
+        """
+        return self.limit or DEFAULT_PAGE_SIZE
+
+    def next_continuation(self, documents):
+        """
+        @param documents:   the documents returned for this criteria's page
+        @type  documents:   list of dict
+
+        @return:    continuation for the page following the given one, or None
+                    if it is the last page
+        @rtype:     str or None
+        """
+        if len(documents) < self.page_limit:
+            return None
+        return encode_continuation(documents[-1], self.page_sort)
+
 
 class UnitAssociationCriteria(Model):
 
@@ -103,7 +170,8 @@ class UnitAssociationCriteria(Model):
 
     def __init__(self, type_ids=None, association_filters=None, unit_filters=None,
                  association_sort=None, unit_sort=None, limit=None, skip=None,
-                 association_fields=None, unit_fields=None, remove_duplicates=False):
+                 association_fields=None, unit_fields=None, remove_duplicates=False,
+                 continuation=None):
         """
         There are a number of entry points into creating one of these instances:
         multiple REST interfaces, the plugins, etc. As such, this constructor
@@ -146,6 +214,12 @@ class UnitAssociationCriteria(Model):
         @param remove_duplicates: if True, units with multiple associations will
                only return a single association; defaults to False
         @type  remove_duplicates: bool
+
+        @param continuation: if specified, the results are returned a page of
+               at most limit results at a time; an empty string for the first
+               page, otherwise the continuation returned with the previous page;
+               may not be combined with a unit_sort
+        @type  continuation: str
         """
         super(UnitAssociationCriteria, self).__init__()
 
@@ -177,8 +251,10 @@ class UnitAssociationCriteria(Model):
 
         self.remove_duplicates = remove_duplicates
 
+        self.continuation = continuation
+
     @classmethod
-    def from_client_input(cls, query):
+    def from_client_input(cls, query, paginate=False):
         """
         Parses a unit association query document and assembles a corresponding
         internal criteria object.
@@ -200,12 +276,18 @@ class UnitAssociationCriteria(Model):
             "unit" : ["name", "version", "arch"],
             "association" : ["created"]
           },
-          "remove_duplicates" : True
+          "remove_duplicates" : True,
+          "continuation" : ""
         }
 
         @param query: user-provided query details
         @type  query: dict
 
+        @param paginate: True if the caller returns a page of the results along
+               with the next continuation when the query has a continuation;
+               otherwise a continuation is rejected
+        @type  paginate: bool
+
         @return: criteria object for the unit association query
         @rtype:  L{UnitAssociationCriteria}
 
@@ -244,6 +326,12 @@ class UnitAssociationCriteria(Model):
 
         remove_duplicates = bool(query.pop('remove_duplicates', False))
 
+        continuation = _validate_continuation(query.pop('continuation', None), skip, paginate)
+
+        # pages are read from the associations, so they can't be sorted by unit
+        if continuation is not None and unit_sort is not None:
+            raise pulp_exceptions.InvalidValue(['continuation'])
+
         # report any superfluous doc key, value pairs as errors
         for d in (query, filters, sort, fields):
             if d:
@@ -260,7 +348,15 @@ class UnitAssociationCriteria(Model):
         return cls(type_ids=type_ids, association_filters=association_filters, unit_filters=unit_filters,
                    association_sort=association_sort, unit_sort=unit_sort, limit=limit, skip=skip,
                    association_fields=association_fields, unit_fields=unit_fields,
-                   remove_duplicates=remove_duplicates)
+                   remove_duplicates=remove_duplicates, continuation=continuation)
+
+    @property
+    def paginated(self):
+        return self.continuation is not None
+
+    @property
+    def page_limit(self):
+        return self.limit or DEFAULT_PAGE_SIZE
 
     @property
     def association_spec(self):
@@ -289,9 +385,131 @@ class UnitAssociationCriteria(Model):
         if self.skip: s += 'Skip [%s] ' % self.skip
         if self.association_fields: s += 'Assoc Fields [%s] ' % self.association_fields
         if self.unit_fields: s += 'Unit Fields [%s] ' % self.unit_fields
+        if self.continuation: s += 'Continuation [%s] ' % self.continuation
         s += 'Remove Duplicates [%s]' % self.remove_duplicates
         return s
 
+# continuation functions -------------------------------------------------------
+
+# A continuation is an opaque token identifying the last document of a page by
+# its values for the fields of the sort. The next page is the documents sorted
+# after it, so the pages are read with indexed range queries instead of skips
+# that make the database walk over all of the preceding documents.
+
+def continuation_sort(sort):
+    """
+    @param sort:    sort of the query, may be None
+    @type  sort:    list of (str, int)
+
+    @return:    the sort followed by _id, if not already included, so every
+                document has a unique position
+    @rtype:     list of (str, int)
+    """
+    sort = list(sort or [])
+    if '_id' not in [field for field, direction in sort]:
+        sort.append(('_id', pymongo.ASCENDING))
+    return sort
+
+
+def continuation_fields(fields, sort):
+    """
+    @param fields:  fields returned by the query, None for all fields
+    @type  fields:  list of str
+
+    @param sort:    sort of the paginated query
+    @type  sort:    list of (str, int)
+
+    @return:    the fields with the sort fields added, which are needed to
+                build the continuation
+    @rtype:     list of str
+    """
+    if fields is None:
+        return None
+    fields = list(fields)
+    for field, direction in sort:
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def encode_continuation(document, sort):
+    """
+    @param document:    last document of a page
+    @type  document:    dict
+
+    @param sort:        sort of the paginated query
+    @type  sort:        list of (str, int)
+
+    @return:    continuation for the page following the document
+    @rtype:     str
+    """
+    values = [_field_value(document, field) for field, direction in sort]
+    return base64.urlsafe_b64encode(json.dumps(values, default=json_util.default))
+
+
+def after_continuation(spec, sort, continuation):
+    """
+    @param spec:            spec of the query, may be None
+    @type  spec:            dict
+
+    @param sort:            sort of the paginated query
+    @type  sort:            list of (str, int)
+
+    @param continuation:    continuation returned with the previous page; the
+                            spec is returned as is when empty
+    @type  continuation:    str
+
+    @return:    the spec restricted to the documents sorted after the
+                continuation
+    @rtype:     dict
+
+    @raise pulp.server.exceptions.InvalidValue: if the continuation was not
+           returned by a query with the same sort
+    """
+    if not continuation:
+        return spec
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(continuation)),
+                            object_hook=json_util.object_hook)
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise ValueError()
+    except (TypeError, ValueError):
+        raise pulp_exceptions.InvalidValue(['continuation']), None, sys.exc_info()[2]
+
+    # A document is after the continuation if its values are the same for the
+    # first n fields of the sort and after the continuation's for the next one.
+    # Mongo sorts null before any other value.
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        value = values[i]
+        if direction == pymongo.ASCENDING:
+            if value is None:
+                conditions = [{'$ne' : None}]
+            else:
+                conditions = [{'$gt' : value}]
+        else:
+            if value is None:
+                conditions = []
+            else:
+                conditions = [{'$lt' : value}, None]
+        for condition in conditions:
+            clause = dict((f, v) for (f, d), v in zip(sort[:i], values[:i]))
+            clause[field] = condition
+            clauses.append(clause)
+
+    if not spec:
+        return {'$or' : clauses}
+    return {'$and' : [spec, {'$or' : clauses}]}
+
+
+def _field_value(document, field):
+    for name in field.split('.'):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(name)
+    return document
+
 # validation helper functions --------------------------------------------------
 
 def _validate_filters(filters):
@@ -362,6 +580,18 @@ def _validate_skip(skip):
         return skip
 
 
+def _validate_continuation(continuation, skip, paginate):
+    if continuation is None:
+        return None
+    # a page would otherwise be returned without the continuation of the next
+    if not paginate or not isinstance(continuation, basestring):
+        raise pulp_exceptions.InvalidValue(['continuation'])
+    # a page is found from the continuation, skipping makes no sense
+    if skip:
+        raise pulp_exceptions.InvalidValue(['skip'])
+    return continuation
+
+
 def _validate_fields(fields):
     if fields is None:
         return None
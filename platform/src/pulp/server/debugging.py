@@ -12,15 +12,22 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import atexit
+import logging
 import os
 import Queue
 import sys
 import threading
+import time
 import traceback
 
 
 FLAGFILE = '/var/log/pulp/stacktrace-dump'
 
+_LOG = logging.getLogger(__name__)
+
+# Request profiler, None unless enabled with enable_profiling
+PROFILER = None
+
 
 class StacktraceDumper(object):
 
@@ -78,3 +85,170 @@ class StacktraceDumper(object):
         except:
             pass
         self.thread.join()
+
+
+# -- request profiling ---------------------------------------------------------
+
+# Categories of the time spent handling a request, besides the wall time
+AUTH_TIME = 'auth_time'
+DB_TIME = 'db_time'
+SERIALIZATION_TIME = 'serialization_time'
+
+_TIMES = (AUTH_TIME, DB_TIME, SERIALIZATION_TIME)
+
+# Longest query spec, as a string, that is included in the slow query log
+_MAX_SPEC_LENGTH = 1024
+
+
+class RequestProfile(object):
+    """
+    Times spent handling a single request.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.start = time.time()
+        self.wall_time = 0.0
+        self.db_calls = 0
+        self.times = dict.fromkeys(_TIMES, 0.0)
+
+    def __str__(self):
+        times = ', '.join('%s: %.3fs' % (t, self.times[t]) for t in _TIMES)
+        return '%s %s: wall_time: %.3fs, %s, db_calls: %d' % (
+            self.method, self.path, self.wall_time, times, self.db_calls)
+
+
+class RequestProfiler(object):
+    """
+    Records a profile of each request, handled by one thread at a time, and
+    aggregates them into counters. The requests and database queries taking
+    longer than their threshold are logged.
+    """
+
+    def __init__(self, slow_request_threshold, slow_query_threshold):
+        self.slow_request_threshold = slow_request_threshold
+        self.slow_query_threshold = slow_query_threshold
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counters = {'requests': 0, 'slow_requests': 0, 'db_calls': 0, 'slow_queries': 0,
+                         'wall_time': 0.0}
+        self.counters.update(dict.fromkeys(_TIMES, 0.0))
+
+    def start(self, method, path):
+        """
+        Starts the profile of a request handled by the current thread.
+        @return: the profile
+        @rtype: RequestProfile
+        """
+        profile = RequestProfile(method, path)
+        self.local.profile = profile
+        return profile
+
+    def finish(self):
+        """
+        Finishes the profile of the request handled by the current thread and
+        adds it to the counters.
+        """
+        profile = getattr(self.local, 'profile', None)
+        if profile is None:
+            return
+        self.local.profile = None
+        profile.wall_time = time.time() - profile.start
+        slow = profile.wall_time > self.slow_request_threshold
+        self.lock.acquire()
+        try:
+            self.counters['requests'] += 1
+            self.counters['wall_time'] += profile.wall_time
+            self.counters['db_calls'] += profile.db_calls
+            for t in _TIMES:
+                self.counters[t] += profile.times[t]
+            if slow:
+                self.counters['slow_requests'] += 1
+        finally:
+            self.lock.release()
+        if slow:
+            _LOG.warn('Slow request: %s' % profile)
+
+    def add_time(self, category, elapsed):
+        """
+        Adds time spent on the request handled by the current thread.
+        @param category: one of the *_TIME categories
+        @type category: str
+        @param elapsed: seconds
+        @type elapsed: float
+        """
+        profile = getattr(self.local, 'profile', None)
+        if profile is not None:
+            profile.times[category] += elapsed
+
+    def add_query(self, collection_name, operation, elapsed, spec=None):
+        """
+        Adds a database call made for the request handled by the current
+        thread, logging it if it is slow.
+        @param collection_name: name of the collection queried
+        @type collection_name: str
+        @param operation: name of the collection method
+        @type operation: str
+        @param elapsed: seconds
+        @type elapsed: float
+        @param spec: query selector, included in the slow query log; never a
+                     document, which may hold sensitive values
+        """
+        profile = getattr(self.local, 'profile', None)
+        if profile is not None:
+            profile.db_calls += 1
+            profile.times[DB_TIME] += elapsed
+        if elapsed <= self.slow_query_threshold:
+            return
+        self.lock.acquire()
+        try:
+            self.counters['slow_queries'] += 1
+        finally:
+            self.lock.release()
+        message = 'Slow query: %s on %s took %.3fs' % (operation, collection_name, elapsed)
+        if spec is not None:
+            message += ': %s' % str(spec)[:_MAX_SPEC_LENGTH]
+        _LOG.warn(message)
+
+    def statistics(self):
+        """
+        @return: copy of the counters aggregated over all of the requests
+        @rtype: dict
+        """
+        self.lock.acquire()
+        try:
+            return dict(self.counters)
+        finally:
+            self.lock.release()
+
+
+def enable_profiling(slow_request_threshold, slow_query_threshold):
+    """
+    Enables the request profiler.
+    @param slow_request_threshold: seconds above which requests are logged
+    @type slow_request_threshold: float
+    @param slow_query_threshold: seconds above which database calls are logged
+    @type slow_query_threshold: float
+    @return: the profiler
+    @rtype: RequestProfiler
+    """
+    global PROFILER
+    PROFILER = RequestProfiler(slow_request_threshold, slow_query_threshold)
+    return PROFILER
+
+
+def record_time(category, elapsed):
+    """
+    Adds time spent on the current request to its profile, if profiling.
+    """
+    if PROFILER is not None:
+        PROFILER.add_time(category, elapsed)
+
+
+def record_query(collection_name, operation, elapsed, spec=None):
+    """
+    Adds a database call to the profile of the current request, if profiling.
+    """
+    if PROFILER is not None:
+        PROFILER.add_query(collection_name, operation, elapsed, spec)
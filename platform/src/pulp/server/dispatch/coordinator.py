@@ -14,7 +14,6 @@
 import copy
 import datetime
 import logging
-import time
 import types
 import uuid
 from gettext import gettext as _
@@ -26,6 +25,7 @@ from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import exceptions as dispatch_exceptions
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch.call import CallRequest
+from pulp.server.dispatch.locktable import ResourceLockTable
 from pulp.server.dispatch.task import AsyncTask, Task
 from pulp.server.exceptions import OperationTimedOut
 from pulp.server.util import subdict, TopologicalSortError, topological_sort
@@ -45,14 +45,14 @@ class Coordinator(object):
     """
     Coordinator class that runs call requests in the task queue and detects and
     resolves conflicting operations on resources.
-    @ivar task_state_poll_interval: sleep interval to use while polling a "synchronous" task
-    @type task_state_poll_interval: float
+    @ivar resource_lock_table: table of the resources used by queued call requests
+    @type resource_lock_table: L{locktable.ResourceLockTable} or L{locktable.DatabaseResourceLockTable}
     """
 
-    def __init__(self, task_state_poll_interval=0.5):
+    def __init__(self, resource_lock_table=None):
 
-        self.task_state_poll_interval = task_state_poll_interval
-        self.call_resource_collection = CallResource.get_collection()
+        # same default as the [coordinator] resource_lock_table setting
+        self.resource_lock_table = resource_lock_table or ResourceLockTable()
 
     # explicit initialization --------------------------------------------------
 
@@ -62,7 +62,7 @@ class Coordinator(object):
         interrupted tasks.
         """
         # drop all previous knowledge of previous calls
-        self.call_resource_collection.remove(safe=True)
+        self.resource_lock_table.clear()
 
         # re-start interrupted tasks
         queued_call_collection = QueuedCall.get_collection()
@@ -247,7 +247,7 @@ class Coordinator(object):
                 return
 
             if call_resource_list:
-                self.call_resource_collection.insert(call_resource_list, safe=True)
+                self.resource_lock_table.add(call_resource_list)
 
             for task in task_list:
                 task_queue.enqueue(task)
@@ -266,19 +266,18 @@ class Coordinator(object):
         """
         task_queue = dispatch_factory._task_queue()
         valid_states = [dispatch_constants.CALL_RUNNING_STATE]
-        # it's perfectly legitimate for the call to complete before the first poll
+        # it's perfectly legitimate for the call to complete before we start waiting
         valid_states.extend(dispatch_constants.CALL_COMPLETE_STATES)
 
         try:
-            wait_for_task(task, valid_states, poll_interval=self.task_state_poll_interval, timeout=timeout)
+            wait_for_task(task, valid_states, timeout=timeout)
 
         except OperationTimedOut:
             task_queue.dequeue(task) # dequeue or cancel? really need timed out support
             raise
 
         else:
-            wait_for_task(task, dispatch_constants.CALL_COMPLETE_STATES,
-                          poll_interval=self.task_state_poll_interval)
+            wait_for_task(task, dispatch_constants.CALL_COMPLETE_STATES)
 
     def _generate_call_request_group_id(self):
         """
@@ -348,12 +347,9 @@ class Coordinator(object):
         rejecting_call_requests = set()
         rejecting_reasons = []
 
-        call_resource_collection = CallResource.get_collection()
         call_resources = resource_dict_to_call_resources(resources)
-        or_query = filter_dicts(call_resources, ('resource_type', 'resource_id'))
-        cursor = call_resource_collection.find({'$or': or_query})
 
-        for call_resource in cursor:
+        for call_resource in self.resource_lock_table.find(call_resources):
             proposed_operation = resources[call_resource['resource_type']][call_resource['resource_id']]
             queued_operation = call_resource['operation']
 
@@ -464,6 +460,27 @@ class Coordinator(object):
         tasks = self._find_tasks(**criteria)
         return [t.call_report for t in tasks]
 
+    def wait_for_call_state_change(self, call_request_id, state, timeout):
+        """
+        Block until the state of a queued call request is no longer the given
+        state, or the timeout expires. Used to long-poll a call's progress.
+        @param call_request_id: id of the call request to wait on
+        @type  call_request_id: str
+        @param state: state the caller last saw the call request in
+        @type  state: str
+        @param timeout: maximum amount of time, in seconds, to wait
+        @type  timeout: float
+        @return: the call report, or None if the call request is not queued
+        @rtype:  L{call.CallReport} or None
+        """
+        task_list = self._find_tasks(call_request_id=call_request_id)
+        if not task_list:
+            return None
+        task = task_list[0]
+        states = [s for s in dispatch_constants.CALL_STATES if s != state]
+        task.wait_for_state(states, timeout)
+        return task.call_report
+
     # control methods ----------------------------------------------------------
 
     def complete_call_success(self, call_request_id, result=None):
@@ -620,31 +637,26 @@ def set_call_request_id_on_call_resources(call_request_id, call_resources):
         call_resource['call_request_id'] = call_request_id
 
 
-def wait_for_task(task, states, poll_interval=0.5, timeout=None):
+def wait_for_task(task, states, timeout=None):
     """
-    Wait for a task to be in a certain set of states
+    Wait for a task to be in a certain set of states.
+    The task wakes up the waiting thread as soon as its state changes.
     @param task: task to wait for
     @type  task: L{Task}
     @param states: set of valid states
     @type  states: list or tuple
-    @param poll_interval: time, in seconds, to wait in between polling the task
-    @type  poll_interval: float or int
-    @param timeout: maximum amount of time to poll task, None means indefinitely
+    @param timeout: maximum amount of time to wait for the task, None means indefinitely
     @type  timeout: None or datetime.timedelta
     """
     assert isinstance(task, Task)
     assert isinstance(states, (list, set, tuple))
-    assert isinstance(poll_interval, (float, int))
     assert isinstance(timeout, (datetime.timedelta, types.NoneType))
 
-    start = datetime.datetime.now()
-    while task.call_report.state not in states:
-        time.sleep(poll_interval)
-        if timeout is None:
-            continue
-        now = datetime.datetime.now()
-        if now - start < timeout:
-            continue
+    seconds = None
+    if timeout is not None:
+        seconds = timeout.days * 86400 + timeout.seconds + timeout.microseconds / 1000000.0
+
+    if not task.wait_for_state(states, seconds):
         raise OperationTimedOut(timeout)
 
 # query utility functions ------------------------------------------------------
@@ -693,6 +705,6 @@ def coordinator_dequeue_callback(call_request, call_report):
     @param call_report: call report for the call
     @type  call_report: L{call.CallReport} instance
     """
-    collection = CallResource.get_collection()
-    collection.remove({'call_request_id': call_request.id}, safe=True)
+    coordinator = dispatch_factory.coordinator()
+    coordinator.resource_lock_table.remove(call_request.id)
 
@@ -26,8 +26,12 @@ def _initialize_coordinator():
     global _COORDINATOR
     assert _COORDINATOR is None
     from pulp.server.dispatch.coordinator import Coordinator
-    task_state_poll_interval = pulp_config.config.getfloat('coordinator', 'task_state_poll_interval')
-    _COORDINATOR = Coordinator(task_state_poll_interval)
+    from pulp.server.dispatch.locktable import RESOURCE_LOCK_TABLES
+    resource_lock_table_name = pulp_config.config.get('coordinator', 'resource_lock_table')
+    if resource_lock_table_name not in RESOURCE_LOCK_TABLES:
+        raise ValueError('Unknown resource lock table: %s' % resource_lock_table_name)
+    resource_lock_table = RESOURCE_LOCK_TABLES[resource_lock_table_name]()
+    _COORDINATOR = Coordinator(resource_lock_table)
     _COORDINATOR.start()
 
 
@@ -84,9 +88,11 @@ def finalize(clear_queued_calls=False):
     # NOTE this is not required for the pulp server, but is for unit testing
     # order sensitive
     # XXX implement pickling.finalize() ?
+    # the task queue is stopped before the coordinator goes away, as the
+    # coordinator's dequeue callback is run when each task completes
     _finalize_scheduler()
-    _finalize_coordinator()
     _finalize_task_queue(clear_queued_calls)
+    _finalize_coordinator()
 
 # factory functions ------------------------------------------------------------
 
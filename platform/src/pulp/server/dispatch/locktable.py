@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Resource lock tables used by the coordinator to detect conflicting operations.
+
+A resource lock table keeps track of the call resources (i.e. the resource
+type, resource id and operation) of every queued call request. Two interchangeable
+implementations are provided:
+ * ResourceLockTable keeps the table in memory only
+ * DatabaseResourceLockTable keeps the table in the database only
+
+Neither table needs to survive a restart: the coordinator clears the table when
+it starts and re-queues the interrupted call requests, which locks their
+resources again.
+"""
+
+import threading
+
+from pulp.server.db.model.dispatch import CallResource
+
+# in-memory resource lock table ------------------------------------------------
+
+class ResourceLockTable(object):
+    """
+    In-process resource lock table.
+    Call resources are indexed by (resource_type, resource_id), so finding the
+    locks held on a set of resources never leaves the process.
+    """
+
+    def __init__(self):
+        # (resource_type, resource_id) -> {call_request_id: call resource}
+        self.__locks = {}
+        # call_request_id -> list of (resource_type, resource_id)
+        self.__locked_resources = {}
+        self.__lock = threading.RLock()
+
+    def find(self, call_resources):
+        """
+        Find the call resources of queued call requests that are locking any of
+        the resources in the given call resources.
+        @param call_resources: call resources to find locks for
+        @type  call_resources: list of L{CallResource} instances
+        @return: list of locking call resources
+        @rtype:  list of dict
+        """
+        self.__lock.acquire()
+        try:
+            locking_call_resources = []
+            for call_resource in call_resources:
+                key = (call_resource['resource_type'], call_resource['resource_id'])
+                locks = self.__locks.get(key)
+                if locks:
+                    locking_call_resources.extend(locks.values())
+            return locking_call_resources
+        finally:
+            self.__lock.release()
+
+    def add(self, call_resources):
+        """
+        Lock the resources in the given call resources on behalf of their call
+        requests.
+        @param call_resources: call resources with their call_request_id set
+        @type  call_resources: list of L{CallResource} instances
+        """
+        self.__lock.acquire()
+        try:
+            for call_resource in call_resources:
+                key = (call_resource['resource_type'], call_resource['resource_id'])
+                call_request_id = call_resource['call_request_id']
+                self.__locks.setdefault(key, {})[call_request_id] = call_resource
+                self.__locked_resources.setdefault(call_request_id, []).append(key)
+        finally:
+            self.__lock.release()
+
+    def remove(self, call_request_id):
+        """
+        Release all the resources locked by the given call request.
+        @param call_request_id: id of the call request holding the locks
+        @type  call_request_id: str
+        """
+        self.__lock.acquire()
+        try:
+            for key in self.__locked_resources.pop(call_request_id, []):
+                locks = self.__locks.get(key)
+                if locks is None:
+                    continue
+                locks.pop(call_request_id, None)
+                if not locks:
+                    self.__locks.pop(key)
+        finally:
+            self.__lock.release()
+
+    def clear(self):
+        """
+        Release all the locks held by all call requests.
+        """
+        self.__lock.acquire()
+        try:
+            self.__locks.clear()
+            self.__locked_resources.clear()
+        finally:
+            self.__lock.release()
+
+# database resource lock table -------------------------------------------------
+
+class DatabaseResourceLockTable(object):
+    """
+    Resource lock table that is kept entirely in the call resources collection.
+
+    @ivar collection: call resources collection
+    @type collection: L{pulp.server.db.connection.PulpCollection}
+    """
+
+    def __init__(self):
+        self.collection = CallResource.get_collection()
+
+    def find(self, call_resources):
+        """
+        Find the call resources of queued call requests that are locking any of
+        the resources in the given call resources.
+        @param call_resources: call resources to find locks for
+        @type  call_resources: list of L{CallResource} instances
+        @return: list of locking call resources
+        @rtype:  list of dict
+        """
+        or_query = [{'resource_type': c['resource_type'], 'resource_id': c['resource_id']}
+                    for c in call_resources]
+        return list(self.collection.find({'$or': or_query}))
+
+    def add(self, call_resources):
+        """
+        Lock the resources in the given call resources on behalf of their call
+        requests.
+        @param call_resources: call resources with their call_request_id set
+        @type  call_resources: list of L{CallResource} instances
+        """
+        self.collection.insert(call_resources, safe=True)
+
+    def remove(self, call_request_id):
+        """
+        Release all the resources locked by the given call request.
+        @param call_request_id: id of the call request holding the locks
+        @type  call_request_id: str
+        """
+        self.collection.remove({'call_request_id': call_request_id}, safe=True)
+
+    def clear(self):
+        """
+        Release all the locks held by all call requests.
+        """
+        self.collection.remove(safe=True)
+
+# resource lock table selection ------------------------------------------------
+
+RESOURCE_LOCK_TABLES = {
+    'memory': ResourceLockTable,
+    'database': DatabaseResourceLockTable,
+}
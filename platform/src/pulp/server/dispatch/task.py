@@ -16,6 +16,7 @@ import datetime
 import logging
 import sys
 import threading
+import time
 import types
 from gettext import gettext as _
 
@@ -49,6 +50,8 @@ class Task(object):
     @type complete_callback: callable or None
     @ivar progress_callback: call request progress callback called to report execution progress
     @type progress_callback: callable or None
+
+    Threads may block on changes to the task's state using wait_for_state.
     """
 
     def __init__(self, call_request, call_report=None):
@@ -64,6 +67,8 @@ class Task(object):
         self.queued_call_id = None
         self.complete_callback = None
 
+        self.__state_condition = threading.Condition()
+
     def __str__(self):
         return 'Task %s: %s' % (self.call_request.id, str(self.call_request))
 
@@ -86,6 +91,45 @@ class Task(object):
     def _clear_cancel_control_hook(self):
         self.call_request.remove_control_hook(dispatch_constants.CALL_CANCEL_CONTROL_HOOK)
 
+    # task state change notification -------------------------------------------
+
+    def _notify_state_change(self):
+        """
+        Wake up all the threads waiting on a change to the task's state.
+        """
+        self.__state_condition.acquire()
+        try:
+            self.__state_condition.notifyAll()
+        finally:
+            self.__state_condition.release()
+
+    def wait_for_state(self, states, timeout=None):
+        """
+        Block until the task is in one of the given states.
+        @param states: set of valid states
+        @type  states: list or tuple
+        @param timeout: maximum amount of time, in seconds, to wait; None means indefinitely
+        @type  timeout: None or float
+        @return: True if the task is in one of the states, False if the wait timed out
+        @rtype:  bool
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+        self.__state_condition.acquire()
+        try:
+            while self.call_report.state not in states:
+                if deadline is None:
+                    self.__state_condition.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.__state_condition.wait(remaining)
+            return True
+        finally:
+            self.__state_condition.release()
+
     # task lifecycle -----------------------------------------------------------
 
     def skip(self):
@@ -105,6 +149,7 @@ class Task(object):
         # NOTE using run wrapper so that state transition is protected by the
         # task queue lock and doesn't occur in another thread
         self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+        self._notify_state_change()
 
         task_thread = threading.Thread(target=self._run)
         task_thread.start()
@@ -125,6 +170,7 @@ class Task(object):
         # generally set in the wrapper, but not when called directly
         if self.call_report.state in dispatch_constants.CALL_READY_STATES:
             self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+            self._notify_state_change()
 
         self.call_report.start_time = datetime.datetime.now(dateutils.utc_tz())
 
@@ -195,6 +241,7 @@ class Task(object):
 
         # don't set the state to complete in the report until the task is actually complete
         self.call_report.state = state
+        self._notify_state_change()
 
         self.call_life_cycle_callbacks(dispatch_constants.CALL_COMPLETE_LIFE_CYCLE_CALLBACK)
         if not self.call_request.archive:
@@ -305,6 +352,7 @@ class AsyncTask(Task):
         # usually set in the wrapper, unless called directly
         if self.call_report.state in dispatch_constants.CALL_READY_STATES:
             self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+            self._notify_state_change()
 
         self.call_report.start_time = datetime.datetime.now(dateutils.utc_tz())
 
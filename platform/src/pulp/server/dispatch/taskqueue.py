@@ -11,6 +11,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import heapq
 import itertools
 import logging
 import sys
@@ -34,9 +35,20 @@ class TaskQueue(object):
     TaskQueue class
     Manager and dispatcher of concurrent, asynchronous task execution
 
+    Tasks are tracked in indexes keyed by call request id: a reverse dependency
+    index maps each task to the tasks it is blocking, and unblocked tasks are
+    kept in per-weight ready buckets ordered by enqueue sequence. Enqueueing,
+    completing and dispatching a task are therefore proportional to the number
+    of its dependencies and dependents, not to the length of the queue.
+
+    The dispatcher thread is woken up whenever a task is enqueued, becomes
+    unblocked or completes. It only wakes up on its own, every
+    dispatch_interval, while there are completed tasks left to purge from the
+    cache.
+
     @ivar concurrency_threshold: measurement of total allowed concurrency
     @type concurrency_threshold: int
-    @ivar dispatch_interval: time, in seconds, between checks for ready tasks
+    @ivar dispatch_interval: time, in seconds, between purges of the completed task cache
     @type dispatch_interval: float
     @ivar completed_task_cache_life: time, in seconds, to cache completed tasks
     @type completed_task_cache_life: float
@@ -53,10 +65,21 @@ class TaskQueue(object):
 
         self.queued_call_collection = QueuedCall.get_collection()
 
-        self.__waiting_tasks = []
-        self.__running_tasks = []
+        # call request id -> task
+        self.__waiting_tasks = {}
+        self.__running_tasks = {}
+        # in ascending order of finish time
         self.__completed_tasks = []
 
+        # call request id -> enqueue sequence number
+        self.__sequence = itertools.count()
+        self.__sequence_numbers = {}
+        # blocking call request id -> set of blocked call request ids
+        self.__dependent_tasks = {}
+        # weight -> heap of (sequence number, call request id) of unblocked tasks
+        self.__ready_buckets = {}
+        self.__ready_task_ids = set()
+
         self.__running_weight = 0
         self.__exit = False
 
@@ -72,8 +95,10 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         while True:
+            # after an exception, retry once the dispatch interval has passed
+            # rather than waiting for the next event, or spinning
+            timeout = self.dispatch_interval
             try:
-                self.__condition.wait(timeout=self.dispatch_interval)
                 if self.__exit:
                     if self.__lock is not None:
                         self.__lock.release()
@@ -82,40 +107,100 @@ class TaskQueue(object):
                 for task in ready_tasks:
                     self._run_ready_task(task)
                 self._purge_completed_task_cache()
+                timeout = self._dispatch_timeout()
             except:
                 msg = _('Exception in task queue dispatcher thread:\n%(e)s')
                 _LOG.critical(msg % {'e': traceback.format_exception(*sys.exc_info())})
+            self.__condition.wait(timeout=timeout)
+
+    def _dispatch_timeout(self):
+        """
+        Time the dispatcher thread should wait for an event before waking up on
+        its own. This is None, i.e. indefinitely, unless there are completed
+        tasks that will need to be purged from the cache.
+        @return: timeout in seconds or None
+        @rtype:  float or None
+        """
+        if self.__completed_tasks:
+            return self.dispatch_interval
+        return None
 
     def _get_ready_tasks(self):
         """
         Algorithm at the heart of the task dispatcher. Gets the tasks that are
         ready to run (i.e. not blocked) within the limits of the available
-        concurrency threshold and returns them. Note that this algorithm checks
-        all the tasks as some may have a weight of 0.
+        concurrency threshold and returns them in the order they were enqueued.
+        Note that, as the available weight only decreases, repeatedly taking
+        the oldest ready task that still fits is the same as checking all the
+        tasks in order, as some may have a weight of 0.
         """
         self.__lock.acquire()
         try:
             tasks = []
+            popped = []
             available_weight = self.concurrency_threshold - self.__running_weight
-            for task in self.__waiting_tasks:
-                if task.call_request.dependencies:
-                    continue
-                if task.call_request.weight > available_weight:
-                    continue
-                available_weight -= task.call_request.weight
-                tasks.append(task)
+            while True:
+                weight = self._oldest_ready_bucket(available_weight)
+                if weight is None:
+                    break
+                entry = heapq.heappop(self.__ready_buckets[weight])
+                popped.append((weight, entry))
+                available_weight -= weight
+                tasks.append(self.__waiting_tasks[entry[1]])
+            # this method only reports the ready tasks, they are removed from
+            # the ready buckets when actually run
+            for weight, entry in popped:
+                heapq.heappush(self.__ready_buckets[weight], entry)
             return tasks
         finally:
             self.__lock.release()
 
+    def _oldest_ready_bucket(self, available_weight):
+        """
+        Find the ready bucket, within the available weight, whose first task
+        was enqueued the earliest. Stale entries for tasks that are no longer
+        ready are discarded along the way.
+        @param available_weight: maximum weight of the task to find
+        @type  available_weight: int
+        @return: weight of the bucket or None if no ready task fits
+        @rtype:  int or None
+        """
+        oldest_weight = None
+        oldest_sequence = None
+        for weight, bucket in self.__ready_buckets.items():
+            if weight > available_weight:
+                continue
+            while bucket and bucket[0][1] not in self.__ready_task_ids:
+                heapq.heappop(bucket)
+            if not bucket:
+                continue
+            if oldest_sequence is None or bucket[0][0] < oldest_sequence:
+                oldest_weight = weight
+                oldest_sequence = bucket[0][0]
+        return oldest_weight
+
+    def _mark_ready(self, task):
+        """
+        Place an unblocked task into its ready bucket.
+        @param task: task that no longer has any dependencies
+        @type  task: pulp.server.dispatch.task.Task
+        """
+        call_request_id = task.call_request.id
+        entry = (self.__sequence_numbers[call_request_id], call_request_id)
+        bucket = self.__ready_buckets.setdefault(task.call_request.weight, [])
+        heapq.heappush(bucket, entry)
+        self.__ready_task_ids.add(call_request_id)
+
     def _run_ready_task(self, task):
         """
         Run a ready task in a new thread
         """
         self.__lock.acquire()
         try:
-            self.__waiting_tasks.remove(task)
-            self.__running_tasks.append(task)
+            call_request_id = task.call_request.id
+            self.__waiting_tasks.pop(call_request_id)
+            self.__ready_task_ids.discard(call_request_id)
+            self.__running_tasks[call_request_id] = task
             self.__running_weight += task.call_request.weight
             task.run()
         finally:
@@ -126,7 +211,7 @@ class TaskQueue(object):
         Purge expired tasks from the completed tasks cache.
         """
         expired_cutoff = datetime.now(dateutils.utc_tz()) - self.completed_task_cache_life
-        index = 0 # index of the first non-expired cached task
+        index = len(self.__completed_tasks) # index of the first non-expired cached task
         # the tasks stored in the cache are in ascending order of finish time
         for i, task in enumerate(self.__completed_tasks):
             if task.call_report.finish_time > expired_cutoff:
@@ -205,7 +290,13 @@ class TaskQueue(object):
             self.queued_call_collection.save(queued_call, safe=True)
             task.complete_callback = self._complete
             self._validate_call_request_dependencies(task)
-            self.__waiting_tasks.append(task)
+            call_request_id = task.call_request.id
+            self.__sequence_numbers[call_request_id] = self.__sequence.next()
+            self.__waiting_tasks[call_request_id] = task
+            for blocking_call_request_id in task.call_request.dependencies:
+                self.__dependent_tasks.setdefault(blocking_call_request_id, set()).add(call_request_id)
+            if not task.call_request.dependencies:
+                self._mark_ready(task)
             task.call_life_cycle_callbacks(dispatch_constants.CALL_ENQUEUE_LIFE_CYCLE_CALLBACK)
             self.__condition.notify()
         finally:
@@ -222,10 +313,11 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             valid_call_request_dependency_ids = []
-            for potential_blocking_task in itertools.chain(self.__running_tasks, self.__waiting_tasks):
-                if potential_blocking_task.call_request.id not in task.call_request.dependencies:
+            for call_request_id in task.call_request.dependencies:
+                if call_request_id not in self.__running_tasks and \
+                        call_request_id not in self.__waiting_tasks:
                     continue
-                valid_call_request_dependency_ids.append(potential_blocking_task.call_request.id)
+                valid_call_request_dependency_ids.append(call_request_id)
             # DANGER this ignores valid call complete states of dependencies!!
             task.call_request.dependencies = subdict(task.call_request.dependencies, valid_call_request_dependency_ids)
         finally:
@@ -243,11 +335,16 @@ class TaskQueue(object):
             task.complete_callback = None
             self.queued_call_collection.remove({'_id': task.queued_call_id}, safe=True)
             task.queued_call_id = None
-            if task in self.__waiting_tasks:
-                self.__waiting_tasks.remove(task)
-            if task in self.__running_tasks:
-                self.__running_tasks.remove(task)
+            call_request_id = task.call_request.id
+            self.__waiting_tasks.pop(call_request_id, None)
+            self.__running_tasks.pop(call_request_id, None)
+            self.__ready_task_ids.discard(call_request_id)
+            for blocking_call_request_id in task.call_request.dependencies:
+                dependent_ids = self.__dependent_tasks.get(blocking_call_request_id)
+                if dependent_ids is not None:
+                    dependent_ids.discard(call_request_id)
             self._unblock_tasks(task)
+            self.__sequence_numbers.pop(call_request_id, None)
             task.call_life_cycle_callbacks(dispatch_constants.CALL_DEQUEUE_LIFE_CYCLE_CALLBACK)
         finally:
             self.__lock.release()
@@ -260,7 +357,15 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            for potentially_blocked_task in self.__waiting_tasks[:]:
+            dependent_ids = self.__dependent_tasks.pop(task.call_request.id, set())
+            blocked_tasks = [self.__waiting_tasks[i] for i in dependent_ids if i in self.__waiting_tasks]
+            blocked_tasks.sort(key=lambda t: self.__sequence_numbers[t.call_request.id])
+
+            for potentially_blocked_task in blocked_tasks:
+
+                # may have been skipped while unblocking a previous task
+                if potentially_blocked_task.call_request.id not in self.__waiting_tasks:
+                    continue
 
                 if task.call_request.id not in potentially_blocked_task.call_request.dependencies:
                     continue
@@ -274,6 +379,9 @@ class TaskQueue(object):
                 else:
                     # remove the task from the blocking_tasks dict
                     potentially_blocked_task.call_request.dependencies.pop(task.call_request.id)
+                    if not potentially_blocked_task.call_request.dependencies:
+                        self._mark_ready(potentially_blocked_task)
+                        self.__condition.notify()
 
         finally:
             self.__lock.release()
@@ -288,16 +396,19 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            self.__running_weight -= task.call_request.weight
+            # skipped and canceled tasks may complete without ever running
+            if task.call_request.id in self.__running_tasks:
+                self.__running_weight -= task.call_request.weight
             self.dequeue(task)
             self.__completed_tasks.append(task)
+            self.__condition.notify()
         finally:
             self.__lock.release()
 
     def skip(self, task):
         self.__lock.acquire()
         try:
-            if task not in self.__waiting_tasks:
+            if task.call_request.id not in self.__waiting_tasks:
                 return
             return task.skip()
         finally:
@@ -317,6 +428,18 @@ class TaskQueue(object):
 
     # task query methods -------------------------------------------------------
 
+    def _in_enqueue_order(self, task_index):
+        """
+        List the tasks in one of the task indexes in the order they were enqueued
+        @param task_index: call request id to task mapping
+        @type  task_index: dict
+        @return: (potentially empty) list of tasks
+        @rtype:  list of pulp.server.dispatch.task.Task
+        """
+        tasks = task_index.values()
+        tasks.sort(key=lambda t: self.__sequence_numbers[t.call_request.id])
+        return tasks
+
     def get(self, call_request_id):
         """
         Get a single task by its id
@@ -327,9 +450,11 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            for task in itertools.chain(self.__completed_tasks,
-                                        self.__running_tasks,
-                                        self.__waiting_tasks):
+            task = self.__running_tasks.get(call_request_id) or \
+                   self.__waiting_tasks.get(call_request_id)
+            if task is not None:
+                return task
+            for task in self.__completed_tasks:
                 if task.call_request.id != call_request_id:
                     continue
                 return task
@@ -349,8 +474,8 @@ class TaskQueue(object):
         try:
             tasks = []
             for task in itertools.chain(self.__completed_tasks,
-                                        self.__running_tasks,
-                                        self.__waiting_tasks):
+                                        self._in_enqueue_order(self.__running_tasks),
+                                        self._in_enqueue_order(self.__waiting_tasks)):
                 for tag in tags:
                     if tag not in task.call_request.tags:
                         break
@@ -368,7 +493,7 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return self.__waiting_tasks[:]
+            return self._in_enqueue_order(self.__waiting_tasks)
         finally:
             self.__lock.release()
 
@@ -380,7 +505,7 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return self.__running_tasks[:]
+            return self._in_enqueue_order(self.__running_tasks)
         finally:
             self.__lock.release()
 
@@ -392,8 +517,8 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return itertools.chain(self.__running_tasks[:],
-                                   self.__waiting_tasks[:])
+            return itertools.chain(self._in_enqueue_order(self.__running_tasks),
+                                   self._in_enqueue_order(self.__waiting_tasks))
         finally:
             self.__lock.release()
 
@@ -418,7 +543,7 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             return itertools.chain(self.__completed_tasks[:],
-                                   self.__running_tasks[:],
-                                   self.__waiting_tasks[:])
+                                   self._in_enqueue_order(self.__running_tasks),
+                                   self._in_enqueue_order(self.__waiting_tasks))
         finally:
             self.__lock.release()
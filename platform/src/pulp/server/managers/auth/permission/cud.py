@@ -19,6 +19,7 @@ update, and deletion on a Pulp Role.
 import logging
 from gettext import gettext as _
 
+from pulp.server.auth import authorization_cache
 from pulp.server.auth.authorization import _get_operations
 from pulp.server.db.model.auth import Permission, User
 from pulp.server.exceptions import (
@@ -97,6 +98,7 @@ class PermissionManager(object):
             raise PulpDataException(_("Update Keyword [%s] is not supported" % key))
 
         Permission.get_collection().save(found, safe=True)
+        authorization_cache.invalidate()
 
     def delete_permission(self, resource_uri):
         """
@@ -118,6 +120,7 @@ class PermissionManager(object):
             raise MissingResource(resource_uri)
 
         Permission.get_collection().remove({'resource' : resource_uri}, safe=True)
+        authorization_cache.invalidate()
 
     def grant(self, resource, login, operations):
         """
@@ -156,6 +159,7 @@ class PermissionManager(object):
             current_ops.append(o)
 
         Permission.get_collection().save(permission, safe=True)
+        authorization_cache.invalidate(login)
 
     def revoke(self, resource, login, operations):
         """
@@ -201,6 +205,7 @@ class PermissionManager(object):
             return
 
         Permission.get_collection().save(permission, safe=True)
+        authorization_cache.invalidate(login)
 
     def grant_automatic_permissions_for_resource(self, resource):
         """
@@ -274,3 +279,5 @@ class PermissionManager(object):
                 # Delete entire permission if there are no more users
                 Permission.get_collection().remove({'resource':permission['resource']}, safe=True)
 
+        authorization_cache.invalidate(login)
+
@@ -21,6 +21,7 @@ import logging
 import re
 
 from pulp.server.util import Delta
+from pulp.server.auth import authorization_cache
 from pulp.server.db.model.auth import Role, User
 from pulp.server.auth.authorization import _operations_not_granted_by_roles
 from pulp.server.exceptions import DuplicateResource, InvalidValue, MissingResource, PulpDataException
@@ -266,6 +267,7 @@ class RoleManager(object):
 
         user['roles'].append(role_id)
         User.get_collection().save(user, safe=True)
+        authorization_cache.invalidate(login)
         
         for resource, operations in role['permissions'].items():
             factory.permission_manager().grant(resource, login, operations)
@@ -305,6 +307,7 @@ class RoleManager(object):
         
         user['roles'].remove(role_id)
         User.get_collection().save(user, safe=True)
+        authorization_cache.invalidate(login)
 
         for resource, operations in role['permissions'].items():
             other_roles = factory.role_query_manager().get_other_roles(role, user['roles'])
@@ -18,7 +18,8 @@ Contains users query classes
 from gettext import gettext as _
 from logging import getLogger
 
-from pulp.server.db.model.auth import User, Permission, Role
+from pulp.server.auth import authorization_cache
+from pulp.server.db.model.auth import User, Role
 from pulp.server.exceptions import PulpDataException, MissingResource
 from pulp.server.managers import factory
 
@@ -136,23 +137,31 @@ class UserQueryManager(object):
         @return: True if the user is authorized for the operation on the resource,
                  False otherwise
         """
-        if self.is_superuser(login):
+        # The super user status of the user and the operations granted to it
+        # on each resource are cached in the authorization cache
+
+        if authorization_cache.get(login, authorization_cache.SUPER_USER_KEY,
+                                   lambda: self.is_superuser(login)):
             return True
 
         permission_query_manager = factory.permission_query_manager()
 
+        def granted_operations(permission_resource):
+            def load():
+                permission = permission_query_manager.find_by_resource(permission_resource)
+                if permission is None:
+                    return []
+                return permission['users'].get(login, [])
+            return authorization_cache.get(login, permission_resource, load)
+
         parts = [p for p in resource.split('/') if p]
         while parts:
             current_resource = '/%s/' % '/'.join(parts)
-            permission = permission_query_manager.find_by_resource(current_resource)
-            if permission is not None:
-                if operation in permission['users'].get(login, []):
-                    return True
+            if operation in granted_operations(current_resource):
+                return True
             parts = parts[:-1]
 
-        permission = Permission.get_collection().find_one({'resource' : '/'})
-        return (permission is not None and
-                operation in permission['users'].get(login, []))
+        return operation in granted_operations('/')
 
 
     def is_last_super_user(self, login):
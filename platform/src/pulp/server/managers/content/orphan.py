@@ -20,12 +20,17 @@ from gettext import gettext as _
 from pulp.plugins.types import database as content_types_db
 from pulp.server import config as pulp_config
 from pulp.server import exceptions as pulp_exceptions
+from pulp.server import util
 from pulp.server.db import connection as db_connection
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.dispatch import factory as dispatch_factory
 
 
 _LOG = logging.getLogger(__name__)
 
+# number of orphaned content units removed from the database per query
+_DELETE_CHUNK_SIZE = 1000
+
 
 class OrphanManager(object):
 
@@ -97,23 +102,46 @@ class OrphanManager(object):
 
         If fields is not specified, only the `_id` field will be present.
 
+        The ids of the associated content units of the type are loaded with a
+        single query and checked against a single scan of the content units,
+        rather than looking up the associations of every content unit.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param fields: list of fields to include in each content unit
+        :type fields: list or None
+        :return: generator of orphaned content units for the given content type
+        :rtype: generator
+        """
+        return self._generate_orphans_by_type(content_type_id, fields)
+
+    def _generate_orphans_by_type(self, content_type_id, fields=None, content_unit_ids=None):
+        """
+        Return an generator of the orphaned content units of the given content
+        type, optionally limited to the given content unit ids.
+
         :param content_type_id: id of the content type
         :type content_type_id: basestring
         :param fields: list of fields to include in each content unit
         :type fields: list or None
+        :param content_unit_ids: ids of the content units to consider; None means all of them
+        :type content_unit_ids: list or None
         :return: generator of orphaned content units for the given content type
         :rtype: generator
         """
 
         fields = fields if fields is not None else ['_id']
         content_units_collection = content_types_db.type_units_collection(content_type_id)
-        repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        spec = {}
+        if content_unit_ids is not None:
+            spec = {'_id': {'$in': content_unit_ids}}
+
+        associated_unit_ids = associated_content_unit_ids(content_type_id, content_unit_ids)
 
-            repo_content_units_cursor = repo_content_units_collection.find({'unit_id': content_unit['_id']})
+        for content_unit in content_units_collection.find(spec, fields=fields):
 
-            if repo_content_units_cursor.count() > 0:
+            if content_unit['_id'] in associated_unit_ids:
                 continue
 
             yield content_unit
@@ -151,11 +179,7 @@ class OrphanManager(object):
                                  given content type and unit id
         """
 
-        for content_unit in self.generate_orphans_by_type(content_type_id):
-
-            if content_unit['_id'] != content_unit_id:
-                continue
-
+        for content_unit in self._generate_orphans_by_type(content_type_id, content_unit_ids=[content_unit_id]):
             return content_unit
 
         raise pulp_exceptions.MissingResource(content_type=content_type_id, content_unit=content_unit_id)
@@ -170,8 +194,9 @@ class OrphanManager(object):
         :type flush: bool
         """
 
+        progress = {}
         for content_type_id in content_types_db.all_type_ids():
-            self.delete_orphans_by_type(content_type_id, flush=False)
+            self._delete_orphans_by_type(content_type_id, None, progress)
 
         if flush:
             db_connection.flush_database()
@@ -200,8 +225,9 @@ class OrphanManager(object):
             content_unit_id_list = content_units_by_content_type.setdefault(content_unit['content_type_id'], [])
             content_unit_id_list.append(content_unit['unit_id'])
 
+        progress = {}
         for content_type_id, content_unit_id_list in content_units_by_content_type.items():
-            self.delete_orphans_by_type(content_type_id, content_unit_id_list, flush=False)
+            self._delete_orphans_by_type(content_type_id, content_unit_id_list, progress)
 
         if flush:
             db_connection.flush_database()
@@ -224,23 +250,47 @@ class OrphanManager(object):
         :type flush: bool
         """
 
+        self._delete_orphans_by_type(content_type_id, content_unit_ids, {})
+
+        # this forces the database to flush any cached changes to the disk
+        # in the background; for example: the unsafe deletes of the orphans
+        if flush:
+            db_connection.flush_database()
+
+    def _delete_orphans_by_type(self, content_type_id, content_unit_ids, progress):
+        """
+        Delete the orphaned content units for the given content type in chunks,
+        reporting the number of deleted content units after each chunk.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param content_unit_ids: list of content unit ids to delete; None means delete them all
+        :type content_unit_ids: iterable or None
+        :param progress: number of content units deleted so far, keyed by content
+                         type id; reported as the progress of the current task
+        :type progress: dict
+        """
+
+        if content_unit_ids is not None:
+            content_unit_ids = list(content_unit_ids)
+
         content_units_collection = content_types_db.type_units_collection(content_type_id)
+        orphans = self._generate_orphans_by_type(content_type_id, ['_id', '_storage_path'], content_unit_ids)
+        context = dispatch_factory.context()
 
-        for content_unit in self.generate_orphans_by_type(content_type_id, fields=['_id', '_storage_path']):
+        progress[content_type_id] = 0
 
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
-                continue
+        for chunk in util.chunks(orphans, _DELETE_CHUNK_SIZE):
 
-            content_units_collection.remove(content_unit['_id'], safe=False)
+            content_units_collection.remove({'_id': {'$in': [c['_id'] for c in chunk]}}, safe=False)
 
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                self.delete_orphaned_file(storage_path)
+            for content_unit in chunk:
+                storage_path = content_unit.get('_storage_path', None)
+                if storage_path is not None:
+                    self.delete_orphaned_file(storage_path)
 
-        # this forces the database to flush any cached changes to the disk
-        # in the background; for example: the unsafe deletes in the loop above
-        if flush:
-            db_connection.flush_database()
+            progress[content_type_id] += len(chunk)
+            context.report_progress(progress)
 
     # physical bits utility ----------------------------------------------------
 
@@ -281,3 +331,25 @@ class OrphanManager(object):
                 break
             os.rmdir(path)
 
+
+# orphan scan utilities --------------------------------------------------------
+
+def associated_content_unit_ids(content_type_id, content_unit_ids=None):
+    """
+    Return the set of ids of the content units of the given content type that
+    are associated with at least one repository.
+
+    :param content_type_id: id of the content type
+    :type content_type_id: basestring
+    :param content_unit_ids: ids of the content units to consider; None means all of them
+    :type content_unit_ids: list or None
+    :return: ids of the associated content units
+    :rtype: set
+    """
+    spec = {'unit_type_id': content_type_id}
+    if content_unit_ids is not None:
+        spec['unit_id'] = {'$in': content_unit_ids}
+
+    collection = RepoContentUnit.get_collection()
+    return set(a['unit_id'] for a in collection.find(spec, fields=['unit_id']))
+
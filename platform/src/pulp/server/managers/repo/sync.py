@@ -151,7 +151,21 @@ class RepoSyncManager(object):
         result = None
 
         try:
-            sync_report = importer_instance.sync_repo(transfer_repo, conduit, call_config)
+            try:
+                sync_report = importer_instance.sync_repo(transfer_repo, conduit, call_config)
+            except Exception:
+                # Write out the units buffered by the conduit before the failure
+                # without losing the importer's exception
+                exc_info = sys.exc_info()
+                try:
+                    conduit.flush_units()
+                except Exception:
+                    _LOG.exception(_('Failed to save the units buffered during the sync of repo [%(r)s]') %
+                                   {'r': repo_id})
+                raise exc_info[0], exc_info[1], exc_info[2]
+
+            # Write out any units still buffered by the conduit
+            conduit.flush_units()
 
         except Exception, e:
             sync_end_timestamp = _now_timestamp()
@@ -56,6 +56,9 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Number of unit IDs looked up and inserted per database call in bulk operations
+_ASSOCIATION_BATCH_SIZE = 1000
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationManager(object):
@@ -137,7 +140,9 @@ class RepoUnitAssociationManager(object):
         """
         Creates multiple associations between the given repo and content units.
 
-        See associate_unit_by_id for semantics.
+        See associate_unit_by_id for semantics. Existing associations are
+        determined with one query per batch of unit IDs, new associations are
+        inserted in bulk and the repository's unit count is updated once.
 
         @param repo_id: identifies the repo
         @type  repo_id: str
@@ -156,24 +161,55 @@ class RepoUnitAssociationManager(object):
                          the importer ID or user login
         @type  owner_id: str
 
+        @return: number of units that were not previously associated with the
+                 repository in any way
+        @rtype:  int
+
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        # There may be a way to batch this in mongo which would be ideal for a
-        # bulk operation like this. But for deadline purposes, this call will
-        # simply loop and call the single method.
+        if owner_type not in _OWNER_TYPES:
+            raise exceptions.InvalidValue(['owner_type'])
 
+        collection = RepoContentUnit.get_collection()
         unique_count = 0
-        for unit_id in unit_id_list:
-            if not self.association_exists(repo_id, unit_id, unit_type_id):
-                unique_count += 1
-            self.associate_unit_by_id(repo_id, unit_type_id, unit_id, owner_type, owner_id, False)
+
+        # Remove duplicates from the input while preserving its order
+        seen = set()
+        unit_id_list = [u for u in unit_id_list if not (u in seen or seen.add(u))]
+
+        for i in range(0, len(unit_id_list), _ASSOCIATION_BATCH_SIZE):
+            unit_ids = unit_id_list[i:i + _ASSOCIATION_BATCH_SIZE]
+
+            # Find all existing associations to these units in a single query;
+            # any association counts towards the repo's unit count, but only
+            # the ones made by this owner make a new association redundant
+            spec = {'repo_id' : repo_id,
+                    'unit_type_id' : unit_type_id,
+                    'unit_id' : {'$in' : unit_ids}}
+            fields = ['unit_id', 'owner_type', 'owner_id']
+
+            associated_ids = set()
+            owned_ids = set()
+            for association in collection.find(spec, fields=fields):
+                associated_ids.add(association['unit_id'])
+                if association['owner_type'] == owner_type and association['owner_id'] == owner_id:
+                    owned_ids.add(association['unit_id'])
+
+            new_associations = [RepoContentUnit(repo_id, unit_id, unit_type_id, owner_type, owner_id)
+                                for unit_id in unit_ids if unit_id not in owned_ids]
+            if new_associations:
+                collection.insert(new_associations, safe=True)
+
+            unique_count += len([u for u in unit_ids if u not in associated_ids])
 
         # update the count of associated units on the repo object
         if unique_count:
             manager_factory.repo_manager().update_unit_count(
                 repo_id, unit_type_id, unique_count)
 
+        return unique_count
+
     def associate_from_repo(self, source_repo_id, dest_repo_id, criteria=None, import_config_override=None):
         """
         Creates associations in a repository based on the contents of a source
@@ -348,6 +384,72 @@ class RepoUnitAssociationManager(object):
         return self.unassociate_by_criteria(repo_id, criteria, owner_type, owner_id,
                                             notify_plugins=notify_plugins)
 
+    def remove_all_by_ids(self, repo_id, unit_type_id, unit_id_list, owner_type, owner_id):
+        """
+        Removes the associations between the given repo and a number of units
+        made by the given owner.
+
+        Unlike unassociate_all_by_ids, the units are not loaded and plugins are
+        not notified. This is intended for importers removing the units they
+        associated during a sync. Associations are removed in batches of unit
+        IDs and the repository's unit count is updated once.
+
+        @param repo_id: identifies the repo
+        @type  repo_id: str
+
+        @param unit_type_id: identifies the type of units being removed
+        @type  unit_type_id: str
+
+        @param unit_id_list: list of unique identifiers for units within the given type
+        @type  unit_id_list: list of str
+
+        @param owner_type: category of the caller who created the association;
+                           must be one of the OWNER_* variables in this module
+        @type  owner_type: str
+
+        @param owner_id: identifies the caller who created the association, either
+                         the importer ID or user login
+        @type  owner_id: str
+
+        @return: number of units that are no longer associated with the
+                 repository in any way
+        @rtype:  int
+        """
+
+        collection = RepoContentUnit.get_collection()
+        unique_count = 0
+
+        unit_id_list = list(set(unit_id_list))
+
+        for i in range(0, len(unit_id_list), _ASSOCIATION_BATCH_SIZE):
+            unit_ids = unit_id_list[i:i + _ASSOCIATION_BATCH_SIZE]
+
+            spec = {'repo_id' : repo_id,
+                    'unit_type_id' : unit_type_id,
+                    'unit_id' : {'$in' : unit_ids},
+                    'owner_type' : owner_type,
+                    'owner_id' : owner_id}
+            owned_ids = set(a['unit_id'] for a in collection.find(spec, fields=['unit_id']))
+            if not owned_ids:
+                continue
+
+            spec['unit_id'] = {'$in' : list(owned_ids)}
+            collection.remove(spec, safe=True)
+
+            # Units still associated through another owner do not affect the count
+            remaining_spec = {'repo_id' : repo_id,
+                              'unit_type_id' : unit_type_id,
+                              'unit_id' : {'$in' : list(owned_ids)}}
+            remaining_ids = set(a['unit_id'] for a in collection.find(remaining_spec, fields=['unit_id']))
+            unique_count += len(owned_ids - remaining_ids)
+
+        # update the count of associated units on the repo object
+        if unique_count:
+            manager_factory.repo_manager().update_unit_count(
+                repo_id, unit_type_id, -unique_count)
+
+        return unique_count
+
     def unassociate_by_criteria(self, repo_id, criteria, owner_type, owner_id, notify_plugins=True):
         """
         Unassociate units that are matched by the given criteria.
@@ -385,8 +487,12 @@ class RepoUnitAssociationManager(object):
                     'owner_id': owner_id}
             collection.remove(spec, safe=True)
 
-            unique_count = sum(1 for unit_id in unit_ids
-                               if not self.association_exists(repo_id, unit_id, unit_type_id))
+            # Units still associated through another owner do not affect the count
+            remaining_spec = {'repo_id': repo_id,
+                              'unit_type_id': unit_type_id,
+                              'unit_id': {'$in': unit_ids}}
+            remaining_ids = set(a['unit_id'] for a in collection.find(remaining_spec, fields=['unit_id']))
+            unique_count = len(set(unit_ids) - remaining_ids)
             if not unique_count:
                 continue
 
@@ -16,11 +16,15 @@ Contains the manager class for performing queries for repo-unit associations.
 """
 
 import copy
+import itertools
 import logging
 import pymongo
 
 import pulp.plugins.types.database as types_db
-from pulp.server.db.model.criteria import UnitAssociationCriteria
+from pulp.server import exceptions as pulp_exceptions
+from pulp.server import util
+from pulp.server.db.model.criteria import (UnitAssociationCriteria, after_continuation,
+    continuation_fields, continuation_sort, encode_continuation)
 from pulp.server.db.model.repository import RepoContentUnit
 
 # -- constants ----------------------------------------------------------------
@@ -41,6 +45,12 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Sort of the associations in a query across unit types when none is specified
+_DEFAULT_ACROSS_TYPES_SORT = [('unit_type_id', SORT_ASCENDING), ('created', SORT_ASCENDING)]
+
+# Number of associations joined with their units at a time by the get_units_*_iter calls
+DEFAULT_BATCH_SIZE = 1000
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationQueryManager(object):
@@ -146,39 +156,8 @@ class RepoUnitAssociationQueryManager(object):
 
         # -- association collection lookup ------------------------------------
 
-        spec = {'repo_id' : repo_id}
-
-        # Limit to certain type IDs if specified
-        if criteria.type_ids is not None:
-            spec['unit_type_id'] = {'$in' : criteria.type_ids}
-
-        # Just in case the caller stuffed this into the criteria
-        association_filters = criteria.association_filters
-        association_filters.pop('repo_id', None)
-        association_filters.pop('unit_type_id', None)
-
-        # Merge in the association filters
-        spec.update(association_filters)
-
-        cursor = RepoContentUnit.get_collection().find(spec, fields=criteria.association_fields)
-
-        # Add the sort clauses if specified; sort can take either a string
-        # or list so just pass in the sort directly. Mongo will ignore
-        # multiple calls to sort and only use the last one called, so only a
-        # single call is required here.
-        if criteria.association_sort is not None:
-            cursor.sort(criteria.association_sort)
-        else:
-            # If an explicit sort is not provided, default to one for consistency
-            cursor.sort([('unit_type_id', SORT_ASCENDING), ('created', SORT_ASCENDING)])
-
-        # Apply the limit and skip here since no sorting is done in the unit
-        # lookup phase.
-        if criteria.limit is not None:
-            cursor.limit(criteria.limit)
-
-        if criteria.skip is not None:
-            cursor.skip(criteria.skip)
+        spec = self._association_spec_across_types(repo_id, criteria)
+        cursor = self._association_cursor_across_types(spec, criteria)
 
         # Finally do the query and assemble the associations structure
         units = list(cursor)
@@ -230,16 +209,7 @@ class RepoUnitAssociationQueryManager(object):
 
         # -- association collection lookup ------------------------------------
 
-        spec = {'repo_id' : repo_id,
-                'unit_type_id' : type_id}
-
-        # Strip out the type ID and repo fields if they were accidentally specified in the criteria
-        association_spec = criteria.association_filters
-        association_spec.pop('unit_type_id', None)
-        association_spec.pop('repo_id', None)
-
-        # Merge in the given association filters
-        spec.update(association_spec)
+        spec = self._association_spec_by_type(repo_id, type_id, criteria)
 
         cursor = RepoContentUnit.get_collection().find(spec, fields=criteria.association_fields)
 
@@ -360,6 +330,599 @@ class RepoUnitAssociationQueryManager(object):
 
             return merged_units
 
+    # -- streaming queries ----------------------------------------------------
+
+    def get_units_iter(self, repo_id, criteria=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Generator counterpart of get_units; delegates to the appropriate
+        get_units_*_iter call depending on the contents of the criteria.
+
+        If the criteria is paginated, the results after its continuation are
+        returned without a limit; see get_units_page.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: number of associations joined with their units at a time
+        @type  batch_size: int
+
+        @return: generator of association dicts with the unit under 'metadata'
+        @rtype:  generator
+        """
+
+        if criteria is not None and\
+           criteria.type_ids is not None and\
+           len(criteria.type_ids) == 1:
+
+            type_id = criteria.type_ids[0]
+            return self.get_units_by_type_iter(repo_id, type_id, criteria=criteria, batch_size=batch_size)
+        else:
+            return self.get_units_across_types_iter(repo_id, criteria=criteria, batch_size=batch_size)
+
+    def get_units_across_types_iter(self, repo_id, criteria=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Generator counterpart of get_units_across_types. The associations are
+        read from a single cursor and the unit metadata is looked up for one
+        batch of associations at a time, so at most one batch of units is held
+        in memory. The results are returned in the same order as
+        get_units_across_types.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: number of associations joined with their units at a time
+        @type  batch_size: int
+
+        @return: generator of association dicts with the unit under 'metadata'
+        @rtype:  generator
+        """
+
+        if criteria is None:
+            criteria = UnitAssociationCriteria()
+
+        spec = self._association_spec_across_types(repo_id, criteria)
+        cursor = self._association_cursor_across_types(spec, criteria)
+        cursor.batch_size(batch_size)
+
+        for associations in self._association_batches(spec, cursor, criteria, batch_size):
+
+            unit_ids_by_type = {}
+            for association in associations:
+                unit_ids_by_type.setdefault(association['unit_type_id'], []).append(association['unit_id'])
+
+            metadata_by_id = {}
+            for type_id, unit_ids in unit_ids_by_type.items():
+                type_collection = types_db.type_units_collection(type_id)
+                for metadata in type_collection.find({'_id' : {'$in' : unit_ids}}):
+                    metadata_by_id[(type_id, metadata['_id'])] = metadata
+
+            for association in associations:
+                key = (association['unit_type_id'], association['unit_id'])
+                association['metadata'] = metadata_by_id.get(key)
+                yield association
+
+    def get_units_by_type_iter(self, repo_id, type_id, criteria=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Generator counterpart of get_units_by_type. The results are returned
+        in the same order as get_units_by_type, joining associations and units
+        one batch at a time:
+
+        If the sort applies to the association metadata, or the criteria is
+        paginated, the associations are read from a single cursor and the units
+        matching each batch of them are looked up with one query. A paginated
+        criteria without an association sort is read in the order the
+        associations were created; it may not have a unit sort.
+
+        Otherwise only the IDs of the associated units are loaded up front; the
+        units are read from a single sorted cursor and the associations matching
+        each batch of them are looked up with one query.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param type_id: limits returned units to the given type
+        @type  type_id: str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: number of associations joined with their units at a time
+        @type  batch_size: int
+
+        @return: generator of association dicts with the unit under 'metadata'
+        @rtype:  generator
+        """
+
+        if criteria is None:
+            criteria = UnitAssociationCriteria()
+
+        spec = self._association_spec_by_type(repo_id, type_id, criteria)
+        association_collection = RepoContentUnit.get_collection()
+        type_collection = types_db.type_units_collection(type_id)
+
+        if criteria.association_sort is not None or criteria.paginated:
+            if criteria.paginated:
+                sort = self._page_sort(criteria)
+                cursor = association_collection.find(
+                    after_continuation(spec, sort, criteria.continuation),
+                    fields=continuation_fields(criteria.association_fields, sort))
+                cursor.sort(sort)
+            else:
+                cursor = association_collection.find(spec, fields=criteria.association_fields)
+                cursor.sort(criteria.association_sort)
+
+                if criteria.limit is not None:
+                    cursor.limit(criteria.limit)
+
+                if criteria.skip is not None:
+                    cursor.skip(criteria.skip)
+
+            cursor.batch_size(batch_size)
+
+            for associations in self._association_batches(spec, cursor, criteria, batch_size):
+
+                # The unit filters are applied in the same query that retrieves the units
+                unit_spec = copy.copy(criteria.unit_filters)
+                unit_spec['_id'] = {'$in' : [a['unit_id'] for a in associations]}
+                metadata_by_id = dict((u['_id'], u) for u in
+                                      type_collection.find(unit_spec, fields=criteria.unit_fields))
+
+                for association in associations:
+                    metadata = metadata_by_id.get(association['unit_id'])
+                    if metadata is None:
+                        continue
+                    association['metadata'] = metadata
+                    yield association
+
+        else:
+            unit_ids = set(a['unit_id'] for a in association_collection.find(spec, fields=['unit_id']))
+
+            unit_spec = copy.copy(criteria.unit_filters)
+            unit_spec['_id'] = {'$in' : list(unit_ids)}
+
+            cursor = type_collection.find(unit_spec, fields=criteria.unit_fields)
+
+            if criteria.unit_sort is None:
+                unit_key_fields = types_db.type_units_unit_key(type_id)
+                cursor.sort([(u, SORT_ASCENDING) for u in unit_key_fields])
+            else:
+                cursor.sort(criteria.unit_sort)
+
+            if criteria.limit is not None:
+                cursor.limit(criteria.limit)
+
+            if criteria.skip is not None:
+                cursor.skip(criteria.skip)
+
+            cursor.batch_size(batch_size)
+
+            for units in util.chunks(cursor, batch_size):
+                batch_spec = copy.copy(spec)
+                batch_spec['unit_id'] = {'$in' : [u['_id'] for u in units]}
+
+                # One association per unit, the earliest one when there are several
+                associations_by_id = {}
+                batch_cursor = association_collection.find(batch_spec, fields=criteria.association_fields)
+                for association in batch_cursor.sort('created', SORT_DESCENDING):
+                    associations_by_id[association['unit_id']] = association
+
+                for unit in units:
+                    # the association may have been removed since the unit IDs were loaded
+                    association = associations_by_id.get(unit['_id'])
+                    if association is None:
+                        continue
+                    association['metadata'] = unit
+                    yield association
+
+    # -- paginated queries ----------------------------------------------------
+
+    def get_units_page(self, repo_id, criteria):
+        """
+        Returns one page of the results of get_units_iter for a paginated
+        criteria: at most criteria.page_limit results, read from the position
+        identified by the criteria's continuation using the sort of the query
+        (followed by _id) rather than by skipping the preceding results.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param criteria: paginated criteria; the continuation is an empty
+               string for the first page
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @return: tuple of the page of association dicts with the unit under
+                 'metadata' and the continuation for the next page, None if
+                 this is the last page
+        @rtype:  tuple
+        """
+        batch_size = min(criteria.page_limit, DEFAULT_BATCH_SIZE)
+        units = list(itertools.islice(self.get_units_iter(repo_id, criteria=criteria, batch_size=batch_size),
+                                      criteria.page_limit))
+        if len(units) < criteria.page_limit:
+            return units, None
+
+        return units, encode_continuation(units[-1], self._page_sort(criteria))
+
+    # -- multiple repository queries -------------------------------------------
+
+    def get_units_by_repos(self, repo_ids, criteria=None):
+        """
+        Performs the query get_units would perform for each of the given
+        repositories, with the same filtering, sorting, limit, skip and
+        duplicate removal applied to each repository, in a number of queries
+        that does not depend on the number of repositories: the associations of
+        all of the repositories are retrieved with a single query and the units
+        of each type in batches of DEFAULT_BATCH_SIZE IDs, which keeps each
+        query well under the maximum document size.
+
+        Since the limit and skip apply to each repository, they are applied
+        after the associations are read rather than in the database.
+
+        @param repo_ids: identifies the repositories
+        @type  repo_ids: list of str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @return: dict of repository ID to the list of association dicts with
+                 the unit under 'metadata', as returned by get_units
+        @rtype:  dict
+        """
+
+        if criteria is None:
+            criteria = UnitAssociationCriteria()
+
+        type_id = None
+        if criteria.type_ids is not None and len(criteria.type_ids) == 1:
+            type_id = criteria.type_ids[0]
+
+        # -- association collection lookup ------------------------------------
+
+        spec = self._association_spec_across_types({'$in' : list(repo_ids)}, criteria)
+
+        # The repo ID is needed to group the associations by repository
+        association_fields = criteria.association_fields
+        if association_fields is not None and 'repo_id' not in association_fields:
+            association_fields = association_fields + ['repo_id']
+
+        cursor = RepoContentUnit.get_collection().find(spec, fields=association_fields)
+
+        # Same as get_units: the associations are sorted here unless the units
+        # are sorted, which only happens for a single type without an
+        # association sort
+        unit_sorted = type_id is not None and criteria.association_sort is None
+        if not unit_sorted:
+            cursor.sort([('repo_id', SORT_ASCENDING)] +
+                        list(criteria.association_sort or _DEFAULT_ACROSS_TYPES_SORT))
+
+        associations_by_repo = dict((repo_id, []) for repo_id in repo_ids)
+        for association in cursor:
+            associations_by_repo[association['repo_id']].append(association)
+
+        for repo_id, associations in associations_by_repo.items():
+            if not unit_sorted:
+                associations = self._limit(associations, criteria)
+            if criteria.remove_duplicates:
+                associations = self._remove_duplicate_associations(associations)
+            associations_by_repo[repo_id] = associations
+
+        # -- unit lookups -----------------------------------------------------
+
+        if unit_sorted:
+            return self._merge_sorted_units(associations_by_repo, type_id, criteria)
+
+        unit_ids_by_type = {}
+        for associations in associations_by_repo.values():
+            for association in associations:
+                unit_ids_by_type.setdefault(association['unit_type_id'], set()).add(association['unit_id'])
+
+        # The unit filters and fields only apply to a single type, as in get_units
+        metadata_by_id = {}
+        for unit_type_id, unit_ids in unit_ids_by_type.items():
+            unit_spec = {}
+            unit_fields = None
+            if type_id is not None:
+                unit_spec = copy.copy(criteria.unit_filters)
+                unit_fields = criteria.unit_fields
+            type_collection = types_db.type_units_collection(unit_type_id)
+            for batch_ids in util.chunks(unit_ids, DEFAULT_BATCH_SIZE):
+                unit_spec['_id'] = {'$in' : batch_ids}
+                for metadata in type_collection.find(unit_spec, fields=unit_fields):
+                    metadata_by_id[(unit_type_id, metadata['_id'])] = metadata
+
+        units_by_repo = {}
+        for repo_id, associations in associations_by_repo.items():
+            units = []
+            for association in associations:
+                metadata = metadata_by_id.get((association['unit_type_id'], association['unit_id']))
+                # Associations whose unit does not match the unit filters are removed
+                if metadata is None and type_id is not None:
+                    continue
+                association['metadata'] = metadata
+                units.append(association)
+            units_by_repo[repo_id] = units
+
+        return units_by_repo
+
+    @staticmethod
+    def _merge_sorted_units(associations_by_repo, type_id, criteria):
+        """
+        Unit sorted counterpart of the unit lookup in get_units_by_repos. The
+        units of all of the repositories are read in batches and sorted here,
+        since the database can only sort the results of a single query, then
+        each repository's units are limited and merged with their associations
+        in that order.
+
+        @param associations_by_repo: dict of repository ID to its associations
+        @type  associations_by_repo: dict
+
+        @param type_id: type of the units
+        @type  type_id: str
+
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @return: dict of repository ID to the list of association dicts with
+                 the unit under 'metadata'
+        @rtype:  dict
+        """
+        # As in get_units_by_type, one association per unit and repository
+        repo_associations_by_id = {}
+        for repo_id, associations in associations_by_repo.items():
+            for association in associations:
+                repo_associations_by_id.setdefault(association['unit_id'], {})[repo_id] = association
+
+        if criteria.unit_sort is None:
+            unit_key_fields = types_db.type_units_unit_key(type_id)
+            sort = [(u, SORT_ASCENDING) for u in unit_key_fields]
+        else:
+            sort = list(criteria.unit_sort)
+
+        # The sort fields are needed to sort the units but only the requested
+        # fields are returned
+        unit_fields = criteria.unit_fields
+        extra_fields = set()
+        if unit_fields is not None:
+            requested = set(f.split('.', 1)[0] for f in unit_fields)
+            extra_fields = set(f.split('.', 1)[0] for f, d in sort) - requested - set(['_id'])
+            unit_fields = list(unit_fields) + [f for f, d in sort if f not in unit_fields]
+
+        type_collection = types_db.type_units_collection(type_id)
+        unit_spec = copy.copy(criteria.unit_filters)
+        units = []
+        for unit_ids in util.chunks(repo_associations_by_id, DEFAULT_BATCH_SIZE):
+            unit_spec['_id'] = {'$in' : unit_ids}
+            units.extend(type_collection.find(unit_spec, fields=unit_fields))
+
+        # Sorted by the last field first since each sort is stable
+        for field, direction in reversed(sort):
+            units.sort(key=lambda u: RepoUnitAssociationQueryManager._sort_value(u, field),
+                       reverse=(direction == SORT_DESCENDING))
+
+        units_by_repo = dict((repo_id, []) for repo_id in associations_by_repo)
+        for unit in units:
+            for field in extra_fields:
+                unit.pop(field, None)
+            for repo_id, association in repo_associations_by_id[unit['_id']].items():
+                association['metadata'] = unit
+                units_by_repo[repo_id].append(association)
+
+        for repo_id, units in units_by_repo.items():
+            units_by_repo[repo_id] = RepoUnitAssociationQueryManager._limit(units, criteria)
+
+        return units_by_repo
+
+    @staticmethod
+    def _sort_value(unit, field):
+        """
+        Returns the value of a (possibly dotted) field of a unit to sort by,
+        None if it is missing as it is sorted first like a missing field in
+        the database.
+
+        @type  unit: dict
+        @type  field: str
+        """
+        value = unit
+        for name in field.split('.'):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(name)
+        return value
+
+    @staticmethod
+    def _limit(units, criteria):
+        """
+        Applies the criteria's skip and limit to a list of results.
+
+        @type  units: list
+        @type  criteria: L{UnitAssociationCriteria}
+        @rtype: list
+        """
+        start = criteria.skip or 0
+        if criteria.limit is None:
+            return units[start:]
+        return units[start:start + criteria.limit]
+
+    # -- query utilities ------------------------------------------------------
+
+    @staticmethod
+    def _page_sort(criteria):
+        """
+        Determines the sort of a paginated query: the association sort, or the
+        default sort across types if there is none, followed by _id. Paginated
+        queries are always read from the association collection so that each
+        page only reads the associations it returns.
+
+        @param criteria: paginated criteria
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @return: sort of the associations
+        @rtype:  list
+
+        @raise InvalidValue: if the criteria also has a unit sort
+        """
+        if criteria.unit_sort is not None:
+            raise pulp_exceptions.InvalidValue(['continuation'])
+        return continuation_sort(criteria.association_sort or _DEFAULT_ACROSS_TYPES_SORT)
+
+    @staticmethod
+    def _association_spec_across_types(repo_id, criteria):
+        """
+        Builds the association collection spec for a query across unit types.
+
+        @type  repo_id: str
+        @type  criteria: L{UnitAssociationCriteria}
+        @rtype: dict
+        """
+        spec = {'repo_id' : repo_id}
+
+        # Limit to certain type IDs if specified
+        if criteria.type_ids is not None:
+            spec['unit_type_id'] = {'$in' : criteria.type_ids}
+
+        # Just in case the caller stuffed this into the criteria
+        association_filters = criteria.association_filters
+        association_filters.pop('repo_id', None)
+        association_filters.pop('unit_type_id', None)
+
+        # Merge in the association filters
+        spec.update(association_filters)
+        return spec
+
+    @staticmethod
+    def _association_cursor_across_types(spec, criteria):
+        """
+        Creates the sorted, limited and skipped association cursor for a query
+        across unit types.
+
+        @type  spec: dict
+        @type  criteria: L{UnitAssociationCriteria}
+        @rtype: pymongo.cursor.Cursor
+        """
+        collection = RepoContentUnit.get_collection()
+
+        # The page is read from the position of the continuation; it is not
+        # limited here since duplicates may be removed from it
+        if criteria.paginated:
+            sort = RepoUnitAssociationQueryManager._page_sort(criteria)
+            cursor = collection.find(after_continuation(spec, sort, criteria.continuation),
+                                     fields=continuation_fields(criteria.association_fields, sort))
+            return cursor.sort(sort)
+
+        cursor = collection.find(spec, fields=criteria.association_fields)
+
+        # Add the sort clauses if specified; sort can take either a string
+        # or list so just pass in the sort directly. Mongo will ignore
+        # multiple calls to sort and only use the last one called, so only a
+        # single call is required here.
+        if criteria.association_sort is not None:
+            cursor.sort(criteria.association_sort)
+        else:
+            # If an explicit sort is not provided, default to one for consistency
+            cursor.sort(_DEFAULT_ACROSS_TYPES_SORT)
+
+        # Apply the limit and skip here since no sorting is done in the unit
+        # lookup phase.
+        if criteria.limit is not None:
+            cursor.limit(criteria.limit)
+
+        if criteria.skip is not None:
+            cursor.skip(criteria.skip)
+
+        return cursor
+
+    @staticmethod
+    def _association_spec_by_type(repo_id, type_id, criteria):
+        """
+        Builds the association collection spec for a query on a single unit type.
+
+        @type  repo_id: str
+        @type  type_id: str
+        @type  criteria: L{UnitAssociationCriteria}
+        @rtype: dict
+        """
+        spec = {'repo_id' : repo_id,
+                'unit_type_id' : type_id}
+
+        # Strip out the type ID and repo fields if they were accidentally specified in the criteria
+        association_spec = criteria.association_filters
+        association_spec.pop('unit_type_id', None)
+        association_spec.pop('repo_id', None)
+
+        # Merge in the given association filters
+        spec.update(association_spec)
+        return spec
+
+    def _association_batches(self, spec, cursor, criteria, batch_size):
+        """
+        Reads the associations from the cursor one batch at a time, removing
+        the duplicate associations if the criteria asks for it.
+
+        The results of a limited or skipped query are deduplicated among
+        themselves, as get_units does, so they are read in full first. Other
+        queries return every association matching the spec (or, if paginated,
+        every one after the continuation), so the earliest association of each
+        unit is looked up in the database one batch at a time instead.
+
+        @param spec: association collection spec the cursor was created with
+        @type  spec: dict
+
+        @param cursor: sorted association cursor
+        @type  cursor: pymongo.cursor.Cursor
+
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: number of associations per batch
+        @type  batch_size: int
+
+        @return: generator of lists of associations
+        @rtype:  generator
+        """
+        if not criteria.remove_duplicates:
+            return util.chunks(cursor, batch_size)
+
+        if not criteria.paginated and (criteria.limit is not None or criteria.skip is not None):
+            return util.chunks(self._remove_duplicate_associations(list(cursor)), batch_size)
+
+        return (self._remove_later_associations(spec, associations)
+                for associations in util.chunks(cursor, batch_size))
+
+    @staticmethod
+    def _remove_later_associations(spec, associations):
+        """
+        Streaming counterpart of _remove_duplicate_associations for one batch
+        of associations: an association is only kept if it is the earliest
+        created association matching the spec for its unit. Since the earliest
+        association is looked up in the database, duplicates are removed across
+        batches as well. This is only the same as _remove_duplicate_associations
+        when the query returns all of the associations matching the spec; see
+        _association_batches.
+
+        @param spec: association collection spec the associations matched
+        @type  spec: dict
+
+        @param associations: batch of associations
+        @type  associations: list of dict
+
+        @return: the associations that are kept, in their original order
+        @rtype:  list of dict
+        """
+        earliest_spec = copy.copy(spec)
+        earliest_spec['unit_id'] = {'$in' : list(set(a['unit_id'] for a in associations))}
+        cursor = RepoContentUnit.get_collection().find(earliest_spec, fields=['unit_type_id', 'unit_id'])
+
+        earliest_ids = {}
+        for association in cursor.sort('created', SORT_ASCENDING):
+            earliest_ids.setdefault((association['unit_type_id'], association['unit_id']), association['_id'])
+
+        return [a for a in associations
+                if earliest_ids.get((a['unit_type_id'], a['unit_id'])) == a['_id']]
+
     def _remove_duplicate_associations(self, units):
         """
         For units that are associated with a repository more than once, this
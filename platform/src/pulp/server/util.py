@@ -154,6 +154,30 @@ def topological_sort(graph):
 
     return sorted_vertices
 
+# iteration utilities ----------------------------------------------------------
+
+def chunks(iterable, chunk_size):
+    """
+    Split an iterable into lists of at most chunk_size consecutive items,
+    without consuming more of the iterable than the current list.
+    @param iterable: items to split
+    @type  iterable: iterable
+    @param chunk_size: maximum number of items per list
+    @type  chunk_size: int
+    @return: generator of lists of items
+    @rtype:  generator
+    """
+    assert chunk_size > 0
+
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 # legacy delta -----------------------------------------------------------------
 
 class Delta(dict):
@@ -44,6 +44,7 @@ from pulp.server.agent.direct.services import Services as AgentServices
 
 from pulp.plugins.loader import api as plugin_api
 from pulp.server.db import reaper
+from pulp.server import debugging
 from pulp.server.debugging import StacktraceDumper
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.managers import factory as manager_factory
@@ -53,6 +54,7 @@ from pulp.server.webservices.controllers import (
     plugins, repo_groups, repositories, roles, root_actions, status, users)
 from pulp.server.webservices.middleware.exception import ExceptionHandlerMiddleware
 from pulp.server.webservices.middleware.postponed import PostponedOperationMiddleware
+from pulp.server.webservices.middleware.profiling import ProfilingMiddleware
 
 # constants and application globals --------------------------------------------
 
@@ -162,6 +164,13 @@ def wsgi_application():
     stack_components = [application, PostponedOperationMiddleware, ExceptionHandlerMiddleware]
     stack = reduce(lambda a, m: m(a), stack_components)
 
+    # Profile requests, if configured
+    if config.config.getboolean('profiling', 'enabled'):
+        profiler = debugging.enable_profiling(
+            config.config.getfloat('profiling', 'slow_request_threshold'),
+            config.config.getfloat('profiling', 'slow_query_threshold'))
+        stack = ProfilingMiddleware(stack, profiler)
+
     # The following intentionally don't raise the exception. The logging writes
     # to both error_log and pulp.log. Raising the exception caused it to be
     # logged twice to error_log, which was annoying. The Pulp server still
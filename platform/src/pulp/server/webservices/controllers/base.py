@@ -13,11 +13,13 @@
 
 import logging
 import sys
+import time
 from gettext import gettext as _
 
 import web
 
 from pulp.common.util import decode_unicode, encode_unicode
+from pulp.server import debugging
 from pulp.server.compat import json, json_util
 from pulp.server.exceptions import InputEncodingError
 from pulp.server.webservices import http, serialization
@@ -25,6 +27,10 @@ from pulp.server.webservices import http, serialization
 
 _log = logging.getLogger(__name__)
 
+# Size, in bytes, of the encoded JSON that is buffered before each chunk of a
+# streamed response body is handed to the WSGI server
+STREAM_CHUNK_SIZE = 65536
+
 
 class JSONController(object):
     """
@@ -129,13 +135,52 @@ class JSONController(object):
 
     def _output(self, data):
         """
-        JSON encode the response and set the appropriate headers
+        JSON encode the response and set the appropriate headers.
+        Iterators, such as generators and database cursors, are encoded as a
+        JSON array that is streamed as it is read (see _stream).
         """
+        if hasattr(data, 'next'):
+            http.header('Content-Type', 'application/json')
+            return self._stream(data)
+        start = time.time()
         body = json.dumps(data, default=json_util.default)
+        debugging.record_time(debugging.SERIALIZATION_TIME, time.time() - start)
         http.header('Content-Type', 'application/json')
         http.header('Content-Length', len(body))
         return body
 
+    def _stream(self, items):
+        """
+        Generate the body of a response containing a JSON array of the items,
+        in chunks of about STREAM_CHUNK_SIZE bytes. Only the current chunk is
+        held in memory, regardless of the number of items. Since the length of
+        the body is not known up front, no Content-Length header is set.
+        Note that web.py reads the first chunk before the response is started,
+        so errors raised while reading the first items are still reported with
+        the appropriate status.
+        @param items: items to be encoded
+        @type  items: iterator
+        @return: generator of JSON encoded chunks
+        @rtype:  generator
+        """
+        chunk = ['[']
+        size = 0
+        separator = ''
+        for item in items:
+            start = time.time()
+            element = json.dumps(item, default=json_util.default)
+            debugging.record_time(debugging.SERIALIZATION_TIME, time.time() - start)
+            chunk.append(separator)
+            chunk.append(element)
+            separator = ', '
+            size += len(element)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        chunk.append(']')
+        yield ''.join(chunk)
+
     def _error_dict(self, msg, code=None):
         """
         Standardized error returns
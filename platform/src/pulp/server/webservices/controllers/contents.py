@@ -22,6 +22,7 @@ from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch.call import CallRequest
 from pulp.server.exceptions import MissingResource, InvalidValue
 from pulp.server.managers import factory
+from pulp.server.util import chunks
 from pulp.server.webservices import execution, serialization
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
@@ -29,6 +30,9 @@ from pulp.server.webservices.controllers.decorators import auth_required
 # content types controller classes ---------------------------------------------
 from pulp.server.webservices.controllers.search import SearchController
 
+# Number of units searched for repository memberships at a time
+MEMBERSHIP_BATCH_SIZE = 1000
+
 class ContentTypesCollection(JSONController):
 
     @auth_required(READ)
@@ -147,6 +151,29 @@ class ContentUnitsSearch(SearchController):
             unit['repository_memberships'] = list(association_map.get(unit['_id'], []))
         return units
 
+    def _process_units(self, raw_units, type_id, include_repos):
+        """
+        Generator of the processed units, optionally with the attribute
+        "repository_memberships" added, reading the raw units as they are
+        needed so they can be streamed to the client. Repository memberships
+        are found for MEMBERSHIP_BATCH_SIZE units at a time.
+
+        :param raw_units:       unit documents
+        :type  raw_units:       iterable of dicts
+        :param type_id:         content type id
+        :type  type_id:         str
+        :param include_repos:   iff True, adds repository memberships
+        :type  include_repos:   bool
+        :return:    generator of processed units
+        :rtype:     generator
+        """
+        for batch in chunks(raw_units, MEMBERSHIP_BATCH_SIZE):
+            units = [ContentUnitsCollection.process_unit(unit) for unit in batch]
+            if include_repos:
+                self._add_repo_memberships(units, type_id)
+            for unit in units:
+                yield unit
+
     @auth_required(READ)
     def GET(self, type_id):
         """
@@ -160,12 +187,8 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_get(ignore_fields=('include_repos',))
-        units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
-        if web.input().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
-
-        return self.ok(units)
+        criteria = self._get_criteria_from_get(ignore_fields=('include_repos',), paginate=True)
+        return self._search(criteria, type_id, web.input().get('include_repos'))
 
     @auth_required(READ)
     def POST(self, type_id):
@@ -180,12 +203,30 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_post()
-        units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
-        if self.params().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
+        criteria = self._get_criteria_from_post(paginate=True)
+        return self._search(criteria, type_id, self.params().get('include_repos'))
 
-        return self.ok(units)
+    def _search(self, criteria, type_id, include_repos):
+        """
+        Streams the processed units matching the criteria or, if the criteria
+        has a continuation, returns a page of them.
+
+        :param criteria:        criteria of the search
+        :type  criteria:        pulp.server.db.model.criteria.Criteria
+        :param type_id:         content type id
+        :type  type_id:         str
+        :param include_repos:   iff True, adds repository memberships
+        :type  include_repos:   bool
+        :return:    response body
+        """
+        if not criteria.paginated:
+            raw_units = self.query_method(criteria)
+            return self.ok(self._process_units(raw_units, type_id, include_repos))
+
+        # the continuation is built before the units are processed
+        page = self._get_page(criteria)
+        page['items'] = list(self._process_units(page['items'], type_id, include_repos))
+        return self.ok(page)
 
 
 class ContentUnitResource(JSONController):
@@ -19,8 +19,11 @@ that certain other methods will exist.
 
 import httplib
 import logging
+import time
 
 from pulp.common import auth_utils
+from pulp.server import debugging
+from pulp.server.auth import authorization_cache
 from pulp.server.config import config
 from pulp.server.compat import wraps
 from pulp.server.exceptions import PulpException
@@ -176,6 +179,8 @@ def auth_required(operation=None, super_user_only=False):
         @wraps(method)
         def _auth_decorator(self, *args, **kwargs):
 
+            auth_start = time.time()
+
             # Check Authentication 
 
             # Run through each registered and enabled auth function
@@ -207,7 +212,9 @@ def auth_required(operation=None, super_user_only=False):
             principal_manager = factory.principal_manager()
             user_query_manager = factory.user_query_manager()
 
-            if super_user_only and not user_query_manager.is_superuser(userid):
+            if super_user_only and not authorization_cache.get(
+                    userid, authorization_cache.SUPER_USER_KEY,
+                    lambda: user_query_manager.is_superuser(userid)):
                 raise AuthenticationFailed(auth_utils.CODE_PERMISSION)
             # if the operation is None, don't check authorization
             elif operation is not None:
@@ -223,6 +230,12 @@ def auth_required(operation=None, super_user_only=False):
                 else:
                     raise AuthenticationFailed(auth_utils.CODE_PERMISSION)
 
+            auth_time = time.time() - auth_start
+            debugging.record_time(debugging.AUTH_TIME, auth_time)
+            authorization_cache.record_authorization(auth_time)
+            _LOG.debug('Authentication and authorization of [%s] for [%s] took %.2f ms' %
+                       (userid, http.resource_path(), auth_time * 1000))
+
             # Authentication and authorization succeeded. Call method and then clear principal.
             value = method(self, *args, **kwargs)
             principal_manager.clear_principal()
@@ -18,10 +18,11 @@ from gettext import gettext as _
 import web
 
 from pulp.server.auth import authorization
+from pulp.server.config import config as pulp_config
 from pulp.server.db.model.dispatch import QueuedCall
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch import history as dispatch_history
-from pulp.server.exceptions import MissingResource, PulpExecutionException
+from pulp.server.exceptions import InvalidValue, MissingResource, PulpExecutionException
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
@@ -86,9 +87,23 @@ class TaskResource(JSONController):
 
     @auth_required(authorization.READ)
     def GET(self, call_request_id):
+        """
+        Get the call report for a task.  When both the 'state' and 'wait' query
+        parameters are passed, the request is held until the task is no longer
+        in the given state or 'wait' seconds (capped by the tasks max_wait
+        setting) have elapsed, so clients may long-poll for state changes.
+        The request holds a web server thread while it waits, which is why
+        max_wait is kept short.
+        """
         link = serialization.link.link_obj('/pulp/api/v2/tasks/%s/' % call_request_id)
         coordinator = dispatch_factory.coordinator()
-        call_reports = coordinator.find_call_reports(call_request_id=call_request_id)
+        filters = self.filters(['state', 'wait'])
+        if 'state' in filters and 'wait' in filters:
+            timeout = self._wait_timeout(filters['wait'][0])
+            call_report = coordinator.wait_for_call_state_change(call_request_id, filters['state'][0], timeout)
+            call_reports = [call_report] if call_report is not None else []
+        else:
+            call_reports = coordinator.find_call_reports(call_request_id=call_request_id)
         if call_reports:
             serialized_call_report = call_reports[0].serialize()
             serialized_call_report.update(link)
@@ -100,6 +115,23 @@ class TaskResource(JSONController):
             return self.ok(serialized_call_report)
         raise TaskNotFound(call_request_id)
 
+    def _wait_timeout(self, wait):
+        """
+        Get the number of seconds to wait for a task's state to change.
+        @param wait: requested number of seconds
+        @type  wait: str
+        @return: requested seconds, capped by the tasks max_wait setting
+        @rtype:  float
+        @raise InvalidValue: if wait is not a non-negative number
+        """
+        try:
+            wait = float(wait)
+        except ValueError:
+            raise InvalidValue(['wait'])
+        if not wait >= 0:
+            raise InvalidValue(['wait'])
+        return min(wait, pulp_config.getfloat('tasks', 'max_wait'))
+
     @auth_required(authorization.DELETE)
     def DELETE(self, call_request_id):
         coordinator = dispatch_factory.coordinator()
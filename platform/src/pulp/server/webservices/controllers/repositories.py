@@ -26,7 +26,7 @@ from pulp.server.itineraries.repository import (
     distributor_update_itinerary,
 )
 from pulp.common.tags import action_tag, resource_tag
-from pulp.common import constants
+from pulp.common import auth_utils, constants
 from pulp.server import config as pulp_config
 from pulp.server.auth.authorization import CREATE, READ, DELETE, EXECUTE, UPDATE
 from pulp.server.db.model.criteria import UnitAssociationCriteria
@@ -34,18 +34,22 @@ from pulp.server.db.model.repository import RepoContentUnit, Repo
 from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch.call import CallRequest
+from pulp.server.util import chunks
 from pulp.server.itineraries.repo import (
     sync_with_auto_publish_itinerary, publish_itinerary)
 from pulp.server.webservices import execution
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.base import JSONController
-from pulp.server.webservices.controllers.decorators import auth_required
+from pulp.server.webservices.controllers.decorators import AuthenticationFailed, auth_required
 from pulp.server.webservices.controllers.search import SearchController
 
 # -- constants ----------------------------------------------------------------
 
 _LOG = logging.getLogger(__name__)
 
+# Number of repositories processed at a time when streaming a collection
+REPO_BATCH_SIZE = 1000
+
 # -- functions ----------------------------------------------------------------
 
 def _merge_related_objects(name, manager, repos):
@@ -129,6 +133,31 @@ class RepoCollection(JSONController):
 
         return repos
 
+    @staticmethod
+    def _process_repos_iter(repos, importers=False, distributors=False):
+        """
+        Generator counterpart of _process_repos. The repositories are read and
+        processed REPO_BATCH_SIZE at a time so they can be streamed to the
+        client.
+
+        @param repos: collection of repositories
+        @type  repos: iterable
+
+        @param importers:   iff True, adds related importers under the
+                            attribute "importers".
+        @type  importers:   bool
+
+        @param distributors:    iff True, adds related distributors under the
+                                attribute "distributors".
+        @type  distributors:    bool
+
+        @return generator of the processed repositories
+        @rtype  generator
+        """
+        for batch in chunks(repos, REPO_BATCH_SIZE):
+            for repo in RepoCollection._process_repos(batch, importers, distributors):
+                yield repo
+
     @auth_required(READ)
     def GET(self):
         """
@@ -138,20 +167,20 @@ class RepoCollection(JSONController):
         'distributors'.
         """
         query_params = web.input()
-        all_repos = list(Repo.get_collection().find(projection = {'scratchpad' : 0}))
+        all_repos = Repo.get_collection().find(projection = {'scratchpad' : 0})
 
         if query_params.get('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
 
-        self._process_repos(
+        repos = self._process_repos_iter(
             all_repos,
             query_params.get('importers', False),
             query_params.get('distributors', False)
         )
 
         # Return the repos or an empty list; either way it's a 200
-        return self.ok(all_repos)
+        return self.ok(repos)
 
     @auth_required(CREATE)
     def POST(self):
@@ -203,15 +232,13 @@ class RepoSearch(SearchController):
         if query_params.pop('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
-        items = self._get_query_results_from_get(
-            ('details', 'importers', 'distributors'))
+        criteria = self._get_criteria_from_get(('details', 'importers', 'distributors'), paginate=True)
 
-        RepoCollection._process_repos(
-            items,
+        return self._search(
+            criteria,
             query_params.pop('importers', False),
             query_params.pop('distributors', False)
         )
-        return self.ok(items)
 
     @auth_required(READ)
     def POST(self):
@@ -220,13 +247,27 @@ class RepoSearch(SearchController):
         'criteria' which has a data structure that can be turned into a
         Criteria instance.
         """
-        items = self._get_query_results_from_post()
+        criteria = self._get_criteria_from_post(paginate=True)
 
-        RepoCollection._process_repos(
-            items,
+        return self._search(
+            criteria,
             self.params().get('importers', False),
             self.params().get('distributors', False)
         )
+
+    def _search(self, criteria, include_importers, include_distributors):
+        """
+        Returns the processed repos matching the criteria or, if the criteria
+        has a continuation, a page of them.
+        """
+        if criteria.paginated:
+            # the continuation is built before the repos are processed
+            page = self._get_page(criteria)
+            RepoCollection._process_repos(page['items'], include_importers, include_distributors)
+            return self.ok(page)
+
+        items = list(self.query_method(criteria))
+        RepoCollection._process_repos(items, include_importers, include_distributors)
         return self.ok(items)
 
 
@@ -1034,6 +1075,73 @@ class RepoUnitAdvancedSearch(JSONController):
         if query is None:
             raise exceptions.MissingValue(['criteria'])
 
+        try:
+            criteria = UnitAssociationCriteria.from_client_input(query, paginate=True)
+        except:
+            _LOG.error('Error parsing association criteria [%s]' % query)
+            raise exceptions.PulpDataException(), None, sys.exc_info()[2]
+
+        manager = manager_factory.repo_unit_association_query_manager()
+
+        if criteria.paginated:
+            units, continuation = manager.get_units_page(repo_id, criteria)
+            return self.ok({'items' : units, 'continuation' : continuation})
+
+        # Data lookup; the units are streamed to the client as they are read
+        units = manager.get_units_iter(repo_id, criteria=criteria)
+
+        return self.ok(units)
+
+class RepoUnitsSearch(JSONController):
+
+    # Scope: Search
+    # POST:  Advanced search for the unit associations of multiple repos
+
+    @auth_required(READ)
+    def POST(self):
+        """
+        Performs the search RepoUnitAdvancedSearch performs for each of the
+        given repositories, with a fixed number of database queries. The
+        user must be authorized to read each of the repositories.
+
+        @return: dict of repository ID to the list of its unit associations
+        @rtype:  dict
+        """
+        # Params
+        params = self.params()
+        repo_ids = params.get('repo_ids', None)
+        query = params.get('criteria', None)
+
+        if repo_ids is None:
+            raise exceptions.MissingValue(['repo_ids'])
+
+        if not isinstance(repo_ids, list) or not repo_ids or \
+                [r for r in repo_ids if not isinstance(r, basestring)]:
+            raise exceptions.InvalidValue(['repo_ids'])
+
+        # READ on this resource does not imply READ on each repository. Consumers
+        # run as the system principal and may read all repositories.
+        principal_manager = manager_factory.principal_manager()
+        if not principal_manager.is_system_principal():
+            login = principal_manager.get_principal()['login']
+            user_query_manager = manager_factory.user_query_manager()
+            for repo_id in repo_ids:
+                if not user_query_manager.is_authorized('/v2/repositories/%s/' % repo_id, login, READ):
+                    raise AuthenticationFailed(auth_utils.CODE_PERMISSION)
+
+        repo_query_manager = manager_factory.repo_query_manager()
+        found_ids = set(r['id'] for r in repo_query_manager.find_by_id_list(repo_ids))
+        missing_ids = [r for r in repo_ids if r not in found_ids]
+        if missing_ids:
+            raise exceptions.MissingResource(repositories=missing_ids)
+
+        if query is None:
+            raise exceptions.MissingValue(['criteria'])
+
+        # the units of several repositories are not paged
+        if isinstance(query, dict) and 'continuation' in query:
+            raise exceptions.InvalidValue(['continuation'])
+
         try:
             criteria = UnitAssociationCriteria.from_client_input(query)
         except:
@@ -1042,13 +1150,9 @@ class RepoUnitAdvancedSearch(JSONController):
 
         # Data lookup
         manager = manager_factory.repo_unit_association_query_manager()
-        if criteria.type_ids is not None and len(criteria.type_ids) == 1:
-            type_id = criteria.type_ids[0]
-            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
-        else:
-            units = manager.get_units_across_types(repo_id, criteria=criteria)
+        units_by_repo = manager.get_units_by_repos(repo_ids, criteria=criteria)
 
-        return self.ok(units)
+        return self.ok(units_by_repo)
 
 # -- web.py application -------------------------------------------------------
 
@@ -1056,6 +1160,7 @@ class RepoUnitAdvancedSearch(JSONController):
 urls = (
     '/', 'RepoCollection', # collection
     '/search/$', 'RepoSearch', # resource search
+    '/search/units/$', 'RepoUnitsSearch', # multiple resource search
     '/([^/]+)/$', 'RepoResource', # resource
 
     '/([^/]+)/importers/$', 'RepoImporters', # sub-collection
@@ -38,8 +38,14 @@ class SearchController(JSONController):
         separate key-value pairs as is normal with query parameters in URLs. For
         example, '/v2/sometype/search/?field=id&field=display_name' will
         return the fields 'id' and 'display_name'.
+
+        If the 'continuation' parameter is passed, a page of results is
+        returned; see _get_page.
         """
-        return self.ok(self._get_query_results_from_get())
+        criteria = self._get_criteria_from_get(paginate=True)
+        if criteria.paginated:
+            return self.ok(self._get_page(criteria))
+        return self.ok(self.query_method(criteria))
 
     @auth_required(READ)
     def POST(self):
@@ -52,17 +58,53 @@ class SearchController(JSONController):
                             an instance of the Criteria model.
         @type  criteria:    dict
 
-        @return:    list of matching items
-        @rtype:     list
+        @return:    list of matching items, or a page of them if the criteria
+                    has a continuation
+        @rtype:     list or dict
+        """
+        criteria = self._get_criteria_from_post(paginate=True)
+        if criteria.paginated:
+            return self.ok(self._get_page(criteria))
+        return self.ok(self.query_method(criteria))
+
+    def _get_page(self, criteria):
         """
+        Returns a page of the results of a search based on a paginated
+        Criteria. The page is a dict of the list of results under 'items', and
+        the continuation to pass in the criteria to get the next page under
+        'continuation', which is None for the last page.
 
-        return self.ok(self._get_query_results_from_post())
+        @param criteria:    criteria with a continuation, an empty string for
+                            the first page
+        @type  criteria:    pulp.server.db.model.criteria.Criteria
+
+        @return:    page of results
+        @rtype:     dict
+        """
+        items = list(self.query_method(criteria))
+        return {'items' : items, 'continuation' : criteria.next_continuation(items)}
 
     def _get_query_results_from_get(self, ignore_fields=None, is_user_search=False):
         """
         Looks for query parameters that define a Criteria, and returns the
         results of a search based on that Criteria.
 
+        @param ignore_fields:   Field names to ignore. See _get_criteria_from_get
+        @type  ignore_fields:   list
+
+        @type is_user_search:   True if executing a user search.
+
+        @return:    list of documents from the DB that match the given criteria
+                    for the collection associated with this controller
+        @rtype:     list
+        """
+        criteria = self._get_criteria_from_get(ignore_fields, is_user_search)
+        return list(self.query_method(criteria))
+
+    def _get_criteria_from_get(self, ignore_fields=None, is_user_search=False, paginate=False):
+        """
+        Looks for query parameters that define a Criteria, and returns it.
+
         @param ignore_fields:   Field names to ignore. All other fields will be
                                 used in an attempt to generate a Criteria
                                 instance, which will fail if unexpected field
@@ -74,9 +116,14 @@ class SearchController(JSONController):
 
         @type is_user_search
 
-        @return:    list of documents from the DB that match the given criteria
-                    for the collection associated with this controller
-        @rtype:     list
+        @param paginate:        True if the caller returns a page of the results
+                                when the criteria has a continuation; see
+                                Criteria.from_client_input
+        @type  paginate:        bool
+
+        @return:    criteria for a search of the collection associated with
+                    this controller
+        @rtype:     pulp.server.db.model.criteria.Criteria
         """
         input = self._ensure_input_encoding(web.input(field=[]))
         if ignore_fields:
@@ -93,8 +140,7 @@ class SearchController(JSONController):
                 fields.append('login')
             input['fields'] = fields
 
-        criteria = Criteria.from_client_input(input)
-        return list(self.query_method(criteria))
+        return Criteria.from_client_input(input, paginate)
 
     def _get_query_results_from_post(self, is_user_search=False):
         """
@@ -105,14 +151,31 @@ class SearchController(JSONController):
                     for the collection associated with this controller
         @rtype:     list
         """
+        criteria = self._get_criteria_from_post(is_user_search)
+        return list(self.query_method(criteria))
+
+    def _get_criteria_from_post(self, is_user_search=False, paginate=False):
+        """
+        Looks for a Criteria passed as a POST parameter on key 'criteria', and
+        returns it.
+
+        @param paginate:    True if the caller returns a page of the results
+                            when the criteria has a continuation; see
+                            Criteria.from_client_input
+        @type  paginate:    bool
+
+        @return:    criteria for a search of the collection associated with
+                    this controller
+        @rtype:     pulp.server.db.model.criteria.Criteria
+        """
         try:
             criteria_param = self.params()['criteria']
         except KeyError:
             raise exceptions.MissingValue(['criteria'])
-        criteria = Criteria.from_client_input(criteria_param)
+        criteria = Criteria.from_client_input(criteria_param, paginate)
         if criteria.fields:
             if not is_user_search and 'id' not in criteria.fields and u'id' not in criteria.fields:
                 criteria.fields.append('id')
             if is_user_search and 'login' not in criteria.fields and u'login' not in criteria.fields:
                 criteria.fields.append('login')
-        return list(self.query_method(criteria))
+        return criteria
@@ -12,12 +12,18 @@
 # see http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
 
 """
-Unauthenticated status API so that other can make sure we're up (to no good).
+Unauthenticated status API so that other can make sure we're up (to no good),
+along with the (authenticated) request profiling totals and database metrics.
 """
 
 import web
 
+from pulp.server import debugging
+from pulp.server.auth import authorization_cache
+from pulp.server.auth.authorization import READ
+from pulp.server.db import metrics
 from pulp.server.webservices.controllers.base import JSONController
+from pulp.server.webservices.controllers.decorators import auth_required
 
 # status controller ------------------------------------------------------------
 
@@ -27,8 +33,39 @@ class StatusController(JSONController):
         status_data = {'api_version': '2'}
         return self.ok(status_data)
 
+
+class RequestStatistics(JSONController):
+
+    # GET: totals over the requests profiled since the server started
+
+    @auth_required(READ)
+    def GET(self):
+        if debugging.PROFILER is None:
+            return self.ok({'enabled': False})
+        statistics = {'enabled': True,
+                      'requests': debugging.PROFILER.statistics(),
+                      'authorization': authorization_cache.statistics()}
+        return self.ok(statistics)
+
+
+class DatabaseMetrics(JSONController):
+
+    # GET: database metrics aggregated since the server started
+
+    @auth_required(READ)
+    def GET(self):
+        metrics_report = metrics.report()
+        if metrics_report is None:
+            return self.ok({'enabled': False})
+        metrics_report['enabled'] = True
+        return self.ok(metrics_report)
+
 # web.py application -----------------------------------------------------------
 
-URLS = ('/', StatusController)
+URLS = (
+    '/', StatusController,
+    '/requests/$', RequestStatistics,
+    '/database/$', DatabaseMetrics,
+)
 
 application = web.application(URLS, globals())
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+
+class ProfilingMiddleware(object):
+    """
+    Profile each request with the request profiler. The profile is finished
+    once the response body has been written, as streamed bodies are encoded,
+    and their database cursors read, while they are written.
+    """
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        self.profiler.start(environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'))
+        try:
+            body = self.app(environ, start_response)
+        except:
+            self.profiler.finish()
+            raise
+        return self._write(body)
+
+    def _write(self, body):
+        try:
+            for chunk in body:
+                yield chunk
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            self.profiler.finish()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import mock
+import unittest
+
+from pulp.server.auth import authorization_cache
+from pulp.server.config import config
+
+
+class AuthorizationCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = authorization_cache.AuthorizationCache()
+        self.load = mock.Mock(return_value=[1, 2])
+
+    def test_get_cached(self):
+        # Test
+        first = self.cache.get('user-1', '/v2/repositories/', self.load)
+        second = self.cache.get('user-1', '/v2/repositories/', self.load)
+
+        # Verify
+        self.assertEqual([1, 2], first)
+        self.assertEqual([1, 2], second)
+        self.assertEqual(1, self.load.call_count)
+
+        stats = self.cache.statistics()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(1, stats['entries'])
+
+    def test_get_keyed_by_login_and_resource(self):
+        # Test
+        self.cache.get('user-1', '/v2/repositories/', self.load)
+        self.cache.get('user-2', '/v2/repositories/', self.load)
+        self.cache.get('user-1', authorization_cache.SUPER_USER_KEY, self.load)
+
+        # Verify
+        self.assertEqual(3, self.load.call_count)
+
+    @mock.patch('time.time')
+    def test_get_expired(self, mock_time):
+        # Setup
+        ttl = config.getint('security', 'authorization_cache_ttl')
+        mock_time.return_value = 1000
+        self.cache.get('user-1', '/', self.load)
+
+        # Test
+        mock_time.return_value = 1000 + ttl + 1
+        self.cache.get('user-1', '/', self.load)
+
+        # Verify
+        self.assertEqual(2, self.load.call_count)
+
+    @mock.patch('time.time')
+    def test_get_purges_expired(self, mock_time):
+        # Setup
+        ttl = config.getint('security', 'authorization_cache_ttl')
+        mock_time.return_value = 1000
+        self.cache.get('user-1', '/', self.load)
+
+        # Test
+        mock_time.return_value = 1000 + ttl + 1
+        self.cache.get('user-2', '/', self.load)
+
+        # Verify
+        self.assertEqual(1, self.cache.statistics()['entries'])
+
+    @mock.patch('pulp.server.auth.authorization_cache.config')
+    def test_get_evicts_least_recently_used(self, mock_config):
+        # Setup
+        mock_config.getint.side_effect = lambda section, option: {
+            'authorization_cache_ttl' : 60, 'authorization_cache_size' : 2}[option]
+        self.cache.get('user-1', '/', self.load)
+        self.cache.get('user-2', '/', self.load)
+        self.cache.get('user-1', '/', self.load)
+
+        # Test
+        self.cache.get('user-3', '/', self.load)
+
+        # Verify
+        stats = self.cache.statistics()
+        self.assertEqual(2, stats['entries'])
+        self.assertEqual(1, stats['evictions'])
+        self.cache.get('user-1', '/', self.load)
+        self.assertEqual(3, self.load.call_count)
+        self.cache.get('user-2', '/', self.load)
+        self.assertEqual(4, self.load.call_count)
+
+    @mock.patch('pulp.server.auth.authorization_cache.config')
+    def test_get_evicts_in_batches(self, mock_config):
+        # Setup
+        mock_config.getint.side_effect = lambda section, option: {
+            'authorization_cache_ttl' : 60, 'authorization_cache_size' : 20}[option]
+        for i in range(20):
+            self.cache.get('user-%d' % i, '/', self.load)
+        self.cache.get('user-0', '/', self.load)
+
+        # Test
+        self.cache.get('user-20', '/', self.load)
+
+        # Verify
+        stats = self.cache.statistics()
+        self.assertEqual(19, stats['entries'])
+        self.assertEqual(2, stats['evictions'])
+        self.cache.get('user-0', '/', self.load)
+        self.assertEqual(21, self.load.call_count)
+        self.cache.get('user-1', '/', self.load)
+        self.assertEqual(22, self.load.call_count)
+
+    def test_add_authorization(self):
+        # Test
+        self.cache.add_authorization(0.5)
+        self.cache.add_authorization(0.25)
+
+        # Verify
+        stats = self.cache.statistics()
+        self.assertEqual(2, stats['authorizations'])
+        self.assertEqual(0.75, stats['authorization_time'])
+
+    def test_get_load_error(self):
+        # Setup
+        self.load.side_effect = Exception()
+
+        # Test
+        self.assertRaises(Exception, self.cache.get, 'user-1', '/', self.load)
+
+        # Verify
+        self.assertEqual(0, self.cache.statistics()['entries'])
+
+    def test_invalidate_login(self):
+        # Setup
+        self.cache.get('user-1', '/', self.load)
+        self.cache.get('user-2', '/', self.load)
+
+        # Test
+        self.cache.invalidate('user-1')
+
+        # Verify
+        self.cache.get('user-1', '/', self.load)
+        self.cache.get('user-2', '/', self.load)
+        self.assertEqual(3, self.load.call_count)
+
+    def test_invalidate_all(self):
+        # Setup
+        self.cache.get('user-1', '/', self.load)
+        self.cache.get('user-2', '/', self.load)
+
+        # Test
+        self.cache.invalidate()
+
+        # Verify
+        self.assertEqual(0, self.cache.statistics()['entries'])
+
+    def test_invalidate_during_load(self):
+        # Setup
+        def load():
+            self.cache.invalidate('user-1')
+            return [1]
+
+        # Test
+        self.cache.get('user-1', '/', load)
+
+        # Verify
+        self.assertEqual(0, self.cache.statistics()['entries'])
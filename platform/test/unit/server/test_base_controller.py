@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+
+from pulp.server.compat import json
+from pulp.server.webservices.controllers import base
+
+
+class TestOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = base.JSONController()
+
+    @mock.patch('pulp.server.webservices.http.header')
+    def test_output(self, mock_header):
+        body = self.controller._output([{'a': 1}])
+
+        self.assertEqual(json.loads(body), [{'a': 1}])
+        mock_header.assert_any_call('Content-Length', len(body))
+
+    @mock.patch('pulp.server.webservices.http.header')
+    def test_output_iterator(self, mock_header):
+        items = ({'id': i} for i in range(3))
+
+        body = self.controller._output(items)
+
+        self.assertEqual(json.loads(''.join(body)), [{'id': 0}, {'id': 1}, {'id': 2}])
+        mock_header.assert_called_once_with('Content-Type', 'application/json')
+
+    def test_stream_empty(self):
+        chunks = list(self.controller._stream(iter([])))
+
+        self.assertEqual(chunks, ['[]'])
+
+    @mock.patch('pulp.server.webservices.controllers.base.STREAM_CHUNK_SIZE', 100)
+    def test_stream_chunks(self):
+        items = [{'id': i, 'name': 'item-%d' % i} for i in range(100)]
+
+        chunks = list(self.controller._stream(iter(items)))
+
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks[:-1]:
+            self.assertTrue(len(chunk) < 200)
+        self.assertEqual(json.loads(''.join(chunks)), items)
+
+    def test_stream_lazy(self):
+        items = mock.MagicMock()
+        items.__iter__.return_value = iter([1, 2])
+
+        stream = self.controller._stream(items)
+
+        self.assertFalse(items.__iter__.called)
+        self.assertEqual(json.loads(''.join(stream)), [1, 2])
@@ -16,7 +16,6 @@ import unittest
 
 from pulp.plugins.conduits import mixins
 from pulp.plugins.model import Unit, PublishReport
-from pulp.server.exceptions import MissingResource
 from pulp.server.managers import factory as manager_factory
 
 class RepoScratchPadMixinTests(unittest.TestCase):
@@ -150,6 +149,42 @@ class SingleRepoUnitsMixinTests(unittest.TestCase):
         self.assertRaises(mixins.DistributorConduitException, self.mixin.get_units)
 
 
+    @mock.patch('pulp.plugins.types.database.type_definition')
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.get_units_iter')
+    def test_get_units_iter(self, mock_query_call, mock_type_def_call):
+        # Setup
+        mock_query_call.return_value = iter([
+            {'unit_type_id' : 'type-1', 'metadata' : {'m' : 'm1', 'k1' : 'v1'}},
+            {'unit_type_id' : 'type-1', 'metadata' : {'m' : 'm1', 'k1' : 'v2'}},
+        ])
+
+        mock_type_def_call.return_value = {
+            'id' : 'mock-type-def',
+            'unit_key' : ['k1']
+        }
+
+        fake_criteria = 'fake-criteria'
+
+        # Test
+        units = self.mixin.get_units_iter(criteria=fake_criteria, batch_size=10)
+
+        # Verify
+        self.assertFalse(isinstance(units, list))
+        units = list(units)
+        self.assertEqual(2, len(units))
+        self.assertEqual([u.unit_key for u in units], [{'k1' : 'v1'}, {'k1' : 'v2'}])
+        self.assertEqual(1, mock_type_def_call.call_count)
+        mock_query_call.assert_called_once_with(self.repo_id, criteria=fake_criteria, batch_size=10)
+
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.get_units_iter')
+    def test_get_units_iter_server_error(self, mock_query_call):
+        # Setup
+        mock_query_call.side_effect = Exception()
+
+        # Test
+        units = self.mixin.get_units_iter()
+        self.assertRaises(mixins.DistributorConduitException, list, units)
+
 class MultipleRepoUnitsMixinTests(unittest.TestCase):
 
     def setUp(self):
@@ -421,15 +456,15 @@ class AddUnitMixinTests(unittest.TestCase):
         self.assertRaises(mixins.ImporterConduitException, self.mixin.init_unit, 't', {'k' : 'v'}, {'m' : 'm1'}, '/bar')
 
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
-    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
     @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
-    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
-    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_unit_by_id')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
     def test_save_unit_new_unit(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
         # Setup
         unit = self.mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm1'}, '/bar')
-        mock_get.side_effect = MissingResource()
-        mock_add.return_value = 'new-unit-id'
+        mock_get.return_value = ()
+        mock_add.return_value = ['new-unit-id']
 
         # Test
         saved = self.mixin.save_unit(unit)
@@ -444,14 +479,15 @@ class AddUnitMixinTests(unittest.TestCase):
         self.assertEqual(saved.id, 'new-unit-id')
 
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
-    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
     @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
-    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
-    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_unit_by_id')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
     def test_save_unit_updated_unit(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
         # Setup
         unit = self.mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm1'}, '/bar')
-        mock_get.return_value = {'_id' : 'existing'}
+        mock_get.return_value = ({'_id' : 'existing', 'k' : 'v'},)
+        mock_add.return_value = []
 
         # Test
         saved = self.mixin.save_unit(unit)
@@ -459,17 +495,37 @@ class AddUnitMixinTests(unittest.TestCase):
         # Verify
         self.assertEqual(1, mock_get.call_count)
         self.assertEqual(1, mock_update.call_count)
-        self.assertEqual(0, mock_add.call_count)
-        self.assertEqual(1, mock_associate.call_count)
         self.assertEqual(0, self.mixin._added_count)
         self.assertEqual(1, self.mixin._updated_count)
         self.assertEqual(saved.id, 'existing')
+        mock_associate.assert_called_once_with(self.repo_id, 't', ['existing'],
+                                               self.association_owner_type, self.association_owner_id)
 
     @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
-    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_content_unit_by_keys_dict')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
     @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
-    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_unit')
-    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_unit_by_id')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_save_unit_unchanged_unit(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
+        # Setup
+        mock_path.return_value = '/tmp/bar'
+        unit = self.mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm1'}, '/bar')
+        mock_get.return_value = ({'_id' : 'existing', 'k' : 'v', 'm' : 'm1', '_storage_path' : '/tmp/bar'},)
+        mock_add.return_value = []
+
+        # Test
+        self.mixin.save_unit(unit)
+
+        # Verify the unit is counted but not written
+        self.assertEqual(0, mock_update.call_count)
+        self.assertEqual(1, self.mixin._updated_count)
+        self.assertEqual(1, mock_associate.call_count)
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
     def test_save_unit_with_error(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
         # Setup
         mock_get.side_effect = Exception()
@@ -477,6 +533,113 @@ class AddUnitMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.save_unit, None)
 
+        unit = self.mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm1'}, '/bar')
+        self.assertRaises(mixins.ImporterConduitException, self.mixin.save_unit, unit)
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_save_unit_batched(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
+        # Setup
+        mixin = mixins.AddUnitMixin(self.repo_id, self.importer_id, self.association_owner_type,
+                                    self.association_owner_id, unit_batch_size=3)
+        units = [mixin.init_unit('t', {'k' : 'v%d' % i}, {'m' : 'm1'}, None) for i in range(4)]
+        mock_get.return_value = ({'_id' : 'existing', 'k' : 'v1'},)
+        mock_add.side_effect = lambda type_id, metadata: ['new-%s' % m['k'] for m in metadata]
+
+        # Test
+        for unit in units:
+            mixin.save_unit(unit)
+
+        # Verify the first batch was written when it filled up
+        self.assertEqual(1, mock_get.call_count)
+        self.assertEqual(1, mock_add.call_count)
+        self.assertEqual(1, mock_associate.call_count)
+        self.assertEqual(mock_associate.call_args[0][2], ['new-v0', 'existing', 'new-v2'])
+        self.assertEqual(2, mixin._added_count)
+        self.assertEqual(1, mixin._updated_count)
+        self.assertTrue(units[3].id is None)
+
+        # Verify the remainder is written on flush
+        mock_get.return_value = ()
+        mixin.flush_units()
+        self.assertEqual(2, mock_associate.call_count)
+        self.assertEqual(units[3].id, 'new-v3')
+        self.assertEqual(3, mixin._added_count)
+
+        # Verify flushing without buffered units has no effect
+        mixin.flush_units()
+        self.assertEqual(2, mock_get.call_count)
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.update_content_unit')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_save_unit_batched_duplicate(self, mock_associate, mock_add, mock_update, mock_get, mock_path):
+        # Setup
+        mixin = mixins.AddUnitMixin(self.repo_id, self.importer_id, self.association_owner_type,
+                                    self.association_owner_id, unit_batch_size=10)
+        mock_get.return_value = ()
+        mock_add.return_value = ['new-unit-id']
+
+        # Test
+        mixin.save_unit(mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm1'}, None))
+        mixin.save_unit(mixin.init_unit('t', {'k' : 'v'}, {'m' : 'm2'}, None))
+
+        # Verify the second save caused the first to be written
+        self.assertEqual(1, mock_add.call_count)
+        self.assertEqual(1, mixin._added_count)
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_flush_units_error(self, mock_associate, mock_add, mock_get, mock_path):
+        # Setup
+        mixin = mixins.AddUnitMixin(self.repo_id, self.importer_id, self.association_owner_type,
+                                    self.association_owner_id, unit_batch_size=10)
+        mock_get.return_value = ()
+        mock_add.side_effect = [['new-unit-id'], Exception('boom')]
+        saved = mixin.init_unit('t1', {'k' : 'saved'}, {}, None)
+        failed = mixin.init_unit('t2', {'k' : 'failed'}, {}, None)
+        mixin.save_unit(saved)
+        mixin.save_unit(failed)
+
+        # Test
+        try:
+            mixin.flush_units()
+            self.fail()
+        except mixins.ImporterConduitException, e:
+            self.assertTrue('failed' in str(e))
+            self.assertFalse('saved' in str(e))
+
+        # Verify only the units not written are kept in the buffer
+        self.assertEqual(saved.id, 'new-unit-id')
+        self.assertEqual(mixin._unsaved_units, [failed])
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.request_content_unit_file_path')
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
+    @mock.patch('pulp.server.managers.content.cud.ContentManager.add_content_units')
+    @mock.patch('pulp.server.managers.repo.unit_association.RepoUnitAssociationManager.associate_all_by_ids')
+    def test_set_unit_batch_size(self, mock_associate, mock_add, mock_get, mock_path):
+        # Setup
+        mixin = mixins.AddUnitMixin(self.repo_id, self.importer_id, self.association_owner_type,
+                                    self.association_owner_id, unit_batch_size=10)
+        mock_get.return_value = ()
+        mock_add.return_value = ['new-unit-id']
+        unit = mixin.init_unit('t', {'k' : 'v'}, {}, None)
+        mixin.save_unit(unit)
+
+        # Test
+        mixin.set_unit_batch_size(1)
+
+        # Verify the buffered unit was written
+        self.assertEqual(unit.id, 'new-unit-id')
+        self.assertEqual(mixin.unit_batch_size, 1)
+
     @mock.patch('pulp.server.managers.content.cud.ContentManager.link_referenced_content_units')
     def test_link_unit(self, mock_link):
         # Setup
@@ -19,6 +19,7 @@ import traceback
 from pprint import pformat
 
 import base
+import mock
 
 from pulp.server import exceptions as pulp_exceptions
 from pulp.plugins.types import database as content_type_db
@@ -183,6 +184,14 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
                           self.orphan_manager.get_orphan,
                           PHONY_TYPE_1.id, 'non-existent')
 
+    def test_get_associated_orphan_using_generators(self):
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+
+        self.assertRaises(pulp_exceptions.MissingResource,
+                          self.orphan_manager.get_orphan,
+                          PHONY_TYPE_1.id, unit['_id'])
+
     def test_associated_units_using_generators(self):
         unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
         associate_content_unit_with_repo(unit)
@@ -250,6 +259,20 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertFalse(os.path.exists(unit_1['_storage_path']))
         self.assertTrue(os.path.exists(unit_2['_storage_path']))
 
+    @mock.patch('pulp.server.managers.content.orphan._DELETE_CHUNK_SIZE', 2)
+    @mock.patch('pulp.server.dispatch.factory.context')
+    def test_delete_in_chunks_with_progress(self, mock_context):
+        reported = []
+        mock_context.return_value.report_progress.side_effect = lambda p: reported.append(dict(p))
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        associate_content_unit_with_repo(units[0])
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
+
+        self.assertEqual(reported, [{PHONY_TYPE_1.id: 2}, {PHONY_TYPE_1.id: 4}])
+        self.assertEqual(self.number_of_files_in_content_root(), 1)
+        self.assertTrue(os.path.exists(units[0]['_storage_path']))
+
     def test_delete_by_id_using_generators(self):
         unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
 
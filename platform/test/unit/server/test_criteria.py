@@ -13,10 +13,12 @@
 
 import unittest
 
+import pymongo
+
 from pulp.server.db.model import criteria
 from pulp.server import exceptions
 
-FIELDS = set(('sort', 'skip', 'limit', 'filters', 'fields'))
+FIELDS = set(('sort', 'skip', 'limit', 'filters', 'fields', 'continuation'))
 
 class TestAsDict(unittest.TestCase):
     def test_empty(self):
@@ -259,3 +261,105 @@ class TestValidateFields(unittest.TestCase):
         self.assertRaises(exceptions.InvalidValue, criteria._validate_fields,
             input)
 
+
+class TestValidateContinuation(unittest.TestCase):
+    def test_as_string(self):
+        ret = criteria._validate_continuation('abc', None, True)
+        self.assertEqual(ret, 'abc')
+
+    def test_as_empty_string(self):
+        ret = criteria._validate_continuation('', None, True)
+        self.assertEqual(ret, '')
+
+    def test_as_none(self):
+        ret = criteria._validate_continuation(None, 10, False)
+        self.assertTrue(ret is None)
+
+    def test_as_int(self):
+        self.assertRaises(exceptions.InvalidValue, criteria._validate_continuation, 3, None, True)
+
+    def test_with_skip(self):
+        self.assertRaises(exceptions.InvalidValue, criteria._validate_continuation, '', 10, True)
+
+    def test_not_paginated(self):
+        self.assertRaises(exceptions.InvalidValue, criteria._validate_continuation, '', None, False)
+
+
+class TestContinuation(unittest.TestCase):
+    SORT = [('name', pymongo.ASCENDING), ('version', pymongo.DESCENDING), ('_id', pymongo.ASCENDING)]
+
+    def test_from_client_input(self):
+        c = criteria.Criteria.from_client_input({'limit' : 2, 'continuation' : ''}, paginate=True)
+        self.assertTrue(c.paginated)
+        self.assertEqual(c.page_limit, 2)
+        self.assertEqual(c.spec, None)
+
+    def test_from_client_input_not_paginated(self):
+        # callers that don't return the next continuation must not cut the results off at a page
+        self.assertRaises(exceptions.InvalidValue, criteria.Criteria.from_client_input,
+                          {'continuation' : ''})
+
+    def test_unit_association_with_unit_sort(self):
+        # pages are read from the associations, so they can't be sorted by unit
+        query = {'type_ids' : ['rpm'], 'sort' : {'unit' : [['name', 'ascending']]}, 'continuation' : ''}
+        self.assertRaises(exceptions.InvalidValue, criteria.UnitAssociationCriteria.from_client_input,
+                          query, paginate=True)
+
+    def test_not_paginated(self):
+        c = criteria.Criteria(filters={'name' : 'a'})
+        self.assertFalse(c.paginated)
+        self.assertEqual(c.spec, {'name' : 'a'})
+
+    def test_page_sort(self):
+        c = criteria.Criteria(sort=[('name', pymongo.ASCENDING)], continuation='')
+        self.assertEqual(c.page_sort, [('name', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)])
+
+    def test_page_sort_with_id(self):
+        c = criteria.Criteria(sort=[('_id', pymongo.DESCENDING)], continuation='')
+        self.assertEqual(c.page_sort, [('_id', pymongo.DESCENDING)])
+
+    def test_page_fields(self):
+        c = criteria.Criteria(sort=[('name', pymongo.ASCENDING)], fields=['id'], continuation='')
+        self.assertEqual(c.page_fields, ['id', 'name', '_id'])
+
+    def test_next_continuation_last_page(self):
+        c = criteria.Criteria(limit=3, continuation='')
+        self.assertTrue(c.next_continuation([{'_id' : 1}, {'_id' : 2}]) is None)
+
+    def test_spec(self):
+        c = criteria.Criteria(filters={'arch' : 'noarch'}, sort=self.SORT, limit=2, continuation='')
+        continuation = c.next_continuation([{'_id' : 1}, {'_id' : 2, 'name' : 'a', 'version' : '1'}])
+
+        c = criteria.Criteria(filters={'arch' : 'noarch'}, sort=self.SORT, continuation=continuation)
+
+        expected = {'$and' : [{'arch' : 'noarch'}, {'$or' : [
+            {'name' : {'$gt' : 'a'}},
+            {'name' : 'a', 'version' : {'$lt' : '1'}},
+            {'name' : 'a', 'version' : None},
+            {'name' : 'a', 'version' : '1', '_id' : {'$gt' : 2}},
+        ]}]}
+        self.assertEqual(c.spec, expected)
+
+    def test_spec_null_values(self):
+        continuation = criteria.encode_continuation({'_id' : 2}, self.SORT)
+
+        spec = criteria.after_continuation(None, self.SORT, continuation)
+
+        expected = {'$or' : [
+            {'name' : {'$ne' : None}},
+            {'name' : None, 'version' : None, '_id' : {'$gt' : 2}},
+        ]}
+        self.assertEqual(spec, expected)
+
+    def test_nested_field(self):
+        sort = [('notes.type', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)]
+        continuation = criteria.encode_continuation({'_id' : 2, 'notes' : {'type' : 'rpm'}}, sort)
+
+        spec = criteria.after_continuation({}, sort, continuation)
+
+        self.assertEqual(spec['$or'][0], {'notes.type' : {'$gt' : 'rpm'}})
+
+    def test_invalid(self):
+        for continuation in ('not a continuation', 'W10=', criteria.encode_continuation({}, self.SORT[:1])):
+            self.assertRaises(exceptions.InvalidValue, criteria.after_continuation, None, self.SORT,
+                              continuation)
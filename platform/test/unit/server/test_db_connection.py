@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+from pymongo.cursor import Cursor
+
+from pulp.server.db import connection
+
+
+class FakeCursor(Cursor):
+    """
+    Cursor over a list of documents that does not query the database.
+    """
+
+    collection = mock.Mock()
+    collection.name = 'repos'
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.iterator = iter(documents)
+
+    def __del__(self):
+        pass
+
+    def next(self):
+        return self.iterator.next()
+
+    def limit(self, limit):
+        return self
+
+    def clone(self):
+        return FakeCursor(self.documents)
+
+    def count(self):
+        return len(self.documents)
+
+
+@mock.patch('pulp.server.db.connection.metrics')
+@mock.patch('pulp.server.db.connection.debugging')
+class PulpCursorTests(unittest.TestCase):
+
+    def test_iterate(self, mock_debugging, mock_metrics):
+        cursor = connection.PulpCursor(FakeCursor([{'id': 'a'}, {'id': 'b'}]), {'id': 'zoo'})
+
+        self.assertEqual(list(cursor), [{'id': 'a'}, {'id': 'b'}])
+
+        # recorded once, when exhausted
+        self.assertEqual(mock_debugging.record_query.call_count, 1)
+        self.assertEqual(mock_debugging.record_query.call_args[0][:2], ('repos', 'find'))
+        self.assertEqual(mock_debugging.record_query.call_args[0][3], {'id': 'zoo'})
+        self.assertEqual(mock_metrics.record_call.call_args[0][3], 2)
+
+    def test_partially_read(self, mock_debugging, mock_metrics):
+        cursor = connection.PulpCursor(FakeCursor([{'id': 'a'}, {'id': 'b'}]), None)
+
+        cursor.next()
+        self.assertEqual(mock_debugging.record_query.call_count, 0)
+        del cursor
+
+        self.assertEqual(mock_metrics.record_call.call_count, 1)
+        self.assertEqual(mock_metrics.record_call.call_args[0][3], 1)
+
+    def test_not_read(self, mock_debugging, mock_metrics):
+        cursor = connection.PulpCursor(FakeCursor([{'id': 'a'}]), None)
+        del cursor
+
+        self.assertEqual(mock_debugging.record_query.call_count, 0)
+
+    def test_wrapped_cursors(self, mock_debugging, mock_metrics):
+        cursor = connection.PulpCursor(FakeCursor([{'id': 'a'}]), {'id': 'zoo'})
+
+        self.assertTrue(cursor.limit(1) is cursor)
+        clone = cursor.clone()
+        self.assertTrue(isinstance(clone, connection.PulpCursor))
+        self.assertEqual(list(clone), [{'id': 'a'}])
+        self.assertEqual(mock_debugging.record_query.call_args[0][3], {'id': 'zoo'})
+        self.assertEqual(cursor.collection.name, 'repos')
+
+    def test_count(self, mock_debugging, mock_metrics):
+        cursor = connection.PulpCursor(FakeCursor([{'id': 'a'}]), None)
+
+        self.assertEqual(cursor.count(), 1)
+        self.assertEqual(mock_debugging.record_query.call_args[0][:2], ('repos', 'count'))
+
+
+@mock.patch('pulp.server.db.connection.metrics')
+@mock.patch('pulp.server.db.connection.debugging')
+class ProfileDecoratorTests(unittest.TestCase):
+
+    def _call(self, name, *args, **kwargs):
+        method = mock.Mock()
+        method.__name__ = name
+        connection._profile_decorator(method, 'users')(*args, **kwargs)
+
+    def test_update(self, mock_debugging, mock_metrics):
+        self._call('update', {'login': 'admin'}, {'$set': {'password': 'secret'}})
+
+        self.assertEqual(mock_debugging.record_query.call_args[0][3], {'login': 'admin'})
+
+    def test_remove(self, mock_debugging, mock_metrics):
+        self._call('remove', spec_or_id={'login': 'admin'})
+
+        self.assertEqual(mock_debugging.record_query.call_args[0][3], {'login': 'admin'})
+
+    def test_insert(self, mock_debugging, mock_metrics):
+        # the documents are not logged
+        self._call('insert', {'login': 'admin', 'password': 'secret'})
+        self.assertEqual(mock_debugging.record_query.call_args[0][3], None)
+
+        self._call('save', {'login': 'admin', 'password': 'secret'})
+        self.assertEqual(mock_debugging.record_query.call_args[0][3], None)
+        self.assertEqual(mock_metrics.record_call.call_args[0][:2], ('users', 'save'))
+
+
+class PulpCollectionTests(unittest.TestCase):
+
+    @mock.patch('pymongo.collection.Collection.find')
+    @mock.patch('pulp.server.db.connection.metrics.METRICS', None)
+    @mock.patch('pulp.server.db.connection.debugging.PROFILER', None)
+    def test_find_not_profiling(self, mock_find):
+        collection = connection.PulpCollection.__new__(connection.PulpCollection)
+
+        cursor = collection.find({'id': 'zoo'})
+
+        self.assertTrue(cursor is mock_find.return_value)
+
+    @mock.patch('pymongo.collection.Collection.find')
+    @mock.patch('pulp.server.db.connection.metrics.METRICS', None)
+    @mock.patch('pulp.server.db.connection.debugging.PROFILER')
+    def test_find_profiling(self, mock_profiler, mock_find):
+        collection = connection.PulpCollection.__new__(connection.PulpCollection)
+
+        cursor = collection.find({'id': 'zoo'})
+
+        self.assertTrue(isinstance(cursor, connection.PulpCursor))
+        self.assertTrue(cursor._cursor is mock_find.return_value)
+        self.assertEqual(cursor._spec, {'id': 'zoo'})
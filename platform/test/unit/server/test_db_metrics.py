@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+
+from pulp.server.db import metrics
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_add(self):
+        histogram = metrics.Histogram((1, 10))
+
+        for value in (0, 1, 2, 10, 11, 100):
+            histogram.add(value)
+
+        self.assertEqual(histogram.to_dict(), {
+            'count': 6, 'sum': 124,
+            'buckets': [{'upper_bound': 1, 'count': 2},
+                        {'upper_bound': 10, 'count': 2},
+                        {'upper_bound': None, 'count': 2}]})
+
+
+class DatabaseMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = metrics.DatabaseMetrics()
+
+    def test_add_call(self):
+        self.metrics.add_call('repos', 'find', 0.5, 3)
+        self.metrics.add_call('repos', 'find', 0.25, 0)
+        self.metrics.add_call('repos', 'update', 0.125)
+        self.metrics.add_retry('repos', 'update')
+
+        collections = self.metrics.to_dict()['collections']
+        self.assertEqual(collections.keys(), ['repos'])
+        find = collections['repos']['find']
+        self.assertEqual(find['latency']['count'], 2)
+        self.assertEqual(find['latency']['sum'], 0.75)
+        self.assertEqual(find['documents']['count'], 2)
+        self.assertEqual(find['documents']['sum'], 3)
+        self.assertEqual(find['retries'], 0)
+        update = collections['repos']['update']
+        self.assertEqual(update['latency']['count'], 1)
+        self.assertEqual(update['documents']['count'], 0)
+        self.assertEqual(update['retries'], 1)
+
+    def test_add_pool_wait(self):
+        self.metrics.add_pool_wait(0.5)
+
+        pool_wait = self.metrics.to_dict()['pool_wait']
+        self.assertEqual(pool_wait['count'], 1)
+        self.assertEqual(pool_wait['sum'], 0.5)
+
+    def test_format_report(self):
+        self.metrics.add_call('repos', 'find', 0.5, 3)
+        self.metrics.add_call('units_rpm', 'find', 2, 1000)
+        self.metrics.add_retry('repos', 'update')
+
+        lines = metrics.format_report(self.metrics.to_dict())
+
+        # sorted by the total time
+        self.assertEqual([l.split()[:2] for l in lines[1:4]],
+                         [['units_rpm', 'find'], ['repos', 'find'], ['repos', 'update']])
+        self.assertTrue(lines[-1].startswith('pool wait'))
+
+
+class ModuleTests(unittest.TestCase):
+
+    @mock.patch('pulp.server.db.metrics.METRICS', None)
+    def test_disabled(self):
+        metrics.record_call('repos', 'find', 1, 1)
+        metrics.record_retry('repos', 'find')
+
+        self.assertEqual(metrics.report(), None)
+
+    @mock.patch('pulp.server.db.metrics.METRICS', None)
+    def test_enable(self):
+        enabled = metrics.enable()
+
+        self.assertTrue(metrics.enable() is enabled)
+        metrics.record_call('repos', 'find', 1, 1)
+        self.assertEqual(metrics.report()['collections']['repos']['find']['latency']['count'], 1)
+
+    @mock.patch('pulp.server.db.metrics.METRICS')
+    @mock.patch('pymongo.pool.Pool.get_socket')
+    def test_pool_get_socket(self, mock_get_socket, mock_metrics):
+        pool = mock.Mock()
+
+        socket_info = metrics.MetricsPool.get_socket.im_func(pool)
+
+        self.assertEqual(socket_info, mock_get_socket.return_value)
+        mock_get_socket.assert_called_once_with(pool)
+        self.assertEqual(mock_metrics.add_pool_wait.call_count, 1)
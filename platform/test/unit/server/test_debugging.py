@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+
+from pulp.server import debugging
+from pulp.server.webservices.middleware.profiling import ProfilingMiddleware
+
+
+class RequestProfilerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = debugging.RequestProfiler(5, 1)
+
+    def test_finish(self):
+        self.profiler.start('GET', '/v2/repositories/')
+        self.profiler.add_time(debugging.AUTH_TIME, 0.25)
+        self.profiler.add_time(debugging.SERIALIZATION_TIME, 0.5)
+        self.profiler.add_query('repos', 'find', 0.125)
+        self.profiler.add_query('repos', 'count', 0.125)
+        self.profiler.finish()
+
+        statistics = self.profiler.statistics()
+        self.assertEqual(statistics['requests'], 1)
+        self.assertEqual(statistics['slow_requests'], 0)
+        self.assertEqual(statistics['db_calls'], 2)
+        self.assertEqual(statistics['db_time'], 0.25)
+        self.assertEqual(statistics['auth_time'], 0.25)
+        self.assertEqual(statistics['serialization_time'], 0.5)
+        self.assertEqual(statistics['slow_queries'], 0)
+
+    def test_finish_not_started(self):
+        self.profiler.finish()
+
+        self.assertEqual(self.profiler.statistics()['requests'], 0)
+
+    @mock.patch('pulp.server.debugging.time.time')
+    @mock.patch('pulp.server.debugging._LOG')
+    def test_slow_request(self, mock_log, mock_time):
+        mock_time.side_effect = [100, 106]
+
+        self.profiler.start('GET', '/v2/repositories/')
+        self.profiler.finish()
+
+        statistics = self.profiler.statistics()
+        self.assertEqual(statistics['slow_requests'], 1)
+        self.assertEqual(statistics['wall_time'], 6)
+        self.assertEqual(mock_log.warn.call_count, 1)
+        self.assertTrue('/v2/repositories/' in mock_log.warn.call_args[0][0])
+
+    @mock.patch('pulp.server.debugging._LOG')
+    def test_slow_query(self, mock_log):
+        self.profiler.add_query('repos', 'find', 2, {'id': 'zoo'})
+
+        self.assertEqual(self.profiler.statistics()['slow_queries'], 1)
+        self.assertEqual(mock_log.warn.call_count, 1)
+        self.assertTrue('zoo' in mock_log.warn.call_args[0][0])
+
+    def test_record_disabled(self):
+        debugging.record_time(debugging.AUTH_TIME, 1)
+        debugging.record_query('repos', 'find', 1)
+
+    @mock.patch('pulp.server.debugging.PROFILER')
+    def test_record_enabled(self, mock_profiler):
+        debugging.record_time(debugging.AUTH_TIME, 1)
+        debugging.record_query('repos', 'find', 2)
+
+        mock_profiler.add_time.assert_called_once_with(debugging.AUTH_TIME, 1)
+        mock_profiler.add_query.assert_called_once_with('repos', 'find', 2, None)
+
+
+class ProfilingMiddlewareTests(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = debugging.RequestProfiler(5, 1)
+        self.environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/v2/repositories/'}
+
+    def test_call(self):
+        body = mock.MagicMock()
+        body.__iter__.return_value = iter(['[', ']'])
+        middleware = ProfilingMiddleware(mock.Mock(return_value=body), self.profiler)
+
+        chunks = middleware(self.environ, mock.Mock())
+
+        # the profile is finished once the body is written
+        self.assertEqual(self.profiler.statistics()['requests'], 0)
+        self.assertEqual(list(chunks), ['[', ']'])
+        self.assertEqual(self.profiler.statistics()['requests'], 1)
+        body.close.assert_called_once_with()
+
+    def test_call_error(self):
+        app = mock.Mock(side_effect=ValueError())
+        middleware = ProfilingMiddleware(app, self.profiler)
+
+        self.assertRaises(ValueError, middleware, self.environ, mock.Mock())
+        self.assertEqual(self.profiler.statistics()['requests'], 1)
@@ -25,6 +25,7 @@ from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import call
 from pulp.server.dispatch import coordinator
 from pulp.server.dispatch import factory as dispatch_factory
+from pulp.server.dispatch import locktable
 from pulp.server.dispatch.task import Task
 from pulp.server.exceptions import OperationTimedOut
 from pulp.server.util import CycleExists, topological_sort
@@ -206,7 +207,7 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
 
         call_resources = coordinator.resource_dict_to_call_resources(resources)
         coordinator.set_call_request_id_on_call_resources(task_id, call_resources)
-        self.collection.insert(call_resources, safe=True)
+        self.coordinator.resource_lock_table.add(call_resources)
 
         response, blockers, reasons, call_resources = self.coordinator._find_conflicts(resources)
 
@@ -229,7 +230,7 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         }
         existing_task_resources = coordinator.resource_dict_to_call_resources(existing_resources)
         coordinator.set_call_request_id_on_call_resources(task_id, existing_task_resources)
-        self.collection.insert(existing_task_resources, safe=True)
+        self.coordinator.resource_lock_table.add(existing_task_resources)
 
         # delete on content unit is postponed by read
 
@@ -276,8 +277,8 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         task_2_resources = coordinator.resource_dict_to_call_resources(bind_2_resources)
         coordinator.set_call_request_id_on_call_resources(call_2_id, task_2_resources)
 
-        self.collection.insert(task_1_resources, safe=True)
-        self.collection.insert(task_2_resources, safe=True)
+        self.coordinator.resource_lock_table.add(task_1_resources)
+        self.coordinator.resource_lock_table.add(task_2_resources)
 
         # deleting the repository should be postponed by both binds
 
@@ -305,7 +306,7 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         }
         deletion_task_resources = coordinator.resource_dict_to_call_resources(deletion_resources)
         coordinator.set_call_request_id_on_call_resources(task_id, deletion_task_resources)
-        self.collection.insert(deletion_task_resources, safe=True)
+        self.coordinator.resource_lock_table.add(deletion_task_resources)
 
         # a cds sync should be rejected by the deletion
 
@@ -324,6 +325,13 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         self.assertTrue(task_id in blockers)
         self.assertTrue(reasons)
 
+
+class DatabaseCoordinatorCollisionDetectionTests(CoordinatorCollisionDetectionTests):
+
+    def setUp(self):
+        super(DatabaseCoordinatorCollisionDetectionTests, self).setUp()
+        self.coordinator = coordinator.Coordinator(resource_lock_table=locktable.DatabaseResourceLockTable())
+
 # call execution tests ---------------------------------------------------------
 
 def dummy_call(progress, success, failure):
@@ -364,6 +372,20 @@ class CoordinatorWaitForTaskTests(CoordinatorTests):
                           self.coordinator._run_task,
                           task, timeout)
 
+    def test_wait_for_task_complete(self):
+        task = Task(call.CallRequest(find_dummy_call))
+        task.run()
+        coordinator.wait_for_task(task, dispatch_constants.CALL_COMPLETE_STATES,
+                                  timeout=datetime.timedelta(seconds=5))
+        self.assertEqual(task.call_report.state, dispatch_constants.CALL_FINISHED_STATE)
+
+    def test_wait_for_task_timeout(self):
+        task = Task(call.CallRequest(dummy_call))
+        self.assertRaises(OperationTimedOut,
+                          coordinator.wait_for_task,
+                          task, dispatch_constants.CALL_COMPLETE_STATES,
+                          timeout=datetime.timedelta(seconds=0.01))
+
 
 class CoordinatorCallExecutionTests(CoordinatorTests):
 
@@ -553,6 +575,32 @@ class CoordinatorFindCallReportsTests(CoordinatorTests):
         self.assertEqual(len(call_report_list), 1)
         self.assertEqual(call_report_list[0].call_request_id, call_request.id)
 
+    def test_wait_for_call_state_change(self):
+        call_request = call.CallRequest(find_dummy_call)
+        task = Task(call_request)
+        task.run()
+        self.set_task_queue([task])
+
+        call_report = self.coordinator.wait_for_call_state_change(
+            call_request.id, dispatch_constants.CALL_WAITING_STATE, 5)
+        self.assertEqual(call_report.state, dispatch_constants.CALL_FINISHED_STATE)
+
+    def test_wait_for_call_state_change_timeout(self):
+        call_request = call.CallRequest(find_dummy_call)
+        task = Task(call_request)
+        self.set_task_queue([task])
+
+        call_report = self.coordinator.wait_for_call_state_change(
+            call_request.id, dispatch_constants.CALL_WAITING_STATE, 0.01)
+        self.assertEqual(call_report.state, dispatch_constants.CALL_WAITING_STATE)
+
+    def test_wait_for_call_state_change_not_found(self):
+        self.set_task_queue([])
+
+        call_report = self.coordinator.wait_for_call_state_change(
+            'missing', dispatch_constants.CALL_WAITING_STATE, 5)
+        self.assertEqual(call_report, None)
+
 # coordinator start tests ------------------------------------------------------
 
 class CoordinatorStartTests(CoordinatorTests):
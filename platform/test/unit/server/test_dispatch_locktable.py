@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import base
+
+from pulp.server.db.model.dispatch import CallResource
+from pulp.server.dispatch import constants as dispatch_constants
+from pulp.server.dispatch import coordinator
+from pulp.server.dispatch import locktable
+
+# test data --------------------------------------------------------------------
+
+def call_resources(call_request_id, resource_type, resource_id, operation):
+    resources = {resource_type: {resource_id: operation}}
+    resource_list = coordinator.resource_dict_to_call_resources(resources)
+    coordinator.set_call_request_id_on_call_resources(call_request_id, resource_list)
+    return resource_list
+
+# database resource lock table tests -------------------------------------------
+
+class DatabaseResourceLockTableTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(DatabaseResourceLockTableTests, self).setUp()
+        self.lock_table = self.create_lock_table()
+
+    def tearDown(self):
+        super(DatabaseResourceLockTableTests, self).tearDown()
+        CallResource.get_collection().drop()
+
+    def create_lock_table(self):
+        return locktable.DatabaseResourceLockTable()
+
+    def test_find(self):
+        self.lock_table.add(call_resources('call-1', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                           'repo-1', dispatch_constants.RESOURCE_UPDATE_OPERATION))
+        self.lock_table.add(call_resources('call-2', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                           'repo-2', dispatch_constants.RESOURCE_UPDATE_OPERATION))
+
+        query = call_resources(None, dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                               'repo-1', dispatch_constants.RESOURCE_READ_OPERATION)
+        found = self.lock_table.find(query)
+
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0]['call_request_id'], 'call-1')
+        self.assertEqual(found[0]['operation'], dispatch_constants.RESOURCE_UPDATE_OPERATION)
+
+    def test_find_multiple_call_requests(self):
+        for call_request_id in ('call-1', 'call-2'):
+            self.lock_table.add(call_resources(call_request_id, dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                               'repo', dispatch_constants.RESOURCE_READ_OPERATION))
+
+        query = call_resources(None, dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                               'repo', dispatch_constants.RESOURCE_DELETE_OPERATION)
+        found = self.lock_table.find(query)
+
+        self.assertEqual(sorted(c['call_request_id'] for c in found), ['call-1', 'call-2'])
+
+    def test_find_resource_type(self):
+        self.lock_table.add(call_resources('call-1', dispatch_constants.RESOURCE_CONSUMER_TYPE,
+                                           'same-id', dispatch_constants.RESOURCE_UPDATE_OPERATION))
+
+        query = call_resources(None, dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                               'same-id', dispatch_constants.RESOURCE_UPDATE_OPERATION)
+
+        self.assertEqual(self.lock_table.find(query), [])
+
+    def test_remove(self):
+        self.lock_table.add(call_resources('call-1', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                           'repo', dispatch_constants.RESOURCE_READ_OPERATION))
+        self.lock_table.add(call_resources('call-2', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                           'repo', dispatch_constants.RESOURCE_READ_OPERATION))
+
+        self.lock_table.remove('call-1')
+
+        query = call_resources(None, dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                               'repo', dispatch_constants.RESOURCE_DELETE_OPERATION)
+        found = self.lock_table.find(query)
+        self.assertEqual([c['call_request_id'] for c in found], ['call-2'])
+
+    def test_clear(self):
+        self.lock_table.add(call_resources('call-1', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                           'repo', dispatch_constants.RESOURCE_READ_OPERATION))
+
+        self.lock_table.clear()
+
+        query = call_resources(None, dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                               'repo', dispatch_constants.RESOURCE_DELETE_OPERATION)
+        self.assertEqual(self.lock_table.find(query), [])
+
+# in-memory resource lock table tests ------------------------------------------
+
+class ResourceLockTableTests(DatabaseResourceLockTableTests):
+
+    def create_lock_table(self):
+        return locktable.ResourceLockTable()
+
+    def test_remove_releases_resource(self):
+        lock_table = locktable.ResourceLockTable()
+        lock_table.add(call_resources('call-1', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                      'repo', dispatch_constants.RESOURCE_READ_OPERATION))
+        lock_table.remove('call-1')
+        self.assertEqual(lock_table._ResourceLockTable__locks, {})
+        self.assertEqual(lock_table._ResourceLockTable__locked_resources, {})
+
+# conflict detection equivalence tests -----------------------------------------
+
+class ConflictDetectionEquivalenceTests(base.PulpServerTests):
+
+    def tearDown(self):
+        super(ConflictDetectionEquivalenceTests, self).tearDown()
+        CallResource.get_collection().drop()
+
+    def test_equivalence(self):
+        # every proposed operation against every queued operation must get the
+        # same answer from both resource lock tables
+        operations = (dispatch_constants.RESOURCE_CREATE_OPERATION,
+                      dispatch_constants.RESOURCE_READ_OPERATION,
+                      dispatch_constants.RESOURCE_UPDATE_OPERATION,
+                      dispatch_constants.RESOURCE_DELETE_OPERATION)
+        for queued_operation in operations:
+            for proposed_operation in operations:
+                answers = []
+                for lock_table in (locktable.DatabaseResourceLockTable(),
+                                   locktable.ResourceLockTable()):
+                    lock_table.clear()
+                    lock_table.add(call_resources('queued', dispatch_constants.RESOURCE_REPOSITORY_TYPE,
+                                                  'repo', queued_operation))
+                    coordinator_instance = coordinator.Coordinator(resource_lock_table=lock_table)
+                    resources = {proposed_operation: {dispatch_constants.RESOURCE_REPOSITORY_TYPE: ['repo']}}
+                    response, blocking, reasons, resource_list = coordinator_instance._find_conflicts(resources)
+                    answers.append((response, blocking, reasons))
+                    lock_table.clear()
+                self.assertEqual(answers[0], answers[1], '%s, %s' % (queued_operation, proposed_operation))
@@ -12,6 +12,7 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import datetime
+import threading
 import traceback
 import types
 
@@ -152,6 +153,31 @@ class TaskTests(base.PulpServerTests):
         for h in hooks:
             self.assertTrue(h.call_count == 1)
 
+# task state wait testing ------------------------------------------------------
+
+class TaskWaitForStateTests(base.PulpServerTests):
+
+    def setUp(self):
+        super(TaskWaitForStateTests, self).setUp()
+        self.task = Task(CallRequest(call_without_callbacks))
+
+    def test_already_in_state(self):
+        self.assertTrue(self.task.wait_for_state([dispatch_constants.CALL_WAITING_STATE], 0))
+
+    def test_timeout(self):
+        self.assertFalse(self.task.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES, 0.01))
+
+    def test_wake_up_on_complete(self):
+        self.task.run()
+        self.assertTrue(self.task.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES, 5))
+        self.assertEqual(self.task.call_report.state, dispatch_constants.CALL_FINISHED_STATE)
+
+    def test_wake_up_on_skip(self):
+        timer = threading.Timer(0.01, self.task.skip)
+        timer.start()
+        self.assertTrue(self.task.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES))
+        self.assertEqual(self.task.call_report.state, dispatch_constants.CALL_SKIPPED_STATE)
+
 # run failure testing ----------------------------------------------------------
 
 class FailTests(base.PulpServerTests):
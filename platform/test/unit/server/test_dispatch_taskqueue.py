@@ -78,6 +78,16 @@ class TaskQueueStartStopTests(base.PulpServerTests):
         self.queue.stop()
         self.assertTrue(self.queue._TaskQueue__dispatcher is None)
 
+    @mock.patch('pulp.server.dispatch.taskqueue._LOG')
+    def test_dispatch_error(self, mock_log):
+        self.queue.dispatch_interval = 10
+        self.queue._get_ready_tasks = mock.Mock(side_effect=Exception())
+        self.queue.start()
+        time.sleep(0.1)
+        # the dispatcher waits for the dispatch interval before trying again
+        self.assertEqual(self.queue._get_ready_tasks.call_count, 1)
+        self.assertEqual(mock_log.critical.call_count, 1)
+
 # task queue base tests class --------------------------------------------------
 
 class TaskQueueTests(base.PulpServerTests):
@@ -311,6 +321,104 @@ class TaskQueueControlFlowTests(TaskQueueTests):
         self.queue.dequeue(task_1)
         self.assertFalse(task_1.call_request.id in task_2.call_request.dependencies)
 
+# task queue scheduling tests --------------------------------------------------
+
+class TaskQueueSchedulingTests(TaskQueueTests):
+
+    def test_ready_tasks_in_enqueue_order(self):
+        task_1 = self.gen_async_task()
+        task_2 = self.gen_task()
+        task_3 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        for t in (task_1, task_2, task_3):
+            self.queue.enqueue(t)
+        self.queue._run_ready_task(task_1)
+        self.wait_for_task_to_start(task_1)
+        task_1._succeeded()
+        self.wait_for_task_to_complete(task_1)
+        # task_2 became ready after task_3, but was enqueued first
+        task_list = self.queue._get_ready_tasks()
+        self.assertEqual(task_list, [task_2, task_3])
+
+    def test_get_ready_tasks_weight(self):
+        task_1 = self.gen_task()
+        task_1.call_request.weight = 3
+        task_2 = self.gen_task()
+        task_2.call_request.weight = 0
+        task_3 = self.gen_task()
+        task_3.call_request.weight = 2
+        task_4 = self.gen_task()
+        for t in (task_1, task_2, task_3, task_4):
+            self.queue.enqueue(t)
+        task_list = self.queue._get_ready_tasks()
+        self.assertEqual(task_list, [task_2, task_3])
+
+    def test_get_ready_tasks_idempotent(self):
+        tasks = [self.gen_task() for i in range(3)]
+        for t in tasks:
+            self.queue.enqueue(t)
+        self.assertEqual(self.queue._get_ready_tasks(), self.queue._get_ready_tasks())
+
+    def test_skipped_task_weight(self):
+        task_1 = self.gen_task(call=error)
+        task_2 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = [dispatch_constants.CALL_FINISHED_STATE]
+        self.queue.enqueue(task_1)
+        self.queue.enqueue(task_2)
+        self.queue._run_ready_task(task_1)
+        self.wait_for_task_to_complete(task_1)
+        self.wait_for_task_to_complete(task_2)
+        # the skipped task never ran, so it must not give back any weight
+        self.assertEqual(self.queue._TaskQueue__running_weight, 0)
+
+    def test_dequeue_blocked_task(self):
+        task_1 = self.gen_task()
+        task_2 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        self.queue.enqueue(task_1)
+        self.queue.enqueue(task_2)
+        self.queue.dequeue(task_2)
+        dependent_tasks = self.queue._TaskQueue__dependent_tasks
+        self.assertFalse(task_2.call_request.id in dependent_tasks[task_1.call_request.id])
+
+    def test_dependency_chain(self):
+        tasks = [self.gen_task()]
+        for i in range(4):
+            task = self.gen_task()
+            task.call_request.dependencies[tasks[-1].call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+            tasks.append(task)
+        for t in tasks:
+            self.queue.enqueue(t)
+        for t in tasks:
+            self.assertEqual(self.queue._get_ready_tasks(), [t])
+            self.queue._run_ready_task(t)
+            self.wait_for_task_to_complete(t)
+        self.assertEqual(self.queue._get_ready_tasks(), [])
+        self.assertEqual(self.queue._TaskQueue__dependent_tasks, {})
+
+    def test_event_driven_dispatch(self):
+        # the dispatch interval is long enough that only an event can trigger the task
+        queue = TaskQueue(1, dispatch_interval=60)
+        queue.start()
+        try:
+            task_1 = self.gen_task()
+            task_2 = self.gen_task()
+            queue.enqueue(task_1)
+            queue.enqueue(task_2)
+            self.wait_for_task_to_complete(task_1)
+            self.wait_for_task_to_complete(task_2)
+        finally:
+            queue.stop()
+
+    def test_purge_completed_task_cache(self):
+        queue = TaskQueue(1, completed_task_cache_life=0)
+        task = self.gen_task()
+        queue.enqueue(task)
+        queue._run_ready_task(task)
+        self.wait_for_task_to_complete(task)
+        queue._purge_completed_task_cache()
+        self.assertEqual(queue.completed_tasks(), [])
+
 # task queue query tests -------------------------------------------------------
 
 class TaskQueueQueryTests(TaskQueueTests):
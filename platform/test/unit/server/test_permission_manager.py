@@ -139,6 +139,14 @@ class RoleManagerTests(base.PulpServerTests):
         self.permission_manager.revoke(r, u['login'], [o])
         self.assertFalse(self.user_query_manager.is_authorized(r, u['login'], o))
 
+    def test_user_permission_grant_after_denied(self):
+        u = self._create_user()
+        r = self._create_resource()
+        o = authorization.READ
+        self.assertFalse(self.user_query_manager.is_authorized(r, u['login'], o))
+        self.permission_manager.grant(r, u['login'], [o])
+        self.assertTrue(self.user_query_manager.is_authorized(r, u['login'], o))
+
     def test_non_existing_user_permission_revoke(self):
         login = 'non-existing-user-login'
         r = self._create_resource()
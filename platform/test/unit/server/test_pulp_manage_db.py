@@ -15,7 +15,7 @@ import os
 from mock import call, inPy3k, MagicMock, patch
 
 from pulp.common.compat import all, json
-from pulp.server.db import manage
+from pulp.server.db import manage, metrics
 from pulp.server.db.migrate import models
 from pulp.server.db.model.migration_tracker import MigrationTracker
 from pulp.server.managers.migration_tracker import DoesNotExist, MigrationTrackerManager
@@ -257,6 +257,26 @@ class TestManageDB(MigrationTest):
         self.assertEqual(indexes.keys(), [u'_id_', u'attribute_1_1_attribute_2_1_attribute_3_1',
                                           u'attribute_1_1', u'attribute_3_1'])
 
+    @patch('pulp.server.db.metrics.METRICS', None)
+    @patch('sys.stdout')
+    @patch('sys.argv', ["pulp-manage-db", "--dump-metrics"])
+    @patch('pulp.server.db.manage.logger')
+    @patch('pulp.server.db.manage._auto_manage_db')
+    @patch('pulp.server.db.manage._start_logging')
+    def test_dump_metrics(self, start_logging_mock, auto_manage_db_mock, logger_mock, stdout_mock):
+        """
+        Test that --dump-metrics records the database calls and prints them once done.
+        """
+        def manage_db(options):
+            metrics.record_call('repos', 'find', 0.5, 10)
+        auto_manage_db_mock.side_effect = manage_db
+
+        manage.main()
+
+        lines = [c[1][0] for c in logger_mock.info.mock_calls]
+        self.assertEqual(lines, metrics.format_report(metrics.report()))
+        self.assertTrue(lines[1].startswith('repos'))
+
     @patch('sys.stderr')
     @patch.object(models.MigrationPackage, 'apply_migration',
            side_effect=models.MigrationPackage.apply_migration, autospec=True)
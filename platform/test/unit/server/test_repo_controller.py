@@ -74,7 +74,8 @@ class RepoSearchTests(RepoControllersTests):
         self.assertEqual(mock_params.call_count, 3)
 
     @mock.patch.object(PulpCollection, 'query')
-    @mock.patch('pulp.server.db.model.criteria.Criteria.from_client_input')
+    @mock.patch('pulp.server.db.model.criteria.Criteria.from_client_input',
+                return_value=criteria.Criteria())
     def test_get_details(self, mock_from_client, mock_query):
         status, body = self.get('/v2/repositories/search/?details=1&limit=2')
         self.assertEqual(status, 200)
@@ -175,6 +176,49 @@ class RepoSearchTests(RepoControllersTests):
         self.assertEqual(generated_criteria.limit, 20)
         self.assertTrue(generated_criteria.skip is None)
 
+    @mock.patch.object(repositories.RepoSearch, 'params')
+    @mock.patch.object(PulpCollection, 'query')
+    def test_search_page(self, mock_query, mock_params):
+        mock_params.return_value = {
+            'criteria' : {'limit' : 2, 'continuation' : ''}
+        }
+        mock_query.return_value = [
+            {'_id' : 'a', 'id' : 'repo-1'},
+            {'_id' : 'b', 'id' : 'repo-2'},
+        ]
+
+        status, body = self.post('/v2/repositories/search/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual([r['id'] for r in body['items']], ['repo-1', 'repo-2'])
+        generated_criteria = mock_query.call_args[0][0]
+        self.assertEqual(body['continuation'],
+                         generated_criteria.next_continuation(mock_query.return_value))
+
+    @mock.patch.object(repositories.RepoSearch, 'params')
+    @mock.patch.object(PulpCollection, 'query')
+    def test_search_last_page(self, mock_query, mock_params):
+        mock_params.return_value = {
+            'criteria' : {'limit' : 2, 'continuation' : 'WyJhIl0='}
+        }
+        mock_query.return_value = [{'_id' : 'b', 'id' : 'repo-2'}]
+
+        status, body = self.post('/v2/repositories/search/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body['items']), 1)
+        self.assertTrue(body['continuation'] is None)
+
+    @mock.patch.object(repositories.RepoSearch, 'params')
+    def test_search_page_with_skip(self, mock_params):
+        mock_params.return_value = {
+            'criteria' : {'skip' : 2, 'continuation' : ''}
+        }
+
+        status, body = self.post('/v2/repositories/search/')
+
+        self.assertEqual(status, 400)
+
 
 class RepoCollectionTests(RepoControllersTests):
 
@@ -1226,7 +1270,7 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
         """
 
         # Setup
-        self.association_query_mock.get_units_by_type.return_value = []
+        self.association_query_mock.get_units_iter.return_value = iter([])
 
         query = {
             'type_ids' : ['rpm'],
@@ -1253,10 +1297,10 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
         # Verify
         self.assertEqual(200, status)
 
-        self.assertEqual(0, self.association_query_mock.get_units_across_types.call_count)
-        self.assertEqual(1, self.association_query_mock.get_units_by_type.call_count)
+        self.assertEqual(1, self.association_query_mock.get_units_iter.call_count)
+        self.assertEqual('repo-1', self.association_query_mock.get_units_iter.call_args[0][0])
 
-        criteria = self.association_query_mock.get_units_by_type.call_args[1]['criteria']
+        criteria = self.association_query_mock.get_units_iter.call_args[1]['criteria']
         self.assertTrue(isinstance(criteria, UnitAssociationCriteria))
         self.assertEqual(query['type_ids'], criteria.type_ids)
         self.assertEqual(query['filters']['association'], criteria.association_filters)
@@ -1271,11 +1315,12 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
 
     def test_post_multiple_type(self):
         """
-        Passes in a multiple typed query to ensure the correct manager method is called.
+        Passes in a multiple typed query to ensure the units are streamed.
         """
 
         # Setup
-        self.association_query_mock.get_units_across_types.return_value = []
+        units = [{'unit_id' : 'unit-%d' % i, 'unit_type_id' : 'rpm'} for i in range(3)]
+        self.association_query_mock.get_units_iter.return_value = iter(units)
 
         query = {'type_ids' : ['rpm', 'errata']}
 
@@ -1284,10 +1329,35 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
 
         # Verify
         self.assertEqual(200, status)
+        self.assertEqual(units, body)
+
+        self.assertEqual(1, self.association_query_mock.get_units_iter.call_count)
+        criteria = self.association_query_mock.get_units_iter.call_args[1]['criteria']
+        self.assertTrue(isinstance(criteria, UnitAssociationCriteria))
+        self.assertEqual(query['type_ids'], criteria.type_ids)
+
+    def test_post_page(self):
+        """
+        Passes in a paginated query to ensure a page of units is returned.
+        """
+
+        # Setup
+        units = [{'unit_id' : 'unit-%d' % i, 'unit_type_id' : 'rpm'} for i in range(2)]
+        self.association_query_mock.get_units_page.return_value = units, 'abc'
+
+        query = {'type_ids' : ['rpm'], 'limit' : 2, 'continuation' : ''}
+
+        params = {'criteria' : query}
+        status, body = self.post('/v2/repositories/repo-1/search/units/', params=params)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual({'items' : units, 'continuation' : 'abc'}, body)
 
-        self.assertEqual(0, self.association_query_mock.get_units_by_type.call_count)
-        self.assertEqual(1, self.association_query_mock.get_units_across_types.call_count)
-        self.assertTrue(isinstance(self.association_query_mock.get_units_across_types.call_args[1]['criteria'], UnitAssociationCriteria))
+        self.assertEqual(0, self.association_query_mock.get_units_iter.call_count)
+        criteria = self.association_query_mock.get_units_page.call_args[0][1]
+        self.assertEqual('', criteria.continuation)
+        self.assertEqual(2, criteria.page_limit)
 
     def test_post_missing_query(self):
         # Test
@@ -1304,6 +1374,83 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
         # Verify
         self.assertEqual(400, status)
 
+class RepoUnitsSearchTests(RepoControllersTests):
+
+    def setUp(self):
+        super(RepoUnitsSearchTests, self).setUp()
+        self.repo_manager.create_repo('repo-1')
+        self.repo_manager.create_repo('repo-2')
+
+        self.association_query_mock = mock.Mock()
+        manager_factory._INSTANCES[manager_factory.TYPE_REPO_ASSOCIATION_QUERY] = self.association_query_mock
+
+    def clean(self):
+        super(RepoUnitsSearchTests, self).clean()
+        manager_factory.reset()
+
+    def test_post(self):
+        # Setup
+        units_by_repo = {
+            'repo-1' : [{'unit_id' : 'unit-1', 'unit_type_id' : 'rpm'}],
+            'repo-2' : [],
+        }
+        self.association_query_mock.get_units_by_repos.return_value = units_by_repo
+
+        query = {'type_ids' : ['rpm'], 'limit' : 10}
+        params = {'repo_ids' : ['repo-1', 'repo-2'], 'criteria' : query}
+
+        # Test
+        status, body = self.post('/v2/repositories/search/units/', params=params)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(units_by_repo, body)
+
+        self.assertEqual(1, self.association_query_mock.get_units_by_repos.call_count)
+        self.assertEqual(['repo-1', 'repo-2'], self.association_query_mock.get_units_by_repos.call_args[0][0])
+        criteria = self.association_query_mock.get_units_by_repos.call_args[1]['criteria']
+        self.assertTrue(isinstance(criteria, UnitAssociationCriteria))
+        self.assertEqual(['rpm'], criteria.type_ids)
+        self.assertEqual(10, criteria.limit)
+
+    def test_post_missing_repo(self):
+        params = {'repo_ids' : ['repo-1', 'missing'], 'criteria' : {}}
+
+        status, body = self.post('/v2/repositories/search/units/', params=params)
+
+        self.assertEqual(404, status)
+        self.assertEqual(['missing'], body['resources']['repositories'])
+        self.assertEqual(0, self.association_query_mock.get_units_by_repos.call_count)
+
+    @mock.patch('pulp.server.managers.auth.user.query.UserQueryManager.is_authorized')
+    def test_post_unauthorized_repo(self, mock_is_authorized):
+        mock_is_authorized.side_effect = lambda resource, login, operation: resource != '/v2/repositories/repo-2/'
+        params = {'repo_ids' : ['repo-1', 'repo-2'], 'criteria' : {}}
+
+        status, body = self.post('/v2/repositories/search/units/', params=params)
+
+        self.assertEqual(401, status)
+        self.assertEqual(0, self.association_query_mock.get_units_by_repos.call_count)
+
+    def test_post_missing_repo_ids(self):
+        status, body = self.post('/v2/repositories/search/units/', params={'criteria' : {}})
+
+        self.assertEqual(400, status)
+
+    def test_post_invalid_repo_ids(self):
+        for repo_ids in ('repo-1', [], [1]):
+            params = {'repo_ids' : repo_ids, 'criteria' : {}}
+            status, body = self.post('/v2/repositories/search/units/', params=params)
+            self.assertEqual(400, status)
+
+    def test_post_continuation(self):
+        params = {'repo_ids' : ['repo-1'], 'criteria' : {'continuation' : ''}}
+
+        status, body = self.post('/v2/repositories/search/units/', params=params)
+
+        self.assertEqual(400, status)
+
+
 class DependencyResolutionTests(RepoControllersTests):
 
     @mock.patch('pulp.server.managers.repo.dependency.DependencyManager.resolve_dependencies_by_criteria')
@@ -106,6 +106,40 @@ class RepoSyncConduitTests(base.PulpServerTests):
         db_unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_1.id)
         self.assertTrue(db_unit is not None)
 
+    def test_remove_units(self):
+        """
+        Tests removing units in bulk by ID.
+        """
+
+        # Setup
+        for i in range(0, 3):
+            unit = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i}, {}, '/foo/bar')
+            self.conduit.save_unit(unit)
+        units = self.conduit.get_units()
+
+        # Test
+        removed = self.conduit.remove_units(TYPE_1_DEF.id, [u.id for u in units[:2]])
+
+        # Verify
+        self.assertEqual(2, removed)
+        associated_units = list(RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}))
+        self.assertEqual(1, len(associated_units))
+        self.assertEqual(units[2].id, associated_units[0]['unit_id'])
+
+        repo = Repo.get_collection().find_one({'id' : 'repo-1'})
+        self.assertEqual(1, repo['content_unit_counts'][TYPE_1_DEF.id])
+
+        report = self.conduit.build_success_report('summary', 'details')
+        self.assertEqual(2, report.removed_count)
+
+    def test_remove_units_with_error(self):
+        # Setup
+        self.conduit._association_manager = mock.Mock()
+        self.conduit._association_manager.remove_all_by_ids.side_effect = Exception()
+
+        # Test
+        self.assertRaises(ImporterConduitException, self.conduit.remove_units, 'type-1', ['a'])
+
     def test_build_reports(self):
         """
         Tests that the conduit correctly inserts the count values into the report.
@@ -148,6 +182,28 @@ class RepoSyncConduitTests(base.PulpServerTests):
             self.assertEqual('summary', r.summary)
             self.assertEqual('details', r.details)
 
+    def test_save_unit_batched(self):
+        """
+        Tests that saved units are only written once the batch is flushed.
+        """
+
+        # Setup
+        self.conduit.set_unit_batch_size(10)
+        unit = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_1'}, {}, '/foo/bar')
+
+        # Test
+        self.conduit.save_unit(unit)
+
+        # Verify
+        self.assertTrue(unit.id is None)
+        self.assertEqual(0, RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}).count())
+
+        report = self.conduit.build_success_report('summary', 'details')
+
+        self.assertTrue(unit.id is not None)
+        self.assertEqual(1, RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}).count())
+        self.assertEqual(1, report.added_count)
+
     def test_remove_unit_with_error(self):
         # Setup
         self.conduit._association_manager = mock.Mock()
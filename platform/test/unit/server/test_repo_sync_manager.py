@@ -317,6 +317,35 @@ class RepoSyncManagerTests(base.PulpAsyncServerTests):
         # Cleanup
         mock_plugins.MOCK_IMPORTER.sync_repo.side_effect = None
 
+    @mock.patch('pulp.plugins.conduits.repo_sync.RepoSyncConduit.flush_units')
+    def test_sync_with_error_and_flush_error(self, mock_flush):
+        """
+        Tests that the plugin's error is reported when writing the buffered
+        units fails as well.
+        """
+
+        # Setup
+        class FakePluginException(Exception): pass
+
+        mock_plugins.MOCK_IMPORTER.sync_repo.side_effect = FakePluginException('Error test')
+        mock_flush.side_effect = Exception('Flush error')
+
+        self.repo_manager.create_repo('gonna-bail')
+        self.importer_manager.set_importer('gonna-bail', 'mock-importer', {})
+
+        # Test
+        self.assertRaises(repo_sync_manager.PulpExecutionException, self.sync_manager.sync, 'gonna-bail')
+
+        # Verify
+        history = list(RepoSyncResult.get_collection().find({'repo_id' : 'gonna-bail'}))
+        self.assertEqual(1, len(history))
+        self.assertEqual('Error test', history[0]['error_message'])
+        self.assertTrue('FakePluginException' in history[0]['exception'])
+        self.assertEqual(1, mock_flush.call_count)
+
+        # Cleanup
+        mock_plugins.MOCK_IMPORTER.sync_repo.side_effect = None
+
     def _test_sync_with_auto_publish(self):
         """
         Tests that the autodistribute call is properly called at the tail end
@@ -448,6 +448,41 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
 
         mock_call.assert_called_once_with(self.repo_id, 'type-1', 2)
 
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_existing_associations(self, mock_call):
+        """
+        Tests that units already associated by the same owner are skipped and
+        units associated by another owner are associated but not counted.
+        """
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'foo', OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'bar', OWNER_TYPE_USER, 'admin2')
+        mock_call.reset_mock()
+
+        self.manager.associate_all_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar', 'baz'], OWNER_TYPE_USER, 'admin')
+
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', 1)
+
+        unit_coll = RepoContentUnit.get_collection()
+        self.assertEqual(1, unit_coll.find({'repo_id' : self.repo_id, 'unit_id' : 'foo'}).count())
+        self.assertEqual(2, unit_coll.find({'repo_id' : self.repo_id, 'unit_id' : 'bar'}).count())
+        self.assertEqual(1, unit_coll.find({'repo_id' : self.repo_id, 'unit_id' : 'baz'}).count())
+
+    @mock.patch('pulp.server.managers.repo.unit_association._ASSOCIATION_BATCH_SIZE', 2)
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_multiple_batches(self, mock_call):
+        ids = ['unit-%d' % i for i in range(5)]
+
+        self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin')
+
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', len(ids))
+        unit_coll = RepoContentUnit.get_collection()
+        self.assertEqual(len(ids), unit_coll.find({'repo_id' : self.repo_id}).count())
+
+    def test_associate_all_invalid_owner_type(self):
+        self.assertRaises(exceptions.InvalidValue, self.manager.associate_all_by_ids,
+                          self.repo_id, 'type-1', ['foo'], 'bad-owner', 'admin')
+
     def test_unassociate_all(self):
         """
         Tests unassociating multiple units in a single call.
@@ -508,6 +543,66 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
             self.repo_id, 'type-1', 'unit-1', OWNER_TYPE_USER, 'admin1')
         self.assertEqual(mock_call.call_count, 1) # only once for the associates
 
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_unassociate_all_non_unique(self, mock_call):
+        self.manager.associate_all_by_ids(
+            self.repo_id, self.unit_type_id, [self.unit_id, self.unit_id_2], OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(
+            self.repo_id, self.unit_type_id, self.unit_id, OWNER_TYPE_USER, 'admin2')
+        mock_call.reset_mock()
+
+        # only the second unit is no longer associated with the repo at all
+        self.manager.unassociate_all_by_ids(self.repo_id, self.unit_type_id,
+                                            [self.unit_id, self.unit_id_2], OWNER_TYPE_USER, 'admin')
+
+        mock_call.assert_called_once_with(self.repo_id, self.unit_type_id, -1)
+
+    @mock.patch('pulp.server.managers.repo.unit_association.remove_from_importer')
+    def test_remove_all_by_ids(self, mock_remove):
+        self.manager.associate_all_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar', 'baz'], OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-2', 'foo', OWNER_TYPE_USER, 'admin')
+
+        removed = self.manager.remove_all_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar', 'missing'], OWNER_TYPE_USER, 'admin')
+
+        self.assertEqual(2, removed)
+        self.assertFalse(mock_remove.called)
+        unit_coll = RepoContentUnit.get_collection()
+        self.assertEqual(2, unit_coll.find({'repo_id' : self.repo_id}).count())
+        self.assertEqual(1, unit_coll.find({'repo_id' : self.repo_id, 'unit_id' : 'baz'}).count())
+        self.assertEqual(1, unit_coll.find({'repo_id' : self.repo_id, 'unit_type_id' : 'type-2'}).count())
+
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_remove_all_by_ids_other_owner(self, mock_call):
+        self.manager.associate_all_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar'], OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'foo', OWNER_TYPE_USER, 'admin2')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'baz', OWNER_TYPE_USER, 'admin2')
+        mock_call.reset_mock()
+
+        # only bar is no longer associated with the repo at all
+        removed = self.manager.remove_all_by_ids(
+            self.repo_id, 'type-1', ['foo', 'bar', 'baz'], OWNER_TYPE_USER, 'admin')
+
+        self.assertEqual(1, removed)
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', -1)
+        unit_coll = RepoContentUnit.get_collection()
+        self.assertEqual(2, unit_coll.find({'repo_id' : self.repo_id, 'owner_id' : 'admin2'}).count())
+
+    @mock.patch('pulp.server.managers.repo.unit_association._ASSOCIATION_BATCH_SIZE', 2)
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_remove_all_by_ids_multiple_batches(self, mock_call):
+        ids = ['unit-%d' % i for i in range(5)]
+        self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin')
+        mock_call.reset_mock()
+
+        self.manager.remove_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin')
+
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', -len(ids))
+        unit_coll = RepoContentUnit.get_collection()
+        self.assertEqual(0, unit_coll.find({'repo_id' : self.repo_id}).count())
+
     @mock.patch('pymongo.cursor.Cursor.count', return_value=1)
     def test_association_exists_true(self, mock_count):
         self.assertTrue(self.manager.association_exists(self.repo_id, 'unit-1', 'type-1'))
@@ -21,6 +21,7 @@ from pulp.common import dateutils
 from pulp.plugins.types import database, model
 from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server import exceptions
 import pulp.server.managers.repo.unit_association as association_manager
 from pulp.server.managers.repo.unit_association import OWNER_TYPE_USER, OWNER_TYPE_IMPORTER
 import pulp.server.managers.repo.unit_association_query as association_query_manager
@@ -620,6 +621,167 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         for u in units:
             self.assertTrue(u['metadata']['key_1'] != 'aardvark')
 
+    # -- streaming tests ------------------------------------------------------
+
+    def _assert_iter_matches_list(self, criteria_args, repo_id='repo-1'):
+        """
+        Asserts the generator query returns the same units in the same order
+        as the list query, with batches smaller than the result.
+        """
+        expected = self.manager.get_units(repo_id, UnitAssociationCriteria(**criteria_args))
+        units = self.manager.get_units_iter(repo_id, UnitAssociationCriteria(**criteria_args), batch_size=2)
+
+        self.assertFalse(isinstance(units, list))
+        units = list(units)
+        self.assertEqual([(u['unit_type_id'], u['unit_id'], u.get('owner_id')) for u in expected],
+                         [(u['unit_type_id'], u['unit_id'], u.get('owner_id')) for u in units])
+        self.assertEqual([u['metadata'] for u in expected], [u['metadata'] for u in units])
+
+    def test_get_units_iter_across_types(self):
+        self._assert_iter_matches_list({})
+        self._assert_iter_matches_list({}, repo_id='repo-2')
+        self._assert_iter_matches_list({'type_ids' : ['alpha', 'gamma']})
+        self._assert_iter_matches_list({'limit' : 4, 'skip' : 1})
+        self._assert_iter_matches_list({'association_sort' : [('owner_id', association_manager.SORT_DESCENDING)]})
+
+    def test_get_units_iter_across_types_remove_duplicates(self):
+        self._assert_iter_matches_list({'remove_duplicates' : True})
+
+        units = list(self.manager.get_units_iter('repo-1', UnitAssociationCriteria(remove_duplicates=True),
+                                                 batch_size=1))
+        self.assertEqual(self.repo_1_count_no_dupes, len(units))
+
+        # duplicates are only removed among the limited and skipped results, as in get_units
+        sort = [('owner_id', association_manager.SORT_DESCENDING)]
+        self._assert_iter_matches_list({'remove_duplicates' : True, 'limit' : 4, 'skip' : 4})
+        self._assert_iter_matches_list({'remove_duplicates' : True, 'association_sort' : sort, 'limit' : 3})
+
+    def test_get_units_iter_by_type_unit_sort(self):
+        self._assert_iter_matches_list({'type_ids' : ['beta']})
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'unit_sort' : [('md_1', association_manager.SORT_DESCENDING)]})
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'unit_filters' : {'md_2' : 0}})
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'limit' : 2, 'skip' : 1})
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'unit_fields' : ['key_1']})
+        self._assert_iter_matches_list({'type_ids' : ['epsilon']})
+
+    def test_get_units_iter_by_type_association_sort(self):
+        sort = [('created', association_manager.SORT_DESCENDING)]
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'association_sort' : sort})
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'association_sort' : sort, 'unit_filters' : {'md_2' : 1}})
+        self._assert_iter_matches_list({'type_ids' : ['beta'], 'association_sort' : sort, 'limit' : 3})
+        self._assert_iter_matches_list({'type_ids' : ['gamma'], 'association_sort' : sort, 'remove_duplicates' : True})
+        self._assert_iter_matches_list({'type_ids' : ['gamma'], 'association_sort' : sort, 'remove_duplicates' : True,
+                                        'limit' : 1})
+
+    # -- pagination tests -----------------------------------------------------
+
+    def _assert_pages_match_list(self, criteria_args, page_size=2, repo_id='repo-1'):
+        """
+        Asserts reading all of the pages returns the same units as the list
+        query, each of them once, with no page larger than the page size.
+        """
+        expected = self.manager.get_units(repo_id, UnitAssociationCriteria(**criteria_args))
+
+        units = []
+        continuation = ''
+        while continuation is not None:
+            criteria = UnitAssociationCriteria(limit=page_size, continuation=continuation, **criteria_args)
+            page, continuation = self.manager.get_units_page(repo_id, criteria)
+            self.assertTrue(len(page) <= page_size)
+            units.extend(page)
+
+        def identity(u):
+            return u['unit_type_id'], u['unit_id'], u.get('owner_id')
+
+        self.assertEqual(len(expected), len(units))
+        self.assertEqual(sorted(map(identity, expected)), sorted(map(identity, units)))
+
+    def test_get_units_page_across_types(self):
+        self._assert_pages_match_list({})
+        self._assert_pages_match_list({}, page_size=1)
+        self._assert_pages_match_list({'type_ids' : ['alpha', 'gamma']})
+        self._assert_pages_match_list({'association_sort' : [('owner_id', association_manager.SORT_DESCENDING)]})
+        self._assert_pages_match_list({'remove_duplicates' : True})
+
+    def test_get_units_page_by_type(self):
+        sort = [('created', association_manager.SORT_DESCENDING)]
+        self._assert_pages_match_list({'type_ids' : ['beta']})
+        self._assert_pages_match_list({'type_ids' : ['beta'], 'remove_duplicates' : True})
+        self._assert_pages_match_list({'type_ids' : ['gamma'], 'remove_duplicates' : True}, page_size=1)
+        self._assert_pages_match_list({'type_ids' : ['beta'], 'unit_filters' : {'md_2' : 0}})
+        self._assert_pages_match_list({'type_ids' : ['beta'], 'unit_fields' : ['key_1']})
+        self._assert_pages_match_list({'type_ids' : ['beta'], 'association_sort' : sort})
+        self._assert_pages_match_list({'type_ids' : ['beta'], 'association_sort' : sort, 'unit_filters' : {'md_2' : 1}})
+
+    def test_get_units_page_unit_sort(self):
+        sort = [('md_1', association_manager.SORT_DESCENDING)]
+        criteria = UnitAssociationCriteria(type_ids=['beta'], unit_sort=sort, limit=2, continuation='')
+
+        self.assertRaises(exceptions.InvalidValue, self.manager.get_units_page, 'repo-1', criteria)
+
+    def test_get_units_page_last_page(self):
+        criteria = UnitAssociationCriteria(type_ids=['beta'], continuation='')
+        units, continuation = self.manager.get_units_page('repo-1', criteria)
+
+        self.assertEqual(len(units), len(self.manager.get_units('repo-1', UnitAssociationCriteria(type_ids=['beta']))))
+        self.assertTrue(continuation is None)
+
+    # -- multiple repository tests --------------------------------------------
+
+    def _assert_by_repos_matches_list(self, criteria_args, repo_ids=('repo-1', 'repo-2', 'repo-3')):
+        """
+        Asserts the query for multiple repositories returns the same units in
+        the same order as the list query for each repository.
+        """
+        units_by_repo = self.manager.get_units_by_repos(list(repo_ids), UnitAssociationCriteria(**criteria_args))
+
+        self.assertEqual(set(repo_ids), set(units_by_repo.keys()))
+        for repo_id in repo_ids:
+            expected = self.manager.get_units(repo_id, UnitAssociationCriteria(**criteria_args))
+            units = units_by_repo[repo_id]
+            self.assertEqual([(u['unit_type_id'], u['unit_id'], u.get('owner_id')) for u in expected],
+                             [(u['unit_type_id'], u['unit_id'], u.get('owner_id')) for u in units])
+            self.assertEqual([u['metadata'] for u in expected], [u['metadata'] for u in units])
+
+    def test_get_units_by_repos_across_types(self):
+        self._assert_by_repos_matches_list({})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta', 'gamma']})
+        self._assert_by_repos_matches_list({'limit' : 3, 'skip' : 1})
+        self._assert_by_repos_matches_list({'association_sort' : [('owner_id', association_manager.SORT_DESCENDING)]})
+        self._assert_by_repos_matches_list({'remove_duplicates' : True})
+
+    def test_get_units_by_repos_by_type_unit_sort(self):
+        self._assert_by_repos_matches_list({'type_ids' : ['beta']})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'unit_sort' : [('md_1', association_manager.SORT_DESCENDING)]})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'unit_filters' : {'md_2' : 0}})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'limit' : 2, 'skip' : 1})
+        self._assert_by_repos_matches_list({'type_ids' : ['gamma'], 'remove_duplicates' : True})
+
+    def test_get_units_by_repos_by_type_association_sort(self):
+        sort = [('created', association_manager.SORT_DESCENDING)]
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'association_sort' : sort})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'association_sort' : sort, 'unit_filters' : {'md_2' : 1}})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'association_sort' : sort, 'limit' : 1})
+
+    @mock.patch('pulp.server.managers.repo.unit_association_query.DEFAULT_BATCH_SIZE', 1)
+    def test_get_units_by_repos_batches(self):
+        # the units are read in several queries and sorted after they are read
+        self._assert_by_repos_matches_list({'type_ids' : ['beta', 'gamma']})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'limit' : 2, 'skip' : 1})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'],
+                                            'unit_sort' : [('md_2', association_manager.SORT_ASCENDING),
+                                                           ('md_1', association_manager.SORT_DESCENDING)]})
+        self._assert_by_repos_matches_list({'type_ids' : ['beta'], 'unit_fields' : ['md_2'],
+                                            'unit_sort' : [('md_1', association_manager.SORT_DESCENDING)]})
+
+    @mock.patch('pulp.server.db.model.repository.RepoContentUnit.get_collection')
+    def test_get_units_by_repos_single_association_query(self, mock_get_collection):
+        self.manager.get_units_by_repos(['repo-1', 'repo-2'], UnitAssociationCriteria(type_ids=['beta']))
+
+        self.assertEqual(1, mock_get_collection.return_value.find.call_count)
+        spec = mock_get_collection.return_value.find.call_args[0][0]
+        self.assertEqual({'$in' : ['repo-1', 'repo-2']}, spec['repo_id'])
+
     def test_remove_duplicates(self):
         # Setup
         def unit(unit_type_id, unit_id, created):
@@ -60,7 +60,13 @@ class TestGetQueryResultsFromGet(unittest.TestCase):
     @mock.patch('pulp.server.db.model.criteria.Criteria.from_client_input')
     def test_ignore_fields(self, mock_from_client, mock_input):
         self.controller._get_query_results_from_get(('foo','bar'))
-        mock_from_client.assert_called_once_with({'limit':10})
+        mock_from_client.assert_called_once_with({'limit':10}, False)
+
+    @mock.patch('web.input', return_value={'field':[], 'continuation':''})
+    def test_continuation_not_paginated(self, mock_input):
+        # the results are returned without a continuation, so they must not be a page
+        self.assertRaises(exceptions.InvalidValue, self.controller._get_query_results_from_get)
+        self.assertEqual(self.mock_query_method.call_count, 0)
 
     @mock.patch('web.input', return_value={'field':['name']})
     def test_adds_id(self, mock_input):
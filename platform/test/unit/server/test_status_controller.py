@@ -11,8 +11,13 @@
 # You should have received a copy of GPLv2 along with this software; if not,
 # see http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
 
+import mock
+
 import base
 
+from pulp.server import debugging
+from pulp.server.db import metrics
+
 
 class StatusControllerTests(base.PulpWebserviceTests):
 
@@ -22,3 +27,55 @@ class StatusControllerTests(base.PulpWebserviceTests):
 
         self.assertEqual(status, 200)
         self.assertTrue('api_version' in body)
+
+    @mock.patch('pulp.server.debugging.PROFILER', debugging.RequestProfiler(5, 1))
+    def test_get_profiling(self):
+
+        status, body = self.get('/v2/status/')
+
+        # the profiling totals are only served to authenticated users
+        self.assertEqual(status, 200)
+        self.assertEqual(body.keys(), ['api_version'])
+
+
+class RequestStatisticsTests(base.PulpWebserviceTests):
+
+    @mock.patch('pulp.server.debugging.PROFILER', None)
+    def test_get_disabled(self):
+
+        status, body = self.get('/v2/status/requests/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'enabled': False})
+
+    @mock.patch('pulp.server.debugging.PROFILER', debugging.RequestProfiler(5, 1))
+    def test_get(self):
+
+        status, body = self.get('/v2/status/requests/')
+
+        self.assertEqual(status, 200)
+        self.assertTrue(body['enabled'])
+        self.assertTrue('db_calls' in body['requests'])
+        self.assertTrue('authorizations' in body['authorization'])
+
+
+class DatabaseMetricsTests(base.PulpWebserviceTests):
+
+    @mock.patch('pulp.server.db.metrics.METRICS', None)
+    def test_get_disabled(self):
+
+        status, body = self.get('/v2/status/database/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'enabled': False})
+
+    @mock.patch('pulp.server.db.metrics.METRICS', metrics.DatabaseMetrics())
+    def test_get(self):
+        metrics.record_call('repos', 'find', 0.5, 3)
+
+        status, body = self.get('/v2/status/database/')
+
+        self.assertEqual(status, 200)
+        self.assertTrue(body['enabled'])
+        self.assertEqual(body['collections']['repos']['find']['documents']['sum'], 3)
+        self.assertTrue('pool_wait' in body)
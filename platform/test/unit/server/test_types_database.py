@@ -16,7 +16,7 @@ import base
 
 import pulp.plugins.types.database as types_db
 from pulp.plugins.types.model import TypeDefinition
-from pulp.server.db.model.content import ContentType
+from pulp.server.db.model.content import ContentType, ContentTypesVersion
 import pulp.server.db.connection as pulp_db
 
 # -- constants -----------------------------------------------------------------
@@ -260,6 +260,92 @@ class TypesDatabaseTests(base.PulpServerTests):
         # Verify
         self.assertTrue(indexes is None)
 
+    # -- cache tests -----------------------------------------------------------
+
+    def test_type_definition_cached(self):
+        """
+        Tests repeated lookups are served from the cache.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1, DEF_2])
+        types_db.type_definition(DEF_1.id)
+        before = types_db.cache_statistics()
+
+        # Test
+        self.assertEqual(DEF_1.id, types_db.type_definition(DEF_1.id)['id'])
+        self.assertEqual(DEF_2.unit_key, types_db.type_units_unit_key(DEF_2.id))
+        self.assertEqual(set([DEF_1.id, DEF_2.id]), set(types_db.all_type_ids()))
+
+        # Verify
+        after = types_db.cache_statistics()
+        self.assertEqual(before['misses'], after['misses'])
+        self.assertEqual(before['hits'] + 3, after['hits'])
+        self.assertTrue(0 < after['hit_rate'] <= 1)
+
+    def test_type_definition_copy(self):
+        """
+        Tests modifying a returned definition does not change the cached one.
+        """
+
+        # Setup
+        types_db.update_database([DEF_2])
+
+        # Test
+        types_db.type_definition(DEF_2.id)['unit_key'].append('extra')
+        types_db.type_units_unit_key(DEF_2.id).append('extra')
+
+        # Verify
+        self.assertEqual(DEF_2.unit_key, types_db.type_definition(DEF_2.id)['unit_key'])
+
+    def test_update_invalidates_cache(self):
+        """
+        Tests updated definitions are returned as soon as the update completes.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        self.assertEqual([DEF_1.id], types_db.all_type_ids())
+
+        # Test
+        types_db.update_database([DEF_1, DEF_2])
+
+        # Verify
+        self.assertEqual(set([DEF_1.id, DEF_2.id]), set(types_db.all_type_ids()))
+        self.assertTrue(types_db.type_definition(DEF_2.id) is not None)
+
+    def test_version_stamp_invalidates_cache(self):
+        """
+        Tests a version bump made by another process is noticed once the check
+        interval has passed.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        self.assertEqual([DEF_1.id], types_db.all_type_ids())
+
+        # Simulate another process updating the definitions; the local cache
+        # is not invalidated by these calls
+        type_def = ContentType(DEF_2.id, DEF_2.display_name, DEF_2.description,
+                               DEF_2.unit_key, DEF_2.search_indexes, DEF_2.referenced_types)
+        ContentType.get_collection().save(type_def, safe=True)
+        ContentTypesVersion.get_collection().update({'_id' : ContentTypesVersion.STAMP_ID},
+                                                    {'$inc' : {'version' : 1}}, safe=True)
+
+        # Test
+        cached_ids = types_db.all_type_ids()
+
+        original_interval = types_db._CACHE.check_interval
+        types_db._CACHE.check_interval = 0
+        try:
+            reloaded_ids = types_db.all_type_ids()
+        finally:
+            types_db._CACHE.check_interval = original_interval
+
+        # Verify
+        self.assertEqual([DEF_1.id], cached_ids)
+        self.assertEqual(set([DEF_1.id, DEF_2.id]), set(reloaded_ids))
+
     # -- utility method tests ------------------------------------------------
 
     def test_create_or_update_type_collection(self):
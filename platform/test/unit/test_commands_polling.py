@@ -39,8 +39,8 @@ class PollingCommandTests(base.PulpClientTests):
         # Verify
         self.assertEqual(.5, command.poll_frequency_in_seconds)  # from test-override-admin.conf
 
-    @mock.patch('time.sleep')
-    def test_poll_single_task(self, mock_sleep):
+    @mock.patch('pulp.client.commands.polling.time')
+    def test_poll_single_task(self, mock_time):
         """
         Task Count: 1
         Statuses: None; normal progression of waiting to running to completed
@@ -51,6 +51,9 @@ class PollingCommandTests(base.PulpClientTests):
         """
 
         # Setup
+        mock_time.time.return_value = 0
+        self.command.poll_frequency_in_seconds = 1
+
         sim = TaskSimulator()
         sim.install(self.bindings)
 
@@ -76,8 +79,9 @@ class PollingCommandTests(base.PulpClientTests):
         expected_tags = ['abort', 'delayed-spinner', 'delayed-spinner', 'succeeded']
         self.assertEqual(self.prompt.get_write_tags(), expected_tags)
 
-        self.assertEqual(4, mock_sleep.call_count) # 2 for waiting, 2 for running
-        self.assertEqual(mock_sleep.call_args_list[0][0][0], 0)  # frequency passed to sleep
+        # the simulator does not wait so the command sleeps when the state is unchanged
+        self.assertEqual(2, mock_time.sleep.call_count) # 1 for waiting, 1 for running
+        self.assertEqual(mock_time.sleep.call_args_list[0][0][0], 1)  # frequency passed to sleep
 
         self.assertEqual(3, mock_progress_call.call_count) # 2 running, 1 final
 
@@ -85,6 +89,33 @@ class PollingCommandTests(base.PulpClientTests):
         self.assertEqual(1, len(completed_tasks))
         self.assertEqual(STATE_FINISHED, completed_tasks[0].state)
 
+    def test_poll_single_task_wait(self):
+        """
+        Task Count: 1
+        Statuses: None; normal progression of waiting to running to completed
+        Result: Success
+
+        Verifies the server is asked to wait for the state last seen to change.
+        """
+
+        # Setup
+        sim = TaskSimulator()
+        sim.install(self.bindings)
+        sim.add_task_states('123', [STATE_WAITING, STATE_RUNNING, STATE_FINISHED])
+
+        mock_get_task = mock.MagicMock(side_effect=sim.get_task)
+        self.bindings.tasks.get_task = mock_get_task
+
+        # Test
+        task_list = sim.get_all_tasks().response_body
+        completed_tasks = self.command.poll(task_list, {})
+
+        # Verify
+        self.assertEqual(STATE_FINISHED, completed_tasks[0].state)
+        self.assertEqual(2, mock_get_task.call_count)
+        mock_get_task.assert_any_call('123', wait=0, state=STATE_WAITING)
+        mock_get_task.assert_any_call('123', wait=0, state=STATE_RUNNING)
+
     def test_poll_task_list(self):
         """
         Task Count: 3
@@ -68,6 +68,21 @@ class TestRepoUnitSearchAPI(unittest.TestCase):
         self.assertEqual(self.query['filters']['association'],
                 {'created': {'$lte': '2012-03-15'}})
 
+    def test_page_size(self):
+        pages = []
+        for items, continuation in (([1, 2], 'abc'), ([3], None)):
+            response = mock.MagicMock()
+            response.response_body = {'items' : items, 'continuation' : continuation}
+            pages.append(response)
+        self.api.server.POST.side_effect = pages
+
+        response = self.api.search('repo1', type_ids=['rpm'], **{'page-size' : 2})
+
+        self.assertEqual(response.response_body, [1, 2, 3])
+        self.assertEqual(self.api.server.POST.call_count, 2)
+        self.assertEqual(self.query['continuation'], 'abc')
+        self.assertEqual(self.query['limit'], 2)
+
 class TestRepoUnitCopyAPI(unittest.TestCase):
     def setUp(self):
         self.api = RepositoryUnitAPI(mock.MagicMock())
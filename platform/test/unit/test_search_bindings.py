@@ -43,6 +43,35 @@ class TestSearchAPI(unittest.TestCase):
         self.api.search(limit=20)
         mock_compose.assert_called_once_with(limit=20)
 
+    def _pages(self, *pages):
+        responses = []
+        for items, continuation in pages:
+            response = mock.MagicMock()
+            response.response_body = {'items' : items, 'continuation' : continuation}
+            responses.append(response)
+        self.api.server.POST.side_effect = responses
+
+    def test_search_pages(self):
+        self._pages(([1, 2], 'abc'), ([3], None))
+
+        ret = self.api.search(**{'page-size' : 2})
+
+        self.assertEqual(ret, [1, 2, 3])
+        calls = self.api.server.POST.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][0][1], {'criteria' : {'limit' : 2, 'continuation' : ''}})
+        self.assertEqual(calls[1][0][1], {'criteria' : {'limit' : 2, 'continuation' : 'abc'}})
+
+    def test_search_pages_limit(self):
+        self._pages(([1, 2], 'abc'), ([3], 'def'))
+
+        ret = self.api.search(limit=3, **{'page-size' : 2})
+
+        self.assertEqual(ret, [1, 2, 3])
+        calls = self.api.server.POST.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1][0][1], {'criteria' : {'limit' : 1, 'continuation' : 'abc'}})
+
     def test_remove_non_criteria(self):
         self.api.search(gt=[('count', 20)])
         spec = self.api.server.POST.call_args[0][1]['criteria']
@@ -148,6 +148,7 @@ class TestDisplayUnitAssociationsCommand(unittest.TestCase):
         self.assertTrue('--before' in options_present)
         self.assertTrue('--repo-id' in options_present)
         self.assertTrue('--details' in options_present)
+        self.assertTrue('--page-size' in options_present)
 
     def test_inherits_search(self):
         # make sure this inherits features that were tested elsewhere.
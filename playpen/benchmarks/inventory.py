@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Nodes unit inventory benchmark.
+
+Writes a manifest of --units rpm-like units and generates the same number of
+child units, --changed of which differ from the parent.  Times building the
+nodes importer UnitInventory and listing the units on the parent only and on
+the child only, and reports the peak memory (max RSS) of the forked process
+that does it.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+
+from pulp_node.manifest import Manifest, UnitWriter, UNITS_FILE_NAME
+from pulp_node.importers.inventory import UnitInventory
+
+
+def unit(n, owner=False):
+    unit = {
+        'unit_id': '%032x' % n,
+        'type_id': 'rpm',
+        'unit_key': {'name': 'package-%d' % n, 'version': '1.0', 'release': '1',
+                     'epoch': '0', 'arch': 'noarch', 'checksumtype': 'sha256',
+                     'checksum': '%064x' % n},
+        'metadata': {'summary': 'benchmark package %d' % n, 'size': n, 'requires': []},
+        'storage_path': '/var/lib/pulp/content/rpm/package-%d.rpm' % n,
+        'relative_path': 'content/rpm/package-%d.rpm' % n,
+    }
+    if owner:
+        unit['owner_type'] = 'importer'
+        unit['owner_id'] = 'nodes_http_importer'
+    return unit
+
+
+def child_units(units, changed):
+    for n in xrange(changed, units + changed):
+        yield unit(n, True)
+
+
+def inventory(manifest, units, changed):
+    start = time.time()
+    unit_inventory = UnitInventory(manifest, child_units(units, changed))
+    parent_only = sum(1 for u in unit_inventory.units_on_parent_only())
+    child_only = len(unit_inventory.units_on_child_only())
+    return time.time() - start, parent_only, child_only
+
+
+def measure(manifest, units, changed):
+    """
+    Build the inventory in a forked process so the peak memory is its own.
+    """
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        os.write(w, '%f %d %d' % inventory(manifest, units, changed))
+        os._exit(0)
+    os.close(w)
+    elapsed, parent_only, child_only = os.read(r, 128).split()
+    os.close(r)
+    usage = os.wait4(pid, 0)[2]
+    return float(elapsed), int(parent_only), int(child_only), usage.ru_maxrss
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--units', type='int', default=1000000, help='number of units')
+    parser.add_option('--changed', type='int', default=1000,
+                      help='number of units added on the parent and removed from the child')
+    options = parser.parse_args()[0]
+
+    dir_path = tempfile.mkdtemp()
+    try:
+        writer = UnitWriter(os.path.join(dir_path, UNITS_FILE_NAME))
+        for n in xrange(options.units):
+            writer.add(unit(n))
+        writer.close()
+        manifest = Manifest('benchmark')
+        manifest.set_units(writer)
+        elapsed, parent_only, child_only, rss = measure(manifest, options.units, options.changed)
+        print 'inventory of %d units: %.1fs, peak rss %.1f MB (parent only: %d, child only: %d)' % (
+            options.units, elapsed, rss / 1024.0, parent_only, child_only)
+    finally:
+        shutil.rmtree(dir_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Resource lock table throughput benchmark.
+
+Runs the same stream of call requests through the coordinator's conflict
+detection with each resource lock table: every call request is checked for
+conflicts and has its resources locked, and the oldest call request is released
+once more than --queue-depth call requests are outstanding, the way the
+dequeue callback does when a task completes.
+
+The resources mimic bursts of scheduled repository syncs and consumer binds
+over a pool of repositories and consumers.
+
+This benchmark uses the database configured in /etc/pulp/server.conf and
+removes all of its call resources.
+"""
+
+import random
+import time
+import uuid
+from optparse import OptionParser
+
+from pulp.server.db import connection
+from pulp.server.dispatch import constants as dispatch_constants
+from pulp.server.dispatch import coordinator
+from pulp.server.dispatch import locktable
+
+
+def generate_resources(count, repos, consumers):
+    resources_list = []
+    for i in range(count):
+        repo_id = 'repo-%d' % random.randint(0, repos - 1)
+        if random.random() < 0.5:
+            # repository sync
+            resources = {dispatch_constants.RESOURCE_UPDATE_OPERATION:
+                             {dispatch_constants.RESOURCE_REPOSITORY_TYPE: [repo_id]}}
+        else:
+            # consumer bind
+            consumer_id = 'consumer-%d' % random.randint(0, consumers - 1)
+            resources = {dispatch_constants.RESOURCE_READ_OPERATION:
+                             {dispatch_constants.RESOURCE_REPOSITORY_TYPE: [repo_id]},
+                         dispatch_constants.RESOURCE_UPDATE_OPERATION:
+                             {dispatch_constants.RESOURCE_CONSUMER_TYPE: [consumer_id]}}
+        resources_list.append(resources)
+    return resources_list
+
+
+def run(lock_table, resources_list, queue_depth):
+    coordinator_instance = coordinator.Coordinator(resource_lock_table=lock_table)
+    lock_table.clear()
+    outstanding = []
+    responses = {}
+
+    start = time.time()
+    for resources in resources_list:
+        response, blocking, reasons, call_resources = coordinator_instance._find_conflicts(resources)
+        responses[response] = responses.get(response, 0) + 1
+        if response is dispatch_constants.CALL_REJECTED_RESPONSE:
+            continue
+        call_request_id = str(uuid.uuid4())
+        coordinator.set_call_request_id_on_call_resources(call_request_id, call_resources)
+        lock_table.add(call_resources)
+        outstanding.append(call_request_id)
+        if len(outstanding) > queue_depth:
+            lock_table.remove(outstanding.pop(0))
+    elapsed = time.time() - start
+
+    lock_table.clear()
+    return elapsed, responses
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--calls', type='int', default=20000, help='number of call requests')
+    parser.add_option('--repos', type='int', default=500, help='number of repositories')
+    parser.add_option('--consumers', type='int', default=5000, help='number of consumers')
+    parser.add_option('--queue-depth', type='int', default=1000, help='outstanding call requests')
+    options = parser.parse_args()[0]
+
+    connection.initialize()
+    random.seed(0)
+    resources_list = generate_resources(options.calls, options.repos, options.consumers)
+
+    for name in ('database', 'memory'):
+        lock_table = locktable.RESOURCE_LOCK_TABLES[name]()
+        elapsed, responses = run(lock_table, resources_list, options.queue_depth)
+        print '%-8s %8.0f calls/s  %s' % (name, options.calls / elapsed,
+                                          ', '.join('%s: %d' % i for i in sorted(responses.items())))
+
+
+if __name__ == '__main__':
+    main()
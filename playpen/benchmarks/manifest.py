@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Nodes manifest benchmark.
+
+Writes --units units (rpm-like unit keys and metadata) using the nodes UnitWriter
+(a single units file) and the ChunkWriter (chunk files written by --workers
+threads) and reports the time taken by each.  Then reports, for reading the
+units file the way the child importer does (iterate all units then fetch every
+--fetch-every unit by reference):
+ * decompressed: the units file is decompressed to disk then read
+ * blocks: the units are read directly from the compressed blocks
+
+For each, the wall time, peak memory (max RSS of a forked process) and peak
+disk used in the working directory are reported.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+
+from pulp_node.compression import decompress
+from pulp_node.manifest import UnitWriter, ChunkWriter, UnitIterator, UNITS_FILE_NAME
+
+
+def write(path, units, writer=None):
+    if writer is None:
+        writer = UnitWriter(path)
+    for n in xrange(units):
+        unit = {
+            'unit_id': 'unit-%d' % n,
+            'type_id': 'rpm',
+            'unit_key': {'name': 'package-%d' % n, 'version': '1.0', 'release': '1',
+                         'epoch': '0', 'arch': 'noarch', 'checksumtype': 'sha256',
+                         'checksum': '%064x' % n},
+            'metadata': {'summary': 'benchmark package %d' % n, 'size': n, 'requires': []},
+            'storage_path': '/var/lib/pulp/content/rpm/package-%d.rpm' % n,
+            'relative_path': 'content/rpm/package-%d.rpm' % n,
+        }
+        writer.add(unit)
+    writer.close()
+    return writer
+
+
+def disk_usage(dir_path):
+    return sum(os.path.getsize(os.path.join(dir_path, f)) for f in os.listdir(dir_path))
+
+
+def read(dir_path, writer, fetch_every, use_blocks):
+    path = os.path.join(dir_path, UNITS_FILE_NAME)
+    shutil.copy(writer.path, path)
+    if use_blocks:
+        units = UnitIterator(path, writer.total_units, writer.blocks)
+    else:
+        # the compressed file is kept next to the decompressed file
+        path = decompress(path)
+        units = UnitIterator(path, writer.total_units)
+    peak_disk = disk_usage(dir_path)
+    refs = []
+    for n, (unit, ref) in enumerate(units):
+        if n % fetch_every == 0:
+            refs.append(ref)
+    for ref in refs:
+        ref.fetch()
+    return peak_disk
+
+
+def measure(writer, fetch_every, use_blocks):
+    """
+    Read the units in a forked process so the peak memory is its own.
+    """
+    dir_path = tempfile.mkdtemp()
+    r, w = os.pipe()
+    start = time.time()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        peak_disk = read(dir_path, writer, fetch_every, use_blocks)
+        os.write(w, str(peak_disk))
+        os._exit(0)
+    os.close(w)
+    peak_disk = int(os.read(r, 64))
+    os.close(r)
+    usage = os.wait4(pid, 0)[2]
+    elapsed = time.time() - start
+    shutil.rmtree(dir_path)
+    return elapsed, usage.ru_maxrss, peak_disk
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--units', type='int', default=500000, help='number of units')
+    parser.add_option('--fetch-every', type='int', default=10,
+                      help='fetch every nth unit by reference')
+    parser.add_option('--workers', type='int', default=4, help='number of chunk writer threads')
+    options = parser.parse_args()[0]
+
+    dir_path = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        writer = write(os.path.join(dir_path, UNITS_FILE_NAME), options.units)
+        print 'wrote %d units (%d blocks, %.1f MB) in %.1fs' % (
+            writer.total_units, len(writer.blocks), os.path.getsize(writer.path) / 1048576.0,
+            time.time() - start)
+        chunks_dir = os.path.join(dir_path, 'chunks')
+        os.mkdir(chunks_dir)
+        start = time.time()
+        chunk_writer = ChunkWriter(os.path.join(chunks_dir, UNITS_FILE_NAME), workers=options.workers)
+        write(None, options.units, chunk_writer)
+        print 'wrote %d units (%d chunks) in %.1fs' % (
+            chunk_writer.total_units, len(chunk_writer.chunks), time.time() - start)
+        print '%-14s %10s %14s %14s' % ('', 'time', 'peak rss', 'peak disk')
+        for name, use_blocks in (('decompressed', False), ('blocks', True)):
+            elapsed, rss, disk = measure(writer, options.fetch_every, use_blocks)
+            print '%-14s %9.1fs %11.1f MB %11.1f MB' % (name, elapsed, rss / 1024.0, disk / 1048576.0)
+    finally:
+        shutil.rmtree(dir_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Nodes unit download benchmark.
+
+Serves a synthetic repository of --units files (every --tarball-every one a
+tarball of --tarball-files files) from a local HTTP server and downloads it
+using the nodes importer UnitDownloadManager with a threaded nectar downloader.
+Adding a unit is simulated by sleeping --add-latency milliseconds, standing in
+for the database writes.  Times the download with the units added on the
+downloader's listener thread (--workers 0) and by the manager's worker threads.
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from optparse import OptionParser
+from BaseHTTPServer import HTTPServer
+from SimpleHTTPServer import SimpleHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+from nectar.config import DownloaderConfig
+from nectar.downloaders.threaded import HTTPThreadedDownloader
+
+from pulp_node import constants
+from pulp_node.importers.download import UnitDownloadManager
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(SimpleHTTPRequestHandler):
+
+    def log_message(self, *unused):
+        pass
+
+
+class Strategy(object):
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def add_unit(self, request, unit):
+        time.sleep(self.latency)
+
+
+class Request(object):
+
+    repo_id = 'benchmark'
+
+    def __init__(self, downloader, working_dir):
+        self.downloader = downloader
+        self.working_dir = working_dir
+
+    def cancelled(self):
+        return False
+
+
+class UnitRef(object):
+
+    def __init__(self, unit):
+        self.unit = unit
+
+    def fetch(self):
+        return dict(self.unit)
+
+
+def populate(dir_path, units, tarball_every, tarball_files):
+    content = os.urandom(4096)
+    for n in xrange(units):
+        path = os.path.join(dir_path, 'unit-%d' % n)
+        if tarball_every and n % tarball_every == 0:
+            tree = tempfile.mkdtemp()
+            for i in xrange(tarball_files):
+                with open(os.path.join(tree, 'file-%d' % i), 'w') as fp:
+                    fp.write(content)
+            tb = tarfile.open(path, 'w')
+            try:
+                tb.add(tree, arcname='unit-%d' % n)
+            finally:
+                tb.close()
+            shutil.rmtree(tree)
+        else:
+            with open(path, 'w') as fp:
+                fp.write(content)
+
+
+def download(base_url, options, workers):
+    dir_path = tempfile.mkdtemp()
+    try:
+        downloader = HTTPThreadedDownloader(DownloaderConfig(max_concurrent=options.concurrency))
+        request = Request(downloader, dir_path)
+        manager = UnitDownloadManager(Strategy(options.add_latency / 1000.0), request, workers=workers)
+        requests = []
+        for n in xrange(options.units):
+            unit = {'unit_id': str(n), 'type_id': 'benchmark', 'unit_key': {'n': n}}
+            if options.tarball_every and n % options.tarball_every == 0:
+                unit[constants.PUBLISHED_AS_TARBALL] = True
+            url = '%s/unit-%d' % (base_url, n)
+            destination = os.path.join(dir_path, 'unit-%d' % n)
+            requests.append(manager.create_request(url, destination, UnitRef(unit)))
+        start = time.time()
+        downloader.event_listener = manager
+        manager.start()
+        try:
+            downloader.download(requests)
+        finally:
+            manager.shutdown()
+        elapsed = time.time() - start
+        return elapsed, len(manager.error_list())
+    finally:
+        shutil.rmtree(dir_path)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--units', type='int', default=2000, help='number of units')
+    parser.add_option('--tarball-every', type='int', default=10, help='every nth unit is a tarball')
+    parser.add_option('--tarball-files', type='int', default=20, help='number of files in a tarball')
+    parser.add_option('--add-latency', type='float', default=5, help='milliseconds to add a unit')
+    parser.add_option('--concurrency', type='int', default=5, help='concurrent downloads')
+    parser.add_option('--workers', type='int', default=4, help='number of worker threads')
+    options = parser.parse_args()[0]
+
+    dir_path = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(dir_path)
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+    try:
+        populate(dir_path, options.units, options.tarball_every, options.tarball_files)
+        base_url = 'http://127.0.0.1:%d' % server.server_address[1]
+        for workers in (0, options.workers):
+            elapsed, errors = download(base_url, options, workers)
+            print 'workers: %d  %d units in %.1fs (%.0f/s) errors: %d' % (
+                workers, options.units, elapsed, options.units / elapsed, errors)
+    finally:
+        server.shutdown()
+        os.chdir(cwd)
+        shutil.rmtree(dir_path)
+
+
+if __name__ == '__main__':
+    main()
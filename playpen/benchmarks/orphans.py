@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Orphan scan benchmark.
+
+Populates a content type with --units units, associates all but --orphans of
+them with --repos repositories and times:
+ * the per-unit association lookup the orphan manager used to do, measured
+   over the first --baseline-units units and extrapolated to all of them
+ * the orphan manager's summary of the orphans
+ * the orphan manager's deletion of the orphans (without files on disk)
+
+This benchmark uses the database configured in /etc/pulp/server.conf and
+removes all of its content types, content units and repository associations.
+"""
+
+import time
+import uuid
+from optparse import OptionParser
+
+from pulp.plugins.types import database as types_db
+from pulp.plugins.types.model import TypeDefinition
+from pulp.server.db import connection
+from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.managers.content.orphan import OrphanManager
+
+TYPE_DEF = TypeDefinition('benchmark_type', 'Benchmark Type', None, 'name', [], [])
+INSERT_BATCH_SIZE = 10000
+
+
+def populate(units, orphans, repos):
+    types_db.clean()
+    types_db.update_database([TYPE_DEF])
+    units_collection = types_db.type_units_collection(TYPE_DEF.id)
+    associations_collection = RepoContentUnit.get_collection()
+    associations_collection.remove(safe=True)
+
+    unit_docs = []
+    association_docs = []
+    for i in xrange(units):
+        unit_id = str(uuid.uuid4())
+        unit_docs.append({'_id': unit_id, '_content_type_id': TYPE_DEF.id, 'name': 'unit-%d' % i})
+        if i >= orphans:
+            repo_id = 'repo-%d' % (i % repos)
+            association_docs.append(RepoContentUnit(repo_id, unit_id, TYPE_DEF.id,
+                                                    RepoContentUnit.OWNER_TYPE_IMPORTER, 'importer'))
+        if len(unit_docs) == INSERT_BATCH_SIZE:
+            units_collection.insert(unit_docs, safe=True)
+            unit_docs = []
+        if len(association_docs) >= INSERT_BATCH_SIZE:
+            associations_collection.insert(association_docs, safe=True)
+            association_docs = []
+    if unit_docs:
+        units_collection.insert(unit_docs, safe=True)
+    if association_docs:
+        associations_collection.insert(association_docs, safe=True)
+
+
+def per_unit_scan(limit):
+    # the orphan scan as it was before the set based implementation
+    units_collection = types_db.type_units_collection(TYPE_DEF.id)
+    associations_collection = RepoContentUnit.get_collection()
+    count = 0
+    for content_unit in units_collection.find({}, fields=['_id']).limit(limit):
+        if associations_collection.find({'unit_id': content_unit['_id']}).count() > 0:
+            continue
+        count += 1
+    return count
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--units', type='int', default=1000000, help='number of content units')
+    parser.add_option('--orphans', type='int', default=100000, help='number of orphaned content units')
+    parser.add_option('--repos', type='int', default=20, help='number of repositories')
+    parser.add_option('--baseline-units', type='int', default=20000,
+                      help='number of units timed with the per-unit lookup')
+    options = parser.parse_args()[0]
+
+    connection.initialize()
+    manager = OrphanManager()
+
+    elapsed = timed(populate, options.units, options.orphans, options.repos)[0]
+    print 'populated %d units in %.1fs' % (options.units, elapsed)
+
+    elapsed = timed(per_unit_scan, options.baseline_units)[0]
+    print 'per-unit scan  %8.1fs (extrapolated from %d units)' % (
+        elapsed * options.units / options.baseline_units, options.baseline_units)
+
+    elapsed, summary = timed(manager.orphans_summary)
+    print 'summary        %8.1fs %s' % (elapsed, summary)
+
+    elapsed = timed(manager.delete_orphans_by_type, TYPE_DEF.id)[0]
+    print 'delete         %8.1fs' % elapsed
+
+    types_db.clean()
+    RepoContentUnit.get_collection().remove(safe=True)
+
+
+if __name__ == '__main__':
+    main()
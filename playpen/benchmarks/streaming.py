@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+REST response encoding benchmark.
+
+Encodes the response to a search returning --units rpm-like units (read from
+a generator standing in for the database cursor) the way the JSONController
+does:
+ * list: the units are read into a list which is encoded as a single string
+ * stream: the units are encoded as they are read, one chunk at a time
+
+The WSGI server is simulated by reading and discarding the body. For each,
+the wall time and peak memory (max RSS of a forked process) are reported.
+"""
+
+import os
+import time
+from optparse import OptionParser
+
+from pulp.server.compat import json, json_util
+from pulp.server.webservices.controllers.base import JSONController
+
+
+def cursor(units):
+    for n in xrange(units):
+        yield {
+            '_id': '%032x' % n,
+            '_content_type_id': 'rpm',
+            'name': 'package-%d' % n, 'version': '1.0', 'release': '1',
+            'epoch': '0', 'arch': 'noarch', 'checksumtype': 'sha256',
+            'checksum': '%064x' % n,
+            'summary': 'benchmark package %d' % n, 'size': n, 'requires': [],
+            '_storage_path': '/var/lib/pulp/content/rpm/package-%d.rpm' % n,
+            '_href': '/pulp/api/v2/content/units/rpm/%032x/' % n,
+        }
+
+
+def respond(units, stream):
+    if stream:
+        body = JSONController()._stream(cursor(units))
+    else:
+        body = [json.dumps(list(cursor(units)), default=json_util.default)]
+    size = 0
+    for chunk in body:
+        size += len(chunk)
+    return size
+
+
+def measure(units, stream):
+    """
+    Encode the response in a forked process so the peak memory is its own.
+    """
+    r, w = os.pipe()
+    start = time.time()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        os.write(w, str(respond(units, stream)))
+        os._exit(0)
+    os.close(w)
+    size = int(os.read(r, 64))
+    os.close(r)
+    usage = os.wait4(pid, 0)[2]
+    return time.time() - start, usage.ru_maxrss, size
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--units', type='int', default=200000, help='number of units')
+    options = parser.parse_args()[0]
+
+    print '%d units' % options.units
+    print '%-8s %10s %14s %14s' % ('', 'time', 'peak rss', 'body')
+    for name, stream in (('list', False), ('stream', True)):
+        elapsed, rss, size = measure(options.units, stream)
+        print '%-8s %9.1fs %11.1f MB %11.1f MB' % (name, elapsed, rss / 1024.0, size / 1048576.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Synchronous call round-trip benchmark.
+
+Runs a trivial call through Coordinator.execute_call_synchronously over and
+over and reports the round-trip latency percentiles, first waiting on the task
+the way wait_for_task used to (sleeping poll_interval between checks of the
+task state), then with the event-driven wait_for_task.
+
+The queued call collection is replaced by a mock and the resource lock table
+is kept in memory, so mongo is not required.
+"""
+
+import datetime
+import time
+from optparse import OptionParser
+
+import mock
+
+from pulp.server.dispatch import coordinator
+from pulp.server.dispatch import factory as dispatch_factory
+from pulp.server.dispatch import locktable
+from pulp.server.dispatch import pickling
+from pulp.server.dispatch.call import CallRequest
+from pulp.server.dispatch.taskqueue import TaskQueue
+from pulp.server.exceptions import OperationTimedOut
+from pulp.server.managers import factory as managers_factory
+
+
+def call():
+    pass
+
+
+def polling_wait_for_task(poll_interval):
+    """
+    The polling implementation of wait_for_task this benchmark compares against.
+    """
+    def wait_for_task(task, states, timeout=None):
+        start = datetime.datetime.now()
+        while task.call_report.state not in states:
+            time.sleep(poll_interval)
+            if timeout is None:
+                continue
+            if datetime.datetime.now() - start < timeout:
+                continue
+            raise OperationTimedOut(timeout)
+    return wait_for_task
+
+
+def run(coordinator_instance, calls):
+    latencies = []
+    for i in range(calls):
+        start = time.time()
+        coordinator_instance.execute_call_synchronously(CallRequest(call))
+        latencies.append((time.time() - start) * 1000)
+    latencies.sort()
+    return latencies
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def report(name, latencies):
+    print '%-10s p50 %8.2f ms, p90 %8.2f ms, p99 %8.2f ms, max %8.2f ms' % \
+          (name, percentile(latencies, 0.5), percentile(latencies, 0.9),
+           percentile(latencies, 0.99), latencies[-1])
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--calls', type='int', default=200, help='number of synchronous calls')
+    parser.add_option('--poll-interval', type='float', default=0.5,
+                      help='poll interval of the polling wait, in seconds')
+    options = parser.parse_args()[0]
+
+    managers_factory.initialize()
+    pickling.initialize()
+
+    with mock.patch('pulp.server.db.model.dispatch.QueuedCall.get_collection'):
+        task_queue = TaskQueue(9)
+    task_queue.start()
+    dispatch_factory._TASK_QUEUE = task_queue
+
+    coordinator_instance = coordinator.Coordinator(locktable.ResourceLockTable())
+    dispatch_factory._COORDINATOR = coordinator_instance
+
+    event_driven_wait_for_task = coordinator.wait_for_task
+    coordinator.wait_for_task = polling_wait_for_task(options.poll_interval)
+    report('polling', run(coordinator_instance, options.calls))
+    coordinator.wait_for_task = event_driven_wait_for_task
+    report('events', run(coordinator_instance, options.calls))
+
+    task_queue.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Task queue dispatch benchmark.
+
+Enqueues a mix of independent tasks, dependency chains and fan-outs (one task
+blocking many) with varying weights into a running TaskQueue. The tasks do no
+work: they are handed to a small pool of completion threads as soon as they
+are run. Dispatch latency is the time between a task becoming ready (enqueued
+with no dependencies, or its last dependency completed) and the task being run.
+
+The queued call collection is replaced by a mock, so mongo is not required.
+"""
+
+import Queue
+import random
+import threading
+import time
+from optparse import OptionParser
+
+import mock
+
+from pulp.server.dispatch import constants as dispatch_constants
+from pulp.server.dispatch.call import CallRequest
+from pulp.server.dispatch.task import Task
+from pulp.server.dispatch.taskqueue import TaskQueue
+
+
+PRINCIPAL = {'login': 'benchmark'}
+
+
+def call():
+    pass
+
+
+class BenchmarkTask(Task):
+    """
+    Task that records its timing and lets the completion threads finish it.
+    """
+
+    completion_queue = None
+
+    def __init__(self, weight, dependencies):
+        call_request = CallRequest(call, principal=PRINCIPAL, weight=weight)
+        for task in dependencies:
+            call_request.dependencies[task.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        super(BenchmarkTask, self).__init__(call_request)
+        self.blocking_tasks = dependencies
+        self.enqueued_at = None
+        self.run_at = None
+        self.completed_at = None
+
+    def run(self):
+        self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+        self.run_at = time.time()
+        self.completion_queue.put(self)
+
+    def ready_at(self):
+        times = [t.completed_at for t in self.blocking_tasks]
+        times.append(self.enqueued_at)
+        return max(times)
+
+
+def complete_tasks(completion_queue):
+    while True:
+        task = completion_queue.get()
+        if task is None:
+            return
+        task.completed_at = time.time()
+        task._succeeded()
+
+
+def generate_tasks(count, chain_length, fan_out):
+    """
+    Generate roughly equal thirds of independent, chained and fanned out tasks.
+    """
+    tasks = []
+    while len(tasks) < count:
+        shape = random.randint(0, 2)
+        weight = random.choice((0, 1, 1, 1, 2))
+        if shape == 0:
+            tasks.append(BenchmarkTask(weight, []))
+        elif shape == 1:
+            chain = [BenchmarkTask(weight, [])]
+            for i in range(chain_length - 1):
+                chain.append(BenchmarkTask(weight, [chain[-1]]))
+            tasks.extend(chain)
+        else:
+            parent = BenchmarkTask(weight, [])
+            tasks.append(parent)
+            tasks.extend(BenchmarkTask(weight, [parent]) for i in range(fan_out))
+    return tasks[:count]
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--tasks', type='int', default=50000, help='number of tasks to enqueue')
+    parser.add_option('--chain-length', type='int', default=5, help='length of the dependency chains')
+    parser.add_option('--fan-out', type='int', default=10, help='tasks blocked by each fan-out parent')
+    parser.add_option('--concurrency', type='int', default=9, help='task queue concurrency threshold')
+    parser.add_option('--completers', type='int', default=4, help='number of completion threads')
+    options = parser.parse_args()[0]
+
+    random.seed(0)
+    completion_queue = Queue.Queue()
+    BenchmarkTask.completion_queue = completion_queue
+    completers = [threading.Thread(target=complete_tasks, args=(completion_queue,))
+                  for i in range(options.completers)]
+    for t in completers:
+        t.setDaemon(True)
+        t.start()
+
+    tasks = generate_tasks(options.tasks, options.chain_length, options.fan_out)
+
+    with mock.patch('pulp.server.db.model.dispatch.QueuedCall.get_collection'):
+        queue = TaskQueue(options.concurrency)
+    queue.start()
+
+    start = time.time()
+    for task in tasks:
+        # the queue lock keeps the completion threads from finishing a task
+        # before its enqueue time is recorded
+        queue.lock()
+        try:
+            task.enqueued_at = time.time()
+            queue.enqueue(task)
+        finally:
+            queue.unlock()
+    enqueued = time.time()
+
+    for task in tasks:
+        while task.call_report.state not in dispatch_constants.CALL_COMPLETE_STATES:
+            time.sleep(0.01)
+    finished = time.time()
+
+    queue.stop()
+    for t in completers:
+        completion_queue.put(None)
+
+    latencies = sorted((t.run_at - t.ready_at()) * 1000 for t in tasks)
+    print 'tasks:            %d' % len(tasks)
+    print 'enqueue time:     %.2f s' % (enqueued - start)
+    print 'total time:       %.2f s' % (finished - start)
+    print 'dispatch latency: p50 %.2f ms, p90 %.2f ms, p99 %.2f ms, max %.2f ms' % \
+          (percentile(latencies, 0.5), percentile(latencies, 0.9),
+           percentile(latencies, 0.99), latencies[-1])
+
+
+if __name__ == '__main__':
+    main()
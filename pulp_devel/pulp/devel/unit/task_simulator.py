@@ -117,9 +117,10 @@ class TaskSimulator(object):
 
     # -- task bindings api ----------------------------------------------------------------------------------
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, wait=None, state=None):
         """
-        Returns the next state for the given task.
+        Returns the next state for the given task. The wait and state arguments
+        are accepted for compatibility with the bindings and are ignored.
 
         :return: response object as if the bindings had contacted the server
         :rtype:  pulp.bindings.response.Response